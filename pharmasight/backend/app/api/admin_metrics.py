@@ -15,6 +15,15 @@ from sqlalchemy.orm import Session
 from app.database import get_db
 from app.dependencies import get_current_admin
 from app.rate_limit import limiter
+from app.services import (
+    branding_asset_cache,
+    company_config_cache,
+    permission_resolver,
+    rendered_pdf_cache,
+    signed_url_cache,
+    storage_http,
+    tenant_engine_manager,
+)
 from app.services.platform_metrics_service import (
     get_summary,
     get_companies_list,
@@ -149,6 +158,79 @@ def metrics_health(
     return get_health(db)
 
 
+@router.get("/metrics/tenant-pools")
+@limiter.limit("60/minute")
+def metrics_tenant_pools(
+    request: Request,
+    _admin: None = Depends(get_current_admin),
+):
+    """
+    Tenant DB connection pools of this app instance: budget, per-engine checkouts, waits,
+    timeouts and overflow use, and engine evictions. PLATFORM_ADMIN only.
+    """
+    return {**tenant_engine_manager.get_metrics(), "generated_at": datetime.now(timezone.utc).isoformat()}
+
+
+@router.get("/metrics/branding-asset-cache")
+@limiter.limit("60/minute")
+def metrics_branding_asset_cache(
+    request: Request,
+    _admin: None = Depends(get_current_admin),
+):
+    """Branding asset (logo/stamp/signature) cache of this app instance: hits, misses, bytes. PLATFORM_ADMIN only."""
+    return {**branding_asset_cache.get_metrics(), "generated_at": datetime.now(timezone.utc).isoformat()}
+
+
+@router.get("/metrics/storage-http")
+@limiter.limit("60/minute")
+def metrics_storage_http(
+    request: Request,
+    _admin: None = Depends(get_current_admin),
+):
+    """Supabase Storage REST calls of this app instance: pooled clients, per-operation latency and retries. PLATFORM_ADMIN only."""
+    return {**storage_http.get_metrics(), "generated_at": datetime.now(timezone.utc).isoformat()}
+
+
+@router.get("/metrics/signed-url-cache")
+@limiter.limit("60/minute")
+def metrics_signed_url_cache(
+    request: Request,
+    _admin: None = Depends(get_current_admin),
+):
+    """Signed storage URL cache of this app instance: hits, misses, entries. PLATFORM_ADMIN only."""
+    return {**signed_url_cache.get_metrics(), "generated_at": datetime.now(timezone.utc).isoformat()}
+
+
+@router.get("/metrics/rendered-pdf-cache")
+@limiter.limit("60/minute")
+def metrics_rendered_pdf_cache(
+    request: Request,
+    _admin: None = Depends(get_current_admin),
+):
+    """Rendered PDF cache (finalized documents) of this app instance: hits, misses, bytes. PLATFORM_ADMIN only."""
+    return {**rendered_pdf_cache.get_metrics(), "generated_at": datetime.now(timezone.utc).isoformat()}
+
+
+@router.get("/metrics/permission-cache")
+@limiter.limit("60/minute")
+def metrics_permission_cache(
+    request: Request,
+    _admin: None = Depends(get_current_admin),
+):
+    """Effective-permission cache of this app instance: request hits, cache hits, stale, misses. PLATFORM_ADMIN only."""
+    return {**permission_resolver.get_metrics(), "generated_at": datetime.now(timezone.utc).isoformat()}
+
+
+@router.get("/metrics/company-config-cache")
+@limiter.limit("60/minute")
+def metrics_company_config_cache(
+    request: Request,
+    _admin: None = Depends(get_current_admin),
+):
+    """Company configuration cache of this app instance: hits, misses, stale entries, version reads. PLATFORM_ADMIN only."""
+    return {**company_config_cache.get_metrics(), "generated_at": datetime.now(timezone.utc).isoformat()}
+
+
 @router.get("/metrics/errors")
 @limiter.limit("30/minute")
 def metrics_errors(
@@ -22,6 +22,7 @@ from app.models.company import Branch, BranchEtimsCredentials
 from app.models.company_module import CompanyModule
 from app.module_enforcement import get_company_module_license_catalog
 from app.module_metadata import get_core_modules
+from app.services import company_config_cache
 from app.services.etims.branch_credentials import effective_etims_environment, get_cmc_key_plain, get_oauth_username_password
 from app.services.etims.constants import SELECT_INIT_OSDC_PATH
 from app.services.etims.etims_invoice_submitter import api_base_for_branch_credentials, find_etims_result_cd
@@ -195,6 +196,7 @@ def patch_company_modules(
                 row.is_enabled = new_val
                 changes += 1
 
+    company_config_cache.bump_config_version(db, company_id)
     db.commit()
     return {"success": True, "changed": changes, "ignored_core": ignored_core}
 
@@ -627,6 +627,7 @@ def complete_branch_transfer(
             SnapshotRefreshService.schedule_snapshot_refresh(
                 db, entry.company_id, entry.branch_id, item_id=entry.item_id
             )
+        SnapshotService.upsert_batch_balances(db, ledger_entries)
 
         # Inventory sanity guard: balance after deduction must be >= 0 for each affected (branch, item)
         for item_id in item_qty_base:
@@ -770,6 +771,7 @@ def confirm_branch_receipt(
                 db, entry.company_id, entry.branch_id, entry.item_id, entry.quantity_delta,
                 document_number=getattr(entry, "document_number", None) or receipt.receipt_number,
             )
+        SnapshotService.upsert_batch_balances(db, ledger_entries)
         SnapshotRefreshService.schedule_snapshot_refresh(db, entry.company_id, entry.branch_id, item_id=entry.item_id)
         # Order book lifecycle: mark ORDERED entries as received and archive to history (CLOSED)
         receipt_item_ids = list({e.item_id for e in ledger_entries})
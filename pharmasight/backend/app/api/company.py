@@ -19,12 +19,13 @@ from app.schemas.company import (
     BranchCreate, BranchResponse, BranchUpdate,
     BranchSettingResponse, BranchSettingUpdate,
 )
+from app.services import company_config_cache
 from app.services.snapshot_refresh_service import SnapshotRefreshService
 from app.services.branch_settings_service import ensure_default_branch_settings
 from app.services.company_provisioning_service import create_company_with_hq_branch_and_registry, HQBranchSpec
 from app.services.tenant_storage_service import (
-    upload_stamp,
-    upload_logo,
+    upload_stamp_async,
+    upload_logo_async,
     get_signed_url,
     BUCKET,
     ALLOWED_IMAGE_EXTENSIONS,
@@ -261,7 +262,7 @@ def update_company(
         del update_data["logo_url"]
     for field, value in update_data.items():
         setattr(company, field, value)
-    
+    company_config_cache.bump_config_version(db, company_id)
     db.commit()
     db.refresh(company)
     return company
@@ -377,6 +378,7 @@ def update_company_setting(
             setting_type=setting_type,
         )
         db.add(row)
+    company_config_cache.bump_config_version(db, company_id)
     db.commit()
     if body.key in BULK_IMPACT_SETTING_KEYS:
         branches = db.query(Branch.id).filter(Branch.company_id == company_id, Branch.is_active == True).all()
@@ -425,7 +427,7 @@ async def upload_company_stamp(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid content-type. Allowed: image/png, image/jpeg",
         )
-    stored_path = upload_stamp(tenant.id, content, content_type, tenant=tenant, company_id=company_id)
+    stored_path = await upload_stamp_async(tenant.id, content, content_type, tenant=tenant, company_id=company_id)
     if not stored_path:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -451,6 +453,7 @@ async def upload_company_stamp(
             setting_value=json.dumps(branding),
             setting_type="json",
         ))
+    company_config_cache.bump_config_version(db, company_id)
     db.commit()
     # Never expose raw path to frontend; return signed preview URL only
     out_branding = _mask_document_branding_for_frontend(branding, tenant)
@@ -492,7 +495,7 @@ async def upload_company_logo(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="File too large. Maximum size is 2MB",
         )
-    stored_path = upload_logo(tenant.id, file_content, content_type, tenant=tenant, company_id=company_id)
+    stored_path = await upload_logo_async(tenant.id, file_content, content_type, tenant=tenant, company_id=company_id)
     if stored_path:
         company.logo_url = stored_path
         db.commit()
@@ -724,6 +727,7 @@ def update_branch_settings(
         row.cost_outlier_threshold_pct = body.cost_outlier_threshold_pct
     if body.min_margin_retail_pct_override is not None:
         row.min_margin_retail_pct_override = body.min_margin_retail_pct_override
+    company_config_cache.bump_config_version(db, branch.company_id)
     db.commit()
     db.refresh(row)
     return BranchSettingResponse(
@@ -0,0 +1,171 @@
+"""
+Bulk document PDF export API: start an export job (ZIP or merged PDF), poll progress, download.
+Rendering runs in the background (app.services.document_export_service).
+"""
+import logging
+import os
+from datetime import date
+from typing import Any, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+
+from app.dependencies import (
+    get_tenant_db,
+    get_current_user,
+    get_tenant_from_header,
+    get_tenant_optional,
+    get_effective_company_id_for_user,
+    ensure_user_has_branch_access,
+    _user_has_permission,
+)
+from app.models import Company, DocumentExportJob
+from app.services.document_export_service import (
+    EXPORT_DOC_TYPES,
+    OUTPUT_FORMATS,
+    count_documents,
+    load_company_logo,
+    start_export_job,
+)
+from app.services.document_pdf_generator import DOC_TYPE_GRN
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+class DocumentExportCreate(BaseModel):
+    doc_type: str = Field(..., description="sales_invoice, grn or supplier_invoice")
+    branch_id: UUID
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    supplier_id: Optional[UUID] = Field(None, description="GRNs / supplier invoices of one supplier")
+    output_format: str = Field("zip", description="zip (one PDF per document) or pdf (merged)")
+
+
+def _get_job_for_user(db: Session, user: Any, job_id: UUID) -> DocumentExportJob:
+    effective_company_id = get_effective_company_id_for_user(db, user)
+    job = db.query(DocumentExportJob).filter(DocumentExportJob.id == job_id).first()
+    if not job or effective_company_id is None or job.company_id != effective_company_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Export job not found")
+    # Same access as creating the export: branch assignment and the doc type's view permission
+    ensure_user_has_branch_access(db, user.id, job.branch_id)
+    permission = EXPORT_DOC_TYPES.get(job.doc_type)
+    if permission is None or not _user_has_permission(db, user.id, permission):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permission denied")
+    return job
+
+
+@router.post("/documents/exports", status_code=status.HTTP_202_ACCEPTED)
+def create_document_export(
+    body: DocumentExportCreate,
+    current_user_and_db: tuple = Depends(get_current_user),
+    tenant=Depends(get_tenant_from_header),
+    storage_tenant: Optional[Any] = Depends(get_tenant_optional),
+    db: Session = Depends(get_tenant_db),
+):
+    """
+    Start a bulk PDF export of finalized documents of one branch (e.g. all invoices for March,
+    all GRNs from supplier X). Returns the job; poll GET /documents/exports/{id} for progress.
+    """
+    user, _ = current_user_and_db
+    permission = EXPORT_DOC_TYPES.get(body.doc_type)
+    if permission is None:
+        raise HTTPException(status_code=400, detail=f"doc_type must be one of: {', '.join(EXPORT_DOC_TYPES)}")
+    if body.output_format not in OUTPUT_FORMATS:
+        raise HTTPException(status_code=400, detail="output_format must be zip or pdf")
+    if body.date_from and body.date_to and body.date_from > body.date_to:
+        raise HTTPException(status_code=400, detail="date_from must be on or before date_to")
+    effective_company_id = get_effective_company_id_for_user(db, user)
+    if effective_company_id is None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Could not resolve company.")
+    ensure_user_has_branch_access(db, user.id, body.branch_id)
+    if not _user_has_permission(db, user.id, permission):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permission denied")
+
+    job = DocumentExportJob(
+        company_id=effective_company_id,
+        branch_id=body.branch_id,
+        user_id=user.id,
+        doc_type=body.doc_type,
+        output_format=body.output_format,
+        filters={
+            "date_from": body.date_from.isoformat() if body.date_from else None,
+            "date_to": body.date_to.isoformat() if body.date_to else None,
+            "supplier_id": str(body.supplier_id) if body.supplier_id else None,
+        },
+        status="pending",
+    )
+    job.total_docs = count_documents(db, job)
+    if job.total_docs == 0:
+        raise HTTPException(status_code=404, detail="No finalized documents match these filters")
+    if job.total_docs > settings.DOCUMENT_EXPORT_MAX_DOCS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{job.total_docs} documents match; narrow the filters (limit {settings.DOCUMENT_EXPORT_MAX_DOCS})",
+        )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    logo_bytes = None
+    if body.doc_type != DOC_TYPE_GRN:
+        company = db.query(Company).filter(Company.id == effective_company_id).first()
+        logo_bytes = load_company_logo(company, storage_tenant)
+    try:
+        start_export_job(job, tenant.database_url if tenant else None, logo_bytes)
+    except Exception as e:
+        logger.error("Failed to start document export %s: %s", job.id, e, exc_info=True)
+        job.status = "failed"
+        job.error_message = f"Failed to start export: {e}"[:1000]
+        db.commit()
+        raise HTTPException(status_code=500, detail="Failed to start export") from e
+    return job.to_dict()
+
+
+@router.get("/documents/exports/{job_id}")
+def get_document_export(
+    job_id: UUID,
+    current_user_and_db: tuple = Depends(get_current_user),
+    db: Session = Depends(get_tenant_db),
+):
+    """Progress of an export job (status, processed_docs / total_docs, progress_percent)."""
+    user, _ = current_user_and_db
+    return _get_job_for_user(db, user, job_id).to_dict()
+
+
+@router.post("/documents/exports/{job_id}/cancel")
+def cancel_document_export(
+    job_id: UUID,
+    current_user_and_db: tuple = Depends(get_current_user),
+    db: Session = Depends(get_tenant_db),
+):
+    """Cancel a pending or running export; the job stops after its current chunk."""
+    user, _ = current_user_and_db
+    job = _get_job_for_user(db, user, job_id)
+    if job.status not in ("pending", "processing"):
+        return {"cancelled": False, "message": f"Export is already {job.status}."}
+    job.status = "cancelled"
+    db.commit()
+    return {"cancelled": True}
+
+
+@router.get("/documents/exports/{job_id}/download")
+def download_document_export(
+    job_id: UUID,
+    current_user_and_db: tuple = Depends(get_current_user),
+    db: Session = Depends(get_tenant_db),
+):
+    """Download a completed export (ZIP of PDFs or one merged PDF)."""
+    user, _ = current_user_and_db
+    job = _get_job_for_user(db, user, job_id)
+    if job.status != "completed" or not job.output_path:
+        raise HTTPException(status_code=409, detail=f"Export is {job.status}; download when completed")
+    if not os.path.isfile(job.output_path):
+        raise HTTPException(status_code=410, detail="Export file is no longer available on this server; start a new export")
+    media_type = "application/zip" if job.output_format == "zip" else "application/pdf"
+    filename = f"{job.doc_type}-export-{str(job.id)[:8]}.{job.output_format}"
+    return FileResponse(job.output_path, media_type=media_type, filename=filename)
@@ -6,13 +6,12 @@ no row). These routes are part of the pharmacy operational surface; they use req
 until product policy explicitly splits inventory entitlements from pharmacy without breaking existing
 deployments.
 """
-from datetime import date, timedelta, datetime, timezone
+from datetime import date
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import and_
 from typing import List, Optional
 from uuid import UUID
-from decimal import Decimal
 
 from app.dependencies import (
     get_tenant_db,
@@ -22,11 +21,13 @@ from app.dependencies import (
     _user_has_permission,
 )
 from app.module_enforcement import require_module
-from app.models import Item, Branch, InventoryLedger
+from app.models import Item, Branch
 from app.schemas.inventory import StockBalance, StockAvailability, BatchStock
 from app.services.inventory_service import InventoryService, _unit_for_display
 from app.services.item_units_helper import get_stock_display_unit
 from app.services.canonical_pricing import CanonicalPricingService
+from app.services.dashboard_read_model import BranchDashboardReadModel
+from app.services.inventory_checkpoint_service import InventoryCheckpointService
 from app.services.pricing_service import PricingService
 
 router = APIRouter(dependencies=[Depends(require_module("pharmacy"))])
@@ -183,7 +184,7 @@ def get_all_stock(
     current_user_and_db: tuple = Depends(get_current_user),
     db: Session = Depends(get_tenant_db),
 ):
-    """Get stock for all items in a branch. OPTIMIZED: only loads items that have stock > 0 (no 10k item load)."""
+    """Get stock for all items in a branch. Only items with stock > 0 (from inventory_balances, no ledger scan)."""
     current_user, _ = current_user_and_db
     branch = db.query(Branch).filter(Branch.id == branch_id).first()
     if not branch:
@@ -193,23 +194,13 @@ def get_all_stock(
     if not _user_has_permission(db, current_user.id, "inventory.view"):
         raise HTTPException(status_code=403, detail="Permission denied")
 
-    # 1) Get item_ids with stock > 0 in ONE query (avoids loading all company items)
-    stock_aggregates = (
-        db.query(
-            InventoryLedger.item_id,
-            func.sum(InventoryLedger.quantity_delta).label("total_stock"),
-        )
-        .filter(
-            InventoryLedger.branch_id == branch_id,
-        )
-        .group_by(InventoryLedger.item_id)
-        .having(func.sum(InventoryLedger.quantity_delta) > 0)
-        .all()
-    )
-    if not stock_aggregates:
+    # 1) Item ids with stock > 0 from the balance snapshot (avoids loading all company items)
+    stock_map = {
+        iid: int(qty)
+        for iid, qty in BranchDashboardReadModel.stock_map(db, branch.company_id, branch_id).items()
+    }
+    if not stock_map:
         return []
-
-    stock_map = {row.item_id: int(row.total_stock or 0) for row in stock_aggregates}
     item_ids = list(stock_map.keys())
 
     # 2) Load only items that have stock. Numeric stock is ALWAYS retail/base. Use retail_unit for labeling.
@@ -238,7 +229,7 @@ def get_expiring_count(
 ):
     """
     Get count of distinct batches expiring within the given number of days.
-    Uses inventory_ledger; counts (item_id, batch_number, expiry_date) with remaining stock > 0.
+    Uses inventory_batch_balances; counts (item_id, batch_number, expiry_date) with remaining stock > 0.
     """
     current_user, _ = current_user_and_db
     branch = db.query(Branch).filter(Branch.id == branch_id).first()
@@ -249,31 +240,7 @@ def get_expiring_count(
     if not _user_has_permission(db, current_user.id, "inventory.view"):
         raise HTTPException(status_code=403, detail="Permission denied")
 
-    cutoff = date.today() + timedelta(days=days)
-
-    # Subquery: batches with positive remaining quantity and expiry in range
-    batch_agg = (
-        db.query(
-            InventoryLedger.item_id,
-            InventoryLedger.batch_number,
-            InventoryLedger.expiry_date,
-            func.sum(InventoryLedger.quantity_delta).label("remaining")
-        )
-        .filter(
-            InventoryLedger.branch_id == branch_id,
-            InventoryLedger.expiry_date.isnot(None),
-            InventoryLedger.expiry_date <= cutoff,
-            InventoryLedger.expiry_date >= date.today()
-        )
-        .group_by(
-            InventoryLedger.item_id,
-            InventoryLedger.batch_number,
-            InventoryLedger.expiry_date
-        )
-        .having(func.sum(InventoryLedger.quantity_delta) > 0)
-        .subquery()
-    )
-    count = db.query(func.count()).select_from(batch_agg).scalar() or 0
+    count = BranchDashboardReadModel.expiring_count(db, branch.company_id, branch_id, days)
     return {"count": count}
 
 
@@ -297,30 +264,7 @@ def get_expiring_list(
     if not _user_has_permission(db, current_user.id, "inventory.view"):
         raise HTTPException(status_code=403, detail="Permission denied")
 
-    cutoff = date.today() + timedelta(days=days)
-
-    batch_agg = (
-        db.query(
-            InventoryLedger.item_id,
-            InventoryLedger.batch_number,
-            InventoryLedger.expiry_date,
-            func.sum(InventoryLedger.quantity_delta).label("quantity"),
-        )
-        .filter(
-            InventoryLedger.branch_id == branch_id,
-            InventoryLedger.expiry_date.isnot(None),
-            InventoryLedger.expiry_date <= cutoff,
-            InventoryLedger.expiry_date >= date.today(),
-        )
-        .group_by(
-            InventoryLedger.item_id,
-            InventoryLedger.batch_number,
-            InventoryLedger.expiry_date,
-        )
-        .having(func.sum(InventoryLedger.quantity_delta) > 0)
-        .order_by(InventoryLedger.expiry_date.asc())
-        .all()
-    )
+    batch_agg = BranchDashboardReadModel.expiring_batches(db, branch.company_id, branch_id, days)
 
     if not batch_agg:
         return []
@@ -358,11 +302,9 @@ def get_total_stock_value(
     """
     Get total stock value (KES) for the branch.
 
-    Valuation rule: stock_value = SUM(remaining_qty * base_unit_cost) over remaining batch layers.
-    - Layer identity: (company_id, branch_id, item_id, batch_number, expiry_date, unit_cost).
-    - Remaining per layer = SUM(quantity_delta) grouped by that identity; only layers with remaining > 0 are valued.
-    - Tenant and branch are enforced in the query filter and in the grouping key for safe reuse (e.g. all-branches analytics).
-    - Cost adjustments update ledger_row.unit_cost in place, so the layer's unit_cost reflects the current batch cost.
+    Valuation rule: stock_value = SUM(current_stock * cost_per_retail) over items with stock > 0,
+    from inventory_balances and item_branch_snapshot.average_cost (last purchase cost per retail
+    unit, else best available cost), see BranchDashboardReadModel. Load time does not grow with the ledger.
     """
     current_user, _ = current_user_and_db
     branch = db.query(Branch).filter(Branch.id == branch_id).first()
@@ -373,45 +315,7 @@ def get_total_stock_value(
     if not _user_has_permission(db, current_user.id, "inventory.view"):
         raise HTTPException(status_code=403, detail="Permission denied")
 
-    company_item_ids = list(
-        db.query(Item.id).filter(Item.company_id == branch.company_id).all()
-    )
-    company_item_ids = [r.id for r in company_item_ids]
-    if not company_item_ids:
-        return {"total_value": 0, "currency": "KES"}
-
-    company_id = branch.company_id
-    # Compute total stock value using the SAME valuation approach as the
-    # `/api/inventory/valuation` endpoint (last_cost / selling_price display).
-    # This keeps dashboard "totalStockValue" synchronized with the Current Stock table.
-    stock_rows = (
-        db.query(
-            InventoryLedger.item_id,
-            func.coalesce(func.sum(InventoryLedger.quantity_delta), 0).label("total_stock"),
-        )
-        .filter(
-            InventoryLedger.item_id.in_(company_item_ids),
-            InventoryLedger.branch_id == branch_id,
-            InventoryLedger.company_id == company_id,
-        )
-        .group_by(InventoryLedger.item_id)
-        .all()
-    )
-
-    stock_map = {r.item_id: Decimal(str(r.total_stock or 0)) for r in stock_rows}
-    item_ids_with_stock = [iid for iid, qty in stock_map.items() if qty > 0]
-    if not item_ids_with_stock:
-        return {"total_value": 0, "currency": "KES"}
-
-    # last_cost is already "per retail/base unit" so: value = qty_retail * unit_cost_retail
-    cost_per_retail = CanonicalPricingService.get_cost_per_retail_for_valuation_batch(
-        db, item_ids_with_stock, branch_id, company_id
-    ) or {}
-
-    total_value = Decimal("0")
-    for iid in item_ids_with_stock:
-        total_value += stock_map.get(iid, Decimal("0")) * Decimal(str(cost_per_retail.get(iid) or 0))
-
+    total_value = BranchDashboardReadModel.total_stock_value(db, branch.company_id, branch_id)
     return {"total_value": round(float(total_value), 2), "currency": "KES"}
 
 
@@ -422,9 +326,6 @@ def get_items_in_stock_count(
     db: Session = Depends(get_tenant_db),
 ):
     """Get count of distinct items that have stock > 0 at this branch (for dashboard)."""
-    from sqlalchemy import func
-    from app.models import InventoryLedger
-
     current_user, _ = current_user_and_db
     branch = db.query(Branch).filter(Branch.id == branch_id).first()
     if not branch:
@@ -434,20 +335,41 @@ def get_items_in_stock_count(
     if not _user_has_permission(db, current_user.id, "inventory.view"):
         raise HTTPException(status_code=403, detail="Permission denied")
 
-    company_item_ids = db.query(Item.id).filter(Item.company_id == branch.company_id)
-    subq = (
-        db.query(InventoryLedger.item_id)
-        .filter(
-            InventoryLedger.branch_id == branch_id,
-            InventoryLedger.item_id.in_(company_item_ids),
-        )
-        .group_by(InventoryLedger.item_id)
-        .having(func.sum(InventoryLedger.quantity_delta) > 0)
-    ).subquery()
-    count = db.query(func.count()).select_from(subq).scalar() or 0
+    count = BranchDashboardReadModel.items_in_stock_count(db, branch.company_id, branch_id)
     return {"count": count}
 
 
+@router.get("/branch/{branch_id}/dashboard", response_model=dict)
+def get_branch_dashboard(
+    branch_id: UUID,
+    expiring_days: int = Query(365, ge=1, le=3650, description="Days ahead for the expiring batches tile"),
+    current_user_and_db: tuple = Depends(get_current_user),
+    db: Session = Depends(get_tenant_db),
+):
+    """
+    All branch dashboard stock tiles in one call (items in stock, total stock value, expiring batches).
+    Same figures as items-in-stock-count, total-value and expiring-count; read from snapshots only.
+    """
+    current_user, _ = current_user_and_db
+    branch = db.query(Branch).filter(Branch.id == branch_id).first()
+    if not branch:
+        raise HTTPException(status_code=404, detail="Branch not found")
+    _require_branch_belongs_to_user_company(db, branch, current_user)
+    ensure_user_has_branch_access(db, current_user.id, branch_id)
+    if not _user_has_permission(db, current_user.id, "inventory.view"):
+        raise HTTPException(status_code=403, detail="Permission denied")
+
+    tiles = BranchDashboardReadModel.tiles(db, branch.company_id, branch_id, expiring_days)
+    return {
+        "branch_id": str(branch_id),
+        "items_in_stock_count": tiles["items_in_stock"],
+        "total_value": round(float(tiles["total_value"]), 2),
+        "currency": "KES",
+        "expiring_count": tiles["expiring_count"],
+        "expiring_days": expiring_days,
+    }
+
+
 @router.get("/branch/{branch_id}/overview", response_model=List[dict])
 def get_all_stock_overview(
     branch_id: UUID,
@@ -472,20 +394,13 @@ def get_all_stock_overview(
     if not items:
         return []
     
-    # Use subquery so we don't pass 10k+ item_ids as bind params
-    from sqlalchemy import func
-    from app.models import InventoryLedger
-    company_item_ids = db.query(Item.id).filter(Item.company_id == branch.company_id)
-
-    stock_aggregates = db.query(
-        InventoryLedger.item_id,
-        func.sum(InventoryLedger.quantity_delta).label('total_stock')
-    ).filter(
-        InventoryLedger.item_id.in_(company_item_ids),
-        InventoryLedger.branch_id == branch_id
-    ).group_by(InventoryLedger.item_id).all()
-    
-    stock_map = {row.item_id: int(row.total_stock or 0) for row in stock_aggregates}
+    # All balances, including negative stock (shown as-is, as the ledger sum was)
+    stock_map = {
+        iid: int(qty)
+        for iid, qty in BranchDashboardReadModel.stock_map(
+            db, branch.company_id, branch_id, positive_only=False
+        ).items()
+    }
     
     # Use InventoryService.format_quantity_display — single source of truth for stock breakdown.
     # Numeric stock is ALWAYS retail/base quantity. stock_display shows multi-tier breakdown.
@@ -542,31 +457,20 @@ def get_stock_valuation(
             raise HTTPException(status_code=400, detail="Invalid as_of_date; use YYYY-MM-DD.")
     else:
         snap_date = date.today()
-    # Ledger filter: include all movements up to end of snap_date
-    end_of_day = datetime(snap_date.year, snap_date.month, snap_date.day, 23, 59, 59, 999999, tzinfo=timezone.utc)
 
     company_id = branch.company_id
     if valuation not in ("last_cost", "selling_price"):
         valuation = "last_cost"
 
-    # 1) Stock aggregates up to as_of_date (single query)
-    q = (
-        db.query(
-            InventoryLedger.item_id,
-            func.sum(InventoryLedger.quantity_delta).label("total_stock"),
-        )
-        .filter(
-            InventoryLedger.branch_id == branch_id,
-            InventoryLedger.company_id == company_id,
-            InventoryLedger.created_at <= end_of_day,
-        )
-        .group_by(InventoryLedger.item_id)
-    )
-    if stock_only:
-        q = q.having(func.sum(InventoryLedger.quantity_delta) > 0)
-    rows = q.all()
-    stock_map = {r.item_id: float(r.total_stock or 0) for r in rows}
-    item_ids_with_stock = [r.item_id for r in rows if (r.total_stock or 0) > 0]
+    # 1) Stock up to end of as_of_date: nearest daily checkpoint per item + ledger rows after it
+    stock_map = {
+        item_id: qty
+        for item_id, (qty, _layer_value) in InventoryCheckpointService.stock_as_of(
+            db, company_id, branch_id, snap_date
+        ).items()
+        if not stock_only or qty > 0
+    }
+    item_ids_with_stock = [iid for iid, qty in stock_map.items() if qty > 0]
 
     if stock_only and not item_ids_with_stock:
         return {
@@ -1376,6 +1376,7 @@ def adjust_stock(
         db, item.company_id, body.branch_id, item_id, quantity_delta,
         document_number="ADJ",
     )
+    SnapshotService.upsert_batch_balances(db, [ledger_entry])
     # Update purchase snapshot with this cost so search and item_branch_snapshot show the same cost (same transaction).
     if quantity_delta > 0 and unit_cost is not None and unit_cost > 0:
         SnapshotService.upsert_purchase_snapshot(
@@ -2167,6 +2168,9 @@ def post_cost_adjustment(
             ledger_row.unit_cost = new_cost
             ledger_row.total_cost = new_cost * ledger_row.quantity_delta
         db.flush()
+        if not cost_unchanged:
+            # The row moves to another (batch, expiry, unit_cost) key: re-derive this item's batch balances
+            SnapshotService.rebuild_batch_balances(db, branch_id=body.branch_id, item_ids=[item_id])
         # Keep branch purchase snapshot aligned with manual valuation corrections
         # so snapshot consumers read the corrected cost immediately.
         SnapshotService.upsert_purchase_snapshot(
@@ -2308,6 +2312,7 @@ def post_batch_quantity_correction(
             db, item.company_id, body.branch_id, item_id, float(quantity_delta),
             document_number="ADJ",
         )
+        SnapshotService.upsert_batch_balances(db, [ledger_entry])
         SnapshotRefreshService.schedule_snapshot_refresh(db, item.company_id, body.branch_id, item_id=item_id)
         db.commit()
         db.refresh(movement)
@@ -2472,6 +2477,7 @@ def post_batch_metadata_correction(
             db, item.company_id, body.branch_id, item_id, Decimal("0"),
             document_number="ADJ",
         )
+        SnapshotService.upsert_batch_balances(db, [out_entry, in_entry])
         # Metadata correction can move stock into a different pool; persist the effective
         # unit cost so branch snapshots remain consistent in the same transaction.
         if unit_cost is not None and unit_cost > 0:
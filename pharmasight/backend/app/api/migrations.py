@@ -16,6 +16,7 @@ from app.services.migration_service import (
     MigrationService,
     run_predefined_migration_by_version,
 )
+from app.services import tenant_migration_orchestrator
 
 router = APIRouter()
 
@@ -77,3 +78,14 @@ def get_migration_status(
     """Get migration status. Requires PLATFORM_ADMIN authentication."""
     service = MigrationService()
     return service.get_migration_status()
+
+
+@router.get("/admin/migrations/progress")
+def get_migration_progress(
+    _admin: None = Depends(get_current_admin),
+):
+    """
+    Per-tenant progress of the startup migration run (pending / running / done / failed / timeout).
+    In-process state of this app instance. Requires PLATFORM_ADMIN authentication.
+    """
+    return tenant_migration_orchestrator.get_progress()
@@ -24,6 +24,7 @@ from app.models.company_module import CompanyModule
 from app.models.user import User, UserBranchRole, UserRole
 from app.module_enforcement import get_company_module_license_catalog
 from app.module_metadata import get_core_modules
+from app.services import company_config_cache
 from app.services.etims.branch_credentials import effective_etims_environment, get_cmc_key_plain, get_oauth_username_password
 from app.services.etims.constants import SELECT_INIT_OSDC_PATH
 from app.services.etims.etims_invoice_submitter import api_base_for_branch_credentials, find_etims_result_cd
@@ -405,6 +406,7 @@ def patch_company_modules(
         else:
             row.is_enabled = bool(t.enabled)
             db.add(row)
+    company_config_cache.bump_config_version(db, company_id)
     db.commit()
     return {"success": True}
 
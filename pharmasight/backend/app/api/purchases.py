@@ -71,6 +71,8 @@ from app.services.tenant_storage_service import (
 from app.utils.vat import vat_rate_to_percent
 from fastapi.responses import Response
 from app.services.document_pdf_generator import build_grn_pdf, build_supplier_invoice_pdf
+from app.services import rendered_pdf_cache
+from app.services.document_export_service import grn_pdf_kwargs, supplier_invoice_pdf_kwargs
 from app.services.canonical_pricing import CanonicalPricingService
 from app.config import settings
 import json
@@ -455,6 +457,7 @@ def create_grn(
             db_grn.supplier_id
         )
         SnapshotRefreshService.schedule_snapshot_refresh(db, entry.company_id, entry.branch_id, item_id=entry.item_id)
+    SnapshotService.upsert_batch_balances(db, ledger_entries)
 
     # Order book lifecycle: mark ORDERED entries as received and archive to history (CLOSED)
     grn_item_ids = list({e.item_id for e in ledger_entries})
@@ -472,6 +475,7 @@ def create_grn(
 def get_grn_pdf(
     grn_id: UUID,
     current_user_and_db: tuple = Depends(get_current_user),
+    tenant: Optional[Any] = Depends(get_tenant_optional),
     db: Session = Depends(get_tenant_db),
 ):
     """Generate and return GRN as PDF (Download PDF). On-demand only."""
@@ -489,36 +493,22 @@ def get_grn_pdf(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permission denied")
     company = db.query(Company).filter(Company.id == grn.company_id).first()
     branch = db.query(Branch).filter(Branch.id == grn.branch_id).first()
-    supplier_name = grn.supplier.name if grn.supplier else "—"
-    items_data = []
-    for oi in grn.items:
-        item_name = oi.item.name if oi.item else "—"
-        items_data.append({
-            "item_name": item_name,
-            "quantity": float(oi.quantity),
-            "unit_name": oi.unit_name or "",
-            "unit_cost": float(oi.unit_cost or 0),
-            "total_cost": float(oi.total_cost or 0),
-        })
+    filename = f"grn-{grn.grn_no or grn_id}.pdf".replace(" ", "-")
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    # GRNs are immutable once posted: reprints come from the rendered PDF cache.
+    pdf_version = rendered_pdf_cache.document_version(
+        grn.created_at, getattr(company, "updated_at", None), getattr(branch, "updated_at", None),
+        getattr(grn.supplier, "updated_at", None), rendered_pdf_cache.lines_updated_at(grn.items),
+    )
+    cached_pdf = rendered_pdf_cache.get("grn", grn.id, pdf_version, tenant)
+    if cached_pdf:
+        return Response(content=cached_pdf, media_type="application/pdf", headers=headers)
     try:
-        pdf_bytes = build_grn_pdf(
-            company_name=company.name if company else "—",
-            company_address=getattr(company, "address", None) if company else None,
-            company_phone=getattr(company, "phone", None) if company else None,
-            company_pin=getattr(company, "pin", None) if company else None,
-            branch_name=branch.name if branch else None,
-            branch_address=getattr(branch, "address", None) if branch else None,
-            grn_no=grn.grn_no,
-            date_received=grn.date_received,
-            supplier_name=supplier_name,
-            items=items_data,
-            total_cost=grn.total_cost or Decimal("0"),
-            notes=grn.notes,
-        )
+        pdf_bytes = build_grn_pdf(**grn_pdf_kwargs(grn, company, branch))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate GRN PDF: {str(e)}")
-    filename = f"grn-{grn.grn_no or grn_id}.pdf".replace(" ", "-")
-    return Response(content=pdf_bytes, media_type="application/pdf", headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+    rendered_pdf_cache.put("grn", grn.id, pdf_version, pdf_bytes, tenant)
+    return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
 
 
 @router.get("/grn/{grn_id}", response_model=GRNResponse)
@@ -930,44 +920,31 @@ def get_supplier_invoice_pdf(
     prepare_supplier_invoice_for_response(db, invoice)
     company = db.query(Company).filter(Company.id == invoice.company_id).first()
     branch = db.query(Branch).filter(Branch.id == invoice.branch_id).first()
-    supplier_name = invoice.supplier.name if invoice.supplier else "—"
-    items_data = []
-    for oi in invoice.items:
-        item_name = oi.item.name if oi.item else "—"
-        items_data.append({
-            "item_name": item_name,
-            "quantity": float(oi.quantity),
-            "unit_name": oi.unit_name or "",
-            "unit_price_exclusive": float(oi.unit_cost_exclusive or 0),
-            "line_total_exclusive": float(oi.line_total_exclusive or 0),
-            "line_total_inclusive": float(oi.line_total_inclusive or 0),
-        })
     logo_path = getattr(company, "logo_url", None) if company else None
     company_logo_bytes = _resolve_asset_bytes(logo_path, tenant, master_db)
+    filename = f"supplier-invoice-{invoice.invoice_number or invoice_id}.pdf".replace(" ", "-")
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    # Batched supplier invoices are immutable: reprints come from the rendered PDF cache.
+    pdf_version = None
+    if (invoice.status or "").upper() == "BATCHED":
+        pdf_version = rendered_pdf_cache.document_version(
+            invoice.status, invoice.updated_at,
+            getattr(company, "updated_at", None), getattr(branch, "updated_at", None),
+            getattr(invoice.supplier, "updated_at", None), rendered_pdf_cache.lines_updated_at(invoice.items),
+            company_logo_bytes,
+        )
+        cached_pdf = rendered_pdf_cache.get("supplier_invoice", invoice.id, pdf_version, tenant)
+        if cached_pdf:
+            return Response(content=cached_pdf, media_type="application/pdf", headers=headers)
     try:
         pdf_bytes = build_supplier_invoice_pdf(
-            company_name=company.name if company else "—",
-            company_address=getattr(company, "address", None) if company else None,
-            company_phone=getattr(company, "phone", None) if company else None,
-            company_pin=getattr(company, "pin", None) if company else None,
-            company_logo_bytes=company_logo_bytes,
-            branch_name=branch.name if branch else None,
-            branch_address=getattr(branch, "address", None) if branch else None,
-            invoice_number=invoice.invoice_number,
-            invoice_date=invoice.invoice_date,
-            supplier_name=supplier_name,
-            reference=invoice.reference,
-            status=invoice.status,
-            items=items_data,
-            total_exclusive=invoice.total_exclusive or Decimal("0"),
-            vat_amount=invoice.vat_amount or Decimal("0"),
-            total_inclusive=invoice.total_inclusive or Decimal("0"),
-            notes=invoice.reference,
+            **supplier_invoice_pdf_kwargs(invoice, company, branch, company_logo_bytes)
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate supplier invoice PDF: {str(e)}")
-    filename = f"supplier-invoice-{invoice.invoice_number or invoice_id}.pdf".replace(" ", "-")
-    return Response(content=pdf_bytes, media_type="application/pdf", headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+    if pdf_version:
+        rendered_pdf_cache.put("supplier_invoice", invoice.id, pdf_version, pdf_bytes, tenant)
+    return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
 
 
 @router.get("/invoice/{invoice_id}", response_model=SupplierInvoiceResponse)
@@ -1930,6 +1907,7 @@ def batch_supplier_invoice(
                 db, entry.company_id, entry.branch_id, entry.item_id, entry.quantity_delta,
                 document_number=getattr(entry, "document_number", None) or invoice.invoice_number,
             )
+        SnapshotService.upsert_batch_balances(db, ledger_entries)
         # Update last unit cost per item from invoice (cost per base unit; purchase snapshot for reporting)
         items_updated_for_cost = set()
         for inv_item in invoice.items:
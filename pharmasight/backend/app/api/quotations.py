@@ -32,8 +32,8 @@ from app.services.order_book_service import OrderBookService
 from app.services.item_units_helper import get_unit_multiplier_from_item, get_unit_display_short
 from app.services.snapshot_service import SnapshotService
 from app.services.snapshot_refresh_service import SnapshotRefreshService
+from app.services.sales_rollup_service import SalesRollupService
 from app.services.etims.invoice_etims_snapshot import apply_etims_snapshots_on_batch
-from app.services.pricing_config_service import validate_line_price, is_line_price_at_promo
 from app.services.tenant_storage_service import get_signed_url
 from app.utils.vat import vat_rate_to_percent
 from fastapi.responses import Response
@@ -225,6 +225,21 @@ def get_quotation_pdf(
     )
 
 
+def _apply_line_cost(line: QuotationItem, priced: dict) -> None:
+    """Set unit_cost_base / unit_cost_used (per sale unit) / margin_percent from a price_lines_batch result."""
+    cost_base = priced["unit_cost_used"]
+    if cost_base is None:
+        return
+    # Expose base-unit cost for UI to calculate margins consistently across unit tiers
+    line.unit_cost_base = cost_base
+    if priced["error"] is None:
+        cost_per_sale_unit = priced["cost_per_sale_unit"] or Decimal("0")
+        line.unit_cost_used = cost_per_sale_unit
+        price = line.unit_price_exclusive or Decimal("0")
+        if price > 0:
+            line.margin_percent = (price - cost_per_sale_unit) / price * Decimal("100")
+
+
 @router.get("/{quotation_id}", response_model=QuotationResponse)
 def get_quotation(
     quotation_id: UUID,
@@ -247,8 +262,16 @@ def get_quotation(
     require_document_belongs_to_user_company(db, user, quotation, "Quotation", request)
     request.state.timings["CompanyCheckMs"] = round((time.perf_counter() - t1) * 1000, 1)
     t2 = time.perf_counter()
+    # Costs of all lines in one batch (FEFO batch, else best available cost, as get_item_cost)
+    priced_lines = PricingService.price_lines_batch(
+        db,
+        quotation.company_id,
+        quotation.branch_id,
+        [{"item_id": q_item.item_id, "unit_name": q_item.unit_name} for q_item in quotation.items],
+        item_map={q_item.item_id: q_item.item for q_item in quotation.items if q_item.item is not None},
+    )
     # Enhance items with item name/code, margin, and unit_display_short (P/W/S for print)
-    for quotation_item in quotation.items:
+    for quotation_item, priced in zip(quotation.items, priced_lines):
         if quotation_item.item:
             quotation_item.item_code = quotation_item.item.sku or ''
             quotation_item.item_name = quotation_item.item.name or ''
@@ -256,22 +279,7 @@ def get_quotation(
                 quotation_item.item, quotation_item.unit_name or ''
             )
         # Margin calculation: cost per sale unit and margin %
-        cost_base = PricingService.get_item_cost(
-            db, quotation_item.item_id, quotation.branch_id
-        )
-        if cost_base is not None:
-            # Expose base-unit cost for UI to calculate margins consistently across unit tiers
-            quotation_item.unit_cost_base = cost_base
-            item = quotation_item.item
-            mult = get_unit_multiplier_from_item(item, quotation_item.unit_name) if item else None
-            if mult is not None:
-                cost_per_sale_unit = cost_base * mult
-                quotation_item.unit_cost_used = cost_per_sale_unit
-                price = quotation_item.unit_price_exclusive or Decimal("0")
-                if price > 0:
-                    quotation_item.margin_percent = (
-                        (price - cost_per_sale_unit) / price * Decimal("100")
-                    )
+        _apply_line_cost(quotation_item, priced)
     request.state.timings["CostEnrichMs"] = round((time.perf_counter() - t2) * 1000, 1)
     t3 = time.perf_counter()
     # Print header: company, branch, user, logo URL for print (all documents)
@@ -496,6 +504,7 @@ def add_quotation_item(
     t3 = time.perf_counter()
 
     # Build response: use already-loaded line.item (selectinload) for existing lines; single `item` for the new line. O(1) Item access.
+    lines_to_cost = []
     for line in quotation.items:
         it = line.item if line.item_id != item_data.item_id else item
         if it:
@@ -505,7 +514,9 @@ def add_quotation_item(
             line.unit_display_short = get_unit_display_short(it, line.unit_name or '')
         if line.item_id == item_data.item_id:
             # Carry cost/margin from client when provided (item search already returned cost; user adjusted price; margin validated at convert/batch)
-            if getattr(item_data, "unit_cost_base", None) is not None:
+            if getattr(item_data, "unit_cost_base", None) is None:
+                lines_to_cost.append(line)
+            else:
                 line.unit_cost_base = Decimal(str(item_data.unit_cost_base))
                 mult = get_unit_multiplier_from_item(it, line.unit_name or '') if it else None
                 if mult is not None:
@@ -516,19 +527,16 @@ def add_quotation_item(
                     price = line.unit_price_exclusive or Decimal("0")
                     if price > 0 and getattr(line, "unit_cost_used", None) and float(line.unit_cost_used) > 0:
                         line.margin_percent = (price - line.unit_cost_used) / price * Decimal("100")
-            else:
-                cost_base = PricingService.get_item_cost_from_snapshot(db, line.item_id, quotation.branch_id, quotation.company_id)
-                if cost_base is None:
-                    cost_base = PricingService.get_item_cost(db, line.item_id, quotation.branch_id, use_fefo=True)
-                if cost_base is not None:
-                    line.unit_cost_base = cost_base
-                    mult = get_unit_multiplier_from_item(it, line.unit_name or '') if it else None
-                    if mult is not None:
-                        cost_per_sale_unit = cost_base * mult
-                        line.unit_cost_used = cost_per_sale_unit
-                        price = line.unit_price_exclusive or Decimal("0")
-                        if price > 0:
-                            line.margin_percent = (price - cost_per_sale_unit) / price * Decimal("100")
+    if lines_to_cost:
+        priced_lines = PricingService.price_lines_batch(
+            db,
+            quotation.company_id,
+            quotation.branch_id,
+            [{"item_id": line.item_id, "unit_name": line.unit_name} for line in lines_to_cost],
+            item_map={item.id: item} if item else None,
+        )
+        for line, priced in zip(lines_to_cost, priced_lines):
+            _apply_line_cost(line, priced)
     request.state.timings["CostMs"] = round((time.perf_counter() - t3) * 1000, 1)
     t4 = time.perf_counter()
     # Use eagerly loaded company, branch, creator (no extra queries)
@@ -697,6 +705,7 @@ def convert_quotation_to_invoice(
     total_vat = Decimal("0")
     invoice_items = []
     ledger_entries = []
+    price_checks = []
     
     for q_item in quotation.items:
         item = q_item.item
@@ -723,32 +732,14 @@ def convert_quotation_to_invoice(
         total_qty = sum(a["quantity"] for a in allocations)
         unit_cost_used = total_cost / total_qty if total_qty > 0 else Decimal("0")
         
-        # Price validation at convert (floor + margin + promo) — same logic as sales batch
+        # Price validation at convert (floor + margin + promo) — same logic as sales batch; run for all lines below
         if unit_cost_used and unit_cost_used > 0 and item:
-            mult = get_unit_multiplier_from_item(item, q_item.unit_name)
-            if mult is not None and float(mult) > 0:
-                cost_per_sale_unit = unit_cost_used * mult
-                unit_price_val = q_item.unit_price_exclusive or Decimal("0")
-                if cost_per_sale_unit > 0:
-                    user_has_override = user_has_sell_below_min_margin(db, quotation.created_by, quotation.branch_id)
-                    is_promo = is_line_price_at_promo(
-                        db, q_item.item_id, q_item.unit_name or "", unit_price_val
-                    )
-                    validation = validate_line_price(
-                        db,
-                        quotation.company_id,
-                        q_item.item_id,
-                        unit_price_val,
-                        cost_per_sale_unit,
-                        user_has_override,
-                        branch_id=quotation.branch_id,
-                        is_promo_price=is_promo,
-                    )
-                    if not validation.get("allowed"):
-                        raise HTTPException(
-                            status_code=400,
-                            detail=validation.get("message", "Price validation failed.")
-                        )
+            price_checks.append({
+                "item_id": q_item.item_id,
+                "unit_name": q_item.unit_name,
+                "unit_price_exclusive": q_item.unit_price_exclusive or Decimal("0"),
+                "unit_cost": unit_cost_used,
+            })
         
         # Use quotation item prices
         line_subtotal = q_item.quantity * q_item.unit_price_exclusive
@@ -799,6 +790,23 @@ def convert_quotation_to_invoice(
         total_exclusive += line_total_exclusive
         total_vat += line_vat
     
+    if price_checks:
+        priced_lines = PricingService.price_lines_batch(
+            db,
+            quotation.company_id,
+            quotation.branch_id,
+            price_checks,
+            user_has_sell_below_margin=user_has_sell_below_min_margin(db, quotation.created_by, quotation.branch_id),
+            item_map={q_item.item_id: q_item.item for q_item in quotation.items if q_item.item is not None},
+        )
+        for priced in priced_lines:
+            validation = priced["validation"]
+            if validation and not validation.get("allowed"):
+                raise HTTPException(
+                    status_code=400,
+                    detail=validation.get("message", "Price validation failed.")
+                )
+
     # Apply discount
     total_exclusive -= quotation.discount_amount
     total_inclusive = total_exclusive + total_vat
@@ -842,6 +850,7 @@ def convert_quotation_to_invoice(
             db, entry.company_id, entry.branch_id, entry.item_id, entry.quantity_delta,
             document_number=invoice_no,
         )
+    SnapshotService.upsert_batch_balances(db, ledger_entries)
     for inv_item in invoice_items:
         SnapshotService.upsert_search_snapshot_last_sale(
             db, quotation.company_id, quotation.branch_id, inv_item.item_id, invoice_date
@@ -864,6 +873,7 @@ def convert_quotation_to_invoice(
             inv_item.item = db.query(Item).filter(Item.id == inv_item.item_id).first()
     apply_etims_snapshots_on_batch(db_invoice)
     db.flush()
+    SalesRollupService.record_invoice(db, db_invoice, ledger_entries, lines=invoice_items)
 
     db.commit()
     
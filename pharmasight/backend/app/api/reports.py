@@ -1,19 +1,23 @@
 """
-Reports API — read-only. Branch-scoped item movement report and batch movement report.
+Reports API — read-only. Branch-scoped item movement report (JSON and streamed CSV) and batch movement report.
 """
+import csv
+import io
 from datetime import date
-from typing import Optional, Tuple
+from typing import Iterator, Optional, Tuple
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.dependencies import get_current_user, _user_has_permission
 from app.models import Branch, User, UserBranchRole
-from app.schemas.reports import ItemMovementReportResponse
+from app.schemas.reports import ItemMovementReportResponse, ItemMovementRow
 from app.services.item_movement_report_service import (
     build_item_movement_report,
     build_batch_movement_report,
+    open_item_movement_report,
 )
 
 router = APIRouter(prefix="/reports", tags=["reports"])
@@ -105,6 +109,87 @@ def get_item_movement_report(
     return report
 
 
+def _item_movement_csv(report: ItemMovementReportResponse, movement_rows: Iterator[ItemMovementRow]) -> Iterator[str]:
+    """CSV text of an item movement report, one chunk per row (rows are not held in memory)."""
+    opts = report.display_options
+    columns = ["Date", "Document Type", "Reference", "Party", "Qty In", "Qty Out", "Balance", "Unit Price / Cost"]
+    if opts.show_batch_number:
+        columns.append("Batch")
+    if opts.show_expiry_date:
+        columns.append("Expiry")
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+
+    def line(values) -> str:
+        buf.seek(0)
+        buf.truncate(0)
+        writer.writerow(values)
+        return buf.getvalue()
+
+    yield line([report.item_name, report.item_sku or "", report.branch_name, report.start_date.isoformat(), report.end_date.isoformat()])
+    yield line(columns)
+    for row in [*report.rows, *movement_rows]:
+        values = [
+            row.date.isoformat(),
+            row.document_type,
+            row.reference,
+            row.party_name or "",
+            row.qty_in,
+            row.qty_out,
+            row.running_balance,
+            "" if row.unit_price_or_cost is None else row.unit_price_or_cost,
+        ]
+        if opts.show_batch_number:
+            values.append(row.batch_number or "")
+        if opts.show_expiry_date:
+            values.append(row.expiry_date.isoformat() if row.expiry_date else "")
+        yield line(values)
+
+
+@router.get("/item-movement/csv")
+def export_item_movement_report_csv(
+    item_id: UUID = Query(..., description="Item UUID"),
+    start_date: date = Query(..., description="Start date (YYYY-MM-DD)"),
+    end_date: date = Query(..., description="End date (YYYY-MM-DD)"),
+    auth: Tuple[User, Session, UUID] = Depends(require_reports_view_and_branch),
+):
+    """
+    Item Movement Report as a CSV download, streamed in date order (suited to multi-year ranges).
+    Same rows and scope as GET /reports/item-movement.
+    """
+    user, db, branch_id = auth
+    if start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_date must be before or equal to end_date.",
+        )
+    branch = db.query(Branch).filter(Branch.id == branch_id).first()
+    if not branch:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Branch not found.")
+    try:
+        report, movement_rows = open_item_movement_report(
+            db,
+            company_id=branch.company_id,
+            branch_id=branch_id,
+            item_id=item_id,
+            start_date=start_date,
+            end_date=end_date,
+        )
+    except ValueError as e:
+        err = str(e)
+        if err == "item_not_found":
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found or does not belong to your company.")
+        if err == "branch_or_company_not_found":
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Branch or company not found.")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=err)
+    filename = f"item-movement-{start_date.isoformat()}-{end_date.isoformat()}.csv"
+    return StreamingResponse(
+        _item_movement_csv(report, movement_rows),
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
 @router.get("/batch-movement", response_model=ItemMovementReportResponse)
 def get_batch_movement_report(
     item_id: UUID = Query(..., description="Item UUID"),
@@ -24,6 +24,8 @@ from app.dependencies import (
 )
 from app.module_enforcement import require_module
 from app.services.document_pdf_generator import build_sales_invoice_pdf
+from app.services import rendered_pdf_cache
+from app.services.document_export_service import sales_invoice_pdf_kwargs, user_display_name
 from app.services.tenant_storage_service import download_file, get_signed_url
 from app.models import (
     SalesInvoice, SalesInvoiceItem, InventoryLedger,
@@ -40,14 +42,14 @@ from app.schemas.sale import (
     InvoicePaymentCreate, InvoicePaymentResponse,
     CreditNoteCreate, CreditNoteResponse,
 )
-from app.services.inventory_service import InventoryService
+from app.services.inventory_service import InventoryService, InsufficientStockError
 from app.services.pricing_service import PricingService
 from app.services.document_service import DocumentService
 from app.services.order_book_service import OrderBookService
 from app.services.item_units_helper import get_unit_display_short, get_unit_multiplier_from_item
 from app.services.snapshot_service import SnapshotService
 from app.services.snapshot_refresh_service import SnapshotRefreshService
-from app.services.pricing_config_service import validate_line_price, is_line_price_at_promo
+from app.services.sales_rollup_service import SalesRollupService, choose_cogs
 from app.utils.vat import vat_rate_to_percent
 
 router = APIRouter(dependencies=[Depends(require_module("pharmacy"))])
@@ -190,11 +192,6 @@ def create_sales_invoice(
                 detail="Customer phone number must be a valid phone number (at least 9 digits)"
             )
     
-    # Generate invoice number
-    invoice_no = DocumentService.get_sales_invoice_number(
-        db, invoice.company_id, invoice.branch_id
-    )
-    
     # Enforce one line per item per invoice: reject duplicate item_id in request
     item_ids = [it.item_id for it in invoice.items]
     if len(item_ids) != len(set(item_ids)):
@@ -215,10 +212,31 @@ def create_sales_invoice(
     from sqlalchemy import inspect
     inspector = inspect(SalesInvoice)
     has_customer_phone = 'customer_phone' in [col.name for col in inspector.columns]
-    
-    for item_data in items_to_save:
-        # Get item
-        item = db.query(Item).filter(Item.id == item_data.item_id).first()
+
+    # Pricing inputs (cost, markup, rounding, min margin, promo) for all lines in a few queries
+    items_by_id = {i.id: i for i in db.query(Item).filter(Item.id.in_(item_ids)).all()}
+    user_has_override = (
+        _user_has_sell_below_min_margin(db, invoice.created_by, invoice.branch_id)
+        if any(it.unit_price_exclusive for it in items_to_save) else False
+    )
+    priced_lines = PricingService.price_lines_batch(
+        db,
+        invoice.company_id,
+        invoice.branch_id,
+        [
+            {
+                "item_id": it.item_id,
+                "unit_name": it.unit_name,
+                "unit_price_exclusive": it.unit_price_exclusive or None,
+            }
+            for it in items_to_save
+        ],
+        user_has_sell_below_margin=user_has_override,
+        item_map=items_by_id,
+    )
+
+    for item_data, priced in zip(items_to_save, priced_lines):
+        item = items_by_id.get(item_data.item_id)
         if not item:
             raise HTTPException(status_code=404, detail=f"Item {item_data.item_id} not found")
         if not getattr(item, "setup_complete", True):
@@ -241,30 +259,14 @@ def create_sales_invoice(
                 detail=f"Insufficient stock for {item.name}. Available: {available}, Required: {required}"
             )
         
-        # Get recommended price if not provided
-        # Use appropriate tier based on sales_type (wholesale / retail / supplier; supplier falls back to wholesale if not set)
-        sales_type = getattr(invoice, 'sales_type', 'RETAIL') or 'RETAIL'
-        if sales_type == 'WHOLESALE':
-            pricing_tier = 'wholesale'
-        elif sales_type == 'SUPPLIER':
-            pricing_tier = 'supplier'
-        else:
-            pricing_tier = 'retail'
-        
+        # Recommended price if not provided (markup-based; same for every sales_type since 3-tier prices are deprecated)
         unit_price = item_data.unit_price_exclusive
         unit_cost_used = None
-        
+
         if not unit_price:
-            price_info = PricingService.calculate_recommended_price(
-                db, item_data.item_id, invoice.branch_id,
-                invoice.company_id, item_data.unit_name, tier=pricing_tier
-            )
-            # Supplier tier: if no supplier price/unit, fall back to wholesale
-            if not price_info and pricing_tier == 'supplier':
-                price_info = PricingService.calculate_recommended_price(
-                    db, item_data.item_id, invoice.branch_id,
-                    invoice.company_id, item_data.unit_name, tier='wholesale'
-                )
+            if priced["error"]:
+                raise HTTPException(status_code=400, detail=priced["error"])
+            price_info = priced["recommended"]
             if price_info:
                 unit_price = price_info["recommended_unit_price"]
                 unit_cost_used = price_info["unit_cost_used"]
@@ -274,39 +276,14 @@ def create_sales_invoice(
                     detail=f"Price not available for {item.name}"
                 )
         else:
-            # Get cost for margin calculation and min-margin check
-            cost_info = PricingService.get_item_cost(
-                db, item_data.item_id, invoice.branch_id
-            )
-            if cost_info:
-                # unit_cost_used = cost per retail/base unit (from CanonicalPricingService)
-                unit_cost_used = cost_info
-            # Price validation (floor + margin + promo)
-            if unit_cost_used and float(unit_cost_used) > 0:
-                mult = get_unit_multiplier_from_item(item, item_data.unit_name)
-                if mult is not None and mult > 0:
-                    cost_per_sale_unit = unit_cost_used * mult
-                    unit_price_val = Decimal(str(unit_price))
-                    if cost_per_sale_unit > 0:
-                        user_has_override = _user_has_sell_below_min_margin(db, invoice.created_by, invoice.branch_id)
-                        is_promo = is_line_price_at_promo(
-                            db, item_data.item_id, item_data.unit_name or "", unit_price_val
-                        )
-                        validation = validate_line_price(
-                            db,
-                            invoice.company_id,
-                            item_data.item_id,
-                            unit_price_val,
-                            cost_per_sale_unit,
-                            user_has_override,
-                            branch_id=invoice.branch_id,
-                            is_promo_price=is_promo,
-                        )
-                        if not validation.get("allowed"):
-                            raise HTTPException(
-                                status_code=400,
-                                detail=validation.get("message", "Price validation failed.")
-                            )
+            # unit_cost_used = cost per retail/base unit; price validated (floor + margin + promo)
+            unit_cost_used = priced["unit_cost_used"] or None
+            validation = priced["validation"]
+            if validation and not validation.get("allowed"):
+                raise HTTPException(
+                    status_code=400,
+                    detail=validation.get("message", "Price validation failed.")
+                )
         
         # Calculate line totals
         line_total_exclusive = Decimal(str(unit_price)) * item_data.quantity
@@ -345,6 +322,12 @@ def create_sales_invoice(
     # Calculate average VAT rate for invoice header
     invoice_vat_rate = (total_vat / total_exclusive * Decimal("100")) if total_exclusive > 0 else Decimal("0")
     
+    # Invoice number last: the sequence row stays locked until commit, so other tills of the branch
+    # only wait for the insert below, not for this request's pricing and stock checks (gapless either way)
+    invoice_no = DocumentService.get_sales_invoice_number(
+        db, invoice.company_id, invoice.branch_id
+    )
+
     # Create invoice as DRAFT
     # Check if customer_phone column exists in the model
     invoice_data = {
@@ -405,57 +388,33 @@ def get_sales_invoice_pdf(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permission denied")
     company = db.query(Company).filter(Company.id == invoice.company_id).first()
     branch = db.query(Branch).filter(Branch.id == invoice.branch_id).first()
-    items_data = []
-    for oi in invoice.items:
-        item_name = oi.item.name if oi.item else (getattr(oi, "item_name", None) or "—")
-        items_data.append({
-            "item_name": item_name,
-            "quantity": float(oi.quantity),
-            "unit_name": oi.unit_name or "",
-            "unit_price_exclusive": float(oi.unit_price_exclusive or 0),
-            "line_total_exclusive": float(oi.line_total_exclusive or 0),
-            "line_total_inclusive": float(oi.line_total_inclusive or 0),
-        })
     company_logo_bytes = None
     if company and getattr(company, "logo_url", None) and str(company.logo_url or "").startswith("tenant-assets/") and tenant is not None:
         company_logo_bytes = download_file(company.logo_url, tenant=tenant)
-    till_number = getattr(branch, "till_number", None) if branch else None
-    paybill = getattr(branch, "paybill", None) if branch else None
-    prepared_by = None
-    served_by = None
+    filename = f"sales-invoice-{invoice.invoice_no or invoice_id}.pdf".replace(" ", "-")
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    # Batched/paid invoices are immutable: reprints come from the rendered PDF cache.
+    pdf_version = None
+    if (invoice.status or "").upper() in ("BATCHED", "PAID"):
+        pdf_version = rendered_pdf_cache.document_version(
+            invoice.status, invoice.updated_at, invoice.created_by,
+            getattr(company, "updated_at", None), getattr(branch, "updated_at", None),
+            rendered_pdf_cache.lines_updated_at(invoice.items), company_logo_bytes,
+        )
+        cached_pdf = rendered_pdf_cache.get("sales_invoice", invoice.id, pdf_version, tenant)
+        if cached_pdf:
+            return Response(content=cached_pdf, media_type="application/pdf", headers=headers)
     creator = db.query(User).filter(User.id == invoice.created_by).first()
-    if creator:
-        prepared_by = getattr(creator, "full_name", None) or getattr(creator, "username", None) or str(invoice.created_by)
-        served_by = prepared_by
+    prepared_by = user_display_name(creator, invoice.created_by)
     try:
         pdf_bytes = build_sales_invoice_pdf(
-            company_name=company.name if company else "—",
-            company_address=getattr(company, "address", None) if company else None,
-            company_phone=getattr(company, "phone", None) if company else None,
-            company_pin=getattr(company, "pin", None) if company else None,
-            company_logo_bytes=company_logo_bytes,
-            branch_name=branch.name if branch else None,
-            branch_address=getattr(branch, "address", None) if branch else None,
-            invoice_no=invoice.invoice_no,
-            invoice_date=invoice.invoice_date,
-            customer_name=invoice.customer_name,
-            customer_phone=getattr(invoice, "customer_phone", None),
-            payment_mode=getattr(invoice, "payment_mode", None),
-            items=items_data,
-            total_exclusive=invoice.total_exclusive or Decimal("0"),
-            vat_amount=invoice.vat_amount or Decimal("0"),
-            total_inclusive=invoice.total_inclusive or Decimal("0"),
-            notes=getattr(invoice, "notes", None),
-            till_number=till_number,
-            paybill=paybill,
-            prepared_by=prepared_by,
-            printed_by=None,
-            served_by=served_by,
+            **sales_invoice_pdf_kwargs(invoice, company, branch, company_logo_bytes, prepared_by)
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate sales invoice PDF: {str(e)}")
-    filename = f"sales-invoice-{invoice.invoice_no or invoice_id}.pdf".replace(" ", "-")
-    return Response(content=pdf_bytes, media_type="application/pdf", headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+    if pdf_version:
+        rendered_pdf_cache.put("sales_invoice", invoice.id, pdf_version, pdf_bytes, tenant)
+    return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
 
 
 def _get_sales_invoice_response(
@@ -687,55 +646,36 @@ def add_sales_invoice_item(
             detail=f"Insufficient stock for {item.name}. Available: {available}, Required: {required}"
         )
 
-    sales_type = getattr(invoice, 'sales_type', 'RETAIL') or 'RETAIL'
-    pricing_tier = 'wholesale' if sales_type == 'WHOLESALE' else ('supplier' if sales_type == 'SUPPLIER' else 'retail')
     unit_price = item_data.unit_price_exclusive
     unit_cost_used = None
+    priced = PricingService.price_lines_batch(
+        db,
+        invoice.company_id,
+        invoice.branch_id,
+        [{"item_id": item.id, "unit_name": item_data.unit_name, "unit_price_exclusive": unit_price or None}],
+        user_has_sell_below_margin=(
+            _user_has_sell_below_min_margin(db, invoice.created_by, invoice.branch_id) if unit_price else False
+        ),
+        item_map={item.id: item},
+    )[0]
     if not unit_price:
-        price_info = PricingService.calculate_recommended_price(
-            db, item_data.item_id, invoice.branch_id,
-            invoice.company_id, item_data.unit_name, tier=pricing_tier
-        )
-        if not price_info and pricing_tier == 'supplier':
-            price_info = PricingService.calculate_recommended_price(
-                db, item_data.item_id, invoice.branch_id,
-                invoice.company_id, item_data.unit_name, tier='wholesale'
-            )
+        if priced["error"]:
+            raise HTTPException(status_code=400, detail=priced["error"])
+        price_info = priced["recommended"]
         if price_info:
             unit_price = price_info["recommended_unit_price"]
             unit_cost_used = price_info["unit_cost_used"]
         else:
             raise HTTPException(status_code=400, detail=f"Price not available for {item.name}")
     else:
-        cost_info = PricingService.get_item_cost(db, item_data.item_id, invoice.branch_id)
-        if cost_info:
-            unit_cost_used = cost_info
+        unit_cost_used = priced["unit_cost_used"] or None
         # Price validation (floor + margin + promo)
-        if unit_cost_used and float(unit_cost_used) > 0:
-            mult = get_unit_multiplier_from_item(item, item_data.unit_name)
-            if mult is not None and mult > 0:
-                cost_per_sale_unit = unit_cost_used * mult
-                unit_price_val = Decimal(str(unit_price))
-                if cost_per_sale_unit > 0:
-                    user_has_override = _user_has_sell_below_min_margin(db, invoice.created_by, invoice.branch_id)
-                    is_promo = is_line_price_at_promo(
-                        db, item_data.item_id, item_data.unit_name or "", unit_price_val
-                    )
-                    validation = validate_line_price(
-                        db,
-                        invoice.company_id,
-                        item_data.item_id,
-                        unit_price_val,
-                        cost_per_sale_unit,
-                        user_has_override,
-                        branch_id=invoice.branch_id,
-                        is_promo_price=is_promo,
-                    )
-                    if not validation.get("allowed"):
-                        raise HTTPException(
-                            status_code=400,
-                            detail=validation.get("message", "Price validation failed.")
-                        )
+        validation = priced["validation"]
+        if validation and not validation.get("allowed"):
+            raise HTTPException(
+                status_code=400,
+                detail=validation.get("message", "Price validation failed.")
+            )
 
     line_total_exclusive = Decimal(str(unit_price)) * item_data.quantity
     discount_amount = item_data.discount_amount or (line_total_exclusive * item_data.discount_percent / Decimal("100"))
@@ -1037,136 +977,6 @@ def get_branch_today_summary(
     }
 
 
-def _compute_cogs_from_invoice_lines(
-    db: Session,
-    branch_id: UUID,
-    sd: date,
-    ed: date,
-    by_date: bool = False,
-) -> tuple:
-    """
-    Compute COGS for gross profit.
-
-    Primary: sum of InventoryLedger.total_cost for SALE rows created when invoices were
-    batched (reference_type=sales_invoice). This is the *actual* cost removed from stock
-    across all FEFO layers — not stock valuation / last-cost-for-display, and not the
-    snapshot on sales_invoice_items.unit_cost_used (which is only the first batch's cost).
-
-    Fallback (legacy / missing ledger): sum per line
-        quantity (sale unit) × multiplier_to_retail × unit_cost_used (per retail/base)
-    when unit_cost_used is set on the line.
-
-    Returns (total_cogs, cogs_by_day_dict or None).
-    """
-    from sqlalchemy.orm import selectinload
-
-    # Use invoice business date for all sales-window analytics so dashboards match invoice listings.
-    sales_date_key = SalesInvoice.invoice_date
-
-    # --- Ledger COGS: actual batching cost (multi-batch correct) ---
-    ledger_total_raw = (
-        db.query(func.coalesce(func.sum(InventoryLedger.total_cost), 0))
-        .join(SalesInvoice, SalesInvoice.id == InventoryLedger.reference_id)
-        .filter(
-            InventoryLedger.branch_id == branch_id,
-            InventoryLedger.transaction_type == "SALE",
-            InventoryLedger.reference_type == "sales_invoice",
-            SalesInvoice.branch_id == branch_id,
-            SalesInvoice.status.in_(["BATCHED", "PAID"]),
-            sales_date_key.between(sd, ed),
-        )
-        .scalar()
-    )
-    ledger_total = Decimal(str(ledger_total_raw or 0))
-
-    ledger_cogs_by_day = None
-    if by_date:
-        ledger_rows = (
-            db.query(
-                sales_date_key.label("d"),
-                func.coalesce(func.sum(InventoryLedger.total_cost), 0).label("cogs"),
-            )
-            .join(SalesInvoice, SalesInvoice.id == InventoryLedger.reference_id)
-            .filter(
-                InventoryLedger.branch_id == branch_id,
-                InventoryLedger.transaction_type == "SALE",
-                InventoryLedger.reference_type == "sales_invoice",
-                SalesInvoice.branch_id == branch_id,
-                SalesInvoice.status.in_(["BATCHED", "PAID"]),
-                sales_date_key.between(sd, ed),
-            )
-            .group_by(sales_date_key)
-            .all()
-        )
-        ledger_cogs_by_day = {r.d: (r.cogs or Decimal("0")) for r in (ledger_rows or [])}
-
-    invoices = (
-        db.query(SalesInvoice)
-        .options(selectinload(SalesInvoice.items).selectinload(SalesInvoiceItem.item))
-        .filter(
-            SalesInvoice.branch_id == branch_id,
-            SalesInvoice.status.in_(["BATCHED", "PAID"]),
-            sales_date_key.between(sd, ed),
-        )
-        .all()
-    )
-    invoice_cogs = Decimal("0")
-    invoice_cogs_by_day = {} if by_date else None
-
-    for inv in invoices:
-        inv_date = inv.invoice_date or inv.batched_at or inv.created_at
-        if inv_date is None:
-            d = sd
-        elif hasattr(inv_date, "date") and callable(getattr(inv_date, "date")):
-            d = inv_date.date()
-        elif isinstance(inv_date, date):
-            d = inv_date
-        else:
-            from datetime import datetime as dt
-            d = dt.fromisoformat(str(inv_date)[:10]).date() if inv_date else sd
-        inv_line_cogs = Decimal("0")
-        for line in inv.items or []:
-            if not line.unit_cost_used or float(line.unit_cost_used) <= 0:
-                continue
-            item = line.item
-            if not item:
-                item = db.query(Item).filter(Item.id == line.item_id).first()
-            if not item:
-                continue
-            
-            # ARCHITECTURE: unit_cost_used is ALWAYS stored as cost per retail/base unit (ledger/snapshot).
-            # COGS = quantity sold (in retail units) × cost per retail unit.
-            # pack_size is not used for cost; it only affects quantity conversion (sale unit → retail).
-            mult_to_retail = get_unit_multiplier_from_item(item, line.unit_name or "")
-            if mult_to_retail is None or mult_to_retail <= 0:
-                continue
-
-            qty_retail = Decimal(str(line.quantity)) * mult_to_retail
-            cost_per_retail = Decimal(str(line.unit_cost_used))
-            line_cogs = qty_retail * cost_per_retail
-            inv_line_cogs += line_cogs
-        
-        invoice_cogs += inv_line_cogs
-        if by_date and inv_line_cogs > 0:
-            invoice_cogs_by_day[d] = invoice_cogs_by_day.get(d, Decimal("0")) + inv_line_cogs
-
-    # Prefer batched SALE ledger totals (multi-batch FEFO accurate). Invoice-line math uses
-    # unit_cost_used from the first batch only and can over- or under-state COGS vs actual layers.
-    # Financial reporting preference:
-    # - When sales invoice snapshot cost (sales_invoice_items.unit_cost_used) exists,
-    #   reports must match that snapshot cost, because users validate against it.
-    # - Ledger SALE costs are the inventory-layer valuation at batching time and can be
-    #   exaggerated if earlier purchase layers were wrong; fixing those layers does
-    #   not retroactively rewrite historical SALE ledger rows.
-    if ledger_total > 0 and invoice_cogs > 0:
-        return invoice_cogs, invoice_cogs_by_day if by_date else None, "invoice_lines"
-
-    if ledger_total > 0:
-        return ledger_total, ledger_cogs_by_day if by_date else None, "ledger"
-
-    return invoice_cogs, invoice_cogs_by_day if by_date else None, "invoice_lines"
-
-
 @router.get("/branch/{branch_id}/gross-profit", response_model=dict)
 def get_branch_gross_profit(
     branch_id: UUID,
@@ -1181,10 +991,11 @@ def get_branch_gross_profit(
     Gross profit summary for a branch and date range.
 
     Net sales = Sales (exclusive) − Credit notes (customer returns) in date range.
-    COGS = sum of SALE ledger total_cost for batched invoices in range (actual FEFO cost);
-           if no ledger rows (legacy), falls back to invoice-line qty × unit_cost_used.
-           Then subtract SALE_RETURN ledger total_cost linked to credit notes in range.
+    COGS = invoice-line qty × unit_cost_used of batched invoices in range; when no line has
+           unit_cost_used (legacy), the SALE ledger total_cost of those invoices.
+           Then subtract SALE_RETURN ledger total_cost of credit notes in range.
     Gross profit = Net sales − COGS.
+    Read from sales_daily_rollup (see SalesRollupService); credit note returns count on credit_note_date.
     """
     user, _ = current_user_and_db
     branch = db.query(Branch).filter(Branch.id == branch_id).first()
@@ -1199,95 +1010,24 @@ def get_branch_gross_profit(
 
     sd, ed = _resolve_date_range(preset, start_date, end_date)
 
-    # Use invoice business date so back-dated invoices stay on their intended day.
-    sales_date_key = SalesInvoice.invoice_date
-    base_sales = (
-        db.query(
-            func.coalesce(func.sum(SalesInvoice.total_exclusive), 0).label("sales_exclusive"),
-            func.coalesce(func.sum(SalesInvoice.total_inclusive), 0).label("sales_inclusive"),
-            func.count(SalesInvoice.id).label("invoice_count"),
-        )
-        .filter(
-            SalesInvoice.branch_id == branch_id,
-            SalesInvoice.status.in_(["BATCHED", "PAID"]),
-            sales_date_key.between(sd, ed),
-        )
-        .first()
-    )
-    sales_exclusive = (base_sales.sales_exclusive if base_sales else Decimal("0")) or Decimal("0")
-    sales_inclusive = (base_sales.sales_inclusive if base_sales else Decimal("0")) or Decimal("0")
-    invoice_count = int(getattr(base_sales, "invoice_count", 0) or 0)
+    # Daily rollups only (maintained when invoices are batched and credit notes created)
+    days = SalesRollupService.get_days(db, branch_id, sd, ed)
 
-    # Net sales: subtract credit notes (customer returns) in date range
-    credit_notes_sum = (
-        db.query(func.coalesce(func.sum(CreditNote.total_exclusive), 0).label("cn_total"))
-        .filter(
-            CreditNote.branch_id == branch_id,
-            CreditNote.credit_note_date >= sd,
-            CreditNote.credit_note_date <= ed,
-        )
-        .scalar()
-    )
-    credit_notes_total = Decimal(str(credit_notes_sum or 0))
-    credit_notes_inclusive_sum = (
-        db.query(func.coalesce(func.sum(CreditNote.total_inclusive), 0).label("cn_total_inclusive"))
-        .filter(
-            CreditNote.branch_id == branch_id,
-            CreditNote.credit_note_date >= sd,
-            CreditNote.credit_note_date <= ed,
-        )
-        .scalar()
-    )
-    credit_notes_total_inclusive = Decimal(str(credit_notes_inclusive_sum or 0))
+    def _total(column: str) -> Decimal:
+        return sum((Decimal(str(getattr(r, column) or 0)) for r in days), Decimal("0"))
+
+    sales_exclusive = _total("sales_exclusive")
+    sales_inclusive = _total("sales_inclusive")
+    invoice_count = sum(int(r.invoice_count or 0) for r in days)
+    credit_notes_total = _total("credit_notes_exclusive")
+    credit_notes_total_inclusive = _total("credit_notes_inclusive")
     net_sales_exclusive = sales_exclusive - credit_notes_total
     net_sales_inclusive = sales_inclusive - credit_notes_total_inclusive
 
-    # COGS from invoice lines (cost of quantity SOLD)
-    cogs, cogs_by_day, cogs_source = _compute_cogs_from_invoice_lines(
-        db, branch_id, sd, ed, by_date=include_breakdown
-    )
-
-    # Subtract SALE_RETURN cost (customer returns reduce COGS)
-    cn_ids_subq = (
-        db.query(CreditNote.id)
-        .filter(
-            CreditNote.branch_id == branch_id,
-            CreditNote.credit_note_date >= sd,
-            CreditNote.credit_note_date <= ed,
-        )
-    )
-    return_cogs_result = (
-        db.query(func.coalesce(func.sum(InventoryLedger.total_cost), 0).label("return_cogs"))
-        .filter(
-            InventoryLedger.branch_id == branch_id,
-            InventoryLedger.transaction_type == "SALE_RETURN",
-            InventoryLedger.reference_type == "credit_note",
-            InventoryLedger.reference_id.in_(cn_ids_subq),
-        )
-        .scalar()
-    )
-    return_cogs = Decimal(str(return_cogs_result or 0))
-    cogs = cogs - return_cogs
-
-    if include_breakdown and return_cogs > 0:
-        return_cogs_rows = (
-            db.query(
-                func.date(InventoryLedger.created_at).label("d"),
-                func.coalesce(func.sum(InventoryLedger.total_cost), 0).label("rc"),
-            )
-            .filter(
-                InventoryLedger.branch_id == branch_id,
-                InventoryLedger.transaction_type == "SALE_RETURN",
-                InventoryLedger.reference_type == "credit_note",
-                InventoryLedger.reference_id.in_(cn_ids_subq),
-            )
-            .group_by(func.date(InventoryLedger.created_at))
-            .all()
-        )
-        return_cogs_by_day = {r.d: (r.rc or Decimal("0")) for r in (return_cogs_rows or [])}
-        if cogs_by_day:
-            for d in list(cogs_by_day.keys()):
-                cogs_by_day[d] = cogs_by_day[d] - return_cogs_by_day.get(d, Decimal("0"))
+    # COGS of quantity SOLD (source chosen over the whole range), less returns (customer returns reduce COGS)
+    cogs, cogs_source = choose_cogs(_total("ledger_cogs"), _total("invoice_line_cogs"))
+    cogs_column = "ledger_cogs" if cogs_source == "ledger" else "invoice_line_cogs"
+    cogs = cogs - _total("return_cogs")
 
     gross_profit = net_sales_exclusive - cogs
     margin_percent = (gross_profit / net_sales_exclusive * Decimal("100")) if net_sales_exclusive and net_sales_exclusive > 0 else Decimal("0")
@@ -1312,64 +1052,19 @@ def get_branch_gross_profit(
         return out
 
     # Per-day breakdown: sales, credit notes, net sales, cogs, gross profit
-    sales_rows = (
-        db.query(
-            sales_date_key.label("d"),
-            func.coalesce(func.sum(SalesInvoice.total_exclusive), 0).label("sales_exclusive"),
-            func.coalesce(func.sum(SalesInvoice.total_inclusive), 0).label("sales_inclusive"),
-        )
-        .filter(
-            SalesInvoice.branch_id == branch_id,
-            SalesInvoice.status.in_(["BATCHED", "PAID"]),
-            sales_date_key.between(sd, ed),
-        )
-        .group_by(sales_date_key)
-        .order_by(sales_date_key.asc())
-        .all()
-    )
-    sales_by_day = {r.d: (r.sales_exclusive or Decimal("0")) for r in (sales_rows or [])}
-    sales_inclusive_by_day = {r.d: (r.sales_inclusive or Decimal("0")) for r in (sales_rows or [])}
-
-    cn_rows = (
-        db.query(
-            CreditNote.credit_note_date.label("d"),
-            func.coalesce(func.sum(CreditNote.total_exclusive), 0).label("cn_total"),
-        )
-        .filter(
-            CreditNote.branch_id == branch_id,
-            CreditNote.credit_note_date >= sd,
-            CreditNote.credit_note_date <= ed,
-        )
-        .group_by(CreditNote.credit_note_date)
-        .all()
-    )
-    credit_notes_by_day = {r.d: (r.cn_total or Decimal("0")) for r in (cn_rows or [])}
-    cn_rows_inclusive = (
-        db.query(
-            CreditNote.credit_note_date.label("d"),
-            func.coalesce(func.sum(CreditNote.total_inclusive), 0).label("cn_total_inclusive"),
-        )
-        .filter(
-            CreditNote.branch_id == branch_id,
-            CreditNote.credit_note_date >= sd,
-            CreditNote.credit_note_date <= ed,
-        )
-        .group_by(CreditNote.credit_note_date)
-        .all()
-    )
-    credit_notes_inclusive_by_day = {r.d: (r.cn_total_inclusive or Decimal("0")) for r in (cn_rows_inclusive or [])}
-    cogs_by_day = cogs_by_day or {}
-
+    by_day = {r.rollup_date: r for r in days}
+    zero = Decimal("0")
     breakdown = []
     dcur = sd
     while dcur <= ed:
-        s = sales_by_day.get(dcur, Decimal("0"))
-        s_inc = sales_inclusive_by_day.get(dcur, Decimal("0"))
-        cn = credit_notes_by_day.get(dcur, Decimal("0"))
-        cn_inc = credit_notes_inclusive_by_day.get(dcur, Decimal("0"))
+        r = by_day.get(dcur)
+        s = Decimal(str(r.sales_exclusive)) if r else zero
+        s_inc = Decimal(str(r.sales_inclusive)) if r else zero
+        cn = Decimal(str(r.credit_notes_exclusive)) if r else zero
+        cn_inc = Decimal(str(r.credit_notes_inclusive)) if r else zero
         net_s = s - cn
         net_s_inc = s_inc - cn_inc
-        c = cogs_by_day.get(dcur, Decimal("0"))
+        c = (Decimal(str(getattr(r, cogs_column))) - Decimal(str(r.return_cogs))) if r else zero
         gp = net_s - c
         mp = (gp / net_s * Decimal("100")) if net_s and net_s > 0 else Decimal("0")
         breakdown.append(
@@ -1704,8 +1399,10 @@ def create_credit_note(
             db, entry.company_id, entry.branch_id, entry.item_id, entry.quantity_delta,
             document_number=getattr(entry, "document_number", None) or credit_note_no,
         )
+    SnapshotService.upsert_batch_balances(db, ledger_entries)
     for entry in ledger_entries:
         SnapshotRefreshService.schedule_snapshot_refresh(db, entry.company_id, entry.branch_id, item_id=entry.item_id)
+    SalesRollupService.record_credit_note(db, credit_note, ledger_entries)
 
     try:
         db.commit()
@@ -1921,65 +1618,55 @@ def batch_sales_invoice(
 
     # Process each item and reduce stock based on FEFO allocation (all in same transaction)
     ledger_entries = []
+    price_checks = []
 
     try:
         for invoice_item in invoice.items:
-            item = invoice_item.item
-            if not item:
+            if not invoice_item.item:
                 raise HTTPException(
                     status_code=400,
                     detail=f"Item {invoice_item.item_id} not found. Cannot batch."
                 )
 
-            quantity_base = InventoryService.convert_to_base_units(
-                db, invoice_item.item_id, float(invoice_item.quantity), invoice_item.unit_name
+        # One locking query for all lines' open batches; allocation happens in memory
+        try:
+            line_allocations = InventoryService.allocate_invoice_fefo(
+                db,
+                invoice.branch_id,
+                [
+                    {
+                        "item_id": invoice_item.item_id,
+                        "item": invoice_item.item,
+                        "quantity": invoice_item.quantity,
+                        "unit_name": invoice_item.unit_name,
+                    }
+                    for invoice_item in invoice.items
+                ],
             )
-
-            is_available, available, required = InventoryService.check_stock_availability(
-                db, invoice_item.item_id, invoice.branch_id,
-                float(invoice_item.quantity), invoice_item.unit_name
+        except InsufficientStockError as e:
+            short_line = invoice.items[e.line_index]
+            raise HTTPException(
+                status_code=400,
+                detail=f"Insufficient stock for {short_line.item_name or short_line.item.name}. Available: {e.available}, Required: {e.required}"
             )
-            if not is_available:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Insufficient stock for {invoice_item.item_name or item.name}. Available: {available}, Required: {required}"
-                )
 
-            allocations = InventoryService.allocate_stock_fefo(
-                db, invoice_item.item_id, invoice.branch_id,
-                quantity_base, invoice_item.unit_name
-            )
+        for invoice_item, line_allocation in zip(invoice.items, line_allocations):
+            quantity_base = line_allocation["quantity_base"]
+            allocations = line_allocation["allocations"]
 
             qty_base_dec = Decimal(str(quantity_base))
             total_line_ledger_cost = _total_cost_from_allocations(allocations)
 
-            # Model B: post-allocation margin and floor price validation (blended cost across FEFO layers)
+            # Model B: post-allocation margin and floor price validation (blended cost across FEFO layers);
+            # all lines are validated in one price_lines_batch call below
             if allocations and qty_base_dec > 0:
                 cost_per_base_unit = total_line_ledger_cost / qty_base_dec
-                mult = get_unit_multiplier_from_item(item, invoice_item.unit_name)
-                if mult is not None and mult > 0:
-                    cost_per_sale_unit = cost_per_base_unit * mult
-                    unit_price_val = invoice_item.unit_price_exclusive or Decimal("0")
-                    if cost_per_sale_unit > 0:
-                        user_has_override = _user_has_sell_below_min_margin(db, batched_by, invoice.branch_id)
-                        is_promo = is_line_price_at_promo(
-                            db, invoice_item.item_id, invoice_item.unit_name or "", unit_price_val
-                        )
-                        validation = validate_line_price(
-                            db,
-                            invoice.company_id,
-                            invoice_item.item_id,
-                            unit_price_val,
-                            cost_per_sale_unit,
-                            user_has_override,
-                            branch_id=invoice.branch_id,
-                            is_promo_price=is_promo,
-                        )
-                        if not validation.get("allowed"):
-                            raise HTTPException(
-                                status_code=400,
-                                detail=validation.get("message", "Price validation failed.")
-                            )
+                price_checks.append({
+                    "item_id": invoice_item.item_id,
+                    "unit_name": invoice_item.unit_name,
+                    "unit_price_exclusive": invoice_item.unit_price_exclusive or Decimal("0"),
+                    "unit_cost": cost_per_base_unit,
+                })
 
                 # Snapshot: per retail/base unit so qty×mult×unit_cost_used == sum(SALE ledger total_cost)
                 old_uc = invoice_item.unit_cost_used
@@ -2020,6 +1707,23 @@ def batch_sales_invoice(
                 )
                 ledger_entries.append(ledger_entry)
 
+        if price_checks:
+            priced_lines = PricingService.price_lines_batch(
+                db,
+                invoice.company_id,
+                invoice.branch_id,
+                price_checks,
+                user_has_sell_below_margin=_user_has_sell_below_min_margin(db, batched_by, invoice.branch_id),
+                item_map={line.item_id: line.item for line in invoice.items},
+            )
+            for priced in priced_lines:
+                validation = priced["validation"]
+                if validation and not validation.get("allowed"):
+                    raise HTTPException(
+                        status_code=400,
+                        detail=validation.get("message", "Price validation failed.")
+                    )
+
         invoice.batched = True
         invoice.batched_by = batched_by
         invoice.batched_at = datetime.utcnow()
@@ -2074,10 +1778,12 @@ def batch_sales_invoice(
                 db, entry.company_id, entry.branch_id, entry.item_id, entry.quantity_delta,
                 document_number=getattr(entry, "document_number", None) or invoice.invoice_no,
             )
+        SnapshotService.upsert_batch_balances(db, ledger_entries)
         for inv_item in invoice.items:
             SnapshotService.upsert_search_snapshot_last_sale(
                 db, invoice.company_id, invoice.branch_id, inv_item.item_id, invoice.invoice_date
             )
+        SalesRollupService.record_invoice(db, invoice, ledger_entries)
         for entry in ledger_entries:
             SnapshotRefreshService.schedule_snapshot_refresh(db, entry.company_id, entry.branch_id, item_id=entry.item_id)
 
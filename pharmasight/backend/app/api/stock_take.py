@@ -14,15 +14,15 @@ from app.dependencies import (
     get_tenant_db,
     get_current_user,
     get_effective_company_id_for_user,
+    get_tenant_from_header,
     require_company_match,
 )
 from app.module_enforcement import require_module
 from app.config import settings
 from app.models import (
     StockTakeSession, StockTakeCount, StockTakeCounterLock, StockTakeAdjustment,
-    User, Item, Branch, Company, UserRole, UserBranchRole, InventoryLedger
+    StockTakeCompletionJob, User, Item, Branch, Company, UserRole, UserBranchRole, InventoryLedger
 )
-from decimal import Decimal
 from app.schemas.stock_take import (
     StockTakeSessionCreate, StockTakeSessionUpdate, StockTakeSessionResponse,
     StockTakeCountCreate, StockTakeCountBranchCreate, StockTakeCountResponse,
@@ -31,14 +31,7 @@ from app.schemas.stock_take import (
     StockTakeAdjustmentCreate, StockTakeAdjustmentResponse,
     SessionJoinRequest, SessionJoinResponse
 )
-from app.services.inventory_service import InventoryService
-from app.services.snapshot_service import SnapshotService
-from app.services.snapshot_refresh_service import SnapshotRefreshService
-from app.services.stock_validation_service import (
-    get_stock_validation_config,
-    validate_stock_entry_with_config,
-    StockValidationError,
-)
+from app.services.stock_take_completion_service import fail_stale_jobs, start_completion_job
 
 logger = logging.getLogger(__name__)
 router = APIRouter(dependencies=[Depends(require_module("pharmacy"))])
@@ -1743,219 +1736,113 @@ def get_branch_locks(
     return result
 
 
-@router.post("/branch/{branch_id}/complete")
+@router.post("/branch/{branch_id}/complete", status_code=status.HTTP_202_ACCEPTED)
 def complete_branch_stock_take(
     branch_id: UUID,
     user_id: UUID = Query(None, description="User ID completing the stock take (optional)"),
     current_user_and_db: tuple = Depends(get_current_user),
+    tenant=Depends(get_tenant_from_header),
     db: Session = Depends(get_tenant_db),
 ):
     """
     Complete stock take for branch.
-    Row-level lock on session prevents concurrent complete; entire operation in one transaction.
+    Starts a background completion job (variance adjustments, uncounted items zeroed out, session
+    COMPLETED, all in one transaction); poll GET /branch/{branch_id}/completion-jobs/{job_id}.
+    Row-level lock on session prevents concurrent complete; a second call returns the running job.
+    A job without progress for STOCK_TAKE_COMPLETION_STALE_SECONDS (worker restarted) is marked failed first.
     """
-    try:
-        # Lock active session row before processing to prevent concurrent complete
-        session = (
-            db.query(StockTakeSession)
-            .filter(
-                and_(
-                    StockTakeSession.branch_id == branch_id,
-                    StockTakeSession.status == 'ACTIVE'
-                )
-            )
-            .with_for_update()
-            .first()
-        )
-        if not session:
-            logger.warning(f"Attempt to complete stock take for branch {branch_id} but no active session found")
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No active stock take session found for this branch"
-            )
-        
-        # Get all counts
-        counts = db.query(StockTakeCount).filter(
-            StockTakeCount.session_id == session.id
-        ).all()
-        
-        # Get branch and item details for ledger entries
-        branch = db.query(Branch).filter(Branch.id == branch_id).first()
-        if not branch:
-            raise HTTPException(status_code=404, detail="Branch not found")
-        
-        # Use provided user_id or session creator or first counter
-        completing_user_id = user_id or session.created_by
-        if not completing_user_id and counts:
-            completing_user_id = counts[0].counted_by
-        
-        if not completing_user_id:
-            logger.warning(f"No user_id available for completing stock take session {session.id}")
-            completing_user_id = session.created_by  # Fallback to session creator
-        
-        # Item IDs that were counted (any count in this session)
-        counted_item_ids = {c.item_id for c in counts}
-
-        # Uncounted items with stock: zero out (record in ledger so stock becomes 0)
-        # Compute BEFORE applying count adjustments so we use pre-completion stock.
-        items_with_stock = db.query(InventoryLedger.item_id).filter(
+    # Lock active session row so concurrent completes see each other's job
+    session = (
+        db.query(StockTakeSession)
+        .filter(
             and_(
-                InventoryLedger.branch_id == branch_id,
+                StockTakeSession.branch_id == branch_id,
+                StockTakeSession.status == 'ACTIVE'
             )
-        ).group_by(InventoryLedger.item_id).having(
-            func.sum(InventoryLedger.quantity_delta) > 0
-        ).all()
-        items_with_stock_ids = {r[0] for r in items_with_stock}
-        uncounted_with_stock = [
-            (item_id, InventoryService.get_current_stock(db, item_id, branch_id))
-            for item_id in (items_with_stock_ids - counted_item_ids)
-        ]
-        uncounted_with_stock = [(iid, q) for iid, q in uncounted_with_stock if q > 0]
-
-        from app.services.canonical_pricing import CanonicalPricingService
-
-        stock_validation_config_st = get_stock_validation_config(db, branch.company_id)
-
-        # 1) Update inventory for each count (variance adjustments)
-        items_updated = 0
-        errors = []
-        for count in counts:
-            try:
-                variance = count.variance
-                if variance != 0:
-                    item = db.query(Item).filter(Item.id == count.item_id).first()
-                    if not item:
-                        logger.warning(f"Item {count.item_id} not found when completing stock take")
-                        continue
-                    # When adding stock (variance > 0) for track_expiry items, require tracking fields per company toggles and validate
-                    if variance > 0 and getattr(item, "track_expiry", False):
-                        bn = (count.batch_number or "").strip() or None
-                        ed = count.expiry_date
-                        if ed is not None and hasattr(ed, "date"):
-                            ed = ed.date() if callable(ed.date) else ed
-                        require_batch = bool(getattr(stock_validation_config_st, "require_batch_tracking", True))
-                        require_expiry = bool(getattr(stock_validation_config_st, "require_expiry_tracking", True))
-                        if (require_batch and not bn) or (require_expiry and not ed):
-                            raise HTTPException(
-                                status_code=status.HTTP_400_BAD_REQUEST,
-                                detail=f"Item '{item.name or count.item_id}' has Track Expiry. Stock take count must include the required tracking fields when adding stock. Missing on completion.",
-                            )
-                        try:
-                            res_st = validate_stock_entry_with_config(
-                                stock_validation_config_st,
-                                batch_number=bn,
-                                expiry_date=ed,
-                                track_expiry=True,
-                                require_batch=require_batch,
-                                require_expiry=require_expiry,
-                                override=False,
-                            )
-                        except StockValidationError as e:
-                            raise HTTPException(
-                                status_code=status.HTTP_400_BAD_REQUEST,
-                                detail=e.result.message if e.result else str(e),
-                            )
-                        if not res_st.valid:
-                            raise HTTPException(
-                                status_code=status.HTTP_400_BAD_REQUEST,
-                                detail=res_st.message or "Batch/expiry validation failed.",
-                            )
-                    unit_cost = CanonicalPricingService.get_best_available_cost(db, count.item_id, branch_id, branch.company_id)
-                    total_cost = abs(variance) * unit_cost
-                    ledger_entry = InventoryLedger(
-                        company_id=branch.company_id,
-                        branch_id=branch_id,
-                        item_id=count.item_id,
-                        transaction_type='ADJUSTMENT',
-                        reference_type='STOCK_TAKE',
-                        reference_id=session.id,
-                        document_number=session.session_code,
-                        quantity_delta=variance,
-                        unit_cost=unit_cost,
-                        total_cost=total_cost,
-                        created_by=completing_user_id,
-                        notes='Stock take count adjustment',
-                        batch_number=count.batch_number,
-                        expiry_date=count.expiry_date,
-                    )
-                    db.add(ledger_entry)
-                    SnapshotService.upsert_inventory_balance(
-                        db, branch.company_id, branch_id, count.item_id, variance,
-                        document_number=session.session_code,
-                    )
-                    SnapshotRefreshService.schedule_snapshot_refresh(db, branch.company_id, branch_id, item_id=count.item_id)
-                    items_updated += 1
-            except Exception as e:
-                logger.error(f"Error updating inventory for item {count.item_id}: {str(e)}")
-                errors.append(f"Item {count.item_id}: {str(e)}")
-                continue
-
-        # 2) Zero out uncounted items: one ADJUSTMENT per item to bring stock to 0
-        items_zeroed = 0
-        for item_id, current_stock in uncounted_with_stock:
-            try:
-                if current_stock <= 0:
-                    continue
-                unit_cost = CanonicalPricingService.get_best_available_cost(db, item_id, branch_id, branch.company_id)
-                total_cost = abs(Decimal(str(current_stock))) * unit_cost
-                qty_delta = -Decimal(str(current_stock))
-                ledger_entry = InventoryLedger(
-                    company_id=branch.company_id,
-                    branch_id=branch_id,
-                    item_id=item_id,
-                    transaction_type='ADJUSTMENT',
-                    reference_type='STOCK_TAKE',
-                    reference_id=session.id,
-                    document_number=session.session_code,
-                    quantity_delta=qty_delta,
-                    unit_cost=unit_cost,
-                    total_cost=total_cost,
-                    created_by=completing_user_id,
-                    notes='Stock take: uncounted item zeroed out'
-                )
-                db.add(ledger_entry)
-                SnapshotService.upsert_inventory_balance(
-                    db, branch.company_id, branch_id, item_id, qty_delta,
-                    document_number=session.session_code,
-                )
-                SnapshotRefreshService.schedule_snapshot_refresh(db, branch.company_id, branch_id, item_id=item_id)
-                items_zeroed += 1
-            except Exception as e:
-                logger.error(f"Error zeroing item {item_id}: {str(e)}")
-                errors.append(f"Item {item_id} (zero out): {str(e)}")
-
-        # Mark session as completed
-        session.status = 'COMPLETED'
-        session.completed_at = datetime.utcnow()
-        db.commit()
-
-        logger.info(
-            f"Stock take session {session.id} completed for branch {branch_id}. "
-            f"Items updated from counts: {items_updated}, items zeroed (uncounted): {items_zeroed}"
         )
-
-        result = {
+        .with_for_update()
+        .first()
+    )
+    if not session:
+        logger.warning(f"Attempt to complete stock take for branch {branch_id} but no active session found")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No active stock take session found for this branch"
+        )
+    fail_stale_jobs(db, session.id)
+    job = db.query(StockTakeCompletionJob).filter(
+        StockTakeCompletionJob.session_id == session.id,
+        StockTakeCompletionJob.status.in_(("pending", "processing")),
+    ).first()
+    if job:
+        db.commit()
+        return {
+            **job.to_dict(),
             "success": True,
-            "message": "Stock take completed and inventory updated",
-            "session_id": str(session.id),
-            "items_updated": items_updated,
-            "items_zeroed": items_zeroed,
-            "total_counts": len(counts)
+            "message": "Stock take completion already in progress",
+            "job_id": str(job.id),
         }
-        if errors:
-            result["warnings"] = errors
-            result["message"] = f"Stock take completed with {len(errors)} warnings"
-        return result
-        
-    except HTTPException:
-        raise
+
+    # Use provided user_id or session creator or first counter
+    completing_user_id = user_id or session.created_by
+    if not completing_user_id:
+        first_count = db.query(StockTakeCount.counted_by).filter(
+            StockTakeCount.session_id == session.id
+        ).first()
+        completing_user_id = first_count[0] if first_count else None
+    if not completing_user_id:
+        logger.warning(f"No user_id available for completing stock take session {session.id}")
+        completing_user_id = current_user_and_db[0].id
+
+    job = StockTakeCompletionJob(
+        company_id=session.company_id,
+        branch_id=branch_id,
+        session_id=session.id,
+        user_id=completing_user_id,
+        status="pending",
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    try:
+        start_completion_job(job, tenant.database_url if tenant else None)
     except Exception as e:
-        logger.error(f"Error completing stock take for branch {branch_id}: {str(e)}", exc_info=True)
-        db.rollback()
+        logger.error(f"Failed to start stock take completion {job.id}: {str(e)}", exc_info=True)
+        job.status = "failed"
+        job.error_message = f"Failed to start completion: {e}"[:1000]
+        db.commit()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to complete stock take: {str(e)}"
         )
+    return {
+        **job.to_dict(),
+        "success": True,
+        "message": "Stock take completion started",
+        "job_id": str(job.id),
+    }
+
+
+@router.get("/branch/{branch_id}/completion-jobs/{job_id}")
+def get_stock_take_completion_job(
+    branch_id: UUID,
+    job_id: UUID,
+    current_user_and_db: tuple = Depends(get_current_user),
+    db: Session = Depends(get_tenant_db),
+):
+    """
+    Progress of a stock take completion job (status, processed_items / total_items, progress_percent).
+    When completed: items_updated, items_zeroed, total_counts and warnings.
+    """
+    user, _ = current_user_and_db
+    effective_company_id = get_effective_company_id_for_user(db, user)
+    job = db.query(StockTakeCompletionJob).filter(
+        StockTakeCompletionJob.id == job_id,
+        StockTakeCompletionJob.branch_id == branch_id,
+    ).first()
+    if not job or effective_company_id is None or job.company_id != effective_company_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Completion job not found")
+    return job.to_dict()
 
 
 @router.post("/branch/{branch_id}/cancel")
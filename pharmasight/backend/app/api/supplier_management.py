@@ -515,6 +515,7 @@ def approve_supplier_return(
                 db, company_id, ret.branch_id, line.item_id, Decimal(str(-float(line.quantity))),
                 document_number=doc_num,
             )
+            SnapshotService.upsert_batch_balances(db, [entry])
             SnapshotRefreshService.schedule_snapshot_refresh(db, company_id, ret.branch_id, item_id=line.item_id)
 
         # Ledger credit
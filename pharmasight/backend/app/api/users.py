@@ -15,11 +15,12 @@ import secrets
 import hashlib
 from datetime import datetime, timezone
 from app.dependencies import get_tenant_db, get_tenant_or_default, get_current_user, get_effective_company_id_for_user, invalidate_auth_cache_for_user
+from app.services.permission_resolver import bump_permissions_version
 from sqlalchemy import text
 from app.models.company import Company
 from app.models.user import User, UserRole, UserBranchRole
 from app.services.tenant_storage_service import (
-    upload_user_signature as upload_signature_to_storage,
+    upload_user_signature_async as upload_signature_to_storage,
     get_signed_url,
     ALLOWED_IMAGE_EXTENSIONS,
     MAX_IMAGE_BYTES,
@@ -223,6 +224,7 @@ def update_role_permissions(
         if perm:
             rp = RolePermission(role_id=role_id, permission_id=perm.id, branch_id=None)
             db.add(rp)
+    bump_permissions_version(db)  # roles are shared by every company in this DB
     db.commit()
     return {"success": True, "permissions": payload.permissions}
 
@@ -434,7 +436,7 @@ async def upload_user_signature(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid content-type. Allowed: image/png, image/jpeg",
         )
-    stored_path = upload_signature_to_storage(tenant.id, user_id, content, content_type, tenant=tenant)
+    stored_path = await upload_signature_to_storage(tenant.id, user_id, content, content_type, tenant=tenant)
     if not stored_path:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -952,6 +954,7 @@ def update_user(
                 existing.role_id = role.id
             else:
                 db.add(UserBranchRole(user_id=user_id, branch_id=branch_id, role_id=role.id))
+            bump_permissions_version(db, company_id)
 
     db.commit()
     db.refresh(user)
@@ -1116,6 +1119,7 @@ def assign_role(
                 role_id=role.id
             )
             db.add(user_branch_role)
+            bump_permissions_version(db, branch.company_id)
             db.commit()
     else:
         # For now, require branch_id. In future, could assign to all branches
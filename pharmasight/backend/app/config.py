@@ -88,6 +88,85 @@ class Settings(BaseSettings):
     # Session pooler host for tenant DBs (e.g. aws-1-eu-west-1.pooler.supabase.com).
     # If unset, derived from DATABASE_URL when it contains pooler.supabase.com.
     SUPABASE_POOLER_HOST: str = os.getenv("SUPABASE_POOLER_HOST", "").strip()
+    # Tenant DB engines: per-tenant pool (size + overflow) and one budget for all tenant engines of a worker.
+    TENANT_DB_POOL_SIZE: int = int(os.getenv("TENANT_DB_POOL_SIZE", "5"))
+    TENANT_DB_MAX_OVERFLOW: int = int(os.getenv("TENANT_DB_MAX_OVERFLOW", "5"))
+    TENANT_DB_POOL_TIMEOUT_SECONDS: float = float(os.getenv("TENANT_DB_POOL_TIMEOUT_SECONDS", "30"))
+    TENANT_DB_GLOBAL_MAX_CONNECTIONS: int = int(os.getenv("TENANT_DB_GLOBAL_MAX_CONNECTIONS", "60"))
+    # Tenant engines unused this long (nothing checked out) are disposed, closing their connections.
+    TENANT_ENGINE_IDLE_SECONDS: float = float(os.getenv("TENANT_ENGINE_IDLE_SECONDS", "600"))
+    # Startup tenant migrations: parallel workers and per-tenant time budget (seconds).
+    TENANT_MIGRATION_WORKERS: int = int(os.getenv("TENANT_MIGRATION_WORKERS", "4"))
+    TENANT_MIGRATION_TIMEOUT_SECONDS: float = float(os.getenv("TENANT_MIGRATION_TIMEOUT_SECONDS", "300"))
+    # blocking: migrate all tenants before serving. background: serve at once; each tenant's
+    # requests wait (up to TENANT_MIGRATION_GATE_WAIT_SECONDS, then 503) until its migrations finish.
+    TENANT_MIGRATION_MODE: str = os.getenv("TENANT_MIGRATION_MODE", "blocking").strip().lower()
+    TENANT_MIGRATION_GATE_WAIT_SECONDS: float = float(os.getenv("TENANT_MIGRATION_GATE_WAIT_SECONDS", "10"))
+    # POS item search: "ranked" (prefix / word-start / trigram similarity, fuzzy fallback) or "ilike" (legacy substring, in-stock then name).
+    ITEM_SEARCH_MODE: str = os.getenv("ITEM_SEARCH_MODE", "ranked").strip().lower()
+    # Fuzzy (typo-tolerant) matches are added when fewer exact matches than this are found.
+    ITEM_SEARCH_FUZZY_MIN_RESULTS: int = int(os.getenv("ITEM_SEARCH_FUZZY_MIN_RESULTS", "5"))
+    # pg_trgm word_similarity threshold for fuzzy matches (0-1; lower = more tolerant).
+    ITEM_SEARCH_FUZZY_THRESHOLD: float = float(os.getenv("ITEM_SEARCH_FUZZY_THRESHOLD", "0.45"))
+    # In-process per-branch search cache (app.services.item_search_cache); off by default.
+    ITEM_SEARCH_CACHE_ENABLED: bool = os.getenv("ITEM_SEARCH_CACHE_ENABLED", "false").lower() == "true"
+    ITEM_SEARCH_CACHE_MAX_BRANCHES: int = int(os.getenv("ITEM_SEARCH_CACHE_MAX_BRANCHES", "32"))
+    # Full rebuild interval; between rebuilds changed rows are patched in via item_branch_snapshot_versions.
+    ITEM_SEARCH_CACHE_TTL_SECONDS: float = float(os.getenv("ITEM_SEARCH_CACHE_TTL_SECONDS", "300"))
+    # How often a cached branch re-reads its version row (bounds staleness for writes from other processes).
+    ITEM_SEARCH_CACHE_VERSION_CHECK_SECONDS: float = float(os.getenv("ITEM_SEARCH_CACHE_VERSION_CHECK_SECONDS", "2"))
+    # Branding assets (logo, stamp, signatures) downloaded for PDFs: in-memory cache, optional disk tier.
+    BRANDING_ASSET_CACHE_MAX_BYTES: int = int(os.getenv("BRANDING_ASSET_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    # Re-download after this long (uploads in other processes); uploads in this process invalidate at once.
+    BRANDING_ASSET_CACHE_TTL_SECONDS: float = float(os.getenv("BRANDING_ASSET_CACHE_TTL_SECONDS", "3600"))
+    BRANDING_ASSET_CACHE_DIR: str = os.getenv("BRANDING_ASSET_CACHE_DIR", "")
+    # Supabase Storage REST (app.services.storage_http): shared keep-alive clients per storage URL.
+    STORAGE_HTTP_MAX_CONNECTIONS: int = int(os.getenv("STORAGE_HTTP_MAX_CONNECTIONS", "20"))
+    STORAGE_HTTP_MAX_KEEPALIVE: int = int(os.getenv("STORAGE_HTTP_MAX_KEEPALIVE", "10"))
+    STORAGE_HTTP_RETRIES: int = int(os.getenv("STORAGE_HTTP_RETRIES", "2"))
+    STORAGE_HTTP_BACKOFF_SECONDS: float = float(os.getenv("STORAGE_HTTP_BACKOFF_SECONDS", "0.2"))
+    # HTTP/2 is used only when the optional `h2` package is installed (pip install "httpx[http2]").
+    STORAGE_HTTP2: bool = os.getenv("STORAGE_HTTP2", "true").lower() == "true"
+    # Signed storage URLs (previews, PO pdf-url): reused while this fraction of their lifetime remains.
+    SIGNED_URL_CACHE_MAX_ENTRIES: int = int(os.getenv("SIGNED_URL_CACHE_MAX_ENTRIES", "5000"))
+    SIGNED_URL_CACHE_MIN_REMAINING_FRACTION: float = float(os.getenv("SIGNED_URL_CACHE_MIN_REMAINING_FRACTION", "0.5"))
+    # Rendered PDFs of finalized documents (batched invoices, GRNs): in-memory LRU; optional copy in tenant storage.
+    RENDERED_PDF_CACHE_MAX_BYTES: int = int(os.getenv("RENDERED_PDF_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    RENDERED_PDF_CACHE_PERSIST: bool = os.getenv("RENDERED_PDF_CACHE_PERSIST", "false").lower() == "true"
+    # Effective (branch, permission) sets per user: reused across requests until companies.permissions_version changes.
+    PERMISSION_CACHE_TTL_SECONDS: float = float(os.getenv("PERMISSION_CACHE_TTL_SECONDS", "300"))
+    PERMISSION_CACHE_MAX_ENTRIES: int = int(os.getenv("PERMISSION_CACHE_MAX_ENTRIES", "10000"))
+    # Company configuration (pricing, stock validation, report display, modules) per company: reused until
+    # companies.config_version changes or the TTL passes.
+    COMPANY_CONFIG_CACHE_TTL_SECONDS: float = float(os.getenv("COMPANY_CONFIG_CACHE_TTL_SECONDS", "300"))
+    COMPANY_CONFIG_CACHE_MAX_ENTRIES: int = int(os.getenv("COMPANY_CONFIG_CACHE_MAX_ENTRIES", "5000"))
+    # Stock take completion (stock_take_completion_jobs): adjustment ledger rows inserted per chunk.
+    STOCK_TAKE_COMPLETION_CHUNK_SIZE: int = int(os.getenv("STOCK_TAKE_COMPLETION_CHUNK_SIZE", "2000"))
+    # Pending/processing jobs without progress for this long are abandoned (worker restarted mid-run).
+    STOCK_TAKE_COMPLETION_STALE_SECONDS: int = int(os.getenv("STOCK_TAKE_COMPLETION_STALE_SECONDS", "1800"))
+    # Bulk document PDF export (document_export_jobs): render processes, documents loaded per chunk, output dir
+    # and how long finished files are kept.
+    DOCUMENT_EXPORT_WORKERS: int = int(os.getenv("DOCUMENT_EXPORT_WORKERS", "2"))
+    DOCUMENT_EXPORT_CHUNK_SIZE: int = int(os.getenv("DOCUMENT_EXPORT_CHUNK_SIZE", "100"))
+    DOCUMENT_EXPORT_MAX_DOCS: int = int(os.getenv("DOCUMENT_EXPORT_MAX_DOCS", "2000"))
+    DOCUMENT_EXPORT_DIR: str = os.getenv("DOCUMENT_EXPORT_DIR", "")
+    DOCUMENT_EXPORT_RETENTION_HOURS: float = float(os.getenv("DOCUMENT_EXPORT_RETENTION_HOURS", "24"))
+
+    @field_validator("TENANT_MIGRATION_MODE", mode="before")
+    @classmethod
+    def validate_tenant_migration_mode(cls, value: str) -> str:
+        mode = (value or "blocking").strip().lower()
+        if mode not in {"blocking", "background"}:
+            return "blocking"
+        return mode
+
+    @field_validator("ITEM_SEARCH_MODE", mode="before")
+    @classmethod
+    def validate_item_search_mode(cls, value: str) -> str:
+        mode = (value or "ranked").strip().lower()
+        if mode not in {"ranked", "ilike"}:
+            return "ranked"
+        return mode
 
     @field_validator("STORAGE_MODE", mode="before")
     @classmethod
@@ -203,6 +282,16 @@ class Settings(BaseSettings):
     ETIMS_VAT_CAT_ZERO: str = os.getenv("ETIMS_VAT_CAT_ZERO", "B").strip() or "B"
     ETIMS_TAX_TY_STANDARD: str = os.getenv("ETIMS_TAX_TY_STANDARD", "V").strip() or "V"
     ETIMS_TAX_TY_ZERO: str = os.getenv("ETIMS_TAX_TY_ZERO", "B").strip() or "B"
+    # Pending-invoice submission engine: worker threads, invoices per run, per-branch concurrency and
+    # request rate (per second, 0 = unlimited), pooled connections per OSCU host, retries and backoff
+    ETIMS_SUBMIT_WORKERS: int = int(os.getenv("ETIMS_SUBMIT_WORKERS", "8"))
+    ETIMS_SUBMIT_BATCH_LIMIT: int = int(os.getenv("ETIMS_SUBMIT_BATCH_LIMIT", "200"))
+    ETIMS_SUBMIT_BRANCH_CONCURRENCY: int = int(os.getenv("ETIMS_SUBMIT_BRANCH_CONCURRENCY", "2"))
+    ETIMS_SUBMIT_BRANCH_RATE_PER_SECOND: float = float(os.getenv("ETIMS_SUBMIT_BRANCH_RATE_PER_SECOND", "5"))
+    ETIMS_SUBMIT_TIMEOUT_SECONDS: int = int(os.getenv("ETIMS_SUBMIT_TIMEOUT_SECONDS", "45"))
+    ETIMS_HTTP_POOL_SIZE: int = int(os.getenv("ETIMS_HTTP_POOL_SIZE", "16"))
+    ETIMS_HTTP_RETRIES: int = int(os.getenv("ETIMS_HTTP_RETRIES", "3"))
+    ETIMS_HTTP_BACKOFF_SECONDS: float = float(os.getenv("ETIMS_HTTP_BACKOFF_SECONDS", "0.5"))
 
 
 settings = Settings()
@@ -20,7 +20,7 @@ from typing import Generator, Optional, Tuple
 from uuid import UUID
 
 from fastapi import Request, Depends, HTTPException, status
-from sqlalchemy import create_engine, pool, text
+from sqlalchemy import text
 from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session, sessionmaker
 
@@ -43,6 +43,7 @@ from app.utils.auth_guards import (
     assert_jwt_company_claim_matches_tenant,
     assert_tenant_company_link,
 )
+from app.services import company_config_cache, permission_resolver, tenant_engine_manager
 from app.services.tenant_registry_service import ensure_tenant_row_for_company
 
 logger = logging.getLogger(__name__)
@@ -121,11 +122,10 @@ def require_company_match(
 
 # -----------------------------------------------------------------------------
 # Tenant engine pool (Step 2)
-# One engine + session factory per tenant database_url. Legacy uses existing
-# app DB (SessionLocal); never store legacy URL in pool.
+# One engine + session factory per tenant database_url (app.services.tenant_engine_manager:
+# global connection budget, LRU/idle disposal). Legacy uses existing app DB (SessionLocal);
+# never store legacy URL in pool.
 # -----------------------------------------------------------------------------
-_tenant_engines: dict[str, object] = {}
-_tenant_sessions: dict[str, sessionmaker] = {}
 _pool_lock = threading.Lock()
 
 # In-process cache for default tenant (key=url, value=(tenant, expiry_ts)); TTL 10 minutes
@@ -280,7 +280,7 @@ def resolve_tenant_database_url(raw_url: Optional[str]) -> str:
 
 
 def _session_factory_for_url(database_url: str) -> sessionmaker:
-    """Get or create session factory for a tenant database_url. Thread-safe."""
+    """Get or create session factory for a tenant database_url. Thread-safe; pooled within the global budget."""
     effective_url = resolve_tenant_database_url(database_url)
     # Use pooler-safe options when connecting via Supabase pooler (session or transaction).
     use_pooler = (
@@ -293,23 +293,23 @@ def _session_factory_for_url(database_url: str) -> sessionmaker:
     }
     if use_pooler:
         connect_args["prepare_threshold"] = None  # Transaction pooler does not support prepared statements
-    with _pool_lock:
-        if effective_url not in _tenant_sessions:
-            engine = create_engine(
-                effective_url,
-                poolclass=pool.QueuePool,
-                pool_size=5,
-                max_overflow=10,
-                pool_pre_ping=True,
-                pool_recycle=3600,
-                connect_args=connect_args,
-                echo=settings.DEBUG,
-            )
-            _tenant_engines[effective_url] = engine
-            _tenant_sessions[effective_url] = sessionmaker(
-                autocommit=False, autoflush=False, bind=engine
-            )
-        return _tenant_sessions[effective_url]
+    return tenant_engine_manager.session_factory(effective_url, connect_args)
+
+
+def _await_tenant_migrations(database_url: Optional[str]) -> None:
+    """
+    Gate mode (TENANT_MIGRATION_MODE=background): hold a request for a tenant DB until its
+    startup migrations have finished; 503 with Retry-After if still running after the wait.
+    No-op once migrations finished, in blocking mode, and for DBs not part of the startup run.
+    """
+    from app.services.tenant_migration_orchestrator import wait_until_migrated
+
+    if not wait_until_migrated(database_url, settings.TENANT_MIGRATION_GATE_WAIT_SECONDS):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Tenant database is being upgraded. Please retry shortly.",
+            headers={"Retry-After": "5"},
+        )
 
 
 def get_tenant_from_header(
@@ -375,10 +375,12 @@ def get_tenant_db(
         return
 
     # Architecture: tenant.database_url from master DB. If unreachable (e.g. deleted project), use app DB.
+    _await_tenant_migrations(tenant.database_url)
     try:
         factory = _session_factory_for_url(tenant.database_url)
         db = factory()
-        db.execute(text("SELECT 1"))  # force connection
+        if not tenant_engine_manager.has_connected(db.get_bind()):
+            db.connection()  # first use of this engine: detect unreachable DB here; pool_pre_ping covers later checkouts
     except (OperationalError, OSError) as e:
         err_str = str(e)
         if "tenant or user not found" in err_str.lower() or "fatal:" in err_str.lower():
@@ -418,6 +420,7 @@ def tenant_db_session(tenant: Tenant) -> Generator[Session, None, None]:
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Tenant database not provisioned",
         )
+    _await_tenant_migrations(tenant.database_url)
     factory = _session_factory_for_url(tenant.database_url)
     db = factory()
     try:
@@ -673,6 +676,7 @@ def _resolve_user_and_db_for_request(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    _await_tenant_migrations(tenant.database_url)
     try:
         factory = _session_factory_for_url(tenant.database_url)
         db = factory()
@@ -854,6 +858,8 @@ def get_current_user(
             path = (request.url.path or "").strip().rstrip("/")
             is_items_search = path == "/api/items/search"
             # Fast path for item search: no SET LOCAL, no user fetch — one round-trip (search query only)
+            if tenant_url and tenant_url.strip():
+                _await_tenant_migrations(tenant_url)
             if is_items_search:
                 db = SessionLocal() if not tenant_url or not tenant_url.strip() else _session_factory_for_url(tenant_url)()
                 # Company access enforcement (companies are the source of truth)
@@ -861,6 +867,8 @@ def get_current_user(
                     from app.models.company import Company
 
                     company = db.query(Company).filter(Company.id == company_id).first() if company_id else None
+                    permission_resolver.note_company(company)
+                    company_config_cache.note_company(company)
                     access = get_company_access(company)
                     if access == "blocked" and not _path_allowed_for_blocked_company(path, method):
                         db.close()
@@ -886,6 +894,8 @@ def get_current_user(
                 from app.models.company import Company
 
                 company = db.query(Company).filter(Company.id == company_id).first() if company_id else None
+                permission_resolver.note_company(company)
+                company_config_cache.note_company(company)
                 access = get_company_access(company)
                 if access == "blocked" and not _path_allowed_for_blocked_company(path, method):
                     db.close()
@@ -961,6 +971,8 @@ def get_current_user(
             from app.models.company import Company
 
             company = db.query(Company).filter(Company.id == company_id).first() if company_id else None
+            permission_resolver.note_company(company)
+            company_config_cache.note_company(company)
             access = get_company_access(company)
             if access == "blocked" and not _path_allowed_for_blocked_company(path, method):
                 raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Company is inactive")
@@ -1103,16 +1115,9 @@ def get_tenant_optional(
 
 def _user_has_permission(db: Session, user_id: UUID, permission_name: str) -> bool:
     """True if user has the given permission in any of their branch-role assignments."""
-    from app.models.user import UserBranchRole
-    from app.models.permission import Permission, RolePermission
-    has_perm = db.query(Permission.id).join(
-        RolePermission, RolePermission.permission_id == Permission.id
-    ).join(
-        UserBranchRole,
-        (UserBranchRole.role_id == RolePermission.role_id)
-        & (UserBranchRole.user_id == user_id)
-    ).filter(Permission.name == permission_name).first()
-    return has_perm is not None
+    from app.services.permission_resolver import get_effective_permissions
+
+    return get_effective_permissions(db, user_id).has(permission_name)
 
 
 def ensure_user_has_branch_access(db: Session, user_id: UUID, branch_id: UUID) -> None:
@@ -1120,17 +1125,13 @@ def ensure_user_has_branch_access(db: Session, user_id: UUID, branch_id: UUID) -
     Require a user_branch_roles row for (user_id, branch_id).
     Raises 403 if the user is not assigned to that branch.
     """
-    from app.models.user import UserBranchRole
-    ok = (
-        db.query(UserBranchRole.id)
-        .filter(
-            UserBranchRole.user_id == user_id,
-            UserBranchRole.branch_id == branch_id,
-        )
-        .first()
-        is not None
-    )
-    if not ok:
+    from app.services.permission_resolver import get_effective_permissions
+
+    try:
+        branch_id = branch_id if isinstance(branch_id, UUID) else UUID(str(branch_id))
+    except (TypeError, ValueError):
+        branch_id = None
+    if branch_id is None or branch_id not in get_effective_permissions(db, user_id).branch_ids:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied to this branch",
@@ -14,6 +14,8 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, RedirectResponse
 
 from app.config import settings
+from app.services.company_config_cache import CompanyConfigScopeMiddleware
+from app.services.permission_resolver import PermissionScopeMiddleware
 from app.rate_limit import limiter
 from slowapi.errors import RateLimitExceeded
 from slowapi import _rate_limit_exceeded_handler
@@ -86,6 +88,8 @@ if getattr(settings, "ENVIRONMENT", "development") != "production":
     _cors_kw["allow_origin_regex"] = r"https?://(localhost|127\.0\.0\.1)(:\d+)?"
 app.add_middleware(CORSMiddleware, **_cors_kw)
 app.add_middleware(RequestTimingMiddleware)
+app.add_middleware(PermissionScopeMiddleware)
+app.add_middleware(CompanyConfigScopeMiddleware)
 
 
 @app.get("/health")
@@ -154,9 +158,36 @@ def log_smtp_and_migrations():
         )
 
 
+@app.on_event("shutdown")
+async def close_storage_http_clients():
+    """Close the shared Supabase Storage HTTP clients (keep-alive connections)."""
+    from app.services import storage_http
+
+    await storage_http.aclose_all()
+
+
+@app.on_event("shutdown")
+def stop_document_export_pool():
+    """Stop the bulk PDF export render processes."""
+    from app.services import document_export_service
+
+    document_export_service.shutdown_pool()
+
+
+@app.on_event("shutdown")
+def close_etims_http_sessions():
+    """Close the pooled KRA eTIMS OSCU HTTP sessions."""
+    from app.services.etims import etims_http
+
+    etims_http.close_all()
+
+
 @app.on_event("startup")
 def run_tenant_migrations():
-    """Apply missing migrations on default/master app DB and on all tenant DBs. Runs every restart to reach latest version."""
+    """
+    Apply missing migrations on default/master app DB and on all tenant DBs. Runs every restart to reach latest version.
+    Tenant DBs run in parallel; with TENANT_MIGRATION_MODE=background they run after startup returns (requests gated per tenant).
+    """
     try:
         from app.services.migration_service import MigrationService, run_migrations_for_url
 
@@ -207,6 +238,26 @@ def run_tenant_migrations():
             print(f"  [Migrations] Found {len(tenants_with_db)} tenant(s) with database_url: {subdomains or '(none)'}")
             if not tenants_with_db:
                 print("  [Migrations] Tip: In master DB (public.tenants), ensure each row has database_url set (e.g. session pooler URL).")
+            from app.services import tenant_migration_orchestrator
+            if settings.TENANT_MIGRATION_MODE == "background" and tenants_with_db:
+                # Serve at once; get_tenant_db holds each tenant's requests until its migrations finish.
+                tenant_migration_orchestrator.start_background(
+                    tenants_with_db,
+                    max_workers=settings.TENANT_MIGRATION_WORKERS,
+                    timeout_seconds=settings.TENANT_MIGRATION_TIMEOUT_SECONDS,
+                )
+                print(
+                    f"  [Migrations] Tenant DBs migrating in background ({settings.TENANT_MIGRATION_WORKERS} workers); "
+                    "progress: GET /api/admin/migrations/progress"
+                )
+                print("  MIGRATIONS: Complete (tenant DBs in background).")
+                print("========================================")
+                print("")
+                return
+            print(
+                f"  [Migrations] Running with {settings.TENANT_MIGRATION_WORKERS} workers, "
+                f"{settings.TENANT_MIGRATION_TIMEOUT_SECONDS:g}s per tenant..."
+            )
             out = svc.run_migrations_all_tenant_dbs()
             if out["applied"]:
                 for tid, versions in out["applied"].items():
@@ -279,6 +330,7 @@ from app.api.auth import router as auth_router
 from app.api.public_marketing import router as public_marketing_router
 from app.api.company_billing import router as company_billing_router
 from app.api.reports import router as reports_router
+from app.api.document_exports import router as document_exports_router
 from app.api.impersonation import router as impersonation_router
 from app.api.admin_metrics import router as admin_metrics_router
 from app.api.admin_platform_licensing import router as admin_platform_licensing_router
@@ -308,6 +360,7 @@ app.include_router(modules_router, prefix="/api", tags=["Modules"])
 app.include_router(clinic_router, prefix="/api", tags=["Clinic / OPD"])
 app.include_router(etims.router, prefix="/api/etims", tags=["ETIMS"])
 app.include_router(reports_router, prefix="/api", tags=["Reports"])
+app.include_router(document_exports_router, prefix="/api", tags=["Document Exports"])
 app.include_router(tenants_router, prefix="/api/admin", tags=["Tenant Management (Admin)"])
 app.include_router(impersonation_router, prefix="/api/admin", tags=["Admin Impersonation"])
 app.include_router(admin_metrics_router, prefix="/api/admin", tags=["Platform Admin Dashboard"])
@@ -9,7 +9,7 @@ from .company_module import CompanyModule
 from .user import User, UserRole, UserBranchRole
 from .item import Item, ItemPricing, CompanyPricingDefault, CompanyMarginTier, PricingSettings
 from .inventory import InventoryLedger, ItemMovement
-from .snapshot import InventoryBalance, ItemBranchPurchaseSnapshot, ItemBranchSearchSnapshot, ItemBranchSnapshot
+from .snapshot import InventoryBalance, InventoryBatchBalance, InventoryCheckpointProgress, InventoryDailyCheckpoint, ItemBranchPurchaseSnapshot, ItemBranchSearchSnapshot, ItemBranchSnapshot, ItemBranchSnapshotVersion
 from .supplier import Supplier
 from .expense import ExpenseCategory, Expense
 from .purchase import GRN, GRNItem, SupplierInvoice, SupplierInvoiceItem, PurchaseOrder, PurchaseOrderItem
@@ -25,11 +25,14 @@ from .cashbook import CashbookEntry
 # Backward compatibility aliases
 PurchaseInvoice = SupplierInvoice
 PurchaseInvoiceItem = SupplierInvoiceItem
-from .sale import SalesInvoice, SalesInvoiceItem, Payment, CreditNote, CreditNoteItem, Quotation, QuotationItem, InvoicePayment
+from .sale import SalesInvoice, SalesInvoiceItem, Payment, CreditNote, CreditNoteItem, Quotation, QuotationItem, InvoicePayment, SalesDailyRollup
 from .settings import DocumentSequence, CompanySetting
-from .stock_take import StockTakeSession, StockTakeCount, StockTakeCounterLock, StockTakeAdjustment
+from .stock_take import (
+    StockTakeSession, StockTakeCount, StockTakeCounterLock, StockTakeAdjustment, StockTakeCompletionJob,
+)
 from .order_book import DailyOrderBook, OrderBookHistory
 from .import_job import ImportJob
+from .document_export_job import DocumentExportJob
 from .permission import Permission, RolePermission
 from .branch_inventory import (
     BranchOrder,
@@ -59,9 +62,13 @@ __all__ = [
     "InventoryLedger",
     "ItemMovement",
     "InventoryBalance",
+    "InventoryBatchBalance",
+    "InventoryCheckpointProgress",
+    "InventoryDailyCheckpoint",
     "ItemBranchPurchaseSnapshot",
     "ItemBranchSearchSnapshot",
     "ItemBranchSnapshot",
+    "ItemBranchSnapshotVersion",
     "Supplier",
     "ExpenseCategory",
     "Expense",
@@ -81,15 +88,18 @@ __all__ = [
     "Quotation",
     "QuotationItem",
     "InvoicePayment",
+    "SalesDailyRollup",
     "DocumentSequence",
     "CompanySetting",
     "StockTakeSession",
     "StockTakeCount",
     "StockTakeCounterLock",
     "StockTakeAdjustment",
+    "StockTakeCompletionJob",
     "DailyOrderBook",
     "OrderBookHistory",
     "ImportJob",
+    "DocumentExportJob",
     "Permission",
     "RolePermission",
     "BranchOrder",
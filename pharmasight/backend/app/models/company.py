@@ -1,7 +1,7 @@
 """
 Company and Branch models
 """
-from sqlalchemy import Column, String, Boolean, Text, Date, ForeignKey, Numeric, Integer
+from sqlalchemy import Column, String, Boolean, Text, Date, ForeignKey, Numeric, Integer, BigInteger
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -37,6 +37,10 @@ class Company(Base):
     # Stripe (Phase 2 — company-scoped; never mirrored on tenants)
     stripe_customer_id = Column(String(255), nullable=True)
     stripe_subscription_id = Column(String(255), nullable=True)
+    # Bumped on role/permission changes; invalidates cached permission sets (permission_resolver)
+    permissions_version = Column(BigInteger, nullable=False, default=0, server_default="0")
+    # Bumped on company/branch settings changes; invalidates cached company configuration (company_config_cache)
+    config_version = Column(BigInteger, nullable=False, default=0, server_default="0")
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
 
@@ -0,0 +1,60 @@
+"""
+Document export job model for bulk PDF exports (ZIP or merged PDF)
+"""
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, Text, JSON, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from app.database import Base
+import uuid
+
+
+class DocumentExportJob(Base):
+    """Tracks bulk document PDF exports with progress (see app.services.document_export_service)"""
+    __tablename__ = "document_export_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    company_id = Column(UUID(as_uuid=True), ForeignKey("companies.id"), nullable=False)
+    branch_id = Column(UUID(as_uuid=True), ForeignKey("branches.id"), nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+
+    doc_type = Column(String(30), nullable=False)  # sales_invoice, grn, supplier_invoice
+    output_format = Column(String(10), nullable=False, default="zip")  # zip, pdf
+    filters = Column(JSON, nullable=True)  # date_from, date_to, supplier_id
+
+    # Status values: 'pending', 'processing', 'completed', 'failed', 'cancelled'
+    status = Column(String(20), nullable=False, default="pending")
+    total_docs = Column(Integer, nullable=False, default=0)
+    processed_docs = Column(Integer, nullable=False, default=0)
+
+    output_path = Column(Text, nullable=True)
+    output_bytes = Column(BigInteger, nullable=True)
+    error_message = Column(String(1000), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
+    def to_dict(self):
+        """Convert to dictionary for API response (output_path is never exposed)"""
+        progress_pct = (self.processed_docs / self.total_docs * 100) if self.total_docs > 0 else 0
+
+        return {
+            "id": str(self.id),
+            "company_id": str(self.company_id),
+            "branch_id": str(self.branch_id),
+            "user_id": str(self.user_id),
+            "doc_type": self.doc_type,
+            "output_format": self.output_format,
+            "filters": self.filters,
+            "status": self.status,
+            "total_docs": self.total_docs,
+            "processed_docs": self.processed_docs,
+            "progress_percent": round(progress_pct, 1),
+            "output_bytes": self.output_bytes,
+            "error_message": self.error_message,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+        }
@@ -1,7 +1,7 @@
 """
 Sales models (KRA Compliant)
 """
-from sqlalchemy import Column, String, Numeric, Date, ForeignKey, Text, Boolean, UniqueConstraint
+from sqlalchemy import Column, String, Numeric, Date, ForeignKey, Integer, Text, Boolean, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -264,3 +264,25 @@ class InvoicePayment(Base):
     __table_args__ = (
         {"comment": "Split payment tracking for sales invoices. Supports multiple payment modes per invoice."},
     )
+
+
+class SalesDailyRollup(Base):
+    """
+    Sales, credit notes and COGS per (branch, business day) for gross-profit reporting.
+    Maintained by SalesRollupService when invoices are batched and credit notes created.
+    """
+    __tablename__ = "sales_daily_rollup"
+
+    branch_id = Column(UUID(as_uuid=True), ForeignKey("branches.id", ondelete="CASCADE"), primary_key=True)
+    rollup_date = Column(Date, primary_key=True)  # invoice_date / credit_note_date
+    company_id = Column(UUID(as_uuid=True), ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
+    sales_exclusive = Column(Numeric(20, 4), nullable=False, default=0)
+    sales_inclusive = Column(Numeric(20, 4), nullable=False, default=0)
+    invoice_count = Column(Integer, nullable=False, default=0)
+    ledger_cogs = Column(Numeric(20, 4), nullable=False, default=0)  # SALE ledger total_cost
+    invoice_line_cogs = Column(Numeric(20, 4), nullable=False, default=0)  # qty x multiplier x unit_cost_used
+    credit_notes_exclusive = Column(Numeric(20, 4), nullable=False, default=0)
+    credit_notes_inclusive = Column(Numeric(20, 4), nullable=False, default=0)
+    credit_note_count = Column(Integer, nullable=False, default=0)
+    return_cogs = Column(Numeric(20, 4), nullable=False, default=0)  # SALE_RETURN ledger total_cost
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
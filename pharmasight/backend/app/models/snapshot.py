@@ -1,10 +1,10 @@
 """
 Snapshot models for search performance.
-Precomputed inventory_balances, item_branch_purchase_snapshot, item_branch_search_snapshot.
+Precomputed inventory_balances, inventory_batch_balances, item_branch_purchase_snapshot, item_branch_search_snapshot.
 Updated in same transaction as ledger writes.
 """
 import uuid
-from sqlalchemy import Boolean, Column, Date, Integer, Numeric, String, ForeignKey, UniqueConstraint
+from sqlalchemy import BigInteger, Boolean, Column, Date, Index, Integer, Numeric, String, ForeignKey, UniqueConstraint, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -28,6 +28,40 @@ class InventoryBalance(Base):
     __mapper_args__ = {"eager_defaults": True}
 
 
+class InventoryBatchBalance(Base):
+    """
+    Precomputed stock per (item_id, branch_id, batch_number, expiry_date, unit_cost): the ledger
+    grouping FEFO allocates from. quantity may be negative for an oversold batch; readers use quantity > 0.
+    """
+    __tablename__ = "inventory_batch_balances"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    company_id = Column(UUID(as_uuid=True), ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
+    branch_id = Column(UUID(as_uuid=True), ForeignKey("branches.id", ondelete="CASCADE"), nullable=False)
+    item_id = Column(UUID(as_uuid=True), ForeignKey("items.id", ondelete="CASCADE"), nullable=False)
+    batch_number = Column(String(200), nullable=True)
+    expiry_date = Column(Date, nullable=True)
+    unit_cost = Column(Numeric(20, 4), nullable=False)
+    quantity = Column(Numeric(20, 4), nullable=False, default=0)
+    first_ledger_entry_id = Column(UUID(as_uuid=True), nullable=True)  # First positive ledger row of the batch
+    first_received_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index(
+            "ux_inventory_batch_balances_key",
+            "item_id",
+            "branch_id",
+            func.coalesce(batch_number, ""),
+            func.coalesce(expiry_date, text("'infinity'::date")),
+            "unit_cost",
+            unique=True,
+        ),
+        {"comment": "Precomputed stock per batch. Updated in same transaction as ledger writes."},
+    )
+    __mapper_args__ = {"eager_defaults": True}
+
+
 class ItemBranchPurchaseSnapshot(Base):
     """Precomputed last purchase per (item_id, branch_id)."""
     __tablename__ = "item_branch_purchase_snapshot"
@@ -126,12 +160,50 @@ class ItemBranchSnapshot(Base):
     __mapper_args__ = {"eager_defaults": True}
 
 
+class ItemBranchSnapshotVersion(Base):
+    """Change counter per branch for item_branch_snapshot (bumped at commit); read by the item search cache."""
+    __tablename__ = "item_branch_snapshot_versions"
+
+    branch_id = Column(UUID(as_uuid=True), ForeignKey("branches.id", ondelete="CASCADE"), primary_key=True)
+    company_id = Column(UUID(as_uuid=True), ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
+    version = Column(BigInteger, nullable=False, default=1)
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+
+
+class InventoryDailyCheckpoint(Base):
+    """
+    Closing stock per (item_id, branch_id, day with movements): cumulative ledger quantity and
+    total_cost up to the end of checkpoint_date (UTC). Built by InventoryCheckpointService.
+    """
+    __tablename__ = "inventory_daily_checkpoints"
+
+    item_id = Column(UUID(as_uuid=True), ForeignKey("items.id", ondelete="CASCADE"), primary_key=True)
+    branch_id = Column(UUID(as_uuid=True), ForeignKey("branches.id", ondelete="CASCADE"), primary_key=True)
+    checkpoint_date = Column(Date, primary_key=True)
+    company_id = Column(UUID(as_uuid=True), ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
+    quantity = Column(Numeric(20, 4), nullable=False)
+    layer_value = Column(Numeric(20, 4), nullable=False)  # Cumulative SUM(quantity_delta * unit_cost)
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+
+
+class InventoryCheckpointProgress(Base):
+    """Last day whose inventory_daily_checkpoints are complete for a branch."""
+    __tablename__ = "inventory_checkpoint_progress"
+
+    branch_id = Column(UUID(as_uuid=True), ForeignKey("branches.id", ondelete="CASCADE"), primary_key=True)
+    company_id = Column(UUID(as_uuid=True), ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
+    built_through = Column(Date, nullable=False)
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+
+
 class SnapshotRefreshQueue(Base):
     """
     Deduplicated queue for bulk POS snapshot refresh. Processed in background.
     item_id NULL = refresh all items in branch; otherwise refresh that (item_id, branch_id).
     claimed_at: set when worker starts branch-wide job so chunked commits can release lock.
     reason: optional debug label (e.g. company_margin_change, promotion_update).
+    last_item_id / items_refreshed: keyset cursor and count of the last committed chunk, so a
+    restarted worker resumes a branch-wide job instead of starting over.
     """
     __tablename__ = "snapshot_refresh_queue"
 
@@ -143,3 +215,5 @@ class SnapshotRefreshQueue(Base):
     processed_at = Column(TIMESTAMP(timezone=True), nullable=True)
     claimed_at = Column(TIMESTAMP(timezone=True), nullable=True)
     reason = Column(String(255), nullable=True)
+    last_item_id = Column(UUID(as_uuid=True), nullable=True)
+    items_refreshed = Column(Integer, nullable=False, default=0, server_default="0")
@@ -144,3 +144,58 @@ class StockTakeAdjustment(Base):
     __table_args__ = (
         {"comment": "Final adjustments applied to inventory after stock take completion."},
     )
+
+
+class StockTakeCompletionJob(Base):
+    """
+    Stock Take Completion Job model
+
+    Tracks a branch stock take completion running in the background
+    (see app.services.stock_take_completion_service).
+    """
+    __tablename__ = "stock_take_completion_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    company_id = Column(UUID(as_uuid=True), ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
+    branch_id = Column(UUID(as_uuid=True), ForeignKey("branches.id", ondelete="CASCADE"), nullable=False)
+    session_id = Column(UUID(as_uuid=True), ForeignKey("stock_take_sessions.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)  # User completing the stock take
+
+    status = Column(String(20), nullable=False, default='pending')  # pending, processing, completed, failed
+    total_items = Column(Integer, nullable=False, default=0)  # Adjustment lines to post
+    processed_items = Column(Integer, nullable=False, default=0)
+    items_updated = Column(Integer, nullable=False, default=0)
+    items_zeroed = Column(Integer, nullable=False, default=0)
+    total_counts = Column(Integer, nullable=False, default=0)
+    warnings = Column(JSONB, nullable=True)  # Lines skipped (validation, insufficient stock)
+    error_message = Column(String(1000), nullable=True)
+
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    started_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    completed_at = Column(TIMESTAMP(timezone=True), nullable=True)
+
+    def to_dict(self):
+        """Convert to dictionary for API response"""
+        progress_pct = (self.processed_items / self.total_items * 100) if self.total_items else 0
+
+        return {
+            "id": str(self.id),
+            "company_id": str(self.company_id),
+            "branch_id": str(self.branch_id),
+            "session_id": str(self.session_id),
+            "user_id": str(self.user_id),
+            "status": self.status,
+            "total_items": self.total_items,
+            "processed_items": self.processed_items,
+            "progress_percent": round(progress_pct, 1),
+            "items_updated": self.items_updated,
+            "items_zeroed": self.items_zeroed,
+            "total_counts": self.total_counts,
+            "warnings": self.warnings or [],
+            "error_message": self.error_message,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+        }
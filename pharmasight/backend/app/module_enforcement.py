@@ -24,6 +24,7 @@ from app.dependencies import get_current_user, get_effective_company_id_for_user
 from app.models.company_module import CompanyModule
 from app.models.user import User
 from app.module_metadata import get_core_modules
+from app.services import company_config_cache
 
 # Module name stored/compared lowercase. Missing row => enabled only for this key.
 DEFAULT_ENABLED_IF_NO_ROW = "pharmacy"
@@ -60,7 +61,7 @@ def is_module_enabled_for_company(
     True if the company may use this module.
 
     - Core modules are always enabled (implicit platform modules; derived from modules.is_core).
-    - If a row exists: use is_enabled.
+    - If a row exists: use is_enabled (rows cached per company_config_cache).
     - If no row: pharmacy is treated as enabled; all other modules are disabled.
     """
     normalized = _normalize_module_name(module_name)
@@ -70,19 +71,22 @@ def is_module_enabled_for_company(
     if normalized in get_core_modules(db):
         return True
 
-    row = (
-        db.query(CompanyModule)
-        .filter(
-            CompanyModule.company_id == company_id,
-            CompanyModule.module_name == normalized,
-        )
-        .first()
-    )
-    if row is not None:
-        return bool(row.is_enabled)
+    switches = company_config_cache.get(db, company_id, "modules", lambda: _load_module_switches(db, company_id))
+    if normalized in switches:
+        return switches[normalized]
     return normalized == DEFAULT_ENABLED_IF_NO_ROW
 
 
+def _load_module_switches(db: Session, company_id: UUID) -> Dict[str, bool]:
+    """company_modules rows of the company: module_name -> is_enabled (one query)."""
+    rows = (
+        db.query(CompanyModule.module_name, CompanyModule.is_enabled)
+        .filter(CompanyModule.company_id == company_id)
+        .all()
+    )
+    return {name: bool(enabled) for name, enabled in rows}
+
+
 def get_company_module_license_catalog(db: Session, company_id: UUID) -> List[Dict[str, Any]]:
     """
     All licenseable (non-core) modules for admin UIs, with effective enabled state.
@@ -0,0 +1,195 @@
+"""
+Local cache for branding assets (company logo and stamp, user signatures) downloaded from storage
+for PDF generation, so a warm print does no network I/O.
+
+- Content-hash keyed: (storage base URL, stored path) maps to the SHA-256 of the bytes; bytes are
+  kept once per digest, least-recently-used beyond BRANDING_ASSET_CACHE_MAX_BYTES are evicted.
+- Optional disk tier (BRANDING_ASSET_CACHE_DIR): blobs/<digest> plus paths/<sha256(path)>.json,
+  so restarts and other workers on the host start warm. Bounded by the same byte budget.
+- Freshness: uploads in this process invalidate the path (tenant_storage_service.upload_file);
+  entries are re-downloaded after BRANDING_ASSET_CACHE_TTL_SECONDS, which bounds staleness after
+  an upload handled by another process. A failed re-download serves the stale bytes.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+# (scope, stored_path) -> (digest, fetched_at monotonic)
+_index: Dict[Tuple[str, str], Tuple[str, float]] = {}
+_blobs: "OrderedDict[str, bytes]" = OrderedDict()
+_blob_bytes = 0
+_stats = {"hits": 0, "disk_hits": 0, "misses": 0, "stale_served": 0, "invalidations": 0}
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _disk_dir() -> Optional[Path]:
+    raw = (getattr(settings, "BRANDING_ASSET_CACHE_DIR", "") or "").strip()
+    return Path(raw) if raw else None
+
+
+def _disk_index_file(root: Path, stored_path: str) -> Path:
+    return root / "paths" / f"{_digest(stored_path.encode('utf-8'))}.json"
+
+
+def _store_blob(digest: str, data: bytes) -> None:
+    """Add bytes to the memory tier (caller holds _lock) and evict beyond the byte budget."""
+    global _blob_bytes
+    if digest in _blobs:
+        _blobs.move_to_end(digest)
+        return
+    _blobs[digest] = data
+    _blob_bytes += len(data)
+    max_bytes = max(0, int(settings.BRANDING_ASSET_CACHE_MAX_BYTES))
+    while _blob_bytes > max_bytes and _blobs:
+        old_digest, old = _blobs.popitem(last=False)
+        _blob_bytes -= len(old)
+        for key in [k for k, (d, _) in _index.items() if d == old_digest]:
+            del _index[key]
+
+
+def _read_disk(scope: str, stored_path: str) -> Optional[Tuple[str, float, bytes]]:
+    """(digest, age_seconds, bytes) from the disk tier, or None."""
+    root = _disk_dir()
+    if root is None:
+        return None
+    try:
+        entry = json.loads(_disk_index_file(root, stored_path).read_text()).get(scope)
+        if not entry:
+            return None
+        digest, fetched_at = entry
+        data = (root / "blobs" / digest).read_bytes()
+    except (OSError, ValueError, TypeError):
+        return None
+    if _digest(data) != digest:
+        return None
+    return digest, max(0.0, time.time() - float(fetched_at)), data
+
+
+def _write_disk(scope: str, stored_path: str, digest: str, data: bytes) -> None:
+    root = _disk_dir()
+    if root is None:
+        return
+    try:
+        (root / "blobs").mkdir(parents=True, exist_ok=True)
+        (root / "paths").mkdir(parents=True, exist_ok=True)
+        blob = root / "blobs" / digest
+        if not blob.exists():
+            tmp = blob.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, blob)
+        index_file = _disk_index_file(root, stored_path)
+        try:
+            entries = json.loads(index_file.read_text())
+        except (OSError, ValueError):
+            entries = {}
+        entries[scope] = [digest, time.time()]
+        tmp = index_file.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(entries))
+        os.replace(tmp, index_file)
+        _prune_disk(root)
+    except OSError as e:
+        logger.warning("Branding asset disk cache write failed (%s): %s", root, e)
+
+
+def _prune_disk(root: Path) -> None:
+    """Delete the least recently written blobs beyond the byte budget (index entries then miss)."""
+    blobs = sorted((p.stat().st_mtime, p.stat().st_size, p) for p in (root / "blobs").iterdir() if p.is_file())
+    total = sum(size for _, size, _ in blobs)
+    max_bytes = max(0, int(settings.BRANDING_ASSET_CACHE_MAX_BYTES))
+    for _, size, path in blobs:
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+
+def get(scope: str, stored_path: str, allow_stale: bool = False) -> Optional[bytes]:
+    """Cached bytes for the asset; None when absent or (unless allow_stale) older than the TTL."""
+    ttl = float(settings.BRANDING_ASSET_CACHE_TTL_SECONDS)
+    key = (scope, stored_path)
+    with _lock:
+        entry = _index.get(key)
+        if entry is not None:
+            digest, fetched_at = entry
+            data = _blobs.get(digest)
+            if data is not None and (allow_stale or time.monotonic() - fetched_at <= ttl):
+                _blobs.move_to_end(digest)
+                _stats["stale_served" if allow_stale else "hits"] += 1
+                return data
+    on_disk = _read_disk(scope, stored_path)
+    if on_disk is not None:
+        digest, age, data = on_disk
+        if allow_stale or age <= ttl:
+            with _lock:
+                _store_blob(digest, data)
+                _index[key] = (digest, time.monotonic() - age)
+                _stats["stale_served" if allow_stale else "disk_hits"] += 1
+            return data
+    if not allow_stale:
+        with _lock:
+            _stats["misses"] += 1
+    return None
+
+
+def put(scope: str, stored_path: str, data: bytes) -> None:
+    if not data:
+        return
+    digest = _digest(data)
+    with _lock:
+        _index[(scope, stored_path)] = (digest, time.monotonic())
+        _store_blob(digest, data)
+    _write_disk(scope, stored_path, digest, data)
+
+
+def invalidate(stored_path: str) -> None:
+    """Forget the asset at stored_path (every storage scope), e.g. after it was re-uploaded."""
+    stored_path = (stored_path or "").strip()
+    if not stored_path:
+        return
+    with _lock:
+        for key in [k for k in _index if k[1] == stored_path]:
+            del _index[key]
+        _stats["invalidations"] += 1
+    root = _disk_dir()
+    if root is not None:
+        try:
+            _disk_index_file(root, stored_path).unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning("Branding asset disk cache invalidate failed for %s: %s", stored_path[:80], e)
+
+
+def clear() -> None:
+    """Drop the memory tier (tests)."""
+    global _blob_bytes
+    with _lock:
+        _index.clear()
+        _blobs.clear()
+        _blob_bytes = 0
+        for k in _stats:
+            _stats[k] = 0
+
+
+def get_metrics() -> Dict[str, Any]:
+    with _lock:
+        return {
+            **_stats,
+            "entries": len(_index),
+            "blobs": len(_blobs),
+            "bytes": _blob_bytes,
+            "max_bytes": int(settings.BRANDING_ASSET_CACHE_MAX_BYTES),
+            "disk_dir": str(_disk_dir() or ""),
+        }
@@ -0,0 +1,146 @@
+"""
+Company configuration cache: per-company settings values, reused across requests until they change.
+
+- One entry per company holding the values loaded so far (pricing config, stock validation config,
+  report display options, module switches, branch pricing overrides), each under its own key.
+- An entry is only used while it was loaded under the company's current companies.config_version.
+  get_current_user records the version from the company row it already loads (note_company); outside
+  a request, or for another company, the version is read with one primary-key lookup (once per request)
+  instead of reloading the settings. Bounded by COMPANY_CONFIG_CACHE_TTL_SECONDS and
+  COMPANY_CONFIG_CACHE_MAX_ENTRIES.
+- Settings writes call bump_config_version in their transaction (api/company.py, module licensing).
+
+Typed accessors stay with their owners (get_global_pricing_config, get_stock_validation_config,
+is_module_enabled_for_company, ...), which load through get(); cached values are shared between
+requests and must be treated as read-only.
+"""
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+
+T = TypeVar("T")
+
+_request_memo: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    "company_config_memo", default=None
+)
+
+_lock = threading.Lock()
+_entries: "OrderedDict[str, Tuple[int, float, Dict[Hashable, Any]]]" = OrderedDict()
+_stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0, "version_reads": 0}
+
+
+class CompanyConfigScopeMiddleware:
+    """ASGI middleware: one config-version memo per HTTP request (request.state.company_config_memo)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        memo: Dict[str, Any] = {}
+        scope.setdefault("state", {})["company_config_memo"] = memo
+        token = _request_memo.set(memo)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_memo.reset(token)
+
+
+def note_company(company: Any) -> None:
+    """Record the request company's config_version (called by get_current_user)."""
+    memo = _request_memo.get()
+    if memo is None or company is None:
+        return
+    memo[str(company.id)] = int(getattr(company, "config_version", None) or 0)
+
+
+def _current_version(db: Session, company_id: str) -> int:
+    memo = _request_memo.get()
+    if memo is not None and company_id in memo:
+        return memo[company_id]
+    version = db.execute(
+        text("SELECT config_version FROM companies WHERE id = :cid"), {"cid": company_id}
+    ).scalar()
+    version = int(version or 0)
+    with _lock:
+        _stats["version_reads"] += 1
+    if memo is not None:
+        memo[company_id] = version
+    return version
+
+
+def get(db: Session, company_id: UUID, key: Hashable, loader: Callable[[], T]) -> T:
+    """Value `key` of company_id: cached when loaded under the current config_version, else loader()."""
+    cid = str(company_id)
+    version = _current_version(db, cid)
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(cid)
+        if entry is not None and (entry[0] != version or entry[1] <= now):
+            _entries.pop(cid, None)
+            _stats["stale"] += 1
+            entry = None
+        if entry is not None and key in entry[2]:
+            _entries.move_to_end(cid)
+            _stats["hits"] += 1
+            return entry[2][key]
+        _stats["misses"] += 1
+
+    value = loader()
+    ttl = max(0.0, float(settings.COMPANY_CONFIG_CACHE_TTL_SECONDS))
+    max_entries = max(1, int(settings.COMPANY_CONFIG_CACHE_MAX_ENTRIES))
+    with _lock:
+        entry = _entries.get(cid)
+        if entry is None or entry[0] != version:
+            entry = _entries[cid] = (version, now + ttl, {})
+        entry[2][key] = value
+        _entries.move_to_end(cid)
+        while len(_entries) > max_entries:
+            _entries.popitem(last=False)
+            _stats["evictions"] += 1
+    return value
+
+
+def bump_config_version(db: Session, company_id: UUID) -> None:
+    """
+    Invalidate cached configuration of company_id. The version update joins the caller's transaction
+    (other workers see it at commit); the local entry is dropped now.
+    """
+    cid = str(company_id)
+    db.execute(
+        text("UPDATE companies SET config_version = config_version + 1 WHERE id = :cid"),
+        {"cid": cid},
+    )
+    with _lock:
+        _entries.pop(cid, None)
+    memo = _request_memo.get()
+    if memo is not None:
+        memo.pop(cid, None)
+
+
+def clear() -> None:
+    """Drop cached entries and reset counters (tests)."""
+    with _lock:
+        _entries.clear()
+        for k in _stats:
+            _stats[k] = 0
+
+
+def get_metrics() -> Dict[str, Any]:
+    with _lock:
+        return {
+            **_stats,
+            "entries": len(_entries),
+            "max_entries": int(settings.COMPANY_CONFIG_CACHE_MAX_ENTRIES),
+            "ttl_seconds": float(settings.COMPANY_CONFIG_CACHE_TTL_SECONDS),
+        }
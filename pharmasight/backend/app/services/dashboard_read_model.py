@@ -0,0 +1,206 @@
+"""
+Branch dashboard read model: stock tiles answered from the snapshots SnapshotService keeps in
+the same transaction as every ledger write, never from inventory_ledger.
+
+- Stock per item: inventory_balances.current_stock.
+- Expiring batches: inventory_batch_balances grouped by (item, batch_number, expiry_date).
+- Stock value: current_stock * item_branch_snapshot.average_cost (cost per retail unit, as POS
+  uses it); items without a snapshot row fall back to the valuation cost lookup.
+
+check_consistency compares these snapshots with the ledger (full aggregate; for scripts and
+support, not for request paths).
+"""
+import logging
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, List
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.services.canonical_pricing import CanonicalPricingService
+
+logger = logging.getLogger(__name__)
+
+_EXPIRING_BATCHES_SQL = """
+SELECT item_id, batch_number, expiry_date, SUM(quantity) AS quantity
+FROM inventory_batch_balances
+WHERE company_id = :company_id AND branch_id = :branch_id
+  AND expiry_date IS NOT NULL AND expiry_date >= :today AND expiry_date <= :cutoff
+GROUP BY item_id, batch_number, expiry_date
+HAVING SUM(quantity) > 0
+"""
+
+# All stock tiles in one round trip
+_TILES_SQL = f"""
+SELECT
+    (SELECT COUNT(*) FROM inventory_balances
+      WHERE company_id = :company_id AND branch_id = :branch_id AND current_stock > 0) AS items_in_stock,
+    (SELECT COUNT(*) FROM ({_EXPIRING_BATCHES_SQL}) e) AS expiring_count,
+    (SELECT COALESCE(SUM(b.current_stock * COALESCE(s.average_cost, 0)), 0)
+       FROM inventory_balances b
+       JOIN item_branch_snapshot s ON s.item_id = b.item_id AND s.branch_id = b.branch_id
+      WHERE b.company_id = :company_id AND b.branch_id = :branch_id AND b.current_stock > 0) AS snapshot_value,
+    (SELECT ARRAY_AGG(b.item_id)
+       FROM inventory_balances b
+      WHERE b.company_id = :company_id AND b.branch_id = :branch_id AND b.current_stock > 0
+        AND NOT EXISTS (
+            SELECT 1 FROM item_branch_snapshot s WHERE s.item_id = b.item_id AND s.branch_id = b.branch_id
+        )) AS unsnapshotted_item_ids
+"""
+
+# Per item: ledger total vs inventory_balances vs item_branch_snapshot.current_stock
+_CONSISTENCY_SQL = """
+WITH ledger AS (
+    SELECT item_id, SUM(quantity_delta) AS quantity
+    FROM inventory_ledger
+    WHERE company_id = :company_id AND branch_id = :branch_id
+    GROUP BY item_id
+),
+balances AS (
+    SELECT item_id, current_stock FROM inventory_balances
+    WHERE company_id = :company_id AND branch_id = :branch_id
+)
+SELECT
+    COALESCE(l.item_id, b.item_id) AS item_id,
+    COALESCE(l.quantity, 0) AS ledger_quantity,
+    COALESCE(b.current_stock, 0) AS balance_quantity,
+    s.current_stock AS snapshot_quantity
+FROM ledger l
+FULL OUTER JOIN balances b ON b.item_id = l.item_id
+LEFT JOIN item_branch_snapshot s ON s.item_id = COALESCE(l.item_id, b.item_id) AND s.branch_id = :branch_id
+WHERE ABS(COALESCE(l.quantity, 0) - COALESCE(b.current_stock, 0)) > 0.0001
+   OR (s.item_id IS NOT NULL AND ABS(COALESCE(s.current_stock, 0) - COALESCE(b.current_stock, 0)) > 0.0001)
+"""
+
+_BATCH_DRIFT_COUNT_SQL = """
+WITH expected AS (
+    SELECT item_id, batch_number, expiry_date, unit_cost, SUM(quantity_delta) AS quantity
+    FROM inventory_ledger
+    WHERE company_id = :company_id AND branch_id = :branch_id
+    GROUP BY item_id, batch_number, expiry_date, unit_cost
+),
+actual AS (
+    SELECT item_id, batch_number, expiry_date, unit_cost, quantity
+    FROM inventory_batch_balances
+    WHERE company_id = :company_id AND branch_id = :branch_id
+)
+SELECT COUNT(*)
+FROM expected e
+FULL OUTER JOIN actual a
+  ON a.item_id = e.item_id
+ AND COALESCE(a.batch_number, '') = COALESCE(e.batch_number, '')
+ AND COALESCE(a.expiry_date, 'infinity'::date) = COALESCE(e.expiry_date, 'infinity'::date)
+ AND a.unit_cost = e.unit_cost
+WHERE ABS(COALESCE(e.quantity, 0) - COALESCE(a.quantity, 0)) > 0.0001
+"""
+
+
+def _params(company_id: UUID, branch_id: UUID, days: int = 0) -> Dict[str, Any]:
+    today = date.today()
+    return {
+        "company_id": str(company_id),
+        "branch_id": str(branch_id),
+        "today": today,
+        "cutoff": today + timedelta(days=days),
+    }
+
+
+class BranchDashboardReadModel:
+    """Branch dashboard stock figures from inventory_balances / inventory_batch_balances / item_branch_snapshot."""
+
+    @staticmethod
+    def stock_map(db: Session, company_id: UUID, branch_id: UUID, positive_only: bool = True) -> Dict[UUID, Decimal]:
+        """Current stock (retail/base units) per item."""
+        rows = db.execute(
+            text(f"""
+                SELECT item_id, current_stock FROM inventory_balances
+                WHERE company_id = :company_id AND branch_id = :branch_id
+                {"AND current_stock > 0" if positive_only else ""}
+            """),
+            _params(company_id, branch_id),
+        ).fetchall()
+        return {r.item_id: Decimal(str(r.current_stock or 0)) for r in rows}
+
+    @staticmethod
+    def items_in_stock_count(db: Session, company_id: UUID, branch_id: UUID) -> int:
+        return db.execute(
+            text("""
+                SELECT COUNT(*) FROM inventory_balances
+                WHERE company_id = :company_id AND branch_id = :branch_id AND current_stock > 0
+            """),
+            _params(company_id, branch_id),
+        ).scalar() or 0
+
+    @staticmethod
+    def expiring_batches(db: Session, company_id: UUID, branch_id: UUID, days: int) -> List[Any]:
+        """Batches with remaining stock expiring between today and today + days, soonest first."""
+        return db.execute(
+            text(_EXPIRING_BATCHES_SQL + " ORDER BY expiry_date, item_id"),
+            _params(company_id, branch_id, days),
+        ).fetchall()
+
+    @staticmethod
+    def expiring_count(db: Session, company_id: UUID, branch_id: UUID, days: int) -> int:
+        return db.execute(
+            text(f"SELECT COUNT(*) FROM ({_EXPIRING_BATCHES_SQL}) e"),
+            _params(company_id, branch_id, days),
+        ).scalar() or 0
+
+    @staticmethod
+    def _value_fallback(db: Session, company_id: UUID, branch_id: UUID, item_ids: List[UUID]) -> Decimal:
+        """Value of in-stock items that have no item_branch_snapshot row yet."""
+        if not item_ids:
+            return Decimal("0")
+        stock = BranchDashboardReadModel.stock_map(db, company_id, branch_id)
+        costs = CanonicalPricingService.get_cost_per_retail_for_valuation_batch(db, item_ids, branch_id, company_id) or {}
+        return sum(
+            (stock.get(iid, Decimal("0")) * Decimal(str(costs.get(iid) or 0)) for iid in item_ids),
+            Decimal("0"),
+        )
+
+    @staticmethod
+    def total_stock_value(db: Session, company_id: UUID, branch_id: UUID) -> Decimal:
+        return BranchDashboardReadModel.tiles(db, company_id, branch_id)["total_value"]
+
+    @staticmethod
+    def tiles(db: Session, company_id: UUID, branch_id: UUID, expiring_days: int = 365) -> Dict[str, Any]:
+        """items_in_stock, expiring_count, total_value (Decimal) in one query."""
+        row = db.execute(text(_TILES_SQL), _params(company_id, branch_id, expiring_days)).fetchone()
+        total_value = Decimal(str(row.snapshot_value or 0))
+        missing = list(row.unsnapshotted_item_ids or [])
+        if missing:
+            total_value += BranchDashboardReadModel._value_fallback(db, company_id, branch_id, missing)
+        return {
+            "items_in_stock": int(row.items_in_stock or 0),
+            "expiring_count": int(row.expiring_count or 0),
+            "total_value": total_value,
+        }
+
+    @staticmethod
+    def check_consistency(db: Session, company_id: UUID, branch_id: UUID, limit: int = 50) -> Dict[str, Any]:
+        """
+        Compare the read model's sources with inventory_ledger for one branch: per-item stock
+        (ledger vs inventory_balances vs item_branch_snapshot) and per-batch stock. Reads the whole
+        branch ledger.
+        """
+        params = _params(company_id, branch_id)
+        mismatches = db.execute(text(_CONSISTENCY_SQL), params).fetchall()
+        batch_drift = db.execute(text(_BATCH_DRIFT_COUNT_SQL), params).scalar() or 0
+        return {
+            "branch_id": str(branch_id),
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+            "consistent": not mismatches and not batch_drift,
+            "item_mismatch_count": len(mismatches),
+            "batch_mismatch_count": int(batch_drift),
+            "item_mismatches": [
+                {
+                    "item_id": str(r.item_id),
+                    "ledger_quantity": float(r.ledger_quantity),
+                    "balance_quantity": float(r.balance_quantity),
+                    "snapshot_quantity": float(r.snapshot_quantity) if r.snapshot_quantity is not None else None,
+                }
+                for r in mismatches[: max(0, limit)]
+            ],
+        }
@@ -0,0 +1,487 @@
+"""
+Bulk PDF export of finalized documents (batched/paid sales invoices, GRNs, batched supplier invoices)
+as one ZIP (a PDF per document) or one merged PDF.
+
+- Jobs are rows in document_export_jobs; run_export_job runs in a background thread (like Excel import)
+  and updates processed_docs per chunk so the UI can poll progress.
+- Company, branch, logo bytes and creator names are loaded once per job/chunk, not per document;
+  documents are loaded DOCUMENT_EXPORT_CHUNK_SIZE at a time with their lines.
+- ReportLab rendering runs in a process pool (DOCUMENT_EXPORT_WORKERS; 0 renders in the job thread),
+  one PDF per document in both formats, so processed_docs counts rendered documents. ZIP entries
+  are written in document order; for a merged PDF the rendered pages are appended per chunk (pypdf).
+- Output files older than DOCUMENT_EXPORT_RETENTION_HOURS are deleted when an export starts.
+- The *_pdf_kwargs helpers are shared with the single-document PDF routes.
+"""
+import io
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from pypdf import PdfWriter
+from sqlalchemy import text
+from sqlalchemy.orm import Session, selectinload
+
+from app.config import settings
+from app.models import (
+    Branch,
+    Company,
+    DocumentExportJob,
+    GRN,
+    GRNItem,
+    SalesInvoice,
+    SalesInvoiceItem,
+    SupplierInvoice,
+    SupplierInvoiceItem,
+    User,
+)
+from app.services.document_pdf_generator import (
+    DOC_TYPE_GRN,
+    DOC_TYPE_SALES_INVOICE,
+    DOC_TYPE_SUPPLIER_INVOICE,
+    build_document_pdf,
+    grn_payload,
+    sales_invoice_payload,
+    supplier_invoice_payload,
+)
+
+logger = logging.getLogger(__name__)
+
+# doc_type -> permission needed to export it
+EXPORT_DOC_TYPES = {
+    DOC_TYPE_SALES_INVOICE: "sales.view",
+    DOC_TYPE_GRN: "purchases.view",
+    DOC_TYPE_SUPPLIER_INVOICE: "purchases.view",
+}
+OUTPUT_FORMATS = ("zip", "pdf")
+
+_pool_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+# ----- PDF arguments per document (shared with the single-document routes) -----
+
+
+def _company_branch_kwargs(company: Optional[Company], branch: Optional[Branch]) -> Dict[str, Any]:
+    return {
+        "company_name": company.name if company else "—",
+        "company_address": getattr(company, "address", None) if company else None,
+        "company_phone": getattr(company, "phone", None) if company else None,
+        "company_pin": getattr(company, "pin", None) if company else None,
+        "branch_name": branch.name if branch else None,
+        "branch_address": getattr(branch, "address", None) if branch else None,
+    }
+
+
+def user_display_name(user: Optional[User], fallback: Any = None) -> Optional[str]:
+    if user is None:
+        return None
+    return getattr(user, "full_name", None) or getattr(user, "username", None) or (str(fallback) if fallback else None)
+
+
+def sales_invoice_pdf_kwargs(
+    invoice: SalesInvoice,
+    company: Optional[Company],
+    branch: Optional[Branch],
+    company_logo_bytes: Optional[bytes],
+    prepared_by: Optional[str],
+) -> Dict[str, Any]:
+    """build_sales_invoice_pdf arguments; invoice.items (with .item) must be loaded."""
+    items_data = []
+    for oi in invoice.items:
+        item_name = oi.item.name if oi.item else (getattr(oi, "item_name", None) or "—")
+        items_data.append({
+            "item_name": item_name,
+            "quantity": float(oi.quantity),
+            "unit_name": oi.unit_name or "",
+            "unit_price_exclusive": float(oi.unit_price_exclusive or 0),
+            "line_total_exclusive": float(oi.line_total_exclusive or 0),
+            "line_total_inclusive": float(oi.line_total_inclusive or 0),
+        })
+    return {
+        **_company_branch_kwargs(company, branch),
+        "company_logo_bytes": company_logo_bytes,
+        "invoice_no": invoice.invoice_no,
+        "invoice_date": invoice.invoice_date,
+        "customer_name": invoice.customer_name,
+        "customer_phone": getattr(invoice, "customer_phone", None),
+        "payment_mode": getattr(invoice, "payment_mode", None),
+        "items": items_data,
+        "total_exclusive": invoice.total_exclusive or Decimal("0"),
+        "vat_amount": invoice.vat_amount or Decimal("0"),
+        "total_inclusive": invoice.total_inclusive or Decimal("0"),
+        "notes": getattr(invoice, "notes", None),
+        "till_number": getattr(branch, "till_number", None) if branch else None,
+        "paybill": getattr(branch, "paybill", None) if branch else None,
+        "prepared_by": prepared_by,
+        "printed_by": None,
+        "served_by": prepared_by,
+    }
+
+
+def grn_pdf_kwargs(grn: GRN, company: Optional[Company], branch: Optional[Branch]) -> Dict[str, Any]:
+    """build_grn_pdf arguments; grn.items (with .item) must be loaded."""
+    items_data = []
+    for oi in grn.items:
+        items_data.append({
+            "item_name": oi.item.name if oi.item else "—",
+            "quantity": float(oi.quantity),
+            "unit_name": oi.unit_name or "",
+            "unit_cost": float(oi.unit_cost or 0),
+            "total_cost": float(oi.total_cost or 0),
+        })
+    return {
+        **_company_branch_kwargs(company, branch),
+        "grn_no": grn.grn_no,
+        "date_received": grn.date_received,
+        "supplier_name": grn.supplier.name if grn.supplier else "—",
+        "items": items_data,
+        "total_cost": grn.total_cost or Decimal("0"),
+        "notes": grn.notes,
+    }
+
+
+def supplier_invoice_pdf_kwargs(
+    invoice: SupplierInvoice,
+    company: Optional[Company],
+    branch: Optional[Branch],
+    company_logo_bytes: Optional[bytes],
+) -> Dict[str, Any]:
+    """build_supplier_invoice_pdf arguments; invoice.items (with .item) must be loaded."""
+    items_data = []
+    for oi in invoice.items:
+        items_data.append({
+            "item_name": oi.item.name if oi.item else "—",
+            "quantity": float(oi.quantity),
+            "unit_name": oi.unit_name or "",
+            "unit_price_exclusive": float(oi.unit_cost_exclusive or 0),
+            "line_total_exclusive": float(oi.line_total_exclusive or 0),
+            "line_total_inclusive": float(oi.line_total_inclusive or 0),
+        })
+    return {
+        **_company_branch_kwargs(company, branch),
+        "company_logo_bytes": company_logo_bytes,
+        "invoice_number": invoice.invoice_number,
+        "invoice_date": invoice.invoice_date,
+        "supplier_name": invoice.supplier.name if invoice.supplier else "—",
+        "reference": invoice.reference,
+        "status": invoice.status,
+        "items": items_data,
+        "total_exclusive": invoice.total_exclusive or Decimal("0"),
+        "vat_amount": invoice.vat_amount or Decimal("0"),
+        "total_inclusive": invoice.total_inclusive or Decimal("0"),
+        "notes": invoice.reference,
+    }
+
+
+# ----- Document selection -----
+
+
+def _parse_date(raw: Any) -> Optional[date]:
+    if not raw:
+        return None
+    return raw if isinstance(raw, date) else date.fromisoformat(str(raw)[:10])
+
+
+def _export_query(db: Session, job: DocumentExportJob):
+    """Query of the job's documents (finalized only), in document date / number order."""
+    filters = job.filters or {}
+    date_from = _parse_date(filters.get("date_from"))
+    date_to = _parse_date(filters.get("date_to"))
+    supplier_id = filters.get("supplier_id")
+    if job.doc_type == DOC_TYPE_SALES_INVOICE:
+        model, doc_date, number = SalesInvoice, SalesInvoice.invoice_date, SalesInvoice.invoice_no
+        q = db.query(model).filter(SalesInvoice.status.in_(("BATCHED", "PAID")))
+    elif job.doc_type == DOC_TYPE_GRN:
+        model, doc_date, number = GRN, GRN.date_received, GRN.grn_no
+        q = db.query(model)
+        if supplier_id:
+            q = q.filter(GRN.supplier_id == UUID(str(supplier_id)))
+    elif job.doc_type == DOC_TYPE_SUPPLIER_INVOICE:
+        model, doc_date, number = SupplierInvoice, SupplierInvoice.invoice_date, SupplierInvoice.invoice_number
+        q = db.query(model).filter(SupplierInvoice.status == "BATCHED")
+        if supplier_id:
+            q = q.filter(SupplierInvoice.supplier_id == UUID(str(supplier_id)))
+    else:
+        raise ValueError(f"Unsupported document type for export: {job.doc_type}")
+    q = q.filter(model.company_id == job.company_id, model.branch_id == job.branch_id)
+    if date_from:
+        q = q.filter(doc_date >= date_from)
+    if date_to:
+        q = q.filter(doc_date <= date_to)
+    return model, q.order_by(doc_date, number, model.id)
+
+
+def count_documents(db: Session, job: DocumentExportJob) -> int:
+    _, q = _export_query(db, job)
+    return q.count()
+
+
+def _iter_document_chunks(db: Session, model: Any, query, chunk_size: int) -> Iterator[List[Any]]:
+    """Documents with lines and items, chunk_size at a time (ids first, then one load per chunk)."""
+    ids = [row[0] for row in query.with_entities(model.id).limit(max(1, int(settings.DOCUMENT_EXPORT_MAX_DOCS))).all()]
+    if model is SalesInvoice:
+        options = [selectinload(SalesInvoice.items).selectinload(SalesInvoiceItem.item)]
+    elif model is GRN:
+        options = [selectinload(GRN.items).selectinload(GRNItem.item), selectinload(GRN.supplier)]
+    else:
+        options = [selectinload(SupplierInvoice.items).selectinload(SupplierInvoiceItem.item), selectinload(SupplierInvoice.supplier)]
+    for start in range(0, len(ids), chunk_size):
+        chunk_ids = ids[start:start + chunk_size]
+        by_id = {d.id: d for d in db.query(model).options(*options).filter(model.id.in_(chunk_ids)).all()}
+        yield [by_id[i] for i in chunk_ids if i in by_id]
+        db.expunge_all()
+
+
+# ----- Rendering -----
+
+
+def _render_pool() -> Optional[ProcessPoolExecutor]:
+    """Shared process pool (spawned workers: no forked DB connections or threads), or None when disabled."""
+    global _pool
+    workers = int(settings.DOCUMENT_EXPORT_WORKERS)
+    if workers <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _render_one(doc: Tuple[str, Dict[str, Any]]) -> bytes:
+    return build_document_pdf(doc[0], doc[1])
+
+
+def _render_many(docs: List[Tuple[str, Dict[str, Any]]]) -> List[bytes]:
+    pool = _render_pool()
+    if pool is None:
+        return [_render_one(d) for d in docs]
+    chunksize = max(1, len(docs) // (4 * int(settings.DOCUMENT_EXPORT_WORKERS)))
+    return list(pool.map(_render_one, docs, chunksize=chunksize))
+
+
+def _append_pdfs(writer: PdfWriter, pdfs: List[bytes]) -> None:
+    """Append every page of each rendered PDF to the merged output, in order."""
+    for pdf in pdfs:
+        writer.append(io.BytesIO(pdf))
+
+
+def export_dir() -> str:
+    path = (settings.DOCUMENT_EXPORT_DIR or "").strip() or os.path.join(tempfile.gettempdir(), "pharmasight-exports")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def cleanup_old_exports(max_age_hours: Optional[float] = None) -> int:
+    """Delete export files older than max_age_hours (default DOCUMENT_EXPORT_RETENTION_HOURS). Returns files removed."""
+    hours = settings.DOCUMENT_EXPORT_RETENTION_HOURS if max_age_hours is None else max_age_hours
+    cutoff = time.time() - max(0.0, float(hours)) * 3600
+    removed = 0
+    path = export_dir()
+    for name in os.listdir(path):
+        full = os.path.join(path, name)
+        try:
+            if os.path.isfile(full) and os.path.getmtime(full) < cutoff:
+                os.remove(full)
+                removed += 1
+        except OSError as e:  # removed concurrently / still open elsewhere
+            logger.debug("Document export cleanup skipped %s: %s", full, e)
+    if removed:
+        logger.info("Document export cleanup: removed %s file(s) from %s", removed, path)
+    return removed
+
+
+def _safe_filename(name: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "-" for c in name)
+
+
+# ----- Job -----
+
+
+def _chunk_documents(
+    db: Session,
+    doc_type: str,
+    docs: List[Any],
+    company: Optional[Company],
+    branch: Optional[Branch],
+    logo_bytes: Optional[bytes],
+) -> List[Tuple[str, str, Dict[str, Any]]]:
+    """(filename, doc_type, payload) per document; creator names are resolved with one query per chunk."""
+    out = []
+    if doc_type == DOC_TYPE_SALES_INVOICE:
+        creator_ids = {d.created_by for d in docs if d.created_by}
+        creators = {u.id: u for u in db.query(User).filter(User.id.in_(creator_ids)).all()} if creator_ids else {}
+        for d in docs:
+            prepared_by = user_display_name(creators.get(d.created_by), d.created_by)
+            kwargs = sales_invoice_pdf_kwargs(d, company, branch, logo_bytes, prepared_by)
+            out.append((f"sales-invoice-{d.invoice_no or d.id}.pdf", DOC_TYPE_SALES_INVOICE, sales_invoice_payload(**kwargs)))
+    elif doc_type == DOC_TYPE_GRN:
+        for d in docs:
+            out.append((f"grn-{d.grn_no or d.id}.pdf", DOC_TYPE_GRN, grn_payload(**grn_pdf_kwargs(d, company, branch))))
+    else:
+        for d in docs:
+            kwargs = supplier_invoice_pdf_kwargs(d, company, branch, logo_bytes)
+            out.append((f"supplier-invoice-{d.invoice_number or d.id}.pdf", DOC_TYPE_SUPPLIER_INVOICE, supplier_invoice_payload(**kwargs)))
+    return [(_safe_filename(name), doc_type, payload) for name, doc_type, payload in out]
+
+
+def load_company_logo(company: Optional[Company], tenant: Optional[Any]) -> Optional[bytes]:
+    """Company logo bytes for an export (resolved once, in the request, and handed to the job)."""
+    logo_path = str(getattr(company, "logo_url", None) or "").strip()
+    if not logo_path:
+        return None
+    from app.services.tenant_storage_service import download_file
+
+    try:
+        return download_file(logo_path, tenant=tenant)
+    except Exception as e:
+        logger.warning("Document export: logo download failed (%s): %s", logo_path[:80], e)
+        return None
+
+
+def _cancelled(db: Session, job_id: UUID) -> bool:
+    """Re-read the job's status (a cancel is committed by another session)."""
+    db.expire_all()
+    status = db.query(DocumentExportJob.status).filter(DocumentExportJob.id == job_id).scalar()
+    return status is None or status == "cancelled"
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def run_export(db: Session, job: DocumentExportJob, logo_bytes: Optional[bytes] = None) -> None:
+    """
+    Render the job's documents into its output file, committing progress per chunk. Returns without
+    rendering when the job is no longer pending (e.g. cancelled before the worker started).
+    """
+    total_docs = min(count_documents(db, job), max(1, int(settings.DOCUMENT_EXPORT_MAX_DOCS)))
+    # Conditional transition, so a cancel committed meanwhile is not overwritten
+    started = db.execute(
+        text("""
+            UPDATE document_export_jobs
+            SET status = 'processing', started_at = NOW(), total_docs = :total_docs, processed_docs = 0,
+                updated_at = NOW()
+            WHERE id = :id AND status = 'pending'
+        """),
+        {"id": str(job.id), "total_docs": total_docs},
+    ).rowcount
+    db.commit()
+    if not started:
+        logger.info("Document export %s is no longer pending; not started", job.id)
+        return
+    # Plain values: job rows are re-read (and expunged) per chunk
+    job_id, company_id, branch_id = job.id, job.company_id, job.branch_id
+    doc_type, output_format = job.doc_type, job.output_format
+    model, query = _export_query(db, job)
+
+    company = db.query(Company).filter(Company.id == company_id).first()
+    branch = db.query(Branch).filter(Branch.id == branch_id).first()
+    db.expunge_all()  # company/branch stay usable detached; chunks are expunged as they go
+
+    cleanup_old_exports()
+    out_path = os.path.join(export_dir(), f"{job_id}.{output_format}")
+    chunk_size = max(1, int(settings.DOCUMENT_EXPORT_CHUNK_SIZE))
+    processed = 0
+    zf = zipfile.ZipFile(out_path, "w", zipfile.ZIP_DEFLATED) if output_format == "zip" else None
+    writer = PdfWriter() if zf is None else None
+    try:
+        for docs in _iter_document_chunks(db, model, query, chunk_size):
+            rendered = _chunk_documents(db, doc_type, docs, company, branch, logo_bytes)
+            pdfs = _render_many([(t, p) for _, t, p in rendered])
+            if zf is not None:
+                used = set(zf.namelist())
+                for (name, _, _), pdf in zip(rendered, pdfs):
+                    stem, n = name[:-4], 1
+                    while name in used:
+                        n += 1
+                        name = f"{stem}-{n}.pdf"
+                    used.add(name)
+                    zf.writestr(name, pdf)
+            else:
+                _append_pdfs(writer, pdfs)
+            processed += len(rendered)
+            if _cancelled(db, job_id):
+                logger.info("Document export %s cancelled after %s documents", job_id, processed)
+                return
+            job = db.query(DocumentExportJob).filter(DocumentExportJob.id == job_id).first()
+            job.processed_docs = processed
+            db.commit()
+        if writer is not None:
+            with open(out_path, "wb") as fh:
+                writer.write(fh)
+    finally:
+        if zf is not None:
+            zf.close()
+        if writer is not None:
+            writer.close()
+
+    # A cancel can arrive while the output is being written
+    if _cancelled(db, job_id):
+        logger.info("Document export %s cancelled before completion", job_id)
+        _remove_file(out_path)
+        return
+    job = db.query(DocumentExportJob).filter(DocumentExportJob.id == job_id).first()
+    job.status = "completed"
+    job.processed_docs = processed
+    job.total_docs = processed
+    job.output_path = out_path
+    job.output_bytes = os.path.getsize(out_path)
+    job.completed_at = datetime.now(timezone.utc)
+    db.commit()
+    logger.info("Document export %s completed: %s %s documents, %s bytes", job_id, processed, doc_type, job.output_bytes)
+
+
+def run_export_job(job_id: UUID, database_url: Optional[str] = None, logo_bytes: Optional[bytes] = None) -> None:
+    """Background thread entry point: own DB session; marks the job failed on any error."""
+    from app.database import SessionLocal
+    from app.dependencies import _session_factory_for_url
+
+    db = _session_factory_for_url(database_url)() if database_url else SessionLocal()
+    try:
+        job = db.query(DocumentExportJob).filter(DocumentExportJob.id == job_id).first()
+        if not job:
+            logger.error("Document export job %s not found", job_id)
+            return
+        run_export(db, job, logo_bytes)
+    except Exception as e:
+        logger.error("Document export job %s failed: %s", job_id, e, exc_info=True)
+        db.rollback()
+        job = db.query(DocumentExportJob).filter(DocumentExportJob.id == job_id).first()
+        if job:
+            job.status = "failed"
+            job.error_message = str(e)[:1000]
+            job.completed_at = datetime.now(timezone.utc)
+            db.commit()
+    finally:
+        db.close()
+
+
+def start_export_job(job: DocumentExportJob, database_url: Optional[str], logo_bytes: Optional[bytes]) -> threading.Thread:
+    thread = threading.Thread(
+        target=run_export_job,
+        args=(job.id, database_url, logo_bytes),
+        daemon=True,
+        name=f"DocumentExport-{job.id}",
+    )
+    thread.start()
+    return thread
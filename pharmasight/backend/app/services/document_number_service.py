@@ -2,14 +2,18 @@
 Unified document number generation for the Transaction Engine.
 Format: {DOC_TYPE}-{BRANCH_CODE}-{SEQUENCE}
 Example: INV-01-000245, CN-01-000014, GRN-02-000099
-Uses document_sequences with row-level locking (SELECT ... FOR UPDATE).
+Uses document_sequences: one UPDATE ... RETURNING increments and row-locks the sequence until commit,
+so numbers stay gapless (a rolled-back document rolls back its number). Callers should take the number
+as late as possible - after pricing / stock checks, right before inserting the document and committing -
+so concurrent tills of a branch only queue for the insert, not for the whole request.
 """
 from __future__ import annotations
 
 from uuid import UUID
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 
-from app.models import Branch, DocumentSequence
+from app.models import Branch
 
 
 # Doc types for the unified format (used in document_sequences.document_type)
@@ -21,6 +25,25 @@ DOC_TYPE_TRF = "TRF"
 DOC_TYPE_ADJ = "ADJ"
 DOC_TYPE_OPEN = "OPEN"
 
+_CLAIM_SQL = text("""
+    UPDATE document_sequences
+    SET current_number = COALESCE(current_number, 0) + 1, updated_at = NOW()
+    WHERE company_id = :company_id AND branch_id = :branch_id
+      AND document_type = :doc_type AND year IS NULL
+    RETURNING current_number
+""")
+# First document of a type at a branch: create the row (year NULL is not covered by the UNIQUE constraint,
+# so concurrent creators serialize on an advisory lock)
+_CREATE_SQL = text("""
+    INSERT INTO document_sequences (company_id, branch_id, document_type, current_number, year)
+    SELECT :company_id, :branch_id, :doc_type, 0, NULL
+    WHERE NOT EXISTS (
+        SELECT 1 FROM document_sequences
+        WHERE company_id = :company_id AND branch_id = :branch_id
+          AND document_type = :doc_type AND year IS NULL
+    )
+""")
+
 
 def _branch_code_two_digit(branch: Branch) -> str:
     """Normalize branch code to two characters for document number (e.g. 01, 02)."""
@@ -37,7 +60,7 @@ def _branch_code_two_digit(branch: Branch) -> str:
 class DocumentNumberService:
     """
     Generates standardized document numbers: {DOC_TYPE}-{BRANCH_CODE}-{SEQUENCE}.
-    Uses document_sequences; row is locked with FOR UPDATE to avoid duplicates.
+    Uses document_sequences; the row is locked by the increment until commit to avoid duplicates and gaps.
     """
 
     @staticmethod
@@ -49,52 +72,24 @@ class DocumentNumberService:
     ) -> str:
         """
         Get next document number for (branch_id, doc_type).
-        Locks the sequence row, increments, and returns formatted number.
+        Increments the sequence row with a single UPDATE ... RETURNING (row lock held until commit)
+        and returns the formatted number. Call right before inserting the document and committing.
         """
         branch = db.query(Branch).filter(Branch.id == branch_id).first()
         if not branch:
             raise ValueError(f"Branch {branch_id} not found")
         branch_code = _branch_code_two_digit(branch)
 
-        # Find or create sequence row (document_type = INV, CN, GRN, etc.; year NULL = unified format)
-        seq = (
-            db.query(DocumentSequence)
-            .filter(
-                DocumentSequence.company_id == company_id,
-                DocumentSequence.branch_id == branch_id,
-                DocumentSequence.document_type == doc_type,
-                DocumentSequence.year.is_(None),
-            )
-            .with_for_update()
-            .first()
-        )
-        if not seq:
-            seq = DocumentSequence(
-                company_id=company_id,
-                branch_id=branch_id,
-                document_type=doc_type,
-                current_number=0,
-                year=None,
+        params = {"company_id": str(company_id), "branch_id": str(branch_id), "doc_type": doc_type}
+        row = db.execute(_CLAIM_SQL, params).first()
+        if row is None:
+            db.execute(
+                text("SELECT pg_advisory_xact_lock(hashtext(:key))"),
+                {"key": f"document_sequences:{company_id}:{branch_id}:{doc_type}"},
             )
-            db.add(seq)
-            db.flush()
-            # Reload with lock (same transaction)
-            seq = (
-                db.query(DocumentSequence)
-                .filter(
-                    DocumentSequence.company_id == company_id,
-                    DocumentSequence.branch_id == branch_id,
-                    DocumentSequence.document_type == doc_type,
-                    DocumentSequence.year.is_(None),
-                )
-                .with_for_update()
-                .first()
-            )
-            if not seq:
+            db.execute(_CREATE_SQL, params)
+            row = db.execute(_CLAIM_SQL, params).first()
+            if row is None:
                 raise ValueError(f"Failed to create sequence for {doc_type} at branch {branch_id}")
 
-        seq.current_number = (seq.current_number or 0) + 1
-        next_num = seq.current_number
-        db.flush()
-
-        return f"{doc_type}-{branch_code}-{next_num:06d}"
+        return f"{doc_type}-{branch_code}-{row[0]:06d}"
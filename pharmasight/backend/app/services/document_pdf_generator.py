@@ -153,7 +153,12 @@ def build_document_pdf(doc_type: str, payload: Dict[str, Any]) -> bytes:
         stamp_bytes, signature_bytes (purchase order only)
     """
     buf = BytesIO()
-    doc = SimpleDocTemplate(
+    _document_template(buf).build(_document_flowables(doc_type, payload))
+    return buf.getvalue()
+
+
+def _document_template(buf: BytesIO) -> SimpleDocTemplate:
+    return SimpleDocTemplate(
         buf,
         pagesize=A4,
         leftMargin=15 * mm,
@@ -161,6 +166,10 @@ def build_document_pdf(doc_type: str, payload: Dict[str, Any]) -> bytes:
         topMargin=15 * mm,
         bottomMargin=15 * mm,
     )
+
+
+def _document_flowables(doc_type: str, payload: Dict[str, Any]) -> List[Any]:
+    """Flowables of one document (see build_document_pdf for payload keys)."""
     st = get_document_styles()
     flow: List[Any] = []
 
@@ -276,8 +285,7 @@ def build_document_pdf(doc_type: str, payload: Dict[str, Any]) -> bytes:
         flow.append(Spacer(1, 4 * mm))
         flow.append(Paragraph(f"Notes: {notes}", st["detail"]))
 
-    doc.build(flow)
-    return buf.getvalue()
+    return flow
 
 
 # ----- Document-specific wrappers (same signatures as before; API imports from here) -----
@@ -433,7 +441,12 @@ def build_po_pdf(
     return build_document_pdf(DOC_TYPE_PURCHASE_ORDER, payload)
 
 
-def build_sales_invoice_pdf(
+def build_sales_invoice_pdf(*args: Any, **kwargs: Any) -> bytes:
+    """Build A4 PDF for a sales invoice. Logo right, company left; footer: prepared/printed/served, till; no status."""
+    return build_document_pdf(DOC_TYPE_SALES_INVOICE, sales_invoice_payload(*args, **kwargs))
+
+
+def sales_invoice_payload(
     company_name: str,
     company_address: Optional[str] = None,
     company_phone: Optional[str] = None,
@@ -459,8 +472,8 @@ def build_sales_invoice_pdf(
     kra_receipt_number: Optional[str] = None,
     kra_signature: Optional[str] = None,
     kra_qr_code: Optional[str] = None,
-) -> bytes:
-    """Build A4 PDF for a sales invoice. Logo right, company left; footer: prepared/printed/served, till; no status."""
+) -> Dict[str, Any]:
+    """Payload for build_document_pdf(DOC_TYPE_SALES_INVOICE, ...); same arguments as build_sales_invoice_pdf."""
     items = items or []
     total_exclusive = total_exclusive or Decimal("0")
     vat_amount = vat_amount or Decimal("0")
@@ -502,10 +515,15 @@ def build_sales_invoice_pdf(
         "kra_signature": (kra_signature or "").strip() or None,
         "kra_qr_png_bytes": kra_qr_png_bytes(kra_qr_code),
     }
-    return build_document_pdf(DOC_TYPE_SALES_INVOICE, payload)
+    return payload
 
 
-def build_grn_pdf(
+def build_grn_pdf(*args: Any, **kwargs: Any) -> bytes:
+    """Build A4 PDF for a GRN. Document skeleton: header, metadata, supplier, items, total."""
+    return build_document_pdf(DOC_TYPE_GRN, grn_payload(*args, **kwargs))
+
+
+def grn_payload(
     company_name: str,
     company_address: Optional[str] = None,
     company_phone: Optional[str] = None,
@@ -519,8 +537,8 @@ def build_grn_pdf(
     items: Optional[List[Dict[str, Any]]] = None,
     total_cost: Optional[Decimal] = None,
     notes: Optional[str] = None,
-) -> bytes:
-    """Build A4 PDF for a GRN. Document skeleton: header, metadata, supplier, items, total."""
+) -> Dict[str, Any]:
+    """Payload for build_document_pdf(DOC_TYPE_GRN, ...); same arguments as build_grn_pdf."""
     items = items or []
     total_cost = total_cost or Decimal("0")
     date_received = date_received or date.today()
@@ -547,10 +565,15 @@ def build_grn_pdf(
         "total_cost": total_cost,
         "notes": notes,
     }
-    return build_document_pdf(DOC_TYPE_GRN, payload)
+    return payload
 
 
-def build_supplier_invoice_pdf(
+def build_supplier_invoice_pdf(*args: Any, **kwargs: Any) -> bytes:
+    """Build A4 PDF for a supplier (purchase) invoice. Document skeleton only; no payment, no approval."""
+    return build_document_pdf(DOC_TYPE_SUPPLIER_INVOICE, supplier_invoice_payload(*args, **kwargs))
+
+
+def supplier_invoice_payload(
     company_name: str,
     company_address: Optional[str] = None,
     company_phone: Optional[str] = None,
@@ -568,8 +591,8 @@ def build_supplier_invoice_pdf(
     vat_amount: Optional[Decimal] = None,
     total_inclusive: Optional[Decimal] = None,
     notes: Optional[str] = None,
-) -> bytes:
-    """Build A4 PDF for a supplier (purchase) invoice. Document skeleton only; no payment, no approval."""
+) -> Dict[str, Any]:
+    """Payload for build_document_pdf(DOC_TYPE_SUPPLIER_INVOICE, ...); same arguments as build_supplier_invoice_pdf."""
     items = items or []
     total_exclusive = total_exclusive or Decimal("0")
     vat_amount = vat_amount or Decimal("0")
@@ -603,4 +626,4 @@ def build_supplier_invoice_pdf(
         "total_inclusive": total_inclusive,
         "notes": notes,
     }
-    return build_document_pdf(DOC_TYPE_SUPPLIER_INVOICE, payload)
+    return payload
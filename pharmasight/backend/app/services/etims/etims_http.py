@@ -0,0 +1,147 @@
+"""
+Shared HTTP sessions for KRA eTIMS OSCU calls (OAuth token, sendSalesTransaction).
+
+- One keep-alive requests.Session per API origin with a connection pool sized for the submission
+  workers (ETIMS_HTTP_POOL_SIZE), instead of a new TCP/TLS connection per invoice.
+- Bounded retries with exponential backoff and full jitter (ETIMS_HTTP_RETRIES,
+  ETIMS_HTTP_BACKOFF_SECONDS); Retry-After is honoured when the gateway sends it. Only failures
+  where OSCU did not take the request are retried: connection errors and retry_statuses
+  (429/503 for sendSalesTransaction). For sendSalesTransaction (RETRY_STATUSES_SUBMIT) only
+  connect timeouts / refused connections count, since an aborted or reset connection may
+  follow a body OSCU already received. Other responses are returned to the caller as-is.
+- Optional throttle callable, invoked before every attempt (per-branch rate limits).
+"""
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, FrozenSet, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES_IDEMPOTENT: FrozenSet[int] = frozenset({429, 502, 503, 504})
+# A 502/504 on a POST may still have reached OSCU: not retried automatically
+RETRY_STATUSES_SUBMIT: FrozenSet[int] = frozenset({429, 503})
+_MAX_BACKOFF_SECONDS = 30.0
+
+_lock = threading.Lock()
+_sessions: Dict[str, requests.Session] = {}
+_stats = {"requests": 0, "retries": 0, "errors": 0}
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def get_session(url: str) -> requests.Session:
+    """Keep-alive session for url's origin (shared by all threads)."""
+    key = _origin(url)
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            pool_size = max(1, int(settings.ETIMS_HTTP_POOL_SIZE))
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[key] = session
+        return session
+
+
+def _request_not_sent(exc: requests.ConnectionError) -> bool:
+    """True when the connection was never established (connect timeout, refused, DNS), so no body went out."""
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    seen = set()
+    cause: Any = exc
+    while cause is not None and id(cause) not in seen:
+        seen.add(id(cause))
+        if isinstance(cause, (NewConnectionError, ConnectionRefusedError)):
+            return True
+        # requests.ConnectionError(MaxRetryError(reason=NewConnectionError(...)))
+        nxt = getattr(cause, "reason", None)
+        if nxt is None and cause.args:
+            nxt = cause.args[0]
+        cause = nxt if isinstance(nxt, BaseException) else None
+    return False
+
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Seconds to wait before retry `attempt` (1-based): Retry-After if given, else full jitter."""
+    if retry_after:
+        try:
+            return min(_MAX_BACKOFF_SECONDS, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+    base = max(0.0, float(settings.ETIMS_HTTP_BACKOFF_SECONDS))
+    return random.uniform(0, min(_MAX_BACKOFF_SECONDS, base * (2 ** (attempt - 1))))
+
+
+def request(
+    method: str,
+    url: str,
+    *,
+    retry_statuses: FrozenSet[int] = RETRY_STATUSES_IDEMPOTENT,
+    throttle: Optional[Callable[[], None]] = None,
+    **kwargs: Any,
+) -> requests.Response:
+    """
+    Send method url on the pooled session, retrying connection errors and retry_statuses.
+    With RETRY_STATUSES_SUBMIT (non-idempotent) only connections that were never established are retried.
+    Raises requests.RequestException when the last attempt fails at transport level.
+    """
+    submit = retry_statuses is RETRY_STATUSES_SUBMIT
+    retries = max(0, int(settings.ETIMS_HTTP_RETRIES))
+    session = get_session(url)
+    attempt = 0
+    while True:
+        if throttle is not None:
+            throttle()
+        with _lock:
+            _stats["requests"] += 1
+        try:
+            response = session.request(method, url, **kwargs)
+        except requests.ConnectionError as e:
+            if attempt >= retries or (submit and not _request_not_sent(e)):
+                with _lock:
+                    _stats["errors"] += 1
+                raise
+            attempt += 1
+            delay = backoff_delay(attempt)
+            logger.info("eTIMS %s %s: %s; retry %s in %.2fs", method, url, e, attempt, delay)
+        else:
+            if response.status_code not in retry_statuses or attempt >= retries:
+                return response
+            attempt += 1
+            delay = backoff_delay(attempt, response.headers.get("Retry-After"))
+            logger.info("eTIMS %s %s: HTTP %s; retry %s in %.2fs", method, url, response.status_code, attempt, delay)
+            response.close()
+        with _lock:
+            _stats["retries"] += 1
+        time.sleep(delay)
+
+
+def get_metrics() -> Dict[str, Any]:
+    with _lock:
+        return {**_stats, "sessions": len(_sessions)}
+
+
+def close_all() -> None:
+    """Close pooled sessions and reset counters (shutdown / tests)."""
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+        for k in _stats:
+            _stats[k] = 0
+    for session in sessions:
+        session.close()
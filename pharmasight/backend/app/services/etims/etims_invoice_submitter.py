@@ -10,7 +10,7 @@ import hashlib
 import json
 import logging
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from uuid import UUID
 
 import requests
@@ -26,6 +26,7 @@ from app.services.etims.branch_credentials import (
     get_cmc_key_plain,
     get_oauth_username_password,
 )
+from app.services.etims import etims_http
 from app.services.etims.etims_invoice_payload_builder import build_send_sales_trns_payload
 from app.services.etims.etims_oauth_client import get_access_token
 
@@ -248,10 +249,12 @@ def submit_sales_invoice(
     invoice_id: UUID,
     *,
     timeout: int = 60,
+    throttle: Optional[Callable[[], None]] = None,
 ) -> Dict[str, Any]:
     """
     Load invoice, validate, POST sendSalesTransaction, update invoice + audit log.
-    Returns a small result dict for workers.
+    Returns a small result dict for workers. throttle (e.g. a per-branch rate limit) is called
+    before each HTTP attempt to OSCU.
     """
     invoice = (
         db.query(SalesInvoice)
@@ -344,8 +347,11 @@ def submit_sales_invoice(
 
     url = f"{base}{SEND_SALES_TRANSACTION_PATH}"
     try:
-        r = requests.post(
+        r = etims_http.request(
+            "POST",
             url,
+            retry_statuses=etims_http.RETRY_STATUSES_SUBMIT,
+            throttle=throttle,
             json=payload,
             headers={
                 "Content-Type": "application/json",
@@ -14,6 +14,7 @@ from typing import Dict, Tuple
 import requests
 
 from app.config import settings
+from app.services.etims import etims_http
 from app.services.etims.constants import OAUTH_TOKEN_PATH_APIGEE, OAUTH_TOKEN_PATH_LEGACY
 
 logger = logging.getLogger(__name__)
@@ -21,6 +22,7 @@ logger = logging.getLogger(__name__)
 _lock = threading.Lock()
 # key -> (access_token, expires_at_epoch)
 _token_cache: Dict[Tuple[str, str, str, str], Tuple[str, float]] = {}
+_fetch_locks: Dict[Tuple[str, str, str, str], threading.Lock] = {}
 
 
 def get_access_token(
@@ -63,24 +65,38 @@ def get_access_token(
         if hit and hit[1] > now + 60:
             return hit[0]
 
-    url = f"{token_base}{token_path}"
+    # One token request per credentials at a time: concurrent submitters wait for it
+    with _fetch_lock(key):
+        now = time.time()
+        with _lock:
+            hit = _token_cache.get(key)
+            if hit and hit[1] > now + 60:
+                return hit[0]
+        token, expires_in = _request_token(f"{token_base}{token_path}", env, username, password, timeout)
+        with _lock:
+            _token_cache[key] = (token, now + expires_in)
+        return token
+
+
+def _fetch_lock(key: Tuple[str, str, str, str]) -> threading.Lock:
+    with _lock:
+        lock = _fetch_locks.get(key)
+        if lock is None:
+            lock = _fetch_locks[key] = threading.Lock()
+        return lock
+
+
+def _request_token(url: str, env: str, username: str, password: str, timeout: int) -> Tuple[str, float]:
     params = {"grant_type": "client_credentials"}
     try:
-        # Align with Postman sandbox collection: use GET for token generation.
-        if env == "production":
-            r = requests.post(
-                url,
-                auth=(username, password),
-                params=params,
-                timeout=timeout,
-            )
-        else:
-            r = requests.get(
-                url,
-                auth=(username, password),
-                params=params,
-                timeout=timeout,
-            )
+        # Align with Postman sandbox collection: use GET for token generation (POST on production).
+        r = etims_http.request(
+            "POST" if env == "production" else "GET",
+            url,
+            auth=(username, password),
+            params=params,
+            timeout=timeout,
+        )
     except requests.RequestException as e:
         logger.warning("eTIMS OAuth request failed: %s", e)
         raise RuntimeError(f"eTIMS OAuth network error: {e}") from e
@@ -94,10 +110,7 @@ def get_access_token(
     if not token:
         raise RuntimeError("eTIMS OAuth response missing access_token")
 
-    expires_in = float(data.get("expires_in") or 3600)
-    with _lock:
-        _token_cache[key] = (token, now + expires_in)
-    return token
+    return token, float(data.get("expires_in") or 3600)
 
 
 def clear_token_cache() -> None:
@@ -1,24 +1,115 @@
 """
 Batch processor: submit sales invoices with submission_status=pending to KRA OSCU.
+
+- Invoices are submitted concurrently by a thread pool (ETIMS_SUBMIT_WORKERS), each task with its
+  own DB session; HTTP goes through the pooled sessions in etims_http.
+- Per-branch limits (per process): at most ETIMS_SUBMIT_BRANCH_CONCURRENCY in-flight submissions and
+  ETIMS_SUBMIT_BRANCH_RATE_PER_SECOND requests to OSCU per branch; work is interleaved across branches
+  so one busy branch does not hold every worker.
+- Claims use FOR UPDATE SKIP LOCKED: the invoice row stays locked until submit_sales_invoice commits,
+  so several worker processes can drain the same backlog without submitting an invoice twice.
 """
 from __future__ import annotations
 
 import logging
-from typing import Any, Dict, List
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from uuid import UUID
 
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, sessionmaker
 
+from app.config import settings
 from app.models.company import BranchEtimsCredentials
 from app.models.sale import SalesInvoice
 from app.services.etims.etims_invoice_submitter import EtimsSubmissionSkipped, submit_sales_invoice
 
 logger = logging.getLogger(__name__)
 
+# Outcomes of one submission task
+OUTCOME_OK = "ok"
+OUTCOME_FAILED = "failed"
+OUTCOME_SKIPPED = "skipped"
+OUTCOME_CLAIMED_ELSEWHERE = "claimed_elsewhere"
 
-def list_pending_etims_invoice_ids(db: Session, *, limit: int = 25) -> List[UUID]:
+
+class BranchLimiter:
+    """Per-branch in-flight cap (semaphore) and request spacing (rate per second; 0 = unlimited)."""
+
+    def __init__(self, concurrency: int, rate_per_second: float):
+        self.concurrency = max(1, int(concurrency))
+        self.interval = 1.0 / rate_per_second if rate_per_second and rate_per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._slots: Dict[Any, threading.Semaphore] = {}
+        self._next_at: Dict[Any, float] = {}
+
+    def slot(self, branch_id: Any) -> threading.Semaphore:
+        with self._lock:
+            sem = self._slots.get(branch_id)
+            if sem is None:
+                sem = self._slots[branch_id] = threading.Semaphore(self.concurrency)
+            return sem
+
+    def throttle(self, branch_id: Any) -> None:
+        """Block until branch_id may send its next request."""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            at = max(now, self._next_at.get(branch_id, now))
+            self._next_at[branch_id] = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+
+def _interleave_by_branch(rows: List[Tuple[UUID, Any]]) -> List[Tuple[UUID, Any]]:
+    """Round-robin across branches, keeping each branch's own order."""
+    queues: "OrderedDict[Any, List[Tuple[UUID, Any]]]" = OrderedDict()
+    for row in rows:
+        queues.setdefault(row[1], []).append(row)
+    out: List[Tuple[UUID, Any]] = []
+    while queues:
+        for branch_id in list(queues):
+            out.append(queues[branch_id].pop(0))
+            if not queues[branch_id]:
+                del queues[branch_id]
+    return out
+
+
+def run_concurrently(
+    tasks: List[Tuple[UUID, Any]],
+    submit_one: Callable[[UUID, Callable[[], None]], str],
+    *,
+    workers: int,
+    limiter: BranchLimiter,
+) -> List[Tuple[UUID, str]]:
+    """
+    Run submit_one(invoice_id, throttle) for each (invoice_id, branch_id) task on `workers` threads
+    under the limiter. Returns (invoice_id, outcome) in completion order.
+    """
+
+    def run(task: Tuple[UUID, Any]) -> Tuple[UUID, str]:
+        invoice_id, branch_id = task
+        with limiter.slot(branch_id):
+            return invoice_id, submit_one(invoice_id, lambda: limiter.throttle(branch_id))
+
+    ordered = _interleave_by_branch(tasks)
+    if workers <= 1:
+        return [run(t) for t in ordered]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="EtimsSubmit") as pool:
+        return list(pool.map(run, ordered))
+
+
+def list_pending_etims_invoices(db: Session, *, limit: int = 25) -> List[Tuple[UUID, UUID]]:
+    """
+    (invoice_id, branch_id) of pending invoices on branches with verified credentials, oldest first.
+    Takes no locks: claim_invoice is the only guard against a submission in flight on another worker.
+    Ends the transaction.
+    """
     q = (
-        db.query(SalesInvoice.id)
+        db.query(SalesInvoice.id, SalesInvoice.branch_id)
         .join(BranchEtimsCredentials, BranchEtimsCredentials.branch_id == SalesInvoice.branch_id)
         .filter(
             SalesInvoice.submission_status == "pending",
@@ -29,34 +120,94 @@ def list_pending_etims_invoice_ids(db: Session, *, limit: int = 25) -> List[UUID
         .order_by(SalesInvoice.created_at.asc())
         .limit(limit)
     )
-    return [row[0] for row in q.all()]
+    rows = [(row[0], row[1]) for row in q.all()]
+    db.commit()
+    return rows
 
 
-def process_pending_etims_submissions(db: Session, *, limit: int = 25) -> Dict[str, Any]:
+def list_pending_etims_invoice_ids(db: Session, *, limit: int = 25) -> List[UUID]:
+    return [invoice_id for invoice_id, _ in list_pending_etims_invoices(db, limit=limit)]
+
+
+def claim_invoice(db: Session, invoice_id: UUID) -> bool:
+    """Lock the invoice if it is still pending and not being submitted by another worker."""
+    row = (
+        db.query(SalesInvoice.id)
+        .filter(SalesInvoice.id == invoice_id, SalesInvoice.submission_status == "pending")
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if row is None:
+        db.rollback()
+        return False
+    return True
+
+
+def submit_claimed(db: Session, invoice_id: UUID, throttle: Optional[Callable[[], None]] = None) -> str:
+    """Claim and submit one invoice; the claim lock is released by submit_sales_invoice's commit."""
+    if not claim_invoice(db, invoice_id):
+        return OUTCOME_CLAIMED_ELSEWHERE
+    try:
+        res = submit_sales_invoice(
+            db,
+            invoice_id,
+            timeout=max(1, int(settings.ETIMS_SUBMIT_TIMEOUT_SECONDS)),
+            throttle=throttle,
+        )
+    except EtimsSubmissionSkipped as e:
+        db.rollback()
+        logger.info("eTIMS skip %s: %s", invoice_id, e)
+        return OUTCOME_SKIPPED
+    return OUTCOME_OK if res.get("ok") else OUTCOME_FAILED
+
+
+def process_pending_etims_submissions(
+    db: Session,
+    *,
+    limit: Optional[int] = None,
+    workers: Optional[int] = None,
+) -> Dict[str, Any]:
     """
-    Attempt each pending invoice (enabled branch credentials). Each submit_sales_invoice commits internally.
+    Submit up to `limit` pending invoices (enabled, verified branch credentials) with `workers` threads.
+    Each submit_sales_invoice commits internally. Defaults: ETIMS_SUBMIT_BATCH_LIMIT / ETIMS_SUBMIT_WORKERS.
     """
-    ids = list_pending_etims_invoice_ids(db, limit=limit)
+    limit = settings.ETIMS_SUBMIT_BATCH_LIMIT if limit is None else limit
+    workers = max(1, int(settings.ETIMS_SUBMIT_WORKERS if workers is None else workers))
+    started = time.monotonic()
+    tasks = list_pending_etims_invoices(db, limit=limit)
     out: Dict[str, Any] = {
-        "candidates": len(ids),
+        "candidates": len(tasks),
         "submitted_ok": 0,
         "failed": 0,
         "skipped": 0,
+        "claimed_elsewhere": 0,
         "errors": [],
     }
-    for iid in ids:
+    limiter = BranchLimiter(settings.ETIMS_SUBMIT_BRANCH_CONCURRENCY, settings.ETIMS_SUBMIT_BRANCH_RATE_PER_SECOND)
+    session_factory = sessionmaker(bind=db.get_bind(), autocommit=False, autoflush=False) if workers > 1 else None
+
+    def submit_one(invoice_id: UUID, throttle: Callable[[], None]) -> str:
+        task_db = session_factory() if session_factory is not None else db
         try:
-            res = submit_sales_invoice(db, iid)
-            if res.get("ok"):
-                out["submitted_ok"] += 1
-            else:
-                out["failed"] += 1
-        except EtimsSubmissionSkipped as e:
-            db.rollback()
-            out["skipped"] += 1
-            logger.info("eTIMS skip %s: %s", iid, e)
+            return submit_claimed(task_db, invoice_id, throttle)
         except Exception as e:
-            db.rollback()
-            out["errors"].append(f"{iid}: {e}")
-            logger.exception("eTIMS submit error for %s", iid)
+            task_db.rollback()
+            logger.exception("eTIMS submit error for %s", invoice_id)
+            return f"{invoice_id}: {e}"
+        finally:
+            if task_db is not db:
+                task_db.close()
+
+    for _, outcome in run_concurrently(tasks, submit_one, workers=min(workers, max(1, len(tasks))), limiter=limiter):
+        if outcome == OUTCOME_OK:
+            out["submitted_ok"] += 1
+        elif outcome == OUTCOME_FAILED:
+            out["failed"] += 1
+        elif outcome == OUTCOME_SKIPPED:
+            out["skipped"] += 1
+        elif outcome == OUTCOME_CLAIMED_ELSEWHERE:
+            out["claimed_elsewhere"] += 1
+        else:
+            out["errors"].append(outcome)
+    out["elapsed_seconds"] = round(time.monotonic() - started, 3)
     return out
@@ -743,6 +743,8 @@ class ExcelImportService:
                 )
             ).delete(synchronize_session=False)
             logger.info(f"Deleted {deleted_count} existing opening balances")
+            if deleted_count:
+                SnapshotService.rebuild_batch_balances(db, branch_id=branch_id)
             
             stock_validation_config = None
             try:
@@ -1413,6 +1415,8 @@ class ExcelImportService:
                 db, company_id, branch_id, item_id, old_qty, quantity,
                 document_number="OPENING",
             )
+            db.flush()
+            SnapshotService.rebuild_batch_balances(db, branch_id=branch_id, item_ids=[item_id])
             SnapshotService.upsert_purchase_snapshot(db, company_id, branch_id, item_id, unit_cost, None, None)
             SnapshotRefreshService.refresh_item_sync(db, company_id, branch_id, item_id)
         else:
@@ -1436,6 +1440,7 @@ class ExcelImportService:
                 db, company_id, branch_id, item_id, quantity,
                 document_number="OPENING",
             )
+            SnapshotService.upsert_batch_balances(db, [ledger_entry])
             SnapshotService.upsert_purchase_snapshot(db, company_id, branch_id, item_id, unit_cost, None, None)
             SnapshotRefreshService.refresh_item_sync(db, company_id, branch_id, item_id)
     
@@ -1817,6 +1822,7 @@ class ExcelImportService:
                     for ob in opening_balances
                 ]
                 SnapshotService.upsert_inventory_balance_bulk(db, balance_rows)
+                SnapshotService.upsert_batch_balances(db, opening_balances)
                 SnapshotService.upsert_purchase_snapshot_bulk(db, purchase_rows)
                 result['opening_balances_created'] = len(opening_balances)
                 logger.info(f"Bulk inserted {len(opening_balances)} opening balances")
@@ -0,0 +1,291 @@
+"""
+Daily stock checkpoints (inventory_daily_checkpoints) for point-in-time stock valuation.
+
+- build_branch: incremental; writes checkpoints for the days after the branch's built_through
+  (one row per item and day with movements, cumulative from the previous checkpoint) and advances
+  built_through. Run nightly via scripts/build_inventory_checkpoints.py; days are UTC, matching the
+  valuation endpoint's end-of-day filter.
+- stock_as_of: latest checkpoint per item on or before LEAST(as_of, built_through) plus only the
+  ledger rows after it. Without checkpoints it sums the ledger, as before.
+- Ledger writes: new rows (created_at = now) are always after built_through, so readers pick them up
+  from the ledger. Backdated rows pull built_through back (note_ledger_entries); rewritten rows
+  rebuild the affected items (rebuild_items, called from SnapshotService.rebuild_batch_balances).
+"""
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Daily deltas for [start, end) plus the closing of each item's previous checkpoint, accumulated per item.
+_BUILD_SQL = """
+WITH daily AS (
+    SELECT item_id, (created_at AT TIME ZONE 'UTC')::date AS day,
+           SUM(quantity_delta) AS q, SUM(quantity_delta * unit_cost) AS v
+    FROM inventory_ledger
+    WHERE company_id = :company_id AND branch_id = :branch_id
+      AND created_at >= :start_ts AND created_at < :end_ts {item_scope}
+    GROUP BY item_id, (created_at AT TIME ZONE 'UTC')::date
+),
+base AS (
+    SELECT DISTINCT ON (c.item_id) c.item_id, c.quantity, c.layer_value
+    FROM inventory_daily_checkpoints c
+    WHERE c.branch_id = :branch_id AND c.checkpoint_date < :start
+      AND c.item_id IN (SELECT item_id FROM daily)
+    ORDER BY c.item_id, c.checkpoint_date DESC
+)
+INSERT INTO inventory_daily_checkpoints (item_id, branch_id, checkpoint_date, company_id, quantity, layer_value, updated_at)
+SELECT daily.item_id, CAST(:branch_id AS uuid), daily.day, CAST(:company_id AS uuid),
+       COALESCE(base.quantity, 0) + SUM(daily.q) OVER w,
+       COALESCE(base.layer_value, 0) + SUM(daily.v) OVER w,
+       NOW()
+FROM daily
+LEFT JOIN base ON base.item_id = daily.item_id
+WINDOW w AS (PARTITION BY daily.item_id ORDER BY daily.day)
+ON CONFLICT (item_id, branch_id, checkpoint_date) DO UPDATE SET
+    quantity = EXCLUDED.quantity,
+    layer_value = EXCLUDED.layer_value,
+    updated_at = NOW()
+"""
+
+# Items of the branch (inventory_batch_balances has a row for every item with ledger rows) -> latest
+# checkpoint by index seek, plus ledger rows after the checkpoint day up to the requested day.
+_STOCK_AS_OF_SQL = """
+WITH cp AS (
+    SELECT items.item_id, c.quantity, c.layer_value
+    FROM (SELECT DISTINCT item_id FROM inventory_batch_balances WHERE branch_id = :branch_id) items
+    CROSS JOIN LATERAL (
+        SELECT quantity, layer_value FROM inventory_daily_checkpoints
+        WHERE item_id = items.item_id AND branch_id = :branch_id AND checkpoint_date <= :cp_date
+        ORDER BY checkpoint_date DESC
+        LIMIT 1
+    ) c
+),
+tail AS (
+    SELECT item_id, SUM(quantity_delta) AS q, SUM(quantity_delta * unit_cost) AS v
+    FROM inventory_ledger
+    WHERE company_id = :company_id AND branch_id = :branch_id
+      AND created_at >= :tail_start AND created_at < :end_ts
+    GROUP BY item_id
+)
+SELECT COALESCE(cp.item_id, tail.item_id) AS item_id,
+       COALESCE(cp.quantity, 0) + COALESCE(tail.q, 0) AS quantity,
+       COALESCE(cp.layer_value, 0) + COALESCE(tail.v, 0) AS layer_value
+FROM cp
+FULL OUTER JOIN tail ON tail.item_id = cp.item_id
+"""
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+def _yesterday_utc() -> date:
+    return datetime.now(timezone.utc).date() - timedelta(days=1)
+
+
+class InventoryCheckpointService:
+    """Build and read inventory_daily_checkpoints."""
+
+    @staticmethod
+    def get_built_through(db: Session, branch_id: UUID, for_update: bool = False) -> Optional[date]:
+        return db.execute(
+            text(
+                "SELECT built_through FROM inventory_checkpoint_progress WHERE branch_id = :branch_id"
+                + (" FOR UPDATE" if for_update else "")
+            ),
+            {"branch_id": str(branch_id)},
+        ).scalar()
+
+    @staticmethod
+    def build_branch(
+        db: Session,
+        company_id: UUID,
+        branch_id: UUID,
+        through: Optional[date] = None,
+    ) -> int:
+        """
+        Write checkpoints for days after built_through up to `through` (default: yesterday, UTC) and
+        advance built_through. Returns checkpoint rows written. Caller commits.
+        """
+        through = min(through or _yesterday_utc(), _yesterday_utc())
+        params = {"company_id": str(company_id), "branch_id": str(branch_id)}
+        # One builder per branch at a time (nightly job vs a manual run)
+        db.execute(text("SELECT pg_advisory_xact_lock(hashtext('inventory_checkpoints:' || :branch_id))"), params)
+        # Row lock: a backdated write (note_ledger_entries) waits for this build and then pulls
+        # built_through back, instead of being overwritten by the final upsert below
+        built_through = InventoryCheckpointService.get_built_through(db, branch_id, for_update=True)
+        if built_through is None:
+            first = db.execute(
+                text("""
+                    SELECT MIN(created_at) FROM inventory_ledger
+                    WHERE company_id = :company_id AND branch_id = :branch_id
+                """),
+                params,
+            ).scalar()
+            start = first.astimezone(timezone.utc).date() if first is not None else through + timedelta(days=1)
+        else:
+            start = built_through + timedelta(days=1)
+        if start > through:
+            written = 0
+        else:
+            written = InventoryCheckpointService._build_range(db, company_id, branch_id, start, through)
+        db.execute(
+            text("""
+                INSERT INTO inventory_checkpoint_progress (branch_id, company_id, built_through, updated_at)
+                VALUES (:branch_id, :company_id, :through, NOW())
+                ON CONFLICT (branch_id) DO UPDATE SET
+                    built_through = GREATEST(inventory_checkpoint_progress.built_through, EXCLUDED.built_through),
+                    updated_at = NOW()
+            """),
+            {**params, "through": through},
+        )
+        return written
+
+    @staticmethod
+    def _build_range(
+        db: Session,
+        company_id: UUID,
+        branch_id: UUID,
+        start: Optional[date],
+        through: date,
+        item_ids: Optional[List[UUID]] = None,
+    ) -> int:
+        """Replace checkpoints of days start..through (start None: from the first ledger row)."""
+        params: Dict[str, Any] = {
+            "company_id": str(company_id),
+            "branch_id": str(branch_id),
+            "start": start or date.min,
+            "start_ts": _day_start(start) if start else datetime.min.replace(tzinfo=timezone.utc),
+            "end_ts": _day_start(through + timedelta(days=1)),
+        }
+        item_scope = ""
+        if item_ids is not None:
+            item_scope = "AND item_id = ANY(CAST(:item_ids AS uuid[]))"
+            params["item_ids"] = [str(i) for i in item_ids]
+        # Stale rows of the range (e.g. after built_through was moved back) must not survive
+        db.execute(
+            text(f"""
+                DELETE FROM inventory_daily_checkpoints
+                WHERE branch_id = :branch_id AND checkpoint_date >= :start {item_scope}
+            """),
+            {k: v for k, v in params.items() if k in ("branch_id", "start", "item_ids")},
+        )
+        result = db.execute(text(_BUILD_SQL.format(item_scope=item_scope)), params)
+        return result.rowcount or 0
+
+    @staticmethod
+    def build_all(db: Session, through: Optional[date] = None) -> Dict[str, int]:
+        """build_branch for every branch, committing per branch. Returns {branch_id: rows written}."""
+        branches = db.execute(text("SELECT id, company_id FROM branches ORDER BY id")).fetchall()
+        written: Dict[str, int] = {}
+        for branch in branches:
+            try:
+                written[str(branch.id)] = InventoryCheckpointService.build_branch(
+                    db, branch.company_id, branch.id, through
+                )
+                db.commit()
+            except Exception:
+                db.rollback()
+                logger.exception("Checkpoint build failed for branch %s", branch.id)
+        return written
+
+    @staticmethod
+    def stock_as_of(
+        db: Session,
+        company_id: UUID,
+        branch_id: UUID,
+        as_of: date,
+    ) -> Dict[UUID, Tuple[float, float]]:
+        """
+        Stock per item at the end of as_of (UTC): {item_id: (quantity, layer_value)}.
+        Items without any ledger row up to as_of are absent.
+        """
+        built_through = InventoryCheckpointService.get_built_through(db, branch_id)
+        cp_date = min(as_of, built_through) if built_through is not None else None
+        params = {
+            "company_id": str(company_id),
+            "branch_id": str(branch_id),
+            "end_ts": _day_start(as_of + timedelta(days=1)),
+        }
+        if cp_date is None:
+            rows = db.execute(
+                text("""
+                    SELECT item_id, SUM(quantity_delta) AS quantity, SUM(quantity_delta * unit_cost) AS layer_value
+                    FROM inventory_ledger
+                    WHERE company_id = :company_id AND branch_id = :branch_id AND created_at < :end_ts
+                    GROUP BY item_id
+                """),
+                params,
+            ).fetchall()
+        else:
+            params["cp_date"] = cp_date
+            params["tail_start"] = _day_start(cp_date + timedelta(days=1))
+            rows = db.execute(text(_STOCK_AS_OF_SQL), params).fetchall()
+        return {r.item_id: (float(r.quantity or 0), float(r.layer_value or 0)) for r in rows}
+
+    @staticmethod
+    def note_ledger_entries(db: Session, entries: Iterable[Any]) -> None:
+        """
+        Backdated ledger rows (created_at on or before a branch's built_through) pull built_through
+        back to the day before, so readers ignore the now stale checkpoints and the next build redoes them.
+        Rows stamped now (the normal case) need nothing.
+        """
+        from app.services.snapshot_service import _ledger_value
+
+        today = datetime.now(timezone.utc).date()
+        earliest: Dict[str, date] = {}
+        for entry in entries:
+            created_at = _ledger_value(entry, "created_at")
+            if created_at is None:
+                continue
+            if isinstance(created_at, datetime):
+                day = (created_at.astimezone(timezone.utc) if created_at.tzinfo else created_at).date()
+            else:
+                day = created_at
+            if day >= today:
+                continue
+            branch_id = str(_ledger_value(entry, "branch_id"))
+            if branch_id not in earliest or day < earliest[branch_id]:
+                earliest[branch_id] = day
+        for branch_id, day in sorted(earliest.items()):
+            db.execute(
+                text("""
+                    UPDATE inventory_checkpoint_progress
+                    SET built_through = :day - 1, updated_at = NOW()
+                    WHERE branch_id = :branch_id AND built_through >= :day
+                """),
+                {"branch_id": branch_id, "day": day},
+            )
+
+    @staticmethod
+    def rebuild_items(
+        db: Session,
+        branch_id: Optional[UUID] = None,
+        item_ids: Optional[List[UUID]] = None,
+    ) -> int:
+        """
+        Recompute checkpoints up to built_through from the ledger (after ledger rows were rewritten),
+        for one branch or all, and/or the given items. Returns rows written. Caller commits.
+        """
+        if item_ids is not None and not item_ids:
+            return 0
+        scope = ""
+        params: Dict[str, Any] = {}
+        if branch_id is not None:
+            scope = "WHERE branch_id = :branch_id"
+            params["branch_id"] = str(branch_id)
+        progress = db.execute(
+            text(f"SELECT branch_id, company_id, built_through FROM inventory_checkpoint_progress {scope}"),
+            params,
+        ).fetchall()
+        written = 0
+        for p in progress:
+            written += InventoryCheckpointService._build_range(
+                db, p.company_id, p.branch_id, None, p.built_through, item_ids
+            )
+        return written
@@ -2,12 +2,12 @@
 Inventory Service - Stock calculation and FEFO allocation
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
-from typing import List, Optional, Dict, Tuple
+from sqlalchemy import func, and_, or_, text
+from typing import Any, List, Optional, Dict, Tuple
 from datetime import date
 from uuid import UUID
 from decimal import Decimal
-from app.models import InventoryLedger, Item, Branch
+from app.models import InventoryBatchBalance, InventoryLedger, Item, Branch
 from app.schemas.inventory import StockBalance, BatchStock, StockAvailability, UnitBreakdown
 from app.services.item_units_helper import get_unit_multiplier_from_item
 
@@ -15,6 +15,44 @@ from app.services.item_units_helper import get_unit_multiplier_from_item
 _LEGACY_UNIT_ALIASES = frozenset({"pair", "pairs", "—", "-", "–", ""})
 
 
+# One statement for the whole invoice: lock the batch balance rows of every invoice item in the
+# branch and return open batches in FEFO order. item_available is the net stock per item (same figure
+# as get_current_stock), so batches that are oversold do not inflate availability. Cost layers of the
+# same batch are consumed oldest first.
+_INVOICE_FEFO_BATCHES_SQL = """
+WITH locked AS (
+    SELECT item_id, batch_number, expiry_date, unit_cost, quantity, first_ledger_entry_id, first_received_at
+    FROM inventory_batch_balances
+    WHERE branch_id = :branch_id
+      AND item_id = ANY(CAST(:item_ids AS uuid[]))
+      {expiry_filter}
+    FOR UPDATE
+),
+batches AS (
+    SELECT *, SUM(quantity) OVER (PARTITION BY item_id) AS item_available
+    FROM locked
+)
+SELECT item_id, batch_number, expiry_date, unit_cost, quantity AS available,
+       first_ledger_entry_id AS ledger_entry_id, item_available
+FROM batches
+WHERE quantity > 0
+ORDER BY item_id, expiry_date ASC NULLS LAST, batch_number ASC NULLS LAST, first_received_at ASC
+"""
+
+
+class InsufficientStockError(ValueError):
+    """Raised by allocate_invoice_fefo when a line cannot be covered; carries the line figures."""
+
+    def __init__(self, line_index: int, item_id: UUID, available: float, required: float):
+        self.line_index = line_index
+        self.item_id = item_id
+        self.available = available
+        self.required = required
+        super().__init__(
+            f"Insufficient stock for item {item_id}. Available: {available}, Required: {required}"
+        )
+
+
 def _unit_for_display(unit: Optional[str], fallback: str = "piece") -> str:
     """Return a safe display unit label; never show legacy values like 'pair'."""
     u = (unit or "").strip().lower()
@@ -57,30 +95,32 @@ class InventoryService:
         branch_id: UUID
     ) -> List[Dict]:
         """
-        Get stock breakdown by batch (FEFO-ready)
+        Get stock breakdown by batch (FEFO-ready), read from inventory_batch_balances.
+        unit_cost is the quantity-weighted cost across the batch's cost layers.
         
         Returns:
             List of dicts with batch_number, expiry_date, quantity, unit_cost, total_cost
         """
+        quantity = func.sum(InventoryBatchBalance.quantity)
+        total_cost = func.sum(InventoryBatchBalance.quantity * InventoryBatchBalance.unit_cost)
         results = db.query(
-            InventoryLedger.batch_number,
-            InventoryLedger.expiry_date,
-            func.sum(InventoryLedger.quantity_delta).label('quantity'),
-            func.avg(InventoryLedger.unit_cost).label('unit_cost'),
-            func.sum(InventoryLedger.total_cost).label('total_cost')
+            InventoryBatchBalance.batch_number,
+            InventoryBatchBalance.expiry_date,
+            quantity.label('quantity'),
+            total_cost.label('total_cost')
         ).filter(
             and_(
-                InventoryLedger.item_id == item_id,
-                InventoryLedger.branch_id == branch_id
+                InventoryBatchBalance.item_id == item_id,
+                InventoryBatchBalance.branch_id == branch_id
             )
         ).group_by(
-            InventoryLedger.batch_number,
-            InventoryLedger.expiry_date
+            InventoryBatchBalance.batch_number,
+            InventoryBatchBalance.expiry_date
         ).having(
-            func.sum(InventoryLedger.quantity_delta) > 0
+            quantity > 0
         ).order_by(
-            InventoryLedger.expiry_date.asc().nulls_last(),  # FEFO: earliest expiry first
-            InventoryLedger.batch_number.asc()
+            InventoryBatchBalance.expiry_date.asc().nulls_last(),  # FEFO: earliest expiry first
+            InventoryBatchBalance.batch_number.asc()
         ).all()
         
         return [
@@ -88,12 +128,62 @@ class InventoryService:
                 "batch_number": r.batch_number,
                 "expiry_date": r.expiry_date,
                 "quantity": float(r.quantity),
-                "unit_cost": float(r.unit_cost),
+                "unit_cost": float(r.total_cost) / float(r.quantity),
                 "total_cost": float(r.total_cost)
             }
             for r in results
         ]
 
+    @staticmethod
+    def get_fefo_first_batches(
+        db: Session,
+        item_ids: List[UUID],
+        branch_id: UUID
+    ) -> Dict[UUID, Dict]:
+        """
+        First FEFO batch per item in one query (same grouping, order and dict shape as
+        get_stock_by_batch()[0]). Items without open batches are absent from the result.
+        """
+        if not item_ids:
+            return {}
+        quantity = func.sum(InventoryBatchBalance.quantity)
+        total_cost = func.sum(InventoryBatchBalance.quantity * InventoryBatchBalance.unit_cost)
+        results = db.query(
+            InventoryBatchBalance.item_id,
+            InventoryBatchBalance.batch_number,
+            InventoryBatchBalance.expiry_date,
+            quantity.label('quantity'),
+            total_cost.label('total_cost')
+        ).filter(
+            and_(
+                InventoryBatchBalance.item_id.in_(item_ids),
+                InventoryBatchBalance.branch_id == branch_id
+            )
+        ).group_by(
+            InventoryBatchBalance.item_id,
+            InventoryBatchBalance.batch_number,
+            InventoryBatchBalance.expiry_date
+        ).having(
+            quantity > 0
+        ).order_by(
+            InventoryBatchBalance.item_id,
+            InventoryBatchBalance.expiry_date.asc().nulls_last(),
+            InventoryBatchBalance.batch_number.asc()
+        ).all()
+
+        first: Dict[UUID, Dict] = {}
+        for r in results:
+            if r.item_id in first:
+                continue
+            first[r.item_id] = {
+                "batch_number": r.batch_number,
+                "expiry_date": r.expiry_date,
+                "quantity": float(r.quantity),
+                "unit_cost": float(r.total_cost) / float(r.quantity),
+                "total_cost": float(r.total_cost)
+            }
+        return first
+
     @staticmethod
     def get_stock_availability(
         db: Session,
@@ -180,7 +270,7 @@ class InventoryService:
         unit_name: str
     ) -> List[Dict]:
         """
-        Allocate stock using FEFO (First Expiry First Out).
+        Allocate stock using FEFO (First Expiry First Out) from inventory_batch_balances.
         quantity_needed is in base (retail) units (e.g. 20 for 20 tablets).
         """
         item = db.query(Item).filter(Item.id == item_id).first()
@@ -195,26 +285,21 @@ class InventoryService:
             return []
         
         batches = db.query(
-            InventoryLedger.batch_number,
-            InventoryLedger.expiry_date,
-            InventoryLedger.unit_cost,
-            InventoryLedger.id.label('ledger_entry_id'),
-            func.sum(InventoryLedger.quantity_delta).label('available')
+            InventoryBatchBalance.batch_number,
+            InventoryBatchBalance.expiry_date,
+            InventoryBatchBalance.unit_cost,
+            InventoryBatchBalance.first_ledger_entry_id.label('ledger_entry_id'),
+            InventoryBatchBalance.quantity.label('available')
         ).filter(
             and_(
-                InventoryLedger.item_id == item_id,
-                InventoryLedger.branch_id == branch_id
+                InventoryBatchBalance.item_id == item_id,
+                InventoryBatchBalance.branch_id == branch_id,
+                InventoryBatchBalance.quantity > 0
             )
-        ).group_by(
-            InventoryLedger.batch_number,
-            InventoryLedger.expiry_date,
-            InventoryLedger.unit_cost,
-            InventoryLedger.id
-        ).having(
-            func.sum(InventoryLedger.quantity_delta) > 0
         ).order_by(
-            InventoryLedger.expiry_date.asc().nulls_last(),  # FEFO
-            InventoryLedger.batch_number.asc()
+            InventoryBatchBalance.expiry_date.asc().nulls_last(),  # FEFO
+            InventoryBatchBalance.batch_number.asc(),
+            InventoryBatchBalance.first_received_at.asc()
         ).all()
         
         allocations = []
@@ -255,57 +340,48 @@ class InventoryService:
         FEFO allocation with row-level lock (FOR UPDATE) for branch transfer.
         Call within a transaction.
 
-        Ledger aggregation (mandatory for correctness):
-        - Available stock per batch = SUM(quantity_delta) over ALL ledger rows for that batch
-          (positive = in, negative = out; returns/reversals are positive, sales/transfers negative).
-        - We lock ALL ledger rows for (item_id, branch_id) with non-expired batches, then
-          aggregate SUM(quantity_delta) GROUP BY (batch_number, expiry_date, unit_cost)
-          HAVING SUM(quantity_delta) > 0. Allocation uses this true available balance only.
+        Reads inventory_batch_balances (running SUM(quantity_delta) per
+        (batch_number, expiry_date, unit_cost), maintained by SnapshotService with every ledger write):
+        - Locks the open batch rows for (item_id, branch_id) so concurrent allocations serialize.
         - Expired batches: exclude_expired=True → only rows where expiry_date IS NULL OR expiry_date >= today.
         - FEFO sort: expiry_date ASC NULLS LAST (null expiry sorts last; earliest expiry first).
 
         Returns list of { batch_number, expiry_date, quantity, unit_cost } in FEFO order.
         """
-        from collections import defaultdict
         from datetime import date as date_type
 
-        q = db.query(InventoryLedger).filter(
+        q = db.query(InventoryBatchBalance).filter(
             and_(
-                InventoryLedger.item_id == item_id,
-                InventoryLedger.branch_id == branch_id,
+                InventoryBatchBalance.item_id == item_id,
+                InventoryBatchBalance.branch_id == branch_id,
+                InventoryBatchBalance.quantity > 0,
             )
         )
         if exclude_expired:
             today = date_type.today()
             q = q.filter(
                 or_(
-                    InventoryLedger.expiry_date.is_(None),
-                    InventoryLedger.expiry_date >= today,
+                    InventoryBatchBalance.expiry_date.is_(None),
+                    InventoryBatchBalance.expiry_date >= today,
                 )
             )
         rows = (
             q.order_by(
-                InventoryLedger.expiry_date.asc().nulls_last(),
-                InventoryLedger.batch_number.asc().nulls_last(),
+                InventoryBatchBalance.expiry_date.asc().nulls_last(),
+                InventoryBatchBalance.batch_number.asc().nulls_last(),
+                InventoryBatchBalance.first_received_at.asc(),
             )
             .with_for_update()
             .all()
         )
-        # Aggregate: SUM(quantity_delta) per (batch_number, expiry_date, unit_cost); HAVING sum > 0
-        batch_totals = defaultdict(lambda: {"quantity": 0.0, "unit_cost": None})
-        for r in rows:
-            key = (r.batch_number, r.expiry_date, float(r.unit_cost))
-            batch_totals[key]["quantity"] += float(r.quantity_delta)
-            batch_totals[key]["unit_cost"] = float(r.unit_cost)
-        # FEFO order: same as row order (expiry ASC NULLS LAST); only batches with positive balance
-        seen = set()
-        ordered_keys = []
-        for r in rows:
-            key = (r.batch_number, r.expiry_date, float(r.unit_cost))
-            if key not in seen:
-                seen.add(key)
-                if batch_totals[key]["quantity"] > 0:
-                    ordered_keys.append(key)
+        batch_totals = {
+            (r.batch_number, r.expiry_date, float(r.unit_cost)): {
+                "quantity": float(r.quantity),
+                "unit_cost": float(r.unit_cost),
+            }
+            for r in rows
+        }
+        ordered_keys = [(r.batch_number, r.expiry_date, float(r.unit_cost)) for r in rows]
         allocations = []
         remaining = float(quantity_needed_base)
         for key in ordered_keys:
@@ -329,6 +405,106 @@ class InventoryService:
             )
         return allocations
 
+    @staticmethod
+    def allocate_invoice_fefo(
+        db: Session,
+        branch_id: UUID,
+        lines: List[Dict[str, Any]],
+        exclude_expired: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        FEFO allocation for every line of a document in a fixed number of queries.
+        Call within a transaction.
+
+        lines: dicts with item_id, quantity, unit_name and optionally item (already-loaded Item).
+        Items not passed in are loaded with one IN query. Open batches for all items are locked
+        (FOR UPDATE) and loaded with one query, then lines are allocated in memory in order, so
+        the same item on several lines draws down one shared pool. Batches come from
+        inventory_batch_balances (see allocate_stock_fefo_with_lock).
+
+        Returns one dict per line, same order: { quantity_base, allocations } where allocations
+        has the allocate_stock_fefo shape (batch_number, expiry_date, quantity, unit_cost,
+        ledger_entry_id). Raises ValueError for unknown item/unit and InsufficientStockError
+        when net stock for the item (expired excluded if exclude_expired) is below what is required.
+        """
+        if not lines:
+            return []
+
+        items_by_id: Dict[str, Item] = {}
+        for line in lines:
+            if line.get("item") is not None:
+                items_by_id[str(line["item_id"])] = line["item"]
+        missing = {str(line["item_id"]) for line in lines} - set(items_by_id)
+        if missing:
+            for item in db.query(Item).filter(Item.id.in_(list(missing))).all():
+                items_by_id[str(item.id)] = item
+
+        required_base: List[float] = []
+        for line in lines:
+            item = items_by_id.get(str(line["item_id"]))
+            if not item:
+                raise ValueError(f"Item {line['item_id']} not found")
+            mult = get_unit_multiplier_from_item(item, line["unit_name"])
+            if mult is None:
+                raise ValueError(f"Unit '{line['unit_name']}' not found for item {line['item_id']}")
+            required_base.append(float(line["quantity"]) * float(mult))
+
+        expiry_filter = "AND (expiry_date IS NULL OR expiry_date >= CURRENT_DATE)" if exclude_expired else ""
+        rows = db.execute(
+            text(_INVOICE_FEFO_BATCHES_SQL.format(expiry_filter=expiry_filter)),
+            {"branch_id": str(branch_id), "item_ids": sorted(items_by_id)},
+        ).fetchall()
+
+        # Per item: remaining net stock and FEFO-ordered batch balances (mutated as lines allocate)
+        pools: Dict[str, Dict[str, Any]] = {}
+        for r in rows:
+            pool = pools.setdefault(
+                str(r.item_id), {"available": float(r.item_available), "batches": []}
+            )
+            pool["batches"].append({
+                "batch_number": r.batch_number,
+                "expiry_date": r.expiry_date,
+                "remaining": float(r.available),
+                "unit_cost": float(r.unit_cost),
+                "ledger_entry_id": r.ledger_entry_id,
+            })
+
+        results: List[Dict[str, Any]] = []
+        for index, line in enumerate(lines):
+            quantity_needed = required_base[index]
+            pool = pools.get(str(line["item_id"]), {"available": 0.0, "batches": []})
+            if quantity_needed <= 0:
+                results.append({"quantity_base": quantity_needed, "allocations": []})
+                continue
+            if pool["available"] < quantity_needed:
+                raise InsufficientStockError(
+                    index, line["item_id"], max(0.0, pool["available"]), quantity_needed
+                )
+            allocations = []
+            remaining = quantity_needed
+            for batch in pool["batches"]:
+                if remaining <= 0:
+                    break
+                if batch["remaining"] <= 0:
+                    continue
+                take = min(remaining, batch["remaining"])
+                allocations.append({
+                    "batch_number": batch["batch_number"],
+                    "expiry_date": batch["expiry_date"],
+                    "quantity": take,
+                    "unit_cost": batch["unit_cost"],
+                    "ledger_entry_id": batch["ledger_entry_id"],
+                })
+                batch["remaining"] -= take
+                remaining -= take
+            if remaining > 0:
+                raise InsufficientStockError(
+                    index, line["item_id"], quantity_needed - remaining, quantity_needed
+                )
+            pool["available"] -= quantity_needed
+            results.append({"quantity_base": quantity_needed, "allocations": allocations})
+        return results
+
     @staticmethod
     def convert_to_base_units(
         db: Session,
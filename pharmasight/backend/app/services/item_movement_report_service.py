@@ -4,10 +4,10 @@ No changes to ledger or any write flows.
 """
 from datetime import date, datetime, timedelta, timezone
 from decimal import Decimal
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from uuid import UUID
 
-from sqlalchemy import func
+from sqlalchemy import and_, func, or_
 from sqlalchemy.orm import Session
 
 from app.models import (
@@ -33,6 +33,23 @@ from app.schemas.reports import (
     ItemMovementRow,
 )
 from app.schemas.reports import ItemBatchInfo
+from app.services import company_config_cache
+
+# Ledger rows per keyset query when streaming a report
+MOVEMENT_CHUNK_SIZE = 2000
+
+_LEDGER_COLUMNS = (
+    InventoryLedger.id,
+    InventoryLedger.created_at,
+    InventoryLedger.quantity_delta,
+    InventoryLedger.reference_type,
+    InventoryLedger.reference_id,
+    InventoryLedger.document_number,
+    InventoryLedger.notes,
+    InventoryLedger.unit_cost,
+    InventoryLedger.batch_number,
+    InventoryLedger.expiry_date,
+)
 
 
 # Default timezone for date boundaries (UTC)
@@ -41,7 +58,14 @@ def _midnight_utc(d: date) -> datetime:
 
 
 def _get_report_display_options(db: Session, company_id: UUID) -> ItemMovementDisplayOptions:
-    """Read company_settings.report_settings.item_movement; default both to False."""
+    """Read company_settings.report_settings.item_movement (cached per company_config_cache); default both to False."""
+    options = company_config_cache.get(
+        db, company_id, "item_movement_display", lambda: _load_report_display_options(db, company_id)
+    )
+    return options.model_copy()
+
+
+def _load_report_display_options(db: Session, company_id: UUID) -> ItemMovementDisplayOptions:
     row = db.query(CompanySetting).filter(
         CompanySetting.company_id == company_id,
         CompanySetting.setting_key == "report_settings",
@@ -66,18 +90,28 @@ def _resolve_references_batch(
 ) -> Dict[Tuple[str, UUID], Dict[str, Any]]:
     """
     Resolve (reference_type, reference_id) to document_type and reference string.
+    One IN query per reference type (purchase invoices joined to their supplier).
     Returns map (reference_type, reference_id) -> { "document_type": str, "reference": str }.
     """
     result: Dict[Tuple[str, UUID], Dict[str, Any]] = {}
 
     # sales_invoice -> Sale, invoice_no (+ customer_name for cash only)
-    for rid in refs_by_type.get("sales_invoice") or []:
-        inv = db.query(SalesInvoice).filter(SalesInvoice.id == rid).first()
+    ids = refs_by_type.get("sales_invoice") or []
+    found = {}
+    if ids:
+        found = {
+            r.id: r
+            for r in db.query(
+                SalesInvoice.id, SalesInvoice.invoice_no, SalesInvoice.customer_name, SalesInvoice.payment_mode
+            ).filter(SalesInvoice.id.in_(ids))
+        }
+    for rid in ids:
+        inv = found.get(rid)
         if inv:
             ref_parts = [inv.invoice_no or ""]
             if inv.customer_name:
                 ref_parts.append(str(inv.customer_name))
-            if getattr(inv, "payment_mode", None):
+            if inv.payment_mode:
                 ref_parts.append(str(inv.payment_mode))
             customer_name = str(inv.customer_name).strip() if inv.customer_name else None
             result[("sales_invoice", rid)] = {
@@ -88,63 +122,60 @@ def _resolve_references_batch(
         else:
             result[("sales_invoice", rid)] = {"document_type": "Sale", "reference": "", "customer_name": None}
 
-    # grn -> GRN, grn_no
-    for rid in refs_by_type.get("grn") or []:
-        grn = db.query(GRN).filter(GRN.id == rid).first()
-        result[("grn", rid)] = {
-            "document_type": "GRN",
-            "reference": grn.grn_no if grn else "",
-        }
-
     # purchase_invoice -> Supplier Invoice, invoice_number, supplier_name
-    for rid in refs_by_type.get("purchase_invoice") or []:
-        inv = db.query(SupplierInvoice).filter(SupplierInvoice.id == rid).first()
+    ids = refs_by_type.get("purchase_invoice") or []
+    found = {}
+    if ids:
+        found = {
+            r.id: r
+            for r in db.query(
+                SupplierInvoice.id,
+                SupplierInvoice.invoice_number,
+                Supplier.id.label("supplier_id"),
+                Supplier.name.label("supplier_name"),
+            )
+            .outerjoin(Supplier, Supplier.id == SupplierInvoice.supplier_id)
+            .filter(SupplierInvoice.id.in_(ids))
+        }
+    for rid in ids:
+        inv = found.get(rid)
         supplier_name = None
         if inv and inv.supplier_id:
-            sup = db.query(Supplier).filter(Supplier.id == inv.supplier_id).first()
-            supplier_name = (sup.name or "").strip() if sup else None
+            supplier_name = (inv.supplier_name or "").strip()
         result[("purchase_invoice", rid)] = {
             "document_type": "Supplier Invoice",
             "reference": inv.invoice_number if inv else "",
             "supplier_name": supplier_name,
         }
 
-    # branch_transfer -> Branch Transfer Out, transfer_number
-    for rid in refs_by_type.get("branch_transfer") or []:
-        t = db.query(BranchTransfer).filter(BranchTransfer.id == rid).first()
-        result[("branch_transfer", rid)] = {
-            "document_type": "Branch Transfer Out",
-            "reference": t.transfer_number if t else "",
-        }
-
-    # branch_receipt -> Branch Transfer In, receipt_number
-    for rid in refs_by_type.get("branch_receipt") or []:
-        r = db.query(BranchReceipt).filter(BranchReceipt.id == rid).first()
-        result[("branch_receipt", rid)] = {
-            "document_type": "Branch Transfer In",
-            "reference": r.receipt_number if r else "",
-        }
-
-    # STOCK_TAKE -> Stock Take, session_code
-    for rid in refs_by_type.get("STOCK_TAKE") or []:
-        s = db.query(StockTakeSession).filter(StockTakeSession.id == rid).first()
-        result[("STOCK_TAKE", rid)] = {
-            "document_type": "Stock Take",
-            "reference": s.session_code if s else str(rid),
-        }
-
-    # credit_note -> Credit Note, credit_note_no
-    for rid in refs_by_type.get("credit_note") or []:
-        cn = db.query(CreditNote).filter(CreditNote.id == rid).first()
-        result[("credit_note", rid)] = {
-            "document_type": "Credit Note",
-            "reference": cn.credit_note_no if cn else "",
-        }
+    # Types resolved to a single document number column: (model, number column, document_type)
+    simple_types = {
+        "grn": (GRN, GRN.grn_no, "GRN"),
+        "branch_transfer": (BranchTransfer, BranchTransfer.transfer_number, "Branch Transfer Out"),
+        "branch_receipt": (BranchReceipt, BranchReceipt.receipt_number, "Branch Transfer In"),
+        "STOCK_TAKE": (StockTakeSession, StockTakeSession.session_code, "Stock Take"),
+        "credit_note": (CreditNote, CreditNote.credit_note_no, "Credit Note"),
+    }
+    for ref_type, (model, number_col, document_type) in simple_types.items():
+        ids = refs_by_type.get(ref_type) or []
+        if not ids:
+            continue
+        numbers = dict(db.query(model.id, number_col).filter(model.id.in_(ids)).all())
+        for rid in ids:
+            if rid in numbers:
+                reference = numbers[rid]
+            else:
+                # Stock take falls back to the session id; the others to an empty reference
+                reference = str(rid) if ref_type == "STOCK_TAKE" else ""
+            result[(ref_type, rid)] = {"document_type": document_type, "reference": reference}
 
     # supplier_return -> Supplier Return (no doc number column; use id prefix for legacy)
-    for rid in refs_by_type.get("supplier_return") or []:
-        sr = db.query(SupplierReturn).filter(SupplierReturn.id == rid).first()
-        ref = f"PR-{str(rid).replace('-', '')[:8].upper()}" if sr else str(rid)
+    ids = refs_by_type.get("supplier_return") or []
+    existing = set()
+    if ids:
+        existing = {r.id for r in db.query(SupplierReturn.id).filter(SupplierReturn.id.in_(ids))}
+    for rid in ids:
+        ref = f"PR-{str(rid).replace('-', '')[:8].upper()}" if rid in existing else str(rid)
         result[("supplier_return", rid)] = {
             "document_type": "Supplier Return",
             "reference": ref,
@@ -170,16 +201,80 @@ def _get_sales_unit_price_by_invoice(
     return {r.sales_invoice_id: (Decimal(str(r.unit_price_exclusive)) if r.unit_price_exclusive is not None else None) for r in rows}
 
 
-def build_item_movement_report(
+def _iter_ledger_chunks(
+    db: Session,
+    filters: List[Any],
+    chunk_size: int = MOVEMENT_CHUNK_SIZE,
+) -> Iterator[List[Any]]:
+    """
+    Ledger rows matching filters in (created_at, id) order, chunk_size rows per query.
+    Keyset pagination: each query continues after the last row of the previous chunk.
+    """
+    last = None
+    while True:
+        q = db.query(*_LEDGER_COLUMNS).filter(*filters)
+        if last is not None:
+            last_ts, last_id = last
+            q = q.filter(
+                or_(
+                    InventoryLedger.created_at > last_ts,
+                    and_(InventoryLedger.created_at == last_ts, InventoryLedger.id > last_id),
+                )
+            )
+        rows = q.order_by(InventoryLedger.created_at.asc(), InventoryLedger.id.asc()).limit(chunk_size).all()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < chunk_size:
+            return
+        last = (rows[-1].created_at, rows[-1].id)
+
+
+def _new_refs_by_type(
+    rows: List[Any],
+    ref_map: Dict[Tuple[str, UUID], Dict[str, Any]],
+) -> Dict[str, List[UUID]]:
+    """Reference ids per type in rows that are not yet in ref_map (deduplicated, in order)."""
+    refs_by_type: Dict[str, List[UUID]] = {}
+    for row in rows:
+        rt = (row.reference_type or "").strip()
+        if rt and row.reference_id and rt not in ("MANUAL_ADJUSTMENT", "OPENING_BALANCE"):
+            if (rt, row.reference_id) not in ref_map:
+                refs_by_type.setdefault(rt, []).append(row.reference_id)
+    return {k: list(dict.fromkeys(v)) for k, v in refs_by_type.items()}
+
+
+def _check_report_scope(db: Session, company_id: UUID, branch_id: UUID, item_id: UUID) -> Tuple[Company, Branch, Item]:
+    company = db.query(Company).filter(Company.id == company_id).first()
+    branch = db.query(Branch).filter(Branch.id == branch_id).first()
+    item = db.query(Item).filter(Item.id == item_id, Item.company_id == company_id).first()
+    if not item:
+        raise ValueError("item_not_found")
+    if not company or not branch or branch.company_id != company_id:
+        raise ValueError("branch_or_company_not_found")
+    return company, branch, item
+
+
+def _expiry_as_date(expiry: Any) -> Any:
+    if expiry is not None and hasattr(expiry, "date") and callable(getattr(expiry, "date", None)):
+        return expiry.date()
+    return expiry
+
+
+def open_item_movement_report(
     db: Session,
     company_id: UUID,
     branch_id: UUID,
     item_id: UUID,
     start_date: date,
     end_date: date,
-) -> ItemMovementReportResponse:
+    chunk_size: int = MOVEMENT_CHUNK_SIZE,
+) -> Tuple[ItemMovementReportResponse, Iterator[ItemMovementRow]]:
     """
-    Build branch-scoped item movement report from inventory_ledger only.
+    Validate and start a branch-scoped item movement report from inventory_ledger only.
+    Returns (header, movement rows): header has the synthetic Opening Balance row as its only row
+    (closing_balance = opening); movement rows are generated lazily in date order, chunk by chunk,
+    each carrying its running balance. Raises ValueError before any row is read.
     Date filter: created_at >= start_ts AND created_at < end_ts
     where start_ts = start_date 00:00:00 UTC, end_ts = end_date + 1 day 00:00:00 UTC.
     """
@@ -188,130 +283,21 @@ def build_item_movement_report(
     # end_ts = day after end_date at 00:00:00
     end_ts = end_ts + timedelta(days=1)
 
-    company = db.query(Company).filter(Company.id == company_id).first()
-    branch = db.query(Branch).filter(Branch.id == branch_id).first()
-    item = db.query(Item).filter(Item.id == item_id, Item.company_id == company_id).first()
-    if not item:
-        raise ValueError("item_not_found")
-    if not company or not branch or branch.company_id != company_id:
-        raise ValueError("branch_or_company_not_found")
-
+    company, branch, item = _check_report_scope(db, company_id, branch_id, item_id)
     display_options = _get_report_display_options(db, company_id)
 
-    # Opening balance: SUM(quantity_delta) where created_at < start_ts
-    opening_row = db.query(func.coalesce(func.sum(InventoryLedger.quantity_delta), 0)).filter(
+    scope = [
         InventoryLedger.company_id == company_id,
         InventoryLedger.branch_id == branch_id,
         InventoryLedger.item_id == item_id,
-        InventoryLedger.created_at < start_ts,
+    ]
+    # Opening balance: SUM(quantity_delta) where created_at < start_ts
+    opening_row = db.query(func.coalesce(func.sum(InventoryLedger.quantity_delta), 0)).filter(
+        *scope, InventoryLedger.created_at < start_ts,
     ).scalar()
     opening_balance = Decimal(str(opening_row or 0))
 
-    # Movement rows: created_at >= start_ts AND created_at < end_ts, ORDER BY created_at ASC, id ASC
-    ledger_rows = (
-        db.query(InventoryLedger)
-        .filter(
-            InventoryLedger.company_id == company_id,
-            InventoryLedger.branch_id == branch_id,
-            InventoryLedger.item_id == item_id,
-            InventoryLedger.created_at >= start_ts,
-            InventoryLedger.created_at < end_ts,
-        )
-        .order_by(InventoryLedger.created_at.asc(), InventoryLedger.id.asc())
-        .all()
-    )
-
-    # Collect reference_type + reference_id for batch resolution
-    refs_by_type: Dict[str, List[UUID]] = {}
-    for row in ledger_rows:
-        rt = (row.reference_type or "").strip()
-        if rt and row.reference_id and rt not in ("MANUAL_ADJUSTMENT", "OPENING_BALANCE"):
-            refs_by_type.setdefault(rt, []).append(row.reference_id)
-    # Deduplicate per type
-    for k in refs_by_type:
-        refs_by_type[k] = list(dict.fromkeys(refs_by_type[k]))
-
-    ref_map = _resolve_references_batch(db, refs_by_type)
-    sales_invoice_ids = refs_by_type.get("sales_invoice") or []
-    sales_price_map = _get_sales_unit_price_by_invoice(db, item_id, sales_invoice_ids)
-
-    # Build output rows: synthetic opening row first, then ledger rows with running balance
-    rows_out: List[ItemMovementRow] = []
-    running = opening_balance
-
-    # First row: synthetic Opening Balance
-    rows_out.append(ItemMovementRow(
-        date=start_ts,
-        document_type="Opening Balance",
-        reference="",
-        qty_in=Decimal("0"),
-        qty_out=Decimal("0"),
-        running_balance=opening_balance,
-        batch_number=None,
-        expiry_date=None,
-        party_name=None,
-        unit_price_or_cost=None,
-    ))
-
-    for row in ledger_rows:
-        qty_delta = Decimal(str(row.quantity_delta or 0))
-        if qty_delta > 0:
-            qty_in, qty_out = qty_delta, Decimal("0")
-        else:
-            qty_in, qty_out = Decimal("0"), abs(qty_delta)
-        running += qty_delta
-
-        rt = (row.reference_type or "").strip()
-        party_name = None
-        unit_price_or_cost = None
-        if rt == "MANUAL_ADJUSTMENT":
-            doc_type, ref = "Adjustment", (row.notes or "Adjustment").strip() or "Adjustment"
-            party_name = "Stock adjustment"
-        elif rt == "OPENING_BALANCE":
-            doc_type, ref = "Opening Balance", ""
-        elif rt == "BATCH_QUANTITY_CORRECTION":
-            doc_type, ref = "Quantity correction", (row.notes or "Batch quantity correction").strip() or "Batch quantity correction"
-            party_name = "Stock adjustment"
-        else:
-            info = ref_map.get((rt, row.reference_id)) if row.reference_id else None
-            doc_type = (info or {}).get("document_type", rt or "—")
-            # Prefer ledger.document_number when present (faster, no join); fall back to resolved reference
-            ref = (getattr(row, "document_number", None) or "").strip() or (info or {}).get("reference", "")
-            if doc_type == "Sale":
-                party_name = (info or {}).get("customer_name") or ""
-                unit_price_or_cost = sales_price_map.get(row.reference_id) if row.reference_id else None
-            elif doc_type == "Supplier Invoice":
-                party_name = (info or {}).get("supplier_name") or ""
-                unit_price_or_cost = Decimal(str(row.unit_cost)) if row.unit_cost is not None else None
-            elif doc_type == "Credit Note":
-                party_name = "Customer return"
-                unit_price_or_cost = Decimal(str(row.unit_cost)) if row.unit_cost is not None else None
-            elif doc_type == "Supplier Return":
-                party_name = "Supplier return"
-                unit_price_or_cost = Decimal(str(row.unit_cost)) if row.unit_cost is not None else None
-            elif doc_type == "Stock Take":
-                party_name = "Stock take"
-                unit_price_or_cost = None
-
-        expiry = row.expiry_date
-        if expiry is not None and hasattr(expiry, "date") and callable(getattr(expiry, "date", None)):
-            expiry = expiry.date()
-        rows_out.append(ItemMovementRow(
-            date=row.created_at,
-            document_type=doc_type,
-            reference=ref or "",
-            qty_in=qty_in,
-            qty_out=qty_out,
-            running_balance=running,
-            batch_number=row.batch_number if display_options.show_batch_number else None,
-            expiry_date=expiry if display_options.show_expiry_date else None,
-            party_name=party_name or None,
-            unit_price_or_cost=unit_price_or_cost,
-        ))
-
-    closing_balance = running
-
-    return ItemMovementReportResponse(
+    header = ItemMovementReportResponse(
         company_name=company.name or "",
         branch_name=branch.name or "",
         item_name=item.name or "",
@@ -320,10 +306,109 @@ def build_item_movement_report(
         end_date=end_date,
         display_options=display_options,
         opening_balance=opening_balance,
-        closing_balance=closing_balance,
-        rows=rows_out,
+        closing_balance=opening_balance,
+        rows=[
+            # First row: synthetic Opening Balance
+            ItemMovementRow(
+                date=start_ts,
+                document_type="Opening Balance",
+                reference="",
+                qty_in=Decimal("0"),
+                qty_out=Decimal("0"),
+                running_balance=opening_balance,
+                batch_number=None,
+                expiry_date=None,
+                party_name=None,
+                unit_price_or_cost=None,
+            )
+        ],
     )
 
+    def movement_rows() -> Iterator[ItemMovementRow]:
+        running = opening_balance
+        ref_map: Dict[Tuple[str, UUID], Dict[str, Any]] = {}
+        sales_price_map: Dict[UUID, Optional[Decimal]] = {}
+        # Movement rows: created_at >= start_ts AND created_at < end_ts, ORDER BY created_at ASC, id ASC
+        filters = scope + [InventoryLedger.created_at >= start_ts, InventoryLedger.created_at < end_ts]
+        for chunk in _iter_ledger_chunks(db, filters, chunk_size):
+            new_refs = _new_refs_by_type(chunk, ref_map)
+            ref_map.update(_resolve_references_batch(db, new_refs))
+            sales_price_map.update(_get_sales_unit_price_by_invoice(db, item_id, new_refs.get("sales_invoice") or []))
+
+            for row in chunk:
+                qty_delta = Decimal(str(row.quantity_delta or 0))
+                if qty_delta > 0:
+                    qty_in, qty_out = qty_delta, Decimal("0")
+                else:
+                    qty_in, qty_out = Decimal("0"), abs(qty_delta)
+                running += qty_delta
+
+                rt = (row.reference_type or "").strip()
+                party_name = None
+                unit_price_or_cost = None
+                if rt == "MANUAL_ADJUSTMENT":
+                    doc_type, ref = "Adjustment", (row.notes or "Adjustment").strip() or "Adjustment"
+                    party_name = "Stock adjustment"
+                elif rt == "OPENING_BALANCE":
+                    doc_type, ref = "Opening Balance", ""
+                elif rt == "BATCH_QUANTITY_CORRECTION":
+                    doc_type, ref = "Quantity correction", (row.notes or "Batch quantity correction").strip() or "Batch quantity correction"
+                    party_name = "Stock adjustment"
+                else:
+                    info = ref_map.get((rt, row.reference_id)) if row.reference_id else None
+                    doc_type = (info or {}).get("document_type", rt or "—")
+                    # Prefer ledger.document_number when present (faster, no join); fall back to resolved reference
+                    ref = (row.document_number or "").strip() or (info or {}).get("reference", "")
+                    if doc_type == "Sale":
+                        party_name = (info or {}).get("customer_name") or ""
+                        unit_price_or_cost = sales_price_map.get(row.reference_id) if row.reference_id else None
+                    elif doc_type == "Supplier Invoice":
+                        party_name = (info or {}).get("supplier_name") or ""
+                        unit_price_or_cost = Decimal(str(row.unit_cost)) if row.unit_cost is not None else None
+                    elif doc_type == "Credit Note":
+                        party_name = "Customer return"
+                        unit_price_or_cost = Decimal(str(row.unit_cost)) if row.unit_cost is not None else None
+                    elif doc_type == "Supplier Return":
+                        party_name = "Supplier return"
+                        unit_price_or_cost = Decimal(str(row.unit_cost)) if row.unit_cost is not None else None
+                    elif doc_type == "Stock Take":
+                        party_name = "Stock take"
+                        unit_price_or_cost = None
+
+                yield ItemMovementRow(
+                    date=row.created_at,
+                    document_type=doc_type,
+                    reference=ref or "",
+                    qty_in=qty_in,
+                    qty_out=qty_out,
+                    running_balance=running,
+                    batch_number=row.batch_number if display_options.show_batch_number else None,
+                    expiry_date=_expiry_as_date(row.expiry_date) if display_options.show_expiry_date else None,
+                    party_name=party_name or None,
+                    unit_price_or_cost=unit_price_or_cost,
+                )
+
+    return header, movement_rows()
+
+
+def build_item_movement_report(
+    db: Session,
+    company_id: UUID,
+    branch_id: UUID,
+    item_id: UUID,
+    start_date: date,
+    end_date: date,
+) -> ItemMovementReportResponse:
+    """
+    Build branch-scoped item movement report from inventory_ledger only (all rows in memory;
+    see open_item_movement_report for streaming).
+    """
+    report, movement_rows = open_item_movement_report(db, company_id, branch_id, item_id, start_date, end_date)
+    for row in movement_rows:
+        report.rows.append(row)
+    report.closing_balance = report.rows[-1].running_balance
+    return report
+
 
 def build_batch_movement_report(
     db: Session,
@@ -337,67 +422,36 @@ def build_batch_movement_report(
     """
     Build branch-scoped batch movement report from inventory_ledger only.
     Filters by company_id, branch_id, item_id, batch_number, and date range.
-    Order by movement date DESC. Running balance is calculated for the batch.
+    Rows in chronological order with the running balance of the batch.
     Read-only; no changes to ledger or stock logic.
     """
     start_ts = _midnight_utc(start_date)
     end_ts = _midnight_utc(end_date)
     end_ts = end_ts + timedelta(days=1)
 
-    company = db.query(Company).filter(Company.id == company_id).first()
-    branch = db.query(Branch).filter(Branch.id == branch_id).first()
-    item = db.query(Item).filter(Item.id == item_id, Item.company_id == company_id).first()
-    if not item:
-        raise ValueError("item_not_found")
-    if not company or not branch or branch.company_id != company_id:
-        raise ValueError("branch_or_company_not_found")
+    company, branch, item = _check_report_scope(db, company_id, branch_id, item_id)
     batch_no_clean = (batch_no or "").strip()
     if not batch_no_clean:
         raise ValueError("batch_no_required")
 
-    display_options = _get_report_display_options(db, company_id)  # unused for batch; overridden below
     # Batch report always shows batch and expiry for context
     display_options = ItemMovementDisplayOptions(
         show_batch_number=True,
         show_expiry_date=True,
     )
 
-    # Opening balance for this batch: SUM(quantity_delta) where created_at < start_ts
-    opening_row = db.query(func.coalesce(func.sum(InventoryLedger.quantity_delta), 0)).filter(
+    scope = [
         InventoryLedger.company_id == company_id,
         InventoryLedger.branch_id == branch_id,
         InventoryLedger.item_id == item_id,
         InventoryLedger.batch_number == batch_no_clean,
-        InventoryLedger.created_at < start_ts,
+    ]
+    # Opening balance for this batch: SUM(quantity_delta) where created_at < start_ts
+    opening_row = db.query(func.coalesce(func.sum(InventoryLedger.quantity_delta), 0)).filter(
+        *scope, InventoryLedger.created_at < start_ts,
     ).scalar()
     opening_balance = Decimal(str(opening_row or 0))
 
-    # Movement rows: date range, ORDER BY created_at DESC, id DESC (newest first)
-    ledger_rows = (
-        db.query(InventoryLedger)
-        .filter(
-            InventoryLedger.company_id == company_id,
-            InventoryLedger.branch_id == branch_id,
-            InventoryLedger.item_id == item_id,
-            InventoryLedger.batch_number == batch_no_clean,
-            InventoryLedger.created_at >= start_ts,
-            InventoryLedger.created_at < end_ts,
-        )
-        .order_by(InventoryLedger.created_at.desc(), InventoryLedger.id.desc())
-        .all()
-    )
-    # Reverse so we display chronological order (oldest first in list) for running balance
-    ledger_rows = list(reversed(ledger_rows))
-
-    refs_by_type: Dict[str, List[UUID]] = {}
-    for row in ledger_rows:
-        rt = (row.reference_type or "").strip()
-        if rt and row.reference_id and rt not in ("MANUAL_ADJUSTMENT", "OPENING_BALANCE"):
-            refs_by_type.setdefault(rt, []).append(row.reference_id)
-    for k in refs_by_type:
-        refs_by_type[k] = list(dict.fromkeys(refs_by_type[k]))
-    ref_map = _resolve_references_batch(db, refs_by_type)
-
     rows_out: List[ItemMovementRow] = []
     running = opening_balance
 
@@ -412,39 +466,40 @@ def build_batch_movement_report(
         expiry_date=None,
     ))
 
-    for row in ledger_rows:
-        qty_delta = Decimal(str(row.quantity_delta or 0))
-        if qty_delta > 0:
-            qty_in, qty_out = qty_delta, Decimal("0")
-        else:
-            qty_in, qty_out = Decimal("0"), abs(qty_delta)
-        running += qty_delta
-
-        rt = (row.reference_type or "").strip()
-        if rt == "MANUAL_ADJUSTMENT":
-            doc_type, ref = "Adjustment", (row.notes or "Adjustment").strip() or "Adjustment"
-        elif rt == "OPENING_BALANCE":
-            doc_type, ref = "Opening Balance", ""
-        elif rt == "BATCH_QUANTITY_CORRECTION":
-            doc_type, ref = "Quantity correction", (row.notes or "Batch quantity correction").strip() or "Batch quantity correction"
-        else:
-            info = ref_map.get((rt, row.reference_id)) if row.reference_id else None
-            doc_type = (info or {}).get("document_type", rt or "—")
-            ref = (getattr(row, "document_number", None) or "").strip() or (info or {}).get("reference", "")
-
-        expiry = row.expiry_date
-        if expiry is not None and hasattr(expiry, "date") and callable(getattr(expiry, "date", None)):
-            expiry = expiry.date()
-        rows_out.append(ItemMovementRow(
-            date=row.created_at,
-            document_type=doc_type,
-            reference=ref or "",
-            qty_in=qty_in,
-            qty_out=qty_out,
-            running_balance=running,
-            batch_number=row.batch_number if display_options.show_batch_number else None,
-            expiry_date=expiry if display_options.show_expiry_date else None,
-        ))
+    ref_map: Dict[Tuple[str, UUID], Dict[str, Any]] = {}
+    filters = scope + [InventoryLedger.created_at >= start_ts, InventoryLedger.created_at < end_ts]
+    for chunk in _iter_ledger_chunks(db, filters):
+        ref_map.update(_resolve_references_batch(db, _new_refs_by_type(chunk, ref_map)))
+        for row in chunk:
+            qty_delta = Decimal(str(row.quantity_delta or 0))
+            if qty_delta > 0:
+                qty_in, qty_out = qty_delta, Decimal("0")
+            else:
+                qty_in, qty_out = Decimal("0"), abs(qty_delta)
+            running += qty_delta
+
+            rt = (row.reference_type or "").strip()
+            if rt == "MANUAL_ADJUSTMENT":
+                doc_type, ref = "Adjustment", (row.notes or "Adjustment").strip() or "Adjustment"
+            elif rt == "OPENING_BALANCE":
+                doc_type, ref = "Opening Balance", ""
+            elif rt == "BATCH_QUANTITY_CORRECTION":
+                doc_type, ref = "Quantity correction", (row.notes or "Batch quantity correction").strip() or "Batch quantity correction"
+            else:
+                info = ref_map.get((rt, row.reference_id)) if row.reference_id else None
+                doc_type = (info or {}).get("document_type", rt or "—")
+                ref = (row.document_number or "").strip() or (info or {}).get("reference", "")
+
+            rows_out.append(ItemMovementRow(
+                date=row.created_at,
+                document_type=doc_type,
+                reference=ref or "",
+                qty_in=qty_in,
+                qty_out=qty_out,
+                running_balance=running,
+                batch_number=row.batch_number if display_options.show_batch_number else None,
+                expiry_date=_expiry_as_date(row.expiry_date) if display_options.show_expiry_date else None,
+            ))
 
     closing_balance = running
 
@@ -0,0 +1,288 @@
+"""
+In-process item search cache: a per-(database, company, branch) copy of item_branch_snapshot so
+POS typeahead can be answered without a DB round-trip.
+
+- Optional: ITEM_SEARCH_CACHE_ENABLED. Misses (and ranked queries with too few substring matches,
+  which need pg_trgm fuzzy matching) return None and the caller queries the DB as before.
+- Rows are kept columnar: namedtuple rows plus one newline-joined search_text blob that is scanned
+  with str.find, so a lookup costs one C-level scan plus work per hit.
+- Freshness: item_branch_snapshot_versions.version is bumped at commit by every transaction that
+  wrote snapshot rows of the branch (mark_branch_changed, called by pos_snapshot_service). The cache
+  re-reads the version at most every ITEM_SEARCH_CACHE_VERSION_CHECK_SECONDS and, when it moved,
+  patches rows changed since its last sync (updated_at). Commits in this process drop their
+  branches at once. Entries are rebuilt after ITEM_SEARCH_CACHE_TTL_SECONDS (picks up deleted
+  rows) and evicted least-recently-used beyond ITEM_SEARCH_CACHE_MAX_BRANCHES.
+"""
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict, namedtuple
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Columns read by the search response builder (ItemSearchService); search_text / updated_at kept separately
+_ROW_FIELDS = (
+    "item_id", "name", "pack_size", "base_unit", "sku", "vat_rate", "vat_category",
+    "current_stock", "average_cost", "last_purchase_price", "selling_price", "margin_percent",
+    "next_expiry_date", "last_purchase_date", "last_order_date", "effective_selling_price",
+    "price_source", "retail_unit", "supplier_unit", "wholesale_unit", "wholesale_units_per_supplier",
+)
+SnapshotRow = namedtuple("SnapshotRow", _ROW_FIELDS)
+
+_SELECT_ROWS_SQL = (
+    f"SELECT {', '.join(_ROW_FIELDS)}, search_text, updated_at FROM item_branch_snapshot "
+    "WHERE company_id = :company_id AND branch_id = :branch_id"
+)
+# Rows written by transactions that started before the last sync but committed after it carry an
+# older updated_at; re-read this much history on each patch (longer ones wait for the TTL rebuild).
+_DELTA_OVERLAP = timedelta(minutes=2)
+
+# Session.info keys: branches written in this transaction / bumped and awaiting after_commit
+_CHANGED_BRANCHES_KEY = "snapshot_changed_branches"
+_COMMITTED_BRANCHES_KEY = "snapshot_committed_branches"
+_HOOKS_REGISTERED = False
+
+_lock = threading.Lock()
+_entries: "OrderedDict[Tuple[str, str, str], _BranchIndex]" = OrderedDict()
+
+
+class _BranchIndex:
+    """Immutable snapshot of one branch catalog; patches build a new instance."""
+
+    __slots__ = ("version", "built_at", "checked_at", "synced_at", "rows", "positions", "blob", "offsets", "in_stock")
+
+    def __init__(self, version: int, built_at: float, synced_at, rows: List[SnapshotRow], texts: List[str]):
+        self.version = version
+        self.built_at = built_at
+        self.checked_at = time.monotonic()
+        self.synced_at = synced_at
+        self.rows = rows
+        self.positions = {r.item_id: i for i, r in enumerate(rows)}
+        self.in_stock = [float(r.current_stock or 0) > 0 for r in rows]
+        # Row i's search_text starts at offsets[i]; "\n" separators keep matches inside one row
+        self.offsets = []
+        pos = 0
+        for t in texts:
+            self.offsets.append(pos)
+            pos += len(t) + 1
+        self.blob = "\n".join(texts)
+
+    def texts(self) -> List[str]:
+        return self.blob.split("\n")
+
+    def text_at(self, i: int) -> str:
+        end = self.offsets[i + 1] - 1 if i + 1 < len(self.offsets) else len(self.blob)
+        return self.blob[self.offsets[i]:end]
+
+    def match(self, term: str) -> List[int]:
+        """Row positions whose search_text contains term."""
+        hits = []
+        blob, offsets = self.blob, self.offsets
+        start = blob.find(term)
+        while start != -1:
+            i = bisect_right(offsets, start) - 1
+            hits.append(i)
+            if i + 1 >= len(offsets):
+                break
+            start = blob.find(term, offsets[i + 1])
+        return hits
+
+
+def _db_key(db: Session) -> str:
+    return str(db.get_bind().url)
+
+
+def _read_version(db: Session, branch_id) -> int:
+    version = db.execute(
+        text("SELECT version FROM item_branch_snapshot_versions WHERE branch_id = :branch_id"),
+        {"branch_id": str(branch_id)},
+    ).scalar()
+    return int(version or 0)
+
+
+def _split(rows) -> Tuple[List[SnapshotRow], List[str], Optional[object]]:
+    out, texts, synced_at = [], [], None
+    for r in rows:
+        out.append(SnapshotRow(*r[: len(_ROW_FIELDS)]))
+        texts.append((r.search_text or "").replace("\n", " "))
+        if r.updated_at is not None and (synced_at is None or r.updated_at > synced_at):
+            synced_at = r.updated_at
+    return out, texts, synced_at
+
+
+def _build(db: Session, company_id, branch_id) -> _BranchIndex:
+    version = _read_version(db, branch_id)  # before rows: a later commit moves it past ours
+    rows = db.execute(
+        text(_SELECT_ROWS_SQL), {"company_id": str(company_id), "branch_id": str(branch_id)}
+    ).fetchall()
+    out, texts, synced_at = _split(rows)
+    return _BranchIndex(version, time.monotonic(), synced_at, out, texts)
+
+
+def _patch(db: Session, entry: _BranchIndex, company_id, branch_id, version: int) -> _BranchIndex:
+    """New index with rows changed since entry.synced_at replaced or appended."""
+    if entry.synced_at is None:
+        return _build(db, company_id, branch_id)
+    changed = db.execute(
+        text(_SELECT_ROWS_SQL + " AND updated_at >= :since"),
+        {"company_id": str(company_id), "branch_id": str(branch_id), "since": entry.synced_at - _DELTA_OVERLAP},
+    ).fetchall()
+    changed_rows, changed_texts, synced_at = _split(changed)
+    rows, texts = list(entry.rows), entry.texts()
+    for row, search_text in zip(changed_rows, changed_texts):
+        i = entry.positions.get(row.item_id)
+        if i is None:
+            rows.append(row)
+            texts.append(search_text)
+        else:
+            rows[i], texts[i] = row, search_text
+    patched = _BranchIndex(version, entry.built_at, max(entry.synced_at, synced_at or entry.synced_at), rows, texts)
+    return patched
+
+
+def _rank(entry: _BranchIndex, hits: List[int], term: str, limit: int, ranked: bool) -> List[SnapshotRow]:
+    rows, in_stock = entry.rows, entry.in_stock
+    if not ranked:
+        # Same order as the ilike DB path: in-stock first, then name
+        return [rows[i] for i in heapq.nsmallest(limit, hits, key=lambda i: (not in_stock[i], rows[i].name or ""))]
+
+    def key(i):
+        name_l = (rows[i].name or "").lower()
+        if name_l.startswith(term):
+            tier = 0
+        elif f" {term}" in f" {entry.text_at(i)}":  # word start in search_text, as in the DB path
+            tier = 1
+        else:
+            tier = 2
+        # Shorter names first: among names that all contain term this tracks trigram similarity
+        return (tier, not in_stock[i], len(name_l), name_l)
+
+    return [rows[i] for i in heapq.nsmallest(limit, hits, key=key)]
+
+
+def lookup(db: Session, q: str, company_id: UUID, branch_id: UUID, limit: int) -> Optional[List[SnapshotRow]]:
+    """
+    Cached search for one branch. Returns rows ordered like ITEM_SEARCH_MODE, or None when the
+    caller should query the DB (cache unusable, or ranked mode needs fuzzy matches).
+    """
+    key = (_db_key(db), str(company_id), str(branch_id))
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None:
+            _entries.move_to_end(key)
+    try:
+        if entry is None or now - entry.built_at > settings.ITEM_SEARCH_CACHE_TTL_SECONDS:
+            entry = _build(db, company_id, branch_id)
+        elif now - entry.checked_at > settings.ITEM_SEARCH_CACHE_VERSION_CHECK_SECONDS:
+            version = _read_version(db, branch_id)
+            if version != entry.version:
+                entry = _patch(db, entry, company_id, branch_id, version)
+            else:
+                entry.checked_at = now
+    except SQLAlchemyError as e:
+        logger.warning("[search-cache] Load failed, using DB search: branch_id=%s error=%s", branch_id, e)
+        db.rollback()
+        return None
+    with _lock:
+        _entries[key] = entry
+        _entries.move_to_end(key)
+        while len(_entries) > max(1, settings.ITEM_SEARCH_CACHE_MAX_BRANCHES):
+            _entries.popitem(last=False)
+
+    term = q.lower()
+    hits = entry.match(term)
+    ranked = settings.ITEM_SEARCH_MODE == "ranked"
+    if ranked and len(hits) < min(limit, settings.ITEM_SEARCH_FUZZY_MIN_RESULTS) and len(term.strip()) >= 3:
+        return None
+    return _rank(entry, hits, term, limit, ranked)
+
+
+def invalidate(db_key: Optional[str] = None, branch_ids=None) -> None:
+    """Drop cached branches (all, one database, or the given branch ids of one database)."""
+    with _lock:
+        if db_key is None:
+            _entries.clear()
+            return
+        wanted = {str(b) for b in branch_ids} if branch_ids is not None else None
+        for key in [k for k in _entries if k[0] == db_key and (wanted is None or k[2] in wanted)]:
+            del _entries[key]
+
+
+# ---------------------------------------------------------------------------
+# Version counter (written by snapshot writers, read by lookup)
+# ---------------------------------------------------------------------------
+
+
+def mark_branch_changed(db: Session, company_id: UUID, branch_id: UUID) -> None:
+    """Record that item_branch_snapshot rows of the branch were written; version is bumped at commit."""
+    if not settings.ITEM_SEARCH_CACHE_ENABLED:
+        return
+    _register_hooks()
+    db.info.setdefault(_CHANGED_BRANCHES_KEY, {})[str(branch_id)] = str(company_id)
+
+
+def bump_branch_versions(db: Session) -> int:
+    """Bump item_branch_snapshot_versions for branches marked in this transaction. Returns branches bumped."""
+    changed: Dict[str, str] = db.info.pop(_CHANGED_BRANCHES_KEY, None) or {}
+    if not changed:
+        return 0
+    branch_ids = sorted(changed)  # fixed lock order across concurrent writers
+    params = {}
+    values = []
+    for n, branch_id in enumerate(branch_ids):
+        params[f"b{n}"] = branch_id
+        params[f"c{n}"] = changed[branch_id]
+        values.append(f"(CAST(:b{n} AS uuid), CAST(:c{n} AS uuid), 1, NOW())")
+    db.execute(
+        text(f"""
+            INSERT INTO item_branch_snapshot_versions (branch_id, company_id, version, updated_at)
+            VALUES {', '.join(values)}
+            ON CONFLICT (branch_id) DO UPDATE SET
+                version = item_branch_snapshot_versions.version + 1,
+                updated_at = NOW()
+        """),
+        params,
+    )
+    db.info.setdefault(_COMMITTED_BRANCHES_KEY, set()).update(branch_ids)
+    return len(branch_ids)
+
+
+def _before_commit_bump(session: Session) -> None:
+    bump_branch_versions(session)
+
+
+def _after_commit_invalidate(session: Session) -> None:
+    branch_ids = session.info.pop(_COMMITTED_BRANCHES_KEY, None)
+    if branch_ids:
+        invalidate(_db_key(session), branch_ids)
+
+
+def _after_transaction_end(session: Session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_CHANGED_BRANCHES_KEY, None)
+        session.info.pop(_COMMITTED_BRANCHES_KEY, None)
+
+
+def _register_hooks() -> None:
+    global _HOOKS_REGISTERED
+    if _HOOKS_REGISTERED:
+        return
+    with _lock:
+        if _HOOKS_REGISTERED:
+            return
+        event.listen(Session, "before_commit", _before_commit_bump)
+        event.listen(Session, "after_commit", _after_commit_invalidate)
+        event.listen(Session, "after_transaction_end", _after_transaction_end)
+        _HOOKS_REGISTERED = True
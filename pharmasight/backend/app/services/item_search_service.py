@@ -2,6 +2,10 @@
 Item search: single entry point for GET /items/search.
 One path only: item_branch_snapshot when branch_id is present. No fallback to heavy path.
 On failure or missing branch_id we return []; fix snapshot/backfill instead of falling back.
+Ranking: ITEM_SEARCH_MODE=ranked (default) orders by prefix / word-start / trigram similarity and
+adds fuzzy matches when exact matches are few; ITEM_SEARCH_MODE=ilike keeps in-stock-then-name order.
+With ITEM_SEARCH_CACHE_ENABLED, substring matches are served from an in-process per-branch copy
+(item_search_cache); fuzzy lookups still go to the DB.
 """
 import logging
 import time
@@ -10,9 +14,13 @@ from types import SimpleNamespace
 from typing import Any, Dict, List, Optional, Tuple
 from uuid import UUID
 
+from sqlalchemy import case, func, or_, text
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
+from app.config import settings
 from app.models import ItemBranchSnapshot
+from app.services import item_search_cache
 from app.services.inventory_service import InventoryService, _unit_for_display
 from app.utils.vat import vat_rate_to_percent
 
@@ -69,25 +77,16 @@ def _search_impl(
     context: Optional[str],
 ) -> Tuple[List[Dict[str, Any]], str, str]:
     t_start = time.perf_counter()
-    search_term_pattern = f"%{q.lower()}%"
 
     # Single-table snapshot path (no Item join): keeps search <100ms at 1.5M rows.
     if branch_id is not None:
+        timing_name = "item_branch_snapshot"
         try:
-            rows = (
-                db.query(ItemBranchSnapshot)
-                .filter(
-                    ItemBranchSnapshot.company_id == company_id,
-                    ItemBranchSnapshot.branch_id == branch_id,
-                    ItemBranchSnapshot.search_text.ilike(search_term_pattern),
-                )
-                .order_by(
-                    (ItemBranchSnapshot.current_stock <= 0).asc(),
-                    ItemBranchSnapshot.name.asc(),
-                )
-                .limit(limit)
-                .all()
-            )
+            rows = item_search_cache.lookup(db, q, company_id, branch_id, limit) if settings.ITEM_SEARCH_CACHE_ENABLED else None
+            if rows is None:
+                rows = _snapshot_rows(db, q, company_id, branch_id, limit)
+            else:
+                timing_name = "item_search_cache"
         except Exception as e:
             t_done = time.perf_counter()
             snapshot_ms = (t_done - t_start) * 1000
@@ -143,8 +142,8 @@ def _search_impl(
             result.append(item_data)
         t_done = time.perf_counter()
         snapshot_ms = (t_done - t_start) * 1000
-        logger.info("[search] item_branch_snapshot: %.2f ms (results=%s)", snapshot_ms, len(result))
-        server_timing = f"item_branch_snapshot;dur={snapshot_ms:.2f}"
+        logger.info("[search] %s: %.2f ms (results=%s)", timing_name, snapshot_ms, len(result))
+        server_timing = f"{timing_name};dur={snapshot_ms:.2f}"
         return result, "item_branch_snapshot", server_timing
 
     # No branch_id: snapshot path only; return empty (caller must pass branch_id for results)
@@ -153,6 +152,90 @@ def _search_impl(
     return [], "item_branch_snapshot", f"item_branch_snapshot;dur={(t_done - t_start) * 1000:.2f}"
 
 
+def _snapshot_rows(db: Session, q: str, company_id: UUID, branch_id: UUID, limit: int) -> List[ItemBranchSnapshot]:
+    """Matching snapshot rows for one branch, per ITEM_SEARCH_MODE (ranked falls back to ilike if pg_trgm is unusable)."""
+    if settings.ITEM_SEARCH_MODE != "ranked":
+        return _ilike_snapshot_rows(db, q, company_id, branch_id, limit)
+    try:
+        return _ranked_snapshot_rows(db, q, company_id, branch_id, limit)
+    except SQLAlchemyError as e:
+        logger.warning("[search] Ranked search failed (pg_trgm missing?), using ilike: branch_id=%s error=%s", branch_id, e)
+        db.rollback()
+        return _ilike_snapshot_rows(db, q, company_id, branch_id, limit)
+
+
+def _ilike_snapshot_rows(db: Session, q: str, company_id: UUID, branch_id: UUID, limit: int) -> List[ItemBranchSnapshot]:
+    """Substring match on search_text; in-stock first, then name."""
+    return (
+        db.query(ItemBranchSnapshot)
+        .filter(
+            ItemBranchSnapshot.company_id == company_id,
+            ItemBranchSnapshot.branch_id == branch_id,
+            ItemBranchSnapshot.search_text.ilike(f"%{q.lower()}%"),
+        )
+        .order_by(
+            (ItemBranchSnapshot.current_stock <= 0).asc(),
+            ItemBranchSnapshot.name.asc(),
+        )
+        .limit(limit)
+        .all()
+    )
+
+
+def _ranked_snapshot_rows(db: Session, q: str, company_id: UUID, branch_id: UUID, limit: int) -> List[ItemBranchSnapshot]:
+    """
+    Substring matches ranked by tier: name prefix, then word start in search_text, then anywhere;
+    within a tier in-stock first, then trigram similarity to the name, then name.
+    When fewer than ITEM_SEARCH_FUZZY_MIN_RESULTS match, fill up with typo-tolerant matches
+    (pg_trgm word_similarity >= ITEM_SEARCH_FUZZY_THRESHOLD, served by the trigram GIN index).
+    """
+    term = q.lower()
+    name_l = func.lower(ItemBranchSnapshot.name)
+    search_text = ItemBranchSnapshot.search_text
+    tier = case(
+        (name_l.like(f"{term}%"), 0),
+        (or_(search_text.like(f"{term}%"), search_text.like(f"% {term}%")), 1),
+        else_=2,
+    )
+    branch_rows = db.query(ItemBranchSnapshot).filter(
+        ItemBranchSnapshot.company_id == company_id,
+        ItemBranchSnapshot.branch_id == branch_id,
+    )
+    rows = (
+        branch_rows.filter(search_text.ilike(f"%{term}%"))
+        .order_by(
+            tier,
+            (ItemBranchSnapshot.current_stock <= 0).asc(),
+            func.similarity(name_l, term).desc(),
+            ItemBranchSnapshot.name.asc(),
+        )
+        .limit(limit)
+        .all()
+    )
+    # Trigrams need 3+ characters; shorter terms have no useful fuzzy matches
+    if len(rows) >= min(limit, settings.ITEM_SEARCH_FUZZY_MIN_RESULTS) or len(term.strip()) < 3:
+        return rows
+
+    # %> uses pg_trgm.word_similarity_threshold; set for this transaction only
+    db.execute(
+        text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+        {"threshold": str(settings.ITEM_SEARCH_FUZZY_THRESHOLD)},
+    )
+    fuzzy = branch_rows.filter(search_text.op("%>")(term))
+    if rows:
+        fuzzy = fuzzy.filter(ItemBranchSnapshot.item_id.notin_([r.item_id for r in rows]))
+    fuzzy_rows = (
+        fuzzy.order_by(
+            func.word_similarity(term, search_text).desc(),
+            (ItemBranchSnapshot.current_stock <= 0).asc(),
+            ItemBranchSnapshot.name.asc(),
+        )
+        .limit(limit - len(rows))
+        .all()
+    )
+    return rows + fuzzy_rows
+
+
 def _canonical_item_from_snapshot_row(
     r: Any,
     item_like: Optional[Any],
@@ -10,6 +10,7 @@ Centralized migration system (locked architecture):
 import logging
 import os
 import re
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Optional, Set, Any
@@ -169,14 +170,21 @@ def run_predefined_migration_by_version(database_url: str, version: str) -> Dict
         conn.close()
 
 
-def run_migrations_for_url(database_url: str) -> List[str]:
+def run_migrations_for_url(database_url: str, timeout_seconds: Optional[float] = None) -> List[str]:
     """
     Run all missing migrations on the given tenant DB URL.
     Ensures schema_migrations exists, optionally baselines existing DBs, then runs ordered files.
     Returns list of versions applied this run. Always brings DB to latest version.
+
+    timeout_seconds: overall budget for this DB. Each file runs with statement_timeout set to the
+    remaining budget; raises TimeoutError once it is spent (files already applied stay applied).
     """
     applied_this_run: List[str] = []
-    conn = psycopg2.connect(_psycopg2_dsn(database_url))
+    deadline = time.monotonic() + timeout_seconds if timeout_seconds else None
+    conn = psycopg2.connect(
+        _psycopg2_dsn(database_url),
+        **({"connect_timeout": max(1, min(10, int(timeout_seconds)))} if timeout_seconds else {}),
+    )
 
     try:
         _ensure_schema_migrations(conn)
@@ -199,6 +207,12 @@ def run_migrations_for_url(database_url: str) -> List[str]:
             sql = path.read_text(encoding="utf-8", errors="replace")
             conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
             cur = conn.cursor()
+            if deadline is not None:
+                remaining_ms = int((deadline - time.monotonic()) * 1000)
+                if remaining_ms <= 0:
+                    cur.close()
+                    raise TimeoutError(f"Migrations exceeded {timeout_seconds:g}s before {version}")
+                cur.execute("SET statement_timeout = %s", (remaining_ms,))
             try:
                 cur.execute(sql)
             except Exception as e:
@@ -331,30 +345,26 @@ class MigrationService:
             logger.warning("Error getting schema version: %s", e)
             return None
 
-    def run_migrations_all_tenant_dbs(self) -> Dict:
+    def run_migrations_all_tenant_dbs(
+        self,
+        max_workers: Optional[int] = None,
+        timeout_seconds: Optional[float] = None,
+    ) -> Dict:
         """
         Apply missing migrations for ALL tenants with database_url (startup/deploy).
         Option B: enumerates infra rows only; no status-column gating on master registry.
+        Tenants run in parallel (max_workers, default TENANT_MIGRATION_WORKERS), each within
+        timeout_seconds (default TENANT_MIGRATION_TIMEOUT_SECONDS); progress via tenant_migration_orchestrator.
         Returns { "applied": { tenant_id: [versions] }, "errors": { tenant_id: str } }.
         """
-        applied: Dict[str, List[str]] = {}
-        errors: Dict[str, str] = {}
-        tenants_with_db = self.get_all_tenants_with_db()
-        tenants_to_migrate = list(tenants_with_db)
-        for t in tenants_to_migrate:
-            try:
-                ran = run_migrations_for_url(t.database_url)
-                if ran:
-                    applied[str(t.id)] = ran
-            except Exception as e:
-                err_str = str(e)
-                if "Network is unreachable" in err_str and "supabase.co" in (t.database_url or ""):
-                    err_str += " (On Render, use Supabase connection pooler URL instead of db.xxx.supabase.co – see RENDER.md)"
-                if "Tenant or user not found" in err_str:
-                    err_str += " (Supabase project was deleted; point tenant at single DB or run: python scripts/mark_tenant_cancelled.py <tenant_id_or_name>)"
-                errors[str(t.id)] = err_str
-                logger.exception("Migrations failed for tenant %s: %s", t.name, e)
-        return {"applied": applied, "errors": errors}
+        from app.config import settings
+        from app.services import tenant_migration_orchestrator
+
+        return tenant_migration_orchestrator.run_all(
+            self.get_all_tenants_with_db(),
+            max_workers=max_workers or settings.TENANT_MIGRATION_WORKERS,
+            timeout_seconds=timeout_seconds or settings.TENANT_MIGRATION_TIMEOUT_SECONDS,
+        )
 
     def apply_migration(
         self,
@@ -3,6 +3,7 @@ Order Book Service - Automatic order book management
 """
 import logging
 import math
+import uuid
 from typing import Optional, List, Dict
 from uuid import UUID
 from decimal import Decimal
@@ -12,7 +13,7 @@ from sqlalchemy import func, and_, or_
 
 from app.models import (
     DailyOrderBook, OrderBookHistory, Item, InventoryLedger, Supplier,
-    SalesInvoiceItem, SalesInvoice
+    SalesInvoiceItem, SalesInvoice, InventoryBalance
 )
 from app.services.inventory_service import InventoryService
 from app.services.snapshot_service import SnapshotService
@@ -32,6 +33,37 @@ LARGE_PACK_TRIGGER_FRACTION_OF_PACK = 0.25
 LARGE_PACK_MONTHLY_SALES_DIVISOR = 4.0
 
 
+def _auto_reorder_packs(current_stock: float, monthly_sales: float, pack_size: int) -> int:
+    """
+    Wholesale packs to reorder for auto-generation (0 = no entry).
+    All quantities in retail units; pack_size >= 1.
+    """
+    at_or_below_one_wholesale = current_stock <= pack_size
+    below_half_monthly = monthly_sales > 0 and current_stock < (monthly_sales / 2)
+    stock_fell_to_zero = current_stock <= 0
+
+    if not at_or_below_one_wholesale and not below_half_monthly and not stock_fell_to_zero:
+        return 0
+
+    if stock_fell_to_zero and monthly_sales <= 0:
+        quantity_needed = pack_size
+    elif at_or_below_one_wholesale:
+        quantity_needed = max(pack_size - current_stock, pack_size)
+    else:
+        quantity_needed = max((monthly_sales / 2) - current_stock, 0)
+
+    if monthly_sales > 0:
+        quantity_needed = min(quantity_needed, monthly_sales)
+
+    if quantity_needed <= 0:
+        return 0
+
+    packs = quantity_needed / pack_size
+    if packs <= 1.5:
+        return 1
+    return int(packs) + (1 if packs % 1 > 0 else 0)
+
+
 class OrderBookService:
     """Service for managing automatic order book entries"""
     
@@ -448,12 +480,16 @@ class OrderBookService:
         rules as sale-triggered logic. Only considers items that have had at least one
         sale at this branch (so we don't recommend restocking everything). Quantities
         are in wholesale packs (pack_size), not supplier or raw base units.
+
+        Set-based: candidate items, stock (inventory_balances), 30-day sales per unit and
+        existing entries are each loaded in one query; rules run in one pass and new
+        entries are bulk-inserted.
         """
         if entry_date is None:
             entry_date = datetime.utcnow().date()
 
         # Items that have had at least one BATCHED/PAID sale at this branch
-        items_with_sales = (
+        sold_item_ids = (
             db.query(SalesInvoiceItem.item_id)
             .join(SalesInvoice, SalesInvoiceItem.sales_invoice_id == SalesInvoice.id)
             .filter(
@@ -464,119 +500,89 @@ class OrderBookService:
                 )
             )
             .distinct()
-            .all()
         )
-        item_ids = [row.item_id for row in items_with_sales]
-        if not item_ids:
+        items = db.query(Item).filter(Item.id.in_(sold_item_ids)).all()
+        if not items:
             logger.info("Auto-generate: no items with sales at branch - nothing to add")
             return 0
 
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        entries_created = 0
-        supplier_map = OrderBookService.get_cheapest_supplier_ids_batch(db, item_ids, company_id)
-
-        for item_id in item_ids:
-            item = db.query(Item).filter(Item.id == item_id).first()
-            if not item:
-                continue
-            pack_size = max(1, int(item.pack_size or 1))
+        # Current stock in retail units (missing balance row = no stock)
+        stock_by_item = {
+            row.item_id: float(row.current_stock or 0)
+            for row in db.query(InventoryBalance.item_id, InventoryBalance.current_stock).filter(
+                InventoryBalance.company_id == company_id,
+                InventoryBalance.branch_id == branch_id,
+                InventoryBalance.item_id.in_(sold_item_ids),
+            )
+        }
 
-            # Current stock in retail units
-            stock_row = (
-                db.query(func.sum(InventoryLedger.quantity_delta))
-                .filter(
-                    and_(
-                        InventoryLedger.item_id == item_id,
-                        InventoryLedger.branch_id == branch_id,
-                        InventoryLedger.company_id == company_id,
-                    )
-                )
-                .scalar()
+        # Monthly sales (30d) per (item, unit); converted to retail units below
+        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+        monthly_rows = (
+            db.query(
+                SalesInvoiceItem.item_id,
+                SalesInvoiceItem.unit_name,
+                func.sum(SalesInvoiceItem.quantity).label("quantity"),
             )
-            current_stock_retail_units = float(stock_row or 0)
-
-            # Monthly sales (30d) in retail units
-            monthly_rows = (
-                db.query(SalesInvoiceItem.quantity, SalesInvoiceItem.unit_name)
-                .join(SalesInvoice, SalesInvoiceItem.sales_invoice_id == SalesInvoice.id)
-                .filter(
-                    and_(
-                        SalesInvoiceItem.item_id == item_id,
-                        SalesInvoice.company_id == company_id,
-                        SalesInvoice.branch_id == branch_id,
-                        SalesInvoice.status.in_(["BATCHED", "PAID"]),
-                        SalesInvoice.created_at >= thirty_days_ago,
-                    )
+            .join(SalesInvoice, SalesInvoiceItem.sales_invoice_id == SalesInvoice.id)
+            .filter(
+                and_(
+                    SalesInvoice.company_id == company_id,
+                    SalesInvoice.branch_id == branch_id,
+                    SalesInvoice.status.in_(["BATCHED", "PAID"]),
+                    SalesInvoice.created_at >= thirty_days_ago,
                 )
-                .all()
             )
-            monthly_sales_retail_units = Decimal("0")
-            for sale_item in monthly_rows:
-                try:
-                    qty_base = InventoryService.convert_to_base_units(
-                        db, item_id, float(sale_item.quantity), sale_item.unit_name or ""
-                    )
-                    monthly_sales_retail_units += Decimal(str(qty_base))
-                except (ValueError, AttributeError, TypeError):
-                    monthly_sales_retail_units += Decimal(str(sale_item.quantity))
-            monthly_sales_float = float(monthly_sales_retail_units)
-
-            at_or_below_one_wholesale = current_stock_retail_units <= pack_size
-            below_half_monthly = monthly_sales_float > 0 and current_stock_retail_units < (monthly_sales_float / 2)
-            stock_fell_to_zero = current_stock_retail_units <= 0
-
-            if not at_or_below_one_wholesale and not below_half_monthly and not stock_fell_to_zero:
-                continue
-
-            if stock_fell_to_zero and monthly_sales_float <= 0:
-                quantity_needed_retail_units = pack_size
-            elif at_or_below_one_wholesale:
-                quantity_needed_retail_units = max(pack_size - current_stock_retail_units, pack_size)
-            else:
-                quantity_needed_retail_units = max((monthly_sales_float / 2) - current_stock_retail_units, 0)
-
-            if monthly_sales_float > 0:
-                quantity_needed_retail_units = min(quantity_needed_retail_units, monthly_sales_float)
-
-            if quantity_needed_retail_units <= 0:
-                continue
+            .group_by(SalesInvoiceItem.item_id, SalesInvoiceItem.unit_name)
+            .all()
+        )
+        items_by_id = {item.id: item for item in items}
+        monthly_by_item: Dict[UUID, Decimal] = {}
+        for row in monthly_rows:
+            item = items_by_id.get(row.item_id)
+            mult = get_unit_multiplier_from_item(item, row.unit_name or "") if item else None
+            qty = Decimal(str(row.quantity or 0))
+            # Unknown unit: count the raw quantity (as retail units)
+            monthly_by_item[row.item_id] = monthly_by_item.get(row.item_id, Decimal("0")) + (
+                qty * mult if mult is not None else qty
+            )
 
-            quantity_supplier_units = quantity_needed_retail_units / pack_size
-            if quantity_supplier_units <= 0:
-                packs_needed = 0
-            elif quantity_supplier_units <= 1.5:
-                packs_needed = 1
-            else:
-                packs_needed = int(quantity_supplier_units) + (1 if quantity_supplier_units % 1 > 0 else 0)
+        existing = db.query(DailyOrderBook.item_id).filter(
+            DailyOrderBook.branch_id == branch_id,
+            DailyOrderBook.status.in_(["PENDING", "ORDERED"]),
+        )
+        if hasattr(DailyOrderBook, "entry_date"):
+            existing = existing.filter(DailyOrderBook.entry_date == entry_date)
+        existing_item_ids = {row.item_id for row in existing}
 
-            if packs_needed <= 0:
+        to_create = []
+        for item in items:
+            if item.id in existing_item_ids:
                 continue
-
-            quantity_needed_wholesale = max(1, packs_needed)
-            wholesale_unit_name = (item.wholesale_unit or item.retail_unit or "unit").strip() or "unit"
-
-            existing = (
-                db.query(DailyOrderBook)
-                .filter(
-                    DailyOrderBook.branch_id == branch_id,
-                    DailyOrderBook.item_id == item_id,
-                    DailyOrderBook.status.in_(["PENDING", "ORDERED"]),
-                )
+            packs_needed = _auto_reorder_packs(
+                stock_by_item.get(item.id, 0.0),
+                float(monthly_by_item.get(item.id, Decimal("0"))),
+                max(1, int(item.pack_size or 1)),
             )
-            if hasattr(DailyOrderBook, "entry_date"):
-                existing = existing.filter(DailyOrderBook.entry_date == entry_date)
-            if existing.first():
-                continue
-
-            supplier_id = supplier_map.get(item_id)
+            if packs_needed > 0:
+                to_create.append((item, packs_needed))
+        if not to_create:
+            logger.info("Auto-generate created 0 order book entries for branch %s (entry_date=%s)", branch_id, entry_date)
+            return 0
 
-            create_kw = dict(
+        supplier_map = OrderBookService.get_cheapest_supplier_ids_batch(
+            db, [item.id for item, _ in to_create], company_id
+        )
+        rows = []
+        for item, packs_needed in to_create:
+            row = dict(
+                id=uuid.uuid4(),
                 company_id=company_id,
                 branch_id=branch_id,
-                item_id=item_id,
-                supplier_id=supplier_id,
-                quantity_needed=Decimal(str(quantity_needed_wholesale)),
-                unit_name=wholesale_unit_name,
+                item_id=item.id,
+                supplier_id=supplier_map.get(item.id),
+                quantity_needed=Decimal(str(packs_needed)),
+                unit_name=(item.wholesale_unit or item.retail_unit or "unit").strip() or "unit",
                 reason="AUTO_THRESHOLD",
                 source_reference_type=None,
                 source_reference_id=None,
@@ -585,14 +591,12 @@ class OrderBookService:
                 created_by=user_id,
             )
             if hasattr(DailyOrderBook, "entry_date"):
-                create_kw["entry_date"] = entry_date
-            db.add(DailyOrderBook(**create_kw))
-            entries_created += 1
-
-        if entries_created:
-            db.commit()
-        logger.info("Auto-generate created %s order book entries for branch %s (entry_date=%s)", entries_created, branch_id, entry_date)
-        return entries_created
+                row["entry_date"] = entry_date
+            rows.append(row)
+        db.bulk_insert_mappings(DailyOrderBook, rows)
+        db.commit()
+        logger.info("Auto-generate created %s order book entries for branch %s (entry_date=%s)", len(rows), branch_id, entry_date)
+        return len(rows)
 
     @staticmethod
     def process_sale_for_order_book(
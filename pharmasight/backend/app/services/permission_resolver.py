@@ -0,0 +1,178 @@
+"""
+Effective-permission resolver: a user's (branch, permission) set, loaded with one query and reused.
+
+- Request scope: PermissionScopeMiddleware puts a memo dict on request.state.permission_memo (and in a
+  context variable, so dependencies running in the threadpool see the same dict). Within a request every
+  _user_has_permission / ensure_user_has_branch_access call after the first is a dict lookup.
+- Across requests: bounded TTL cache keyed by (company_id, user_id) (PERMISSION_CACHE_TTL_SECONDS,
+  PERMISSION_CACHE_MAX_ENTRIES). An entry is only used when it was loaded under the company's current
+  permissions_version, which get_current_user records from the company row it already loads
+  (note_company). Role / permission / assignment edits bump the version (bump_permissions_version).
+- Outside a request (scripts, background jobs) sets are loaded fresh on every call.
+"""
+import contextvars
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EffectivePermissions(NamedTuple):
+    branch_ids: FrozenSet[Any]  # branches the user is assigned to (any role)
+    permissions: FrozenSet[str]  # permission names granted in any assignment
+    by_branch: Dict[Any, FrozenSet[str]]  # branch_id -> permission names of the roles there
+
+    def has(self, permission_name: str, branch_id: Optional[Any] = None) -> bool:
+        if branch_id is None:
+            return permission_name in self.permissions
+        return permission_name in self.by_branch.get(branch_id, frozenset())
+
+
+_request_memo: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    "permission_memo", default=None
+)
+
+_lock = threading.Lock()
+_entries: "OrderedDict[Tuple[str, str], Tuple[int, float, EffectivePermissions]]" = OrderedDict()
+_stats = {"request_hits": 0, "hits": 0, "misses": 0, "stale": 0, "evictions": 0}
+
+
+class PermissionScopeMiddleware:
+    """ASGI middleware: one permission memo per HTTP request (request.state.permission_memo)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        memo: Dict[str, Any] = {}
+        scope.setdefault("state", {})["permission_memo"] = memo
+        token = _request_memo.set(memo)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_memo.reset(token)
+
+
+def note_company(company: Any) -> None:
+    """Record the request's company and its permissions_version (called by get_current_user)."""
+    memo = _request_memo.get()
+    if memo is None or company is None:
+        return
+    memo["company_id"] = str(company.id)
+    memo["version"] = int(getattr(company, "permissions_version", None) or 0)
+
+
+def _load(db: Session, user_id: UUID) -> EffectivePermissions:
+    from app.models.permission import Permission, RolePermission
+    from app.models.user import UserBranchRole
+
+    rows = (
+        db.query(UserBranchRole.branch_id, Permission.name)
+        .outerjoin(RolePermission, RolePermission.role_id == UserBranchRole.role_id)
+        .outerjoin(Permission, Permission.id == RolePermission.permission_id)
+        .filter(UserBranchRole.user_id == user_id)
+        .all()
+    )
+    by_branch: Dict[Any, set] = {}
+    for branch_id, name in rows:
+        names = by_branch.setdefault(branch_id, set())
+        if name:
+            names.add(name)
+    return EffectivePermissions(
+        branch_ids=frozenset(by_branch),
+        permissions=frozenset(n for names in by_branch.values() for n in names),
+        by_branch={b: frozenset(names) for b, names in by_branch.items()},
+    )
+
+
+def get_effective_permissions(db: Session, user_id: UUID) -> EffectivePermissions:
+    """The user's (branch, permission) set: request memo, then versioned TTL cache, then one query."""
+    memo = _request_memo.get()
+    if memo is None:
+        return _load(db, user_id)
+    user_key = str(user_id)
+    perms = memo.get(("user", user_key))
+    if perms is not None:
+        with _lock:
+            _stats["request_hits"] += 1
+        return perms
+
+    company_id, version = memo.get("company_id"), memo.get("version")
+    key = (company_id, user_key)
+    if company_id is not None:
+        now = time.monotonic()
+        with _lock:
+            entry = _entries.get(key)
+            if entry is not None and entry[0] == version and entry[1] > now:
+                _entries.move_to_end(key)
+                _stats["hits"] += 1
+                memo[("user", user_key)] = entry[2]
+                return entry[2]
+            if entry is not None:
+                _entries.pop(key, None)
+                _stats["stale"] += 1
+            _stats["misses"] += 1
+
+    perms = _load(db, user_id)
+    memo[("user", user_key)] = perms
+    if company_id is not None:
+        ttl = max(0.0, float(settings.PERMISSION_CACHE_TTL_SECONDS))
+        max_entries = max(1, int(settings.PERMISSION_CACHE_MAX_ENTRIES))
+        with _lock:
+            _entries[key] = (version, time.monotonic() + ttl, perms)
+            _entries.move_to_end(key)
+            while len(_entries) > max_entries:
+                _entries.popitem(last=False)
+                _stats["evictions"] += 1
+    return perms
+
+
+def bump_permissions_version(db: Session, company_id: Optional[UUID] = None) -> None:
+    """
+    Invalidate cached permission sets of company_id (all companies in this DB when None: roles are
+    shared). The version update joins the caller's transaction; local entries are dropped now.
+    """
+    if company_id is None:
+        db.execute(text("UPDATE companies SET permissions_version = permissions_version + 1"))
+    else:
+        db.execute(
+            text("UPDATE companies SET permissions_version = permissions_version + 1 WHERE id = :cid"),
+            {"cid": str(company_id)},
+        )
+    with _lock:
+        for key in [k for k in _entries if company_id is None or k[0] == str(company_id)]:
+            _entries.pop(key, None)
+    memo = _request_memo.get()
+    if memo is not None:
+        for key in [k for k in memo if isinstance(k, tuple) and k[0] == "user"]:
+            memo.pop(key, None)
+
+
+def clear() -> None:
+    """Drop cached sets and reset counters (tests)."""
+    with _lock:
+        _entries.clear()
+        for k in _stats:
+            _stats[k] = 0
+
+
+def get_metrics() -> Dict[str, Any]:
+    with _lock:
+        return {
+            **_stats,
+            "entries": len(_entries),
+            "max_entries": int(settings.PERMISSION_CACHE_MAX_ENTRIES),
+            "ttl_seconds": float(settings.PERMISSION_CACHE_TTL_SECONDS),
+        }
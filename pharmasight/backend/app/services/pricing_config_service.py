@@ -13,6 +13,7 @@ from uuid import UUID
 from sqlalchemy.orm import Session
 
 from app.models import Item, PricingSettings, BranchSetting
+from app.services import company_config_cache
 from app.services.pricing_service import PricingService
 from app.services.item_units_helper import get_unit_multiplier_from_item
 
@@ -25,12 +26,22 @@ BLOCK = "block"
 
 def get_global_pricing_config(db: Session, company_id: UUID) -> Dict[str, Any]:
     """
-    Load company-level pricing settings. Returns a dict with safe defaults
-    when no row exists (e.g. before migration or for new companies).
+    Load company-level pricing settings (cached per company_config_cache). Returns a dict with
+    safe defaults when no row exists (e.g. before migration or for new companies).
     """
-    row = db.query(PricingSettings).filter(
-        PricingSettings.company_id == company_id
-    ).first()
+    config = company_config_cache.get(
+        db,
+        company_id,
+        "pricing_config",
+        lambda: pricing_config_from_row(
+            db.query(PricingSettings).filter(PricingSettings.company_id == company_id).first()
+        ),
+    )
+    return dict(config)
+
+
+def pricing_config_from_row(row: Optional[PricingSettings]) -> Dict[str, Any]:
+    """get_global_pricing_config for an already loaded pricing_settings row (None = defaults)."""
     if not row:
         return {
             "default_min_margin_retail_pct": None,
@@ -52,6 +63,26 @@ def get_global_pricing_config(db: Session, company_id: UUID) -> Dict[str, Any]:
     }
 
 
+def get_branch_pricing_overrides(db: Session, company_id: UUID, branch_id: UUID) -> Dict[str, Any]:
+    """
+    Branch pricing overrides from branch_settings (cached per company_config_cache):
+    cost_outlier_threshold_pct and min_margin_retail_pct_override, None when unset.
+    """
+
+    def load() -> Dict[str, Any]:
+        row = (
+            db.query(BranchSetting.cost_outlier_threshold_pct, BranchSetting.min_margin_retail_pct_override)
+            .filter(BranchSetting.branch_id == branch_id)
+            .first()
+        )
+        return {
+            "cost_outlier_threshold_pct": row[0] if row else None,
+            "min_margin_retail_pct_override": row[1] if row else None,
+        }
+
+    return dict(company_config_cache.get(db, company_id, ("branch_pricing", str(branch_id)), load))
+
+
 def get_cost_outlier_threshold_pct(
     db: Session, company_id: UUID, branch_id: Optional[UUID] = None
 ) -> Decimal:
@@ -61,14 +92,10 @@ def get_cost_outlier_threshold_pct(
     """
     # 1) Branch-level override when present
     if branch_id is not None:
-        row = (
-            db.query(BranchSetting.cost_outlier_threshold_pct)
-            .filter(BranchSetting.branch_id == branch_id)
-            .first()
-        )
-        if row and row[0] is not None:
+        value = get_branch_pricing_overrides(db, company_id, branch_id)["cost_outlier_threshold_pct"]
+        if value is not None:
             try:
-                return Decimal(str(row[0]))
+                return Decimal(str(value))
             except Exception:
                 pass
 
@@ -143,6 +170,11 @@ def get_effective_item_overrides(
     as_of: date to check promo window (default today).
     """
     item = db.query(Item).filter(Item.id == item_id).first()
+    return item_overrides_from_item(item, as_of)
+
+
+def item_overrides_from_item(item: Optional[Item], as_of: Optional[date] = None) -> Dict[str, Any]:
+    """get_effective_item_overrides for an already loaded item."""
     if not item:
         return {
             "floor_price_retail": None,
@@ -182,8 +214,20 @@ def is_line_price_at_promo(
     overrides = get_effective_item_overrides(db, item_id)
     if not overrides.get("promo_active") or overrides.get("promo_price_retail") is None:
         return False
-    promo_retail = Decimal(str(overrides["promo_price_retail"]))
     item = db.query(Item).filter(Item.id == item_id).first()
+    return is_price_at_promo(item, overrides, unit_name, unit_price_exclusive)
+
+
+def is_price_at_promo(
+    item: Optional[Item],
+    overrides: Dict[str, Any],
+    unit_name: str,
+    unit_price_exclusive: Decimal,
+) -> bool:
+    """is_line_price_at_promo for an already loaded item and its overrides."""
+    if not overrides.get("promo_active") or overrides.get("promo_price_retail") is None:
+        return False
+    promo_retail = Decimal(str(overrides["promo_price_retail"]))
     if not item:
         return False
     mult = get_unit_multiplier_from_item(item, unit_name or "")
@@ -225,8 +269,40 @@ def validate_line_price(
     config = get_global_pricing_config(db, company_id)
     overrides = get_effective_item_overrides(db, item_id)
     min_margin = PricingService.get_min_margin_percent(db, item_id, company_id)
+    branch_min_margin = None
+    if branch_id is not None:
+        branch_min_margin = get_branch_pricing_overrides(db, company_id, branch_id)["min_margin_retail_pct_override"]
+    return evaluate_line_price(
+        config,
+        overrides,
+        min_margin,
+        branch_min_margin,
+        unit_price_exclusive,
+        cost_per_sale_unit,
+        user_has_sell_below_margin,
+        is_promo_price=is_promo_price,
+        line_discount_pct=line_discount_pct,
+    )
+
+
+def evaluate_line_price(
+    config: Dict[str, Any],
+    overrides: Dict[str, Any],
+    min_margin: Decimal,
+    branch_min_margin: Any,
+    unit_price_exclusive: Decimal,
+    cost_per_sale_unit: Decimal,
+    user_has_sell_below_margin: bool,
+    *,
+    is_promo_price: bool = False,
+    line_discount_pct: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Rules of validate_line_price on already loaded inputs: config (get_global_pricing_config),
+    overrides (get_effective_item_overrides), min_margin (PricingService.get_min_margin_percent) and
+    branch_min_margin (branch_settings.min_margin_retail_pct_override, None when unset).
+    """
     effective_min_margin = min_margin
-    messages = []
 
     # 1) Floor price (item-level) — hard block when below
     floor = overrides.get("floor_price_retail")
@@ -244,19 +320,13 @@ def validate_line_price(
     floor_overrides_margin = floor is not None and unit_price_exclusive >= Decimal(str(floor))
 
     # 1c) Branch-level minimum margin override (tightens, never relaxes)
-    if branch_id is not None:
-        row = (
-            db.query(BranchSetting.min_margin_retail_pct_override)
-            .filter(BranchSetting.branch_id == branch_id)
-            .first()
-        )
-        if row and row[0] is not None:
-            try:
-                branch_min = Decimal(str(row[0]))
-                if branch_min > effective_min_margin:
-                    effective_min_margin = branch_min
-            except Exception:
-                pass
+    if branch_min_margin is not None:
+        try:
+            branch_min = Decimal(str(branch_min_margin))
+            if branch_min > effective_min_margin:
+                effective_min_margin = branch_min
+        except Exception:
+            pass
 
     # 2) Margin check (existing logic: min_margin from tier/item) — skipped when floor overrides
     if cost_per_sale_unit <= 0:
@@ -430,6 +430,181 @@ class PricingService:
             "pricing_unit": unit_name
         }
 
+    @staticmethod
+    def price_lines_batch(
+        db: Session,
+        company_id: UUID,
+        branch_id: UUID,
+        lines: List[Dict[str, Any]],
+        user_has_sell_below_margin: bool = False,
+        item_map: Optional[Dict[UUID, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Price and validate every line of a document with a constant number of queries.
+
+        lines: dicts with item_id, unit_name and optionally unit_price_exclusive (line price to
+        validate; None = not priced yet) and unit_cost (cost per base unit already known, e.g. from FEFO allocation; skips
+        the cost lookup and the recommendation). When item_map is provided the Item query is skipped.
+
+        Returns one dict per line, in order:
+          unit_cost_used     - per base unit: unit_cost, else get_item_cost (FEFO batch, last purchase,
+                               best available cost)
+          cost_per_sale_unit - unit_cost_used * unit multiplier (None when unknown)
+          recommended        - calculate_recommended_price result (None when no cost or unit_cost given)
+          error              - what calculate_recommended_price would raise (item / unit not found)
+          is_promo_price     - line price is the item's active promo price
+          validation         - validate_line_price result when the line has a price and a positive cost
+                               per sale unit, else None
+
+        3-tier prices are deprecated (get_price_for_tier returns None), so recommendations are the
+        markup-based prices of calculate_recommended_price regardless of sales tier.
+        """
+        from app.services.canonical_pricing import CanonicalPricingService
+        from app.services.pricing_config_service import (
+            evaluate_line_price,
+            get_branch_pricing_overrides,
+            get_global_pricing_config,
+            is_price_at_promo,
+            item_overrides_from_item,
+        )
+
+        if not lines:
+            return []
+        item_ids = list(dict.fromkeys(line["item_id"] for line in lines))
+        if item_map is None:
+            item_map = {i.id: i for i in db.query(Item).filter(Item.id.in_(item_ids)).all()}
+        pricing_map = {
+            p.item_id: p
+            for p in db.query(ItemPricing).filter(ItemPricing.item_id.in_(item_ids)).all()
+        }
+        tiers = {
+            t.tier_name: t
+            for t in db.query(CompanyMarginTier).filter(CompanyMarginTier.company_id == company_id).all()
+        }
+        company_defaults = db.query(CompanyPricingDefault).filter(
+            CompanyPricingDefault.company_id == company_id
+        ).first()
+        settings_row = db.query(PricingSettings).filter(PricingSettings.company_id == company_id).first()
+        config = get_global_pricing_config(db, company_id)
+        branch_min_margin = None
+        if any(line.get("unit_price_exclusive") is not None for line in lines):
+            branch_min_margin = get_branch_pricing_overrides(db, company_id, branch_id)["min_margin_retail_pct_override"]
+
+        # Cost per item: FEFO first batch, then last purchase / best available cost (one batch lookup)
+        cost_item_ids = list(dict.fromkeys(
+            line["item_id"] for line in lines
+            if line.get("unit_cost") is None and line["item_id"] in item_map
+        ))
+        fefo = InventoryService.get_fefo_first_batches(db, cost_item_ids, branch_id)
+        costs: Dict[UUID, Decimal] = {
+            iid: Decimal(str(batch["unit_cost"])) for iid, batch in fefo.items()
+        }
+        missing = [iid for iid in cost_item_ids if iid not in costs]
+        if missing:
+            costs.update(CanonicalPricingService.get_best_available_cost_batch(db, missing, branch_id, company_id))
+
+        # Inputs resolved in the same priority order as the single-item getters
+        def markup_for(item: Item) -> Decimal:
+            ip = pricing_map.get(item.id)
+            if ip and ip.markup_percent is not None:
+                return Decimal(str(ip.markup_percent))
+            tier = tiers.get(PricingService._resolve_pricing_tier(item))
+            if tier:
+                return Decimal(str(tier.default_margin_percent))
+            if company_defaults:
+                return Decimal(str(company_defaults.default_markup_percent))
+            return Decimal("30.00")
+
+        def min_margin_for(item: Item) -> Decimal:
+            ip = pricing_map.get(item.id)
+            if ip and ip.min_margin_percent is not None:
+                return Decimal(str(ip.min_margin_percent))
+            tier = tiers.get(PricingService._resolve_pricing_tier(item))
+            if tier:
+                return Decimal(str(tier.min_margin_percent))
+            if settings_row and settings_row.default_min_margin_retail_pct is not None:
+                return Decimal(str(settings_row.default_min_margin_retail_pct))
+            if company_defaults and company_defaults.min_margin_percent is not None:
+                return Decimal(str(company_defaults.min_margin_percent))
+            return Decimal("0")
+
+        def rounding_for(item: Item) -> str:
+            ip = pricing_map.get(item.id)
+            if ip and ip.rounding_rule:
+                return ip.rounding_rule
+            if company_defaults:
+                return company_defaults.rounding_rule or "nearest_1"
+            return "nearest_1"
+
+        results = []
+        for line in lines:
+            item_id, unit_name = line["item_id"], line.get("unit_name")
+            out: Dict[str, Any] = {
+                "item_id": item_id,
+                "unit_name": unit_name,
+                "unit_cost_used": None,
+                "cost_per_sale_unit": None,
+                "recommended": None,
+                "error": None,
+                "is_promo_price": False,
+                "validation": None,
+            }
+            results.append(out)
+            item = item_map.get(item_id)
+            if not item:
+                out["error"] = f"Item {item_id} not found"
+                continue
+            multiplier = get_unit_multiplier_from_item(item, unit_name)
+            given_cost = line.get("unit_cost")
+            unit_cost = Decimal(str(given_cost)) if given_cost is not None else costs.get(item_id)
+            out["unit_cost_used"] = unit_cost
+            if multiplier is None:
+                out["error"] = f"Unit '{unit_name}' not found for item {item_id}"
+            elif unit_cost:
+                out["cost_per_sale_unit"] = unit_cost * multiplier
+
+            if given_cost is None and multiplier is not None and unit_cost:
+                markup_percent = markup_for(item)
+                rounding_rule = rounding_for(item)
+                base_unit_price = PricingService.apply_rounding(
+                    unit_cost * (Decimal("1") + markup_percent / Decimal("100")), rounding_rule
+                )
+                batch = fefo.get(item_id)
+                out["recommended"] = {
+                    "recommended_unit_price": base_unit_price * multiplier,
+                    "unit_cost_used": unit_cost,
+                    "markup_percent": markup_percent,
+                    "margin_percent": ((base_unit_price - unit_cost) / unit_cost * Decimal("100")) if unit_cost > 0 else Decimal("0"),
+                    "batch_reference": {
+                        "batch_number": batch.get("batch_number"),
+                        "expiry_date": batch.get("expiry_date"),
+                    } if batch else None,
+                    "base_unit_price": base_unit_price,
+                    "rounding_rule": rounding_rule,
+                    "pricing_tier": None,
+                    "pricing_unit": unit_name,
+                }
+
+            price = line.get("unit_price_exclusive")
+            if price is None:
+                continue
+            price = Decimal(str(price))
+            overrides = item_overrides_from_item(item)
+            out["is_promo_price"] = is_price_at_promo(item, overrides, unit_name or "", price)
+            cost_per_sale_unit = out["cost_per_sale_unit"]
+            if cost_per_sale_unit is not None and unit_cost > 0 and multiplier > 0 and cost_per_sale_unit > 0:
+                out["validation"] = evaluate_line_price(
+                    config,
+                    overrides,
+                    min_margin_for(item),
+                    branch_min_margin,
+                    price,
+                    cost_per_sale_unit,
+                    user_has_sell_below_margin,
+                    is_promo_price=out["is_promo_price"],
+                )
+        return results
+
     @staticmethod
     def calculate_margin(
         unit_cost: Decimal,
@@ -0,0 +1,155 @@
+"""
+Cache of rendered PDFs for finalized documents (batched/paid sales invoices, GRNs, batched supplier
+invoices), so a reprint skips the ReportLab build.
+
+- Keyed by (doc_type, doc_id, version). document_version() hashes everything the PDF depends on that
+  can still change: document status and updated_at, company/branch updated_at, the latest updated_at
+  of the line items (names, units; lines_updated_at) and the branding asset bytes. A changed input
+  gives a new key; the old entry ages out of the LRU.
+- Memory tier bounded by RENDERED_PDF_CACHE_MAX_BYTES (least recently used evicted).
+- Optional persisted tier (RENDERED_PDF_CACHE_PERSIST): tenant-assets/{tenant_id}/documents/rendered/...,
+  written in the background after a render, read on a memory miss (restarts, other workers). Writing
+  a version deletes the document's other persisted versions, so at most one PDF per document is kept.
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Optional, Tuple
+from uuid import UUID
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_entries: "OrderedDict[Tuple[str, str, str], bytes]" = OrderedDict()
+_entry_bytes = 0
+_stats = {"hits": 0, "persisted_hits": 0, "misses": 0, "evictions": 0, "persist_errors": 0, "persisted_removed": 0}
+_persist_pool: Optional[ThreadPoolExecutor] = None
+
+
+def document_version(*parts: Any) -> str:
+    """Short digest of the inputs a rendered PDF depends on (bytes are hashed by content)."""
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, (bytes, bytearray)):
+            h.update(hashlib.sha256(part).digest())
+        else:
+            h.update(repr(part.isoformat() if hasattr(part, "isoformat") else part).encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()[:24]
+
+
+def lines_updated_at(lines: Iterable[Any]) -> Any:
+    """Latest updated_at of the items on a document's lines (item renames change the PDF), or None."""
+    stamps = [
+        getattr(line.item, "updated_at", None) for line in lines or [] if getattr(line, "item", None) is not None
+    ]
+    return max((ts for ts in stamps if ts is not None), default=None)
+
+
+def _store(key: Tuple[str, str, str], pdf: bytes) -> None:
+    global _entry_bytes
+    with _lock:
+        old = _entries.pop(key, None)
+        if old is not None:
+            _entry_bytes -= len(old)
+        _entries[key] = pdf
+        _entry_bytes += len(pdf)
+        max_bytes = max(0, int(settings.RENDERED_PDF_CACHE_MAX_BYTES))
+        while _entry_bytes > max_bytes and _entries:
+            _, evicted = _entries.popitem(last=False)
+            _entry_bytes -= len(evicted)
+            _stats["evictions"] += 1
+
+
+def _persist_enabled(tenant: Optional[Any]) -> bool:
+    return bool(settings.RENDERED_PDF_CACHE_PERSIST) and tenant is not None and getattr(tenant, "id", None) is not None
+
+
+def get(doc_type: str, doc_id: UUID, version: str, tenant: Optional[Any] = None) -> Optional[bytes]:
+    """Cached PDF bytes for this document version, from memory or (when enabled) tenant storage."""
+    key = (doc_type, str(doc_id), version)
+    with _lock:
+        pdf = _entries.get(key)
+        if pdf is not None:
+            _entries.move_to_end(key)
+            _stats["hits"] += 1
+            return pdf
+    if _persist_enabled(tenant):
+        from app.services.tenant_storage_service import download_file, path_rendered_pdf
+
+        pdf = download_file(path_rendered_pdf(tenant.id, doc_type, doc_id, version), tenant, use_asset_cache=False)
+        if pdf:
+            _store(key, pdf)
+            with _lock:
+                _stats["persisted_hits"] += 1
+            return pdf
+    with _lock:
+        _stats["misses"] += 1
+    return None
+
+
+def _persist(tenant: Any, doc_type: str, doc_id: UUID, version: str, pdf: bytes) -> None:
+    from app.services.tenant_storage_service import BUCKET, path_rendered_pdf, upload_file
+
+    stored = path_rendered_pdf(tenant.id, doc_type, doc_id, version)
+    try:
+        ok = upload_file(tenant.id, stored[len(BUCKET) + 1:], pdf, "application/pdf", tenant=tenant)
+    except Exception as e:
+        ok = None
+        logger.warning("rendered PDF persist %s %s: %s", doc_type, doc_id, e)
+    if not ok:
+        with _lock:
+            _stats["persist_errors"] += 1
+        return
+    _remove_other_versions(tenant, doc_type, doc_id, version)
+
+
+def _remove_other_versions(tenant: Any, doc_type: str, doc_id: UUID, version: str) -> None:
+    """Delete persisted PDFs of earlier versions of this document (superseded, never read again)."""
+    from app.services.tenant_storage_service import BUCKET, list_files, path_rendered_pdf, remove_files
+
+    current = path_rendered_pdf(tenant.id, doc_type, doc_id, version)[len(BUCKET) + 1:]
+    folder, name = current.rsplit("/", 1)
+    prefix = f"{doc_id}-"
+    stale = [f"{folder}/{n}" for n in list_files(folder, tenant, search=prefix) if n.startswith(prefix) and n != name]
+    if stale and remove_files(stale, tenant):
+        with _lock:
+            _stats["persisted_removed"] += len(stale)
+
+
+def put(doc_type: str, doc_id: UUID, version: str, pdf: bytes, tenant: Optional[Any] = None) -> None:
+    """Remember a rendered PDF; when persistence is on, also upload it to tenant storage in the background."""
+    global _persist_pool
+    if not pdf:
+        return
+    _store((doc_type, str(doc_id), version), pdf)
+    if _persist_enabled(tenant):
+        with _lock:
+            if _persist_pool is None:
+                _persist_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="RenderedPdfPersist")
+        _persist_pool.submit(_persist, tenant, doc_type, doc_id, version, pdf)
+
+
+def clear() -> None:
+    """Drop the memory tier and reset counters (tests)."""
+    global _entry_bytes
+    with _lock:
+        _entries.clear()
+        _entry_bytes = 0
+        for k in _stats:
+            _stats[k] = 0
+
+
+def get_metrics() -> Dict[str, Any]:
+    with _lock:
+        return {
+            **_stats,
+            "entries": len(_entries),
+            "bytes": _entry_bytes,
+            "max_bytes": int(settings.RENDERED_PDF_CACHE_MAX_BYTES),
+            "persist": bool(settings.RENDERED_PDF_CACHE_PERSIST),
+        }
@@ -0,0 +1,245 @@
+"""
+Daily sales / COGS rollup (sales_daily_rollup) per branch and business day, for gross-profit reporting.
+
+- Invoices (BATCHED/PAID) count on invoice_date, credit notes on credit_note_date, as the reports do.
+- record_invoice / record_credit_note add one document's figures in the transaction that posts it
+  (batch_sales_invoice, quotation conversion, create_credit_note). Concurrent postings add to the same
+  row through ON CONFLICT DO UPDATE and only take a shared per-(company, branch) advisory lock.
+- rebuild recomputes a date range from sales_invoices / credit_notes / inventory_ledger
+  (scripts/backfill_sales_rollup.py; also after manual data corrections). It takes that advisory lock
+  exclusively, so postings of the branch being rebuilt wait until the caller commits; other branches
+  are not blocked. Commit per branch / range.
+"""
+import logging
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.services.item_units_helper import get_unit_multiplier_from_item, get_unit_multiplier_from_item_row
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = (
+    "sales_exclusive",
+    "sales_inclusive",
+    "invoice_count",
+    "ledger_cogs",
+    "invoice_line_cogs",
+    "credit_notes_exclusive",
+    "credit_notes_inclusive",
+    "credit_note_count",
+    "return_cogs",
+)
+
+_ADD_SQL = f"""
+INSERT INTO sales_daily_rollup (branch_id, rollup_date, company_id, {", ".join(_COLUMNS)}, updated_at)
+VALUES (:branch_id, :rollup_date, :company_id, {", ".join(":" + c for c in _COLUMNS)}, NOW())
+ON CONFLICT (branch_id, rollup_date) DO UPDATE SET
+    {", ".join(f"{c} = sales_daily_rollup.{c} + EXCLUDED.{c}" for c in _COLUMNS)},
+    updated_at = NOW()
+"""
+
+_REBUILD_SALES_SQL = """
+SELECT invoice_date AS d,
+       COALESCE(SUM(total_exclusive), 0) AS sales_exclusive,
+       COALESCE(SUM(total_inclusive), 0) AS sales_inclusive,
+       COUNT(*) AS invoice_count
+FROM sales_invoices
+WHERE branch_id = :branch_id AND status IN ('BATCHED', 'PAID') AND invoice_date BETWEEN :start AND :end
+GROUP BY invoice_date
+"""
+
+_REBUILD_LEDGER_COGS_SQL = """
+SELECT si.invoice_date AS d, COALESCE(SUM(l.total_cost), 0) AS cogs
+FROM inventory_ledger l
+JOIN sales_invoices si ON si.id = l.reference_id
+WHERE l.branch_id = :branch_id AND l.transaction_type = 'SALE' AND l.reference_type = 'sales_invoice'
+  AND si.branch_id = :branch_id AND si.status IN ('BATCHED', 'PAID') AND si.invoice_date BETWEEN :start AND :end
+GROUP BY si.invoice_date
+"""
+
+_REBUILD_LINES_SQL = """
+SELECT si.invoice_date AS d, sii.quantity, sii.unit_name, sii.unit_cost_used,
+       i.wholesale_unit, COALESCE(i.retail_unit, i.base_unit) AS retail_unit, i.supplier_unit,
+       i.pack_size, i.wholesale_units_per_supplier
+FROM sales_invoice_items sii
+JOIN sales_invoices si ON si.id = sii.sales_invoice_id
+JOIN items i ON i.id = sii.item_id
+WHERE si.branch_id = :branch_id AND si.status IN ('BATCHED', 'PAID') AND si.invoice_date BETWEEN :start AND :end
+  AND sii.unit_cost_used > 0
+"""
+
+_REBUILD_CREDIT_NOTES_SQL = """
+SELECT credit_note_date AS d,
+       COALESCE(SUM(total_exclusive), 0) AS credit_notes_exclusive,
+       COALESCE(SUM(total_inclusive), 0) AS credit_notes_inclusive,
+       COUNT(*) AS credit_note_count
+FROM credit_notes
+WHERE branch_id = :branch_id AND credit_note_date BETWEEN :start AND :end
+GROUP BY credit_note_date
+"""
+
+_REBUILD_RETURN_COGS_SQL = """
+SELECT cn.credit_note_date AS d, COALESCE(SUM(l.total_cost), 0) AS return_cogs
+FROM inventory_ledger l
+JOIN credit_notes cn ON cn.id = l.reference_id
+WHERE l.branch_id = :branch_id AND l.transaction_type = 'SALE_RETURN' AND l.reference_type = 'credit_note'
+  AND cn.branch_id = :branch_id AND cn.credit_note_date BETWEEN :start AND :end
+GROUP BY cn.credit_note_date
+"""
+
+
+def _line_cogs(quantity: Any, unit_cost_used: Any, multiplier: Optional[Decimal]) -> Decimal:
+    """quantity (sale unit) x multiplier to retail x unit_cost_used (per retail/base unit)."""
+    if not unit_cost_used or float(unit_cost_used) <= 0 or multiplier is None or multiplier <= 0:
+        return Decimal("0")
+    return Decimal(str(quantity)) * multiplier * Decimal(str(unit_cost_used))
+
+
+def choose_cogs(ledger_cogs: Decimal, invoice_line_cogs: Decimal) -> tuple:
+    """
+    (cogs, source) for a reporting range. Invoice-line snapshot cost wins when present, because users
+    validate reports against it; batched SALE ledger cost is used when no line has unit_cost_used.
+    """
+    if ledger_cogs > 0 and invoice_line_cogs <= 0:
+        return ledger_cogs, "ledger"
+    return invoice_line_cogs, "invoice_lines"
+
+
+class SalesRollupService:
+    """Maintain and read sales_daily_rollup."""
+
+    @staticmethod
+    def _lock_branch(db: Session, company_id: UUID, branch_id: UUID, exclusive: bool = False) -> None:
+        """Transaction advisory lock on the branch's rollup: shared for postings, exclusive for rebuild."""
+        fn = "pg_advisory_xact_lock" if exclusive else "pg_advisory_xact_lock_shared"
+        db.execute(
+            text(f"SELECT {fn}(hashtext('sales_daily_rollup:' || :company_id || ':' || :branch_id))"),
+            {"company_id": str(company_id), "branch_id": str(branch_id)},
+        )
+
+    @staticmethod
+    def _add(db: Session, company_id: UUID, branch_id: UUID, day: date, **values: Any) -> None:
+        params: Dict[str, Any] = {c: values.get(c, 0) for c in _COLUMNS}
+        params.update({"branch_id": str(branch_id), "company_id": str(company_id), "rollup_date": day})
+        db.execute(text(_ADD_SQL), params)
+
+    @staticmethod
+    def record_invoice(
+        db: Session,
+        invoice: Any,
+        ledger_entries: Iterable[Any],
+        lines: Optional[Iterable[Any]] = None,
+    ) -> None:
+        """
+        Add a just-batched invoice (lines with final unit_cost_used; default invoice.items) and its SALE
+        ledger rows to its invoice_date. Call once, in the batching transaction.
+        """
+        invoice_line_cogs = Decimal("0")
+        for line in (invoice.items if lines is None else lines) or []:
+            item = getattr(line, "item", None)
+            if item is None:
+                continue
+            invoice_line_cogs += _line_cogs(
+                line.quantity, line.unit_cost_used, get_unit_multiplier_from_item(item, line.unit_name or "")
+            )
+        ledger_cogs = sum(
+            (Decimal(str(e.total_cost or 0)) for e in ledger_entries if e.transaction_type == "SALE"),
+            Decimal("0"),
+        )
+        SalesRollupService._lock_branch(db, invoice.company_id, invoice.branch_id)
+        SalesRollupService._add(
+            db,
+            invoice.company_id,
+            invoice.branch_id,
+            invoice.invoice_date,
+            sales_exclusive=Decimal(str(invoice.total_exclusive or 0)),
+            sales_inclusive=Decimal(str(invoice.total_inclusive or 0)),
+            invoice_count=1,
+            ledger_cogs=ledger_cogs,
+            invoice_line_cogs=invoice_line_cogs,
+        )
+
+    @staticmethod
+    def record_credit_note(db: Session, credit_note: Any, ledger_entries: Iterable[Any]) -> None:
+        """Add a new credit note (totals set) and its SALE_RETURN ledger rows to its credit_note_date."""
+        return_cogs = sum(
+            (Decimal(str(e.total_cost or 0)) for e in ledger_entries if e.transaction_type == "SALE_RETURN"),
+            Decimal("0"),
+        )
+        SalesRollupService._lock_branch(db, credit_note.company_id, credit_note.branch_id)
+        SalesRollupService._add(
+            db,
+            credit_note.company_id,
+            credit_note.branch_id,
+            credit_note.credit_note_date,
+            credit_notes_exclusive=Decimal(str(credit_note.total_exclusive or 0)),
+            credit_notes_inclusive=Decimal(str(credit_note.total_inclusive or 0)),
+            credit_note_count=1,
+            return_cogs=return_cogs,
+        )
+
+    @staticmethod
+    def rebuild(db: Session, company_id: UUID, branch_id: UUID, start: date, end: date) -> int:
+        """
+        Recompute rollup rows for start..end (inclusive) from the source documents, replacing what is
+        there. Returns rows written. Caller commits.
+        """
+        params = {"branch_id": str(branch_id), "start": start, "end": end}
+        # Postings to this branch wait until this transaction commits, so none is counted twice or lost
+        SalesRollupService._lock_branch(db, company_id, branch_id, exclusive=True)
+        days: Dict[date, Dict[str, Any]] = {}
+
+        def day_row(d: date) -> Dict[str, Any]:
+            return days.setdefault(d, {c: 0 for c in _COLUMNS})
+
+        for r in db.execute(text(_REBUILD_SALES_SQL), params):
+            row = day_row(r.d)
+            row.update(sales_exclusive=r.sales_exclusive, sales_inclusive=r.sales_inclusive, invoice_count=r.invoice_count)
+        for r in db.execute(text(_REBUILD_LEDGER_COGS_SQL), params):
+            day_row(r.d)["ledger_cogs"] = r.cogs
+        for r in db.execute(text(_REBUILD_LINES_SQL), params):
+            mult = get_unit_multiplier_from_item_row(
+                wholesale_unit=r.wholesale_unit,
+                retail_unit=r.retail_unit,
+                supplier_unit=r.supplier_unit,
+                pack_size=r.pack_size,
+                wholesale_units_per_supplier=r.wholesale_units_per_supplier,
+                unit_name=r.unit_name or "",
+            )
+            row = day_row(r.d)
+            row["invoice_line_cogs"] = Decimal(str(row["invoice_line_cogs"])) + _line_cogs(r.quantity, r.unit_cost_used, mult)
+        for r in db.execute(text(_REBUILD_CREDIT_NOTES_SQL), params):
+            row = day_row(r.d)
+            row.update(
+                credit_notes_exclusive=r.credit_notes_exclusive,
+                credit_notes_inclusive=r.credit_notes_inclusive,
+                credit_note_count=r.credit_note_count,
+            )
+        for r in db.execute(text(_REBUILD_RETURN_COGS_SQL), params):
+            day_row(r.d)["return_cogs"] = r.return_cogs
+
+        db.execute(
+            text("DELETE FROM sales_daily_rollup WHERE branch_id = :branch_id AND rollup_date BETWEEN :start AND :end"),
+            params,
+        )
+        for d, values in sorted(days.items()):
+            SalesRollupService._add(db, company_id, branch_id, d, **values)
+        return len(days)
+
+    @staticmethod
+    def get_days(db: Session, branch_id: UUID, start: date, end: date) -> List[Any]:
+        """Rollup rows for start..end (inclusive), by day; days without sales or credit notes are absent."""
+        return db.execute(
+            text(f"""
+                SELECT rollup_date, {", ".join(_COLUMNS)}
+                FROM sales_daily_rollup
+                WHERE branch_id = :branch_id AND rollup_date BETWEEN :start AND :end
+                ORDER BY rollup_date
+            """),
+            {"branch_id": str(branch_id), "start": start, "end": end},
+        ).fetchall()
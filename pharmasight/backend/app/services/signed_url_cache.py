@@ -0,0 +1,84 @@
+"""
+Cache of signed storage URLs (tenant_storage_service.get_signed_url*), so logo/signature previews
+and PO pdf-url requests skip the storage sign round-trip while an issued URL is still fresh.
+
+- Keyed by (storage base URL, bucket, object path, expires_in); the base URL identifies the tenant's
+  storage project. Bounded LRU (SIGNED_URL_CACHE_MAX_ENTRIES).
+- A URL is reused while more than SIGNED_URL_CACHE_MIN_REMAINING_FRACTION of its lifetime remains,
+  so a caller always gets at least that share of the validity it asked for.
+- Uploads in this process invalidate the object (tenant_storage_service.upload_file).
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import settings
+
+_lock = threading.Lock()
+# (scope, bucket, object_path, expires_in) -> (url, issued_at monotonic)
+_entries: "OrderedDict[Tuple[str, str, str, int], Tuple[str, float]]" = OrderedDict()
+_stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+
+
+def _key(scope: str, bucket: str, object_path: str, expires_in: int) -> Tuple[str, str, str, int]:
+    return ((scope or "").rstrip("/"), bucket, (object_path or "").lstrip("/"), int(expires_in))
+
+
+def get(scope: str, bucket: str, object_path: str, expires_in: int) -> Optional[str]:
+    """Cached URL when more than the configured fraction of its lifetime remains, else None."""
+    key = _key(scope, bucket, object_path, expires_in)
+    fraction = min(1.0, max(0.0, float(settings.SIGNED_URL_CACHE_MIN_REMAINING_FRACTION)))
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None:
+            url, issued_at = entry
+            remaining = key[3] - (time.monotonic() - issued_at)
+            if remaining > fraction * key[3]:
+                _entries.move_to_end(key)
+                _stats["hits"] += 1
+                return url
+            del _entries[key]
+        _stats["misses"] += 1
+    return None
+
+
+def put(scope: str, bucket: str, object_path: str, expires_in: int, url: str, issued_at: Optional[float] = None) -> None:
+    """Remember url; issued_at (monotonic) should be taken before the sign request was sent."""
+    if not url or int(expires_in) <= 0:
+        return
+    key = _key(scope, bucket, object_path, expires_in)
+    max_entries = max(0, int(settings.SIGNED_URL_CACHE_MAX_ENTRIES))
+    with _lock:
+        _entries[key] = (url, time.monotonic() if issued_at is None else issued_at)
+        _entries.move_to_end(key)
+        while len(_entries) > max_entries:
+            _entries.popitem(last=False)
+            _stats["evictions"] += 1
+
+
+def invalidate(bucket: str, object_path: str) -> None:
+    """Forget URLs for the object (every storage project and lifetime), e.g. after it was re-uploaded."""
+    object_path = (object_path or "").lstrip("/")
+    with _lock:
+        for key in [k for k in _entries if k[1] == bucket and k[2] == object_path]:
+            del _entries[key]
+        _stats["invalidations"] += 1
+
+
+def clear() -> None:
+    """Drop every entry and reset counters (tests)."""
+    with _lock:
+        _entries.clear()
+        for k in _stats:
+            _stats[k] = 0
+
+
+def get_metrics() -> Dict[str, Any]:
+    with _lock:
+        return {
+            **_stats,
+            "entries": len(_entries),
+            "max_entries": int(settings.SIGNED_URL_CACHE_MAX_ENTRIES),
+            "min_remaining_fraction": float(settings.SIGNED_URL_CACHE_MIN_REMAINING_FRACTION),
+        }
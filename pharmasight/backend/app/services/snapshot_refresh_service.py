@@ -8,21 +8,52 @@ Centralized snapshot recalculation service.
   → Insert into deduplicated snapshot_refresh_queue; process in background in batches.
 
 Call schedule_snapshot_refresh() from write paths; the service detects scope and
-either runs sync refresh or enqueues.
+either runs sync refresh or enqueues. Single-item refreshes are collected per transaction
+and deduplicated: one set-based refresh per (company, branch) runs just before commit, so a
+document touching the same item on many ledger rows refreshes it once.
 """
 from __future__ import annotations
 
 import logging
+from collections import defaultdict
 from typing import Callable, List, Optional
 from uuid import UUID
 
-from sqlalchemy import text
+from sqlalchemy import event, text
 from sqlalchemy.orm import Session
 
-from app.services.pos_snapshot_service import refresh_pos_snapshot_for_item
+from app.services.item_search_cache import bump_branch_versions
+from app.services.pos_snapshot_service import refresh_pos_snapshot_for_item, refresh_pos_snapshot_bulk
 
 logger = logging.getLogger(__name__)
 
+# Session.info key holding the set of (company_id, branch_id, item_id) awaiting refresh at commit
+_PENDING_REFRESH_KEY = "pending_snapshot_refresh"
+_COLLECTOR_REGISTERED = False
+
+
+def _before_commit_refresh(session: Session) -> None:
+    SnapshotRefreshService.flush_deferred_refreshes(session)
+    # Flushed refreshes mark their branches; bump the search cache versions in this same commit
+    bump_branch_versions(session)
+
+
+def _after_transaction_end(session: Session, transaction) -> None:
+    # Outermost transaction ended (commit already flushed; rollback discards): drop leftovers
+    if transaction.parent is None:
+        session.info.pop(_PENDING_REFRESH_KEY, None)
+
+
+def register_snapshot_refresh_collector() -> None:
+    """Idempotent: register Session hooks that run deferred snapshot refreshes before commit."""
+    global _COLLECTOR_REGISTERED
+    if _COLLECTOR_REGISTERED:
+        return
+    event.listen(Session, "before_commit", _before_commit_refresh)
+    event.listen(Session, "after_transaction_end", _after_transaction_end)
+    _COLLECTOR_REGISTERED = True
+    logger.debug("Snapshot refresh collector registered")
+
 
 class SnapshotRefreshService:
     """
@@ -53,6 +84,53 @@ class SnapshotRefreshService:
             )
             raise
 
+    @staticmethod
+    def defer_item_refresh(
+        db: Session,
+        company_id: UUID,
+        branch_id: UUID,
+        item_id: UUID,
+    ) -> None:
+        """
+        Collect (company_id, branch_id, item_id) for refresh at the end of the current transaction.
+        Repeated keys are deduplicated; flush_deferred_refreshes runs them (automatically before commit).
+        """
+        register_snapshot_refresh_collector()
+        if not db.in_transaction():
+            db.begin()  # keys belong to a transaction so rollback can discard them
+        db.info.setdefault(_PENDING_REFRESH_KEY, set()).add((str(company_id), str(branch_id), str(item_id)))
+
+    @staticmethod
+    def flush_deferred_refreshes(db: Session) -> int:
+        """
+        Run collected refreshes now: one refresh_pos_snapshot_bulk per (company_id, branch_id) over the
+        distinct items. Called before commit; call directly when the same transaction must read
+        item_branch_snapshot afterwards. Failures re-raise so the transaction rolls back.
+        Returns number of items refreshed.
+        """
+        if not db.info.get(_PENDING_REFRESH_KEY):
+            return 0
+        # before_commit runs ahead of commit's own flush and the refresh is raw SQL (no autoflush):
+        # pending ORM ledger / balance rows must reach the database before the snapshot reads them
+        db.flush()
+        pending = db.info.pop(_PENDING_REFRESH_KEY, None)
+        if not pending:
+            return 0
+        by_branch = defaultdict(list)
+        for company_id, branch_id, item_id in pending:
+            by_branch[(company_id, branch_id)].append(item_id)
+        refreshed = 0
+        for (company_id, branch_id), item_ids in sorted(by_branch.items()):
+            try:
+                refreshed += refresh_pos_snapshot_bulk(db, UUID(company_id), UUID(branch_id), sorted(item_ids))
+            except Exception as e:
+                logger.error(
+                    "item_branch_snapshot deferred refresh failed branch=%s items=%s: %s (transaction will roll back)",
+                    branch_id, len(item_ids), e,
+                )
+                raise
+        return refreshed
+
     @staticmethod
     def enqueue_branch_refresh(
         db: Session,
@@ -126,20 +204,21 @@ class SnapshotRefreshService:
         """
         Single entry point: detect scope and either refresh synchronously or enqueue.
 
-        - item_id set, item_ids None → single-item: sync refresh in current transaction.
-        - item_ids set, len 1 → single-item: sync refresh.
+        - item_id set, item_ids None → single-item: refreshed in current transaction, before commit
+          (deduplicated with other keys collected in the same transaction; see defer_item_refresh).
+        - item_ids set, len 1 → single-item: same as above.
         - item_ids set, len > 1 → multi-item: enqueue each (deduplicated).
         - item_id None, item_ids None → whole branch: enqueue one branch-wide job.
         - item_ids set, len 0 → no-op.
         """
         if item_id is not None and (item_ids is None or len(item_ids or []) == 0):
-            SnapshotRefreshService.refresh_item_sync(db, company_id, branch_id, item_id)
+            SnapshotRefreshService.defer_item_refresh(db, company_id, branch_id, item_id)
             return
         if item_ids is not None:
             if len(item_ids) == 0:
                 return
             if len(item_ids) == 1:
-                SnapshotRefreshService.refresh_item_sync(db, company_id, branch_id, item_ids[0])
+                SnapshotRefreshService.defer_item_refresh(db, company_id, branch_id, item_ids[0])
                 return
             SnapshotRefreshService.enqueue_item_refreshes(db, company_id, branch_id, item_ids)
             return
@@ -165,8 +244,186 @@ class SnapshotRefreshService:
             SnapshotRefreshService.refresh_item_sync(db, company_id, branch_id, item_id)
 
     # Chunk size for branch-wide jobs: refresh this many items per transaction, then commit.
-    # Prevents long locks, large memory, and slow commits when a branch has thousands of items.
-    BRANCH_WIDE_CHUNK_SIZE = 200
+    # Each chunk is one set-based refresh (refresh_pos_snapshot_bulk); chunking still bounds
+    # lock duration and statement time when a branch has tens of thousands of items.
+    BRANCH_WIDE_CHUNK_SIZE = 1000
+
+    @staticmethod
+    def refresh_items_bulk(
+        db: Session,
+        company_id: UUID,
+        branch_id: UUID,
+        item_ids: List[UUID],
+    ) -> int:
+        """
+        Refresh item_branch_snapshot for many items in one set-based pass (no commit).
+        If the bulk statement fails, rolls back and falls back to per-item refresh so one bad
+        item does not block the rest of the chunk. Returns number of items refreshed.
+        """
+        if not item_ids:
+            return 0
+        try:
+            return refresh_pos_snapshot_bulk(db, company_id, branch_id, item_ids)
+        except Exception as e:
+            logger.warning(
+                "Bulk snapshot refresh failed branch=%s items=%s, falling back to per-item: %s",
+                branch_id, len(item_ids), e,
+            )
+            db.rollback()
+        refreshed = 0
+        for iid in item_ids:
+            try:
+                refresh_pos_snapshot_for_item(db, company_id, branch_id, iid)
+                refreshed += 1
+            except Exception as e:
+                logger.warning(
+                    "Queue branch refresh failed item=%s branch=%s: %s",
+                    iid, branch_id, e,
+                )
+        return refreshed
+
+    # Claimed jobs whose heartbeat (claimed_at) is older than this are considered abandoned
+    # and can be taken over; branch-wide jobs bump claimed_at after every chunk.
+    STALE_CLAIM_INTERVAL = "1 hour"
+
+    @staticmethod
+    def claim_next_job(db: Session, branch_wide_only: bool = False):
+        """
+        Claim one pending job with FOR UPDATE SKIP LOCKED and commit the claim, so concurrent
+        workers (threads or processes, each with its own session) never pick the same row.
+        Returns the row (id, company_id, branch_id, item_id, last_item_id, items_refreshed) or None.
+        """
+        scope = "AND item_id IS NULL" if branch_wide_only else ""
+        row = db.execute(
+            text(f"""
+                SELECT id, company_id, branch_id, item_id, last_item_id, items_refreshed
+                FROM snapshot_refresh_queue
+                WHERE processed_at IS NULL
+                  AND (claimed_at IS NULL OR claimed_at < NOW() - INTERVAL '{SnapshotRefreshService.STALE_CLAIM_INTERVAL}')
+                  {scope}
+                ORDER BY created_at ASC
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            """)
+        ).first()
+        if row is None:
+            db.rollback()
+            return None
+        db.execute(
+            text("UPDATE snapshot_refresh_queue SET claimed_at = NOW() WHERE id = :id"),
+            {"id": str(row[0])},
+        )
+        db.commit()
+        return row
+
+    @staticmethod
+    def process_branch_job(
+        db: Session,
+        queue_id: UUID,
+        company_id: UUID,
+        branch_id: UUID,
+        resume_after_item_id: Optional[UUID] = None,
+        items_refreshed: int = 0,
+        chunk_size: Optional[int] = None,
+        progress_callback: Optional[Callable[..., None]] = None,
+    ) -> int:
+        """
+        Refresh every active item of the company for one branch, paging items by keyset on
+        items.id (WHERE id > cursor ORDER BY id), one set-based refresh per chunk.
+        After each chunk the cursor (last_item_id), items_refreshed and claimed_at heartbeat
+        are written in the same transaction as the snapshot rows, so a restarted worker resumes
+        from the last committed chunk. Marks the job processed at the end. Returns items refreshed.
+        """
+        chunk_size = max(1, chunk_size if chunk_size is not None else SnapshotRefreshService.BRANCH_WIDE_CHUNK_SIZE)
+        total_items = db.execute(
+            text("""
+                SELECT COUNT(*) FROM items
+                WHERE company_id = :company_id AND is_active = true
+            """),
+            {"company_id": str(company_id)},
+        ).scalar() or 0
+        if progress_callback:
+            progress_callback("branch_total", total_items=total_items, resumed_from=items_refreshed)
+        cursor = str(resume_after_item_id) if resume_after_item_id else None
+        refreshed_so_far = items_refreshed or 0
+        while True:
+            chunk = db.execute(
+                text(f"""
+                    SELECT id FROM items
+                    WHERE company_id = :company_id AND is_active = true
+                      {"AND id > CAST(:after_id AS uuid)" if cursor else ""}
+                    ORDER BY id
+                    LIMIT :limit
+                """),
+                {"company_id": str(company_id), "after_id": cursor, "limit": chunk_size},
+            ).fetchall()
+            if not chunk:
+                break
+            chunk_ids = [iid for (iid,) in chunk]
+            SnapshotRefreshService.refresh_items_bulk(db, company_id, branch_id, chunk_ids)
+            cursor = str(chunk_ids[-1])
+            refreshed_so_far += len(chunk_ids)
+            db.execute(
+                text("""
+                    UPDATE snapshot_refresh_queue
+                    SET last_item_id = :cursor, items_refreshed = :done, claimed_at = NOW()
+                    WHERE id = :id
+                """),
+                {"cursor": cursor, "done": refreshed_so_far, "id": str(queue_id)},
+            )
+            db.commit()
+            if progress_callback and total_items > 0:
+                pct = min(100, round(100.0 * refreshed_so_far / total_items, 1))
+                progress_callback("chunk_done", last_item_id=cursor, refreshed=len(chunk_ids), total_items=total_items, refreshed_so_far=refreshed_so_far, percent=pct)
+            if len(chunk_ids) < chunk_size:
+                break
+        db.execute(
+            text("UPDATE snapshot_refresh_queue SET processed_at = NOW() WHERE id = :id"),
+            {"id": str(queue_id)},
+        )
+        db.commit()
+        return refreshed_so_far
+
+    @staticmethod
+    def process_claimed_job(
+        db: Session,
+        row,
+        branch_wide_chunk_size: Optional[int] = None,
+        progress_callback: Optional[Callable[..., None]] = None,
+    ) -> bool:
+        """Run one job returned by claim_next_job. Returns True on success; rolls back and returns False on error."""
+        qid, company_id, branch_id, item_id = row[0], UUID(str(row[1])), UUID(str(row[2])), row[3]
+        job_type = "branch_wide" if item_id is None else "single_item"
+        try:
+            if progress_callback:
+                progress_callback("job_start", job_type=job_type, company_id=company_id, branch_id=branch_id, item_id=item_id)
+            if item_id is None:
+                SnapshotRefreshService.process_branch_job(
+                    db,
+                    qid,
+                    company_id,
+                    branch_id,
+                    resume_after_item_id=row[4],
+                    items_refreshed=row[5] or 0,
+                    chunk_size=branch_wide_chunk_size,
+                    progress_callback=progress_callback,
+                )
+            else:
+                refresh_pos_snapshot_for_item(db, company_id, branch_id, UUID(str(item_id)))
+                db.execute(
+                    text("UPDATE snapshot_refresh_queue SET processed_at = NOW() WHERE id = :id"),
+                    {"id": str(qid)},
+                )
+                db.commit()
+            if progress_callback:
+                progress_callback("job_done", job_type=job_type, success=True)
+            return True
+        except Exception as e:
+            logger.warning("Queue job %s failed: %s", qid, e)
+            db.rollback()
+            if progress_callback:
+                progress_callback("job_done", job_type=job_type, success=False, error=str(e))
+            return False
 
     @staticmethod
     def process_queue_batch(
@@ -176,116 +433,65 @@ class SnapshotRefreshService:
         branch_wide_chunk_size: Optional[int] = None,
     ) -> int:
         """
-        Process up to batch_size pending jobs from snapshot_refresh_queue.
+        Process up to batch_size pending jobs from snapshot_refresh_queue in this session.
+        Jobs are claimed one at a time (claim_next_job), so several workers can run this
+        concurrently against the same queue.
         - Item jobs: refresh that (item_id, branch_id) in one transaction, mark processed.
-        - Branch-wide jobs (item_id IS NULL): claim row, then process items in chunks of
-          branch_wide_chunk_size (default BRANCH_WIDE_CHUNK_SIZE); commit after each chunk.
-          Use a larger chunk size (e.g. 1000) for night batch runs to reduce commit overhead.
+        - Branch-wide jobs (item_id IS NULL): keyset-paged chunks of branch_wide_chunk_size
+          (default BRANCH_WIDE_CHUNK_SIZE), one set-based refresh and commit per chunk;
+          resumes from last_item_id when the job was abandoned by a previous worker.
 
         progress_callback: optional callable(event: str, **kwargs). Events:
           - "job_start": job_type="branch_wide"|"single_item", company_id, branch_id, item_id (or None)
-          - "branch_total": total_items=N (branch-wide only, before chunks)
-          - "chunk_done": offset, refreshed, total_items, percent (branch-wide only)
-          - "job_done": job_type, success=True
+          - "branch_total": total_items=N, resumed_from=M (branch-wide only, before chunks)
+          - "chunk_done": last_item_id, refreshed, total_items, refreshed_so_far, percent (branch-wide only)
+          - "job_done": job_type, success=True|False
         """
-        from app.models import Item
-        chunk_size = branch_wide_chunk_size if branch_wide_chunk_size is not None else SnapshotRefreshService.BRANCH_WIDE_CHUNK_SIZE
-        chunk_size = max(1, chunk_size)
-        # Include rows claimed >1h ago (stuck worker)
-        rows = db.execute(
-            text("""
-                SELECT id, company_id, branch_id, item_id
-                FROM snapshot_refresh_queue
-                WHERE processed_at IS NULL
-                  AND (claimed_at IS NULL OR claimed_at < NOW() - INTERVAL '1 hour')
-                ORDER BY created_at ASC
-                LIMIT :batch_size
-                FOR UPDATE SKIP LOCKED
-            """),
-            {"batch_size": batch_size},
-        ).fetchall()
-        if not rows:
-            return 0
         processed = 0
-        for row in rows:
-            qid, company_id, branch_id, item_id = row[0], UUID(str(row[1])), UUID(str(row[2])), row[3]
-            try:
-                if item_id is None:
-                    if progress_callback:
-                        progress_callback("job_start", job_type="branch_wide", company_id=company_id, branch_id=branch_id, item_id=None)
-                    # Branch-wide: claim so we can commit in chunks without another worker taking the row
-                    db.execute(
-                        text("UPDATE snapshot_refresh_queue SET claimed_at = NOW() WHERE id = :id"),
-                        {"id": str(qid)},
-                    )
-                    db.commit()
-                    # Get total count for progress
-                    total_result = db.execute(
-                        text("""
-                            SELECT COUNT(*) FROM items
-                            WHERE company_id = :company_id AND is_active = true
-                        """),
-                        {"company_id": str(company_id)},
-                    ).scalar()
-                    total_items = total_result or 0
-                    if progress_callback:
-                        progress_callback("branch_total", total_items=total_items)
-                    # Process items in chunks; commit after each chunk
-                    offset = 0
-                    while True:
-                        chunk = db.execute(
-                            text("""
-                                SELECT id FROM items
-                                WHERE company_id = :company_id AND is_active = true
-                                ORDER BY id
-                                LIMIT :limit OFFSET :offset
-                            """),
-                            {
-                                "company_id": str(company_id),
-                                "limit": chunk_size,
-                                "offset": offset,
-                            },
-                        ).fetchall()
-                        if not chunk:
-                            break
-                        for (iid,) in chunk:
-                            try:
-                                refresh_pos_snapshot_for_item(db, company_id, branch_id, iid)
-                            except Exception as e:
-                                logger.warning(
-                                    "Queue branch refresh failed item=%s branch=%s: %s",
-                                    iid, branch_id, e,
-                                )
-                        db.commit()
-                        refreshed_so_far = offset + len(chunk)
-                        if progress_callback and total_items > 0:
-                            pct = min(100, round(100.0 * refreshed_so_far / total_items, 1))
-                            progress_callback("chunk_done", offset=offset, refreshed=len(chunk), total_items=total_items, refreshed_so_far=refreshed_so_far, percent=pct)
-                        offset += chunk_size
-                        if len(chunk) < chunk_size:
-                            break
-                    db.execute(
-                        text("UPDATE snapshot_refresh_queue SET processed_at = NOW() WHERE id = :id"),
-                        {"id": str(qid)},
-                    )
-                    db.commit()
-                    if progress_callback:
-                        progress_callback("job_done", job_type="branch_wide", success=True)
-                else:
-                    if progress_callback:
-                        progress_callback("job_start", job_type="single_item", company_id=company_id, branch_id=branch_id, item_id=item_id)
-                    refresh_pos_snapshot_for_item(db, company_id, branch_id, UUID(str(item_id)))
-                    db.execute(
-                        text("UPDATE snapshot_refresh_queue SET processed_at = NOW() WHERE id = :id"),
-                        {"id": str(qid)},
-                    )
-                    db.commit()
-                    if progress_callback:
-                        progress_callback("job_done", job_type="single_item", success=True)
+        for _ in range(max(0, batch_size)):
+            row = SnapshotRefreshService.claim_next_job(db)
+            if row is None:
+                break
+            if SnapshotRefreshService.process_claimed_job(db, row, branch_wide_chunk_size, progress_callback):
                 processed += 1
-            except Exception as e:
-                logger.warning("Queue job %s failed: %s", qid, e)
-                db.rollback()
-                if progress_callback:
-                    progress_callback("job_done", job_type="branch_wide" if item_id is None else "single_item", success=False, error=str(e))
         return processed
+
+    @staticmethod
+    def process_queue_parallel(
+        workers: int = 4,
+        batch_size: int = 50,
+        branch_wide_chunk_size: Optional[int] = None,
+    ) -> int:
+        """
+        Drain the queue with a pool of worker processes. Each process opens its own session
+        and loops claim -> process (process_queue_batch) until the queue is empty or batch_size
+        jobs were handled by that worker; SKIP LOCKED claims keep workers on different jobs.
+        Returns total jobs processed across workers.
+        """
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        workers = max(1, workers)
+        # spawn: each worker builds its own engine/pool instead of inheriting the parent's sockets
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            futures = [
+                pool.submit(_queue_worker_main, batch_size, branch_wide_chunk_size)
+                for _ in range(workers)
+            ]
+            return sum(f.result() for f in futures)
+
+
+def _queue_worker_main(batch_size: int, branch_wide_chunk_size: Optional[int]) -> int:
+    """Process-pool entry point for SnapshotRefreshService.process_queue_parallel."""
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return SnapshotRefreshService.process_queue_batch(
+            db,
+            batch_size=batch_size,
+            branch_wide_chunk_size=branch_wide_chunk_size,
+        )
+    finally:
+        db.close()
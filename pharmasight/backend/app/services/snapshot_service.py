@@ -1,6 +1,7 @@
 """
-Snapshot service: maintains inventory_balances and item_branch_purchase_snapshot
-in sync with inventory_ledger. Called from every write point in the same transaction.
+Snapshot service: maintains inventory_balances, inventory_batch_balances and
+item_branch_purchase_snapshot in sync with inventory_ledger (and keeps inventory_daily_checkpoints
+valid). Called from every write point in the same transaction.
 
 Stock math: current_stock = current_stock + quantity_delta only. Movement type is not used;
 SALE (negative), SALE_RETURN (positive), PURCHASE (positive), PURCHASE_RETURN (negative),
@@ -10,14 +11,49 @@ all apply the same way. Ledger is immutable history; snapshot is current balance
 from __future__ import annotations
 
 import logging
-from decimal import Decimal
-from typing import List, Tuple, Any, Optional
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from uuid import UUID
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
+from app.services.inventory_checkpoint_service import InventoryCheckpointService
+
 logger = logging.getLogger(__name__)
 
+_BATCH_BALANCE_CONFLICT = (
+    "(item_id, branch_id, (COALESCE(batch_number, '')), (COALESCE(expiry_date, 'infinity'::date)), unit_cost)"
+)
+
+# Recompute inventory_batch_balances from the ledger; {scope} restricts to a branch and/or item list.
+_REBUILD_BATCH_BALANCES_SQL = """
+INSERT INTO inventory_batch_balances (
+    company_id, branch_id, item_id, batch_number, expiry_date, unit_cost,
+    quantity, first_ledger_entry_id, first_received_at, updated_at
+)
+SELECT
+    (ARRAY_AGG(company_id))[1],
+    branch_id,
+    item_id,
+    batch_number,
+    expiry_date,
+    unit_cost,
+    SUM(quantity_delta),
+    (ARRAY_AGG(id ORDER BY created_at, id) FILTER (WHERE quantity_delta > 0))[1],
+    MIN(created_at),
+    NOW()
+FROM inventory_ledger
+WHERE true {scope}
+GROUP BY item_id, branch_id, batch_number, expiry_date, unit_cost
+"""
+
+
+def _ledger_value(entry: Any, name: str) -> Any:
+    """Field from an InventoryLedger object or a bulk_insert_mappings dict."""
+    if isinstance(entry, dict):
+        return entry.get(name)
+    return getattr(entry, name, None)
+
 
 class SnapshotService:
     """Update snapshot tables in same transaction as ledger writes. Never commits."""
@@ -122,6 +158,108 @@ class SnapshotService:
             document_number=document_number or "OPENING",
         )
 
+    @staticmethod
+    def upsert_batch_balances(db: Session, entries: Iterable[Any]) -> None:
+        """
+        Apply ledger entries to inventory_batch_balances in one statement.
+        entries: InventoryLedger objects (flushed, so id is set) or bulk_insert_mappings dicts.
+        Deltas for the same (item_id, branch_id, batch_number, expiry_date, unit_cost) are summed first.
+        The first positive entry of a batch becomes its first_ledger_entry_id. Call after every ledger
+        INSERT, next to upsert_inventory_balance, in the same transaction.
+        """
+        entries = list(entries)
+        grouped: Dict[Tuple, Dict[str, Any]] = {}
+        for entry in entries:
+            unit_cost = Decimal(str(_ledger_value(entry, "unit_cost") or 0)).quantize(Decimal("0.0001"), rounding=ROUND_HALF_UP)
+            key = (
+                str(_ledger_value(entry, "item_id")),
+                str(_ledger_value(entry, "branch_id")),
+                _ledger_value(entry, "batch_number"),
+                _ledger_value(entry, "expiry_date"),
+                unit_cost,
+            )
+            qty = Decimal(str(_ledger_value(entry, "quantity_delta") or 0))
+            row = grouped.get(key)
+            if row is None:
+                row = grouped[key] = {
+                    "company_id": str(_ledger_value(entry, "company_id")),
+                    "quantity": Decimal("0"),
+                    "first_id": None,
+                    "first_at": None,
+                }
+            row["quantity"] += qty
+            if qty > 0 and row["first_id"] is None and _ledger_value(entry, "id") is not None:
+                row["first_id"] = str(_ledger_value(entry, "id"))
+                row["first_at"] = _ledger_value(entry, "created_at")
+        if not grouped:
+            return
+        InventoryCheckpointService.note_ledger_entries(db, entries)
+        value_parts = []
+        params = {}
+        # Sorted keys: concurrent writers lock batch rows in the same order
+        for i, key in enumerate(sorted(grouped, key=lambda k: (k[0], k[1], k[2] or "", str(k[3] or ""), k[4]))):
+            item_id, branch_id, batch_number, expiry_date, unit_cost = key
+            row = grouped[key]
+            value_parts.append(
+                f"(CAST(:c{i} AS uuid), CAST(:b{i} AS uuid), CAST(:i{i} AS uuid), :bn{i}, CAST(:ex{i} AS date), "
+                f":uc{i}, :q{i}, CAST(:f{i} AS uuid), COALESCE(CAST(:fa{i} AS timestamptz), NOW()), NOW())"
+            )
+            params.update({
+                f"c{i}": row["company_id"],
+                f"b{i}": branch_id,
+                f"i{i}": item_id,
+                f"bn{i}": batch_number,
+                f"ex{i}": expiry_date,
+                f"uc{i}": unit_cost,
+                f"q{i}": row["quantity"],
+                f"f{i}": row["first_id"],
+                f"fa{i}": row["first_at"],
+            })
+        db.execute(
+            text(f"""
+                INSERT INTO inventory_batch_balances (
+                    company_id, branch_id, item_id, batch_number, expiry_date, unit_cost,
+                    quantity, first_ledger_entry_id, first_received_at, updated_at
+                )
+                VALUES {", ".join(value_parts)}
+                ON CONFLICT {_BATCH_BALANCE_CONFLICT} DO UPDATE SET
+                    quantity = inventory_batch_balances.quantity + EXCLUDED.quantity,
+                    first_ledger_entry_id = COALESCE(
+                        inventory_batch_balances.first_ledger_entry_id, EXCLUDED.first_ledger_entry_id
+                    ),
+                    first_received_at = LEAST(inventory_batch_balances.first_received_at, EXCLUDED.first_received_at),
+                    updated_at = NOW()
+            """),
+            params,
+        )
+
+    @staticmethod
+    def rebuild_batch_balances(
+        db: Session,
+        branch_id: Optional[UUID] = None,
+        item_ids: Optional[List[UUID]] = None,
+    ) -> int:
+        """
+        Recompute inventory_batch_balances from inventory_ledger (all, one branch, and/or given items).
+        Deletes the scoped rows and re-inserts them; also rebuilds the daily checkpoints of the scope.
+        Returns batch balance rows written. Caller commits.
+        """
+        scope = ""
+        params: Dict[str, Any] = {}
+        if branch_id is not None:
+            scope += " AND branch_id = :branch_id"
+            params["branch_id"] = str(branch_id)
+        if item_ids is not None:
+            if not item_ids:
+                return 0
+            scope += " AND item_id = ANY(CAST(:item_ids AS uuid[]))"
+            params["item_ids"] = [str(i) for i in item_ids]
+        db.execute(text(f"DELETE FROM inventory_batch_balances WHERE true {scope}"), params)
+        result = db.execute(text(_REBUILD_BATCH_BALANCES_SQL.format(scope=scope)), params)
+        # Same ledger rewrite invalidates the daily checkpoints of these items
+        InventoryCheckpointService.rebuild_items(db, branch_id, item_ids)
+        return result.rowcount or 0
+
     @staticmethod
     def upsert_purchase_snapshot(
         db: Session,
@@ -0,0 +1,312 @@
+"""
+Branch stock take completion: post count variances and zero out uncounted stock in a constant number
+of statements, as a tracked background job (stock_take_completion_jobs).
+
+- Current stock is read once from inventory_balances (rows locked, in item order), not per item
+  from the ledger; count lines are validated against the company stock validation config in memory.
+- Adjustment costs come from CanonicalPricingService.get_best_available_cost_batch.
+- ADJUSTMENT ledger rows are bulk-inserted per STOCK_TAKE_COMPLETION_CHUNK_SIZE chunk (with their
+  batch balances); inventory_balances deltas are applied in one statement and item_branch_snapshot
+  is refreshed in one set-based pass at commit.
+- Lines that would fail (missing tracking fields, insufficient stock) are skipped and reported as
+  warnings, as the per-line completion did; everything else commits in one transaction together
+  with the session status and the job result.
+"""
+import logging
+import threading
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import InventoryLedger, Item, StockTakeCompletionJob, StockTakeCount, StockTakeSession
+from app.services.canonical_pricing import CanonicalPricingService
+from app.services.snapshot_refresh_service import SnapshotRefreshService
+from app.services.snapshot_service import SnapshotService
+from app.services.stock_validation_service import (
+    StockValidationError,
+    get_stock_validation_config,
+    validate_stock_entry_with_config,
+)
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def _tracking_error(item: Any, batch_number: Optional[str], expiry_date: Any, config: Any) -> Optional[str]:
+    """Why a stock-adding count of a track_expiry item cannot be posted, or None."""
+    bn = (batch_number or "").strip() or None
+    ed = expiry_date
+    if ed is not None and hasattr(ed, "date"):
+        ed = ed.date() if callable(ed.date) else ed
+    require_batch = bool(getattr(config, "require_batch_tracking", True))
+    require_expiry = bool(getattr(config, "require_expiry_tracking", True))
+    if (require_batch and not bn) or (require_expiry and not ed):
+        return (
+            f"Item '{item.name or item.id}' has Track Expiry. Stock take count must include the required "
+            "tracking fields when adding stock. Missing on completion."
+        )
+    try:
+        res = validate_stock_entry_with_config(
+            config,
+            batch_number=bn,
+            expiry_date=ed,
+            track_expiry=True,
+            require_batch=require_batch,
+            require_expiry=require_expiry,
+            override=False,
+        )
+    except StockValidationError as e:
+        return e.result.message if e.result else str(e)
+    if not res.valid:
+        return res.message or "Batch/expiry validation failed."
+    return None
+
+
+def complete_stock_take(
+    db: Session,
+    session: StockTakeSession,
+    completing_user_id: UUID,
+    progress: Optional[ProgressCallback] = None,
+) -> Dict[str, Any]:
+    """
+    Apply the counts of an ACTIVE session (locked by the caller) to its branch and mark it COMPLETED.
+    Counted items get one ADJUSTMENT per non-zero count variance; items with stock that were not
+    counted are zeroed out. progress(processed, total) is called after each chunk of ledger rows.
+    Does not commit. Returns the completion summary (items_updated, items_zeroed, total_counts, warnings).
+    """
+    company_id, branch_id = session.company_id, session.branch_id
+    counts = (
+        db.query(
+            StockTakeCount.item_id,
+            StockTakeCount.variance,
+            StockTakeCount.batch_number,
+            StockTakeCount.expiry_date,
+        )
+        .filter(StockTakeCount.session_id == session.id)
+        .order_by(StockTakeCount.counted_at, StockTakeCount.id)
+        .all()
+    )
+
+    # Pre-completion stock of the whole branch; locked so no movement lands between check and post
+    stock: Dict[UUID, Decimal] = {
+        row.item_id: Decimal(str(row.current_stock or 0))
+        for row in db.execute(
+            text("""
+                SELECT item_id, current_stock FROM inventory_balances
+                WHERE branch_id = :branch_id
+                ORDER BY item_id
+                FOR UPDATE
+            """),
+            {"branch_id": str(branch_id)},
+        )
+    }
+    counted_item_ids = {c.item_id for c in counts}
+    uncounted = sorted(
+        ((iid, qty) for iid, qty in stock.items() if qty > 0 and iid not in counted_item_ids),
+        key=lambda r: str(r[0]),
+    )
+
+    variance_item_ids = {c.item_id for c in counts if c.variance}
+    items = {
+        row.id: row
+        for row in (
+            db.query(Item.id, Item.name, Item.track_expiry).filter(Item.id.in_(variance_item_ids)).all()
+            if variance_item_ids else []
+        )
+    }
+    config = get_stock_validation_config(db, company_id)
+
+    # (item_id, quantity_delta, batch_number, expiry_date, notes) per ledger row, in posting order
+    lines: List[tuple] = []
+    warnings: List[str] = []
+    running = dict(stock)
+    for count in counts:
+        if not count.variance:
+            continue
+        item = items.get(count.item_id)
+        if item is None:
+            logger.warning("Item %s not found when completing stock take", count.item_id)
+            continue
+        variance = Decimal(count.variance)
+        if variance > 0 and item.track_expiry:
+            error = _tracking_error(item, count.batch_number, count.expiry_date, config)
+            if error:
+                warnings.append(f"Item {count.item_id}: {error}")
+                continue
+        current = running.get(count.item_id, Decimal("0"))
+        if current + variance < 0:
+            warnings.append(
+                f"Item {count.item_id}: Insufficient stock for movement: current_stock={current} "
+                f"quantity_delta={variance} would give new_stock={current + variance}"
+            )
+            continue
+        running[count.item_id] = current + variance
+        lines.append((count.item_id, variance, count.batch_number, count.expiry_date, "Stock take count adjustment"))
+    items_updated = len(lines)
+    for item_id, qty in uncounted:
+        lines.append((item_id, -qty, None, None, "Stock take: uncounted item zeroed out"))
+    items_zeroed = len(lines) - items_updated
+
+    total = len(lines)
+    if progress:
+        progress(0, total)
+    costs = CanonicalPricingService.get_best_available_cost_batch(
+        db, list({line[0] for line in lines}), branch_id, company_id
+    )
+    chunk_size = max(1, int(settings.STOCK_TAKE_COMPLETION_CHUNK_SIZE))
+    deltas: Dict[UUID, Decimal] = {}
+    for start in range(0, total, chunk_size):
+        entries = []
+        for item_id, qty, batch_number, expiry_date, notes in lines[start:start + chunk_size]:
+            unit_cost = costs.get(item_id, Decimal("0"))
+            entries.append({
+                "id": uuid.uuid4(),
+                "company_id": company_id,
+                "branch_id": branch_id,
+                "item_id": item_id,
+                "transaction_type": "ADJUSTMENT",
+                "reference_type": "STOCK_TAKE",
+                "reference_id": session.id,
+                "document_number": session.session_code,
+                "quantity_delta": qty,
+                "unit_cost": unit_cost,
+                "total_cost": abs(qty) * unit_cost,
+                "created_by": completing_user_id,
+                "notes": notes,
+                "batch_number": batch_number,
+                "expiry_date": expiry_date,
+            })
+            deltas[item_id] = deltas.get(item_id, Decimal("0")) + qty
+        db.bulk_insert_mappings(InventoryLedger, entries)
+        SnapshotService.upsert_batch_balances(db, entries)
+        if progress:
+            progress(start + len(entries), total)
+
+    SnapshotService.upsert_inventory_balance_bulk(
+        db, [(company_id, branch_id, item_id, qty) for item_id, qty in sorted(deltas.items(), key=lambda d: str(d[0]))]
+    )
+    # Deferred keys are refreshed with one refresh_pos_snapshot_bulk for the branch before commit
+    for item_id in deltas:
+        SnapshotRefreshService.defer_item_refresh(db, company_id, branch_id, item_id)
+
+    session.status = "COMPLETED"
+    session.completed_at = datetime.now(timezone.utc)
+    db.flush()
+    logger.info(
+        "Stock take session %s completed for branch %s. Items updated from counts: %s, items zeroed (uncounted): %s",
+        session.id, branch_id, items_updated, items_zeroed,
+    )
+    return {
+        "session_id": str(session.id),
+        "items_updated": items_updated,
+        "items_zeroed": items_zeroed,
+        "total_counts": len(counts),
+        "warnings": warnings,
+    }
+
+
+def fail_stale_jobs(db: Session, session_id: UUID) -> int:
+    """
+    Mark pending/processing jobs of session_id without progress for STOCK_TAKE_COMPLETION_STALE_SECONDS
+    as failed (their thread died with a restart or redeploy; nothing of them was committed), so the
+    stock take can be completed again. Does not commit. Returns jobs marked failed.
+    """
+    result = db.execute(
+        text("""
+            UPDATE stock_take_completion_jobs
+            SET status = 'failed',
+                error_message = 'Completion was interrupted (no progress); start it again.',
+                completed_at = NOW(),
+                updated_at = NOW()
+            WHERE session_id = :session_id
+              AND status IN ('pending', 'processing')
+              AND updated_at < NOW() - make_interval(secs => :stale_seconds)
+        """),
+        {"session_id": str(session_id), "stale_seconds": max(1, int(settings.STOCK_TAKE_COMPLETION_STALE_SECONDS))},
+    )
+    if result.rowcount:
+        logger.warning("Stock take session %s: %s abandoned completion job(s) marked failed", session_id, result.rowcount)
+    return result.rowcount or 0
+
+
+def run_completion_job(job_id: UUID, database_url: Optional[str] = None) -> None:
+    """
+    Background thread entry point: own DB session; the stock take and the job result commit together.
+    Progress is committed on a second session so pollers see it while the completion runs.
+    Marks the job failed on any error (nothing of the stock take is applied then).
+    """
+    from app.database import SessionLocal
+    from app.dependencies import _session_factory_for_url
+
+    factory = _session_factory_for_url(database_url) if database_url else SessionLocal
+    db = factory()
+    progress_db = factory()
+
+    def report(processed: int, total: int) -> None:
+        progress_db.execute(
+            text("""
+                UPDATE stock_take_completion_jobs
+                SET processed_items = :processed, total_items = :total, updated_at = NOW()
+                WHERE id = :job_id
+            """),
+            {"processed": processed, "total": total, "job_id": str(job_id)},
+        )
+        progress_db.commit()
+
+    try:
+        job = db.query(StockTakeCompletionJob).filter(StockTakeCompletionJob.id == job_id).first()
+        if not job:
+            logger.error("Stock take completion job %s not found", job_id)
+            return
+        job.status = "processing"
+        job.started_at = datetime.now(timezone.utc)
+        db.commit()
+
+        session = (
+            db.query(StockTakeSession)
+            .filter(StockTakeSession.id == job.session_id, StockTakeSession.status == "ACTIVE")
+            .with_for_update()
+            .first()
+        )
+        if not session:
+            raise ValueError("No active stock take session found for this branch")
+        result = complete_stock_take(db, session, job.user_id, progress=report)
+
+        job.status = "completed"
+        job.total_items = job.processed_items = result["items_updated"] + result["items_zeroed"]
+        job.items_updated = result["items_updated"]
+        job.items_zeroed = result["items_zeroed"]
+        job.total_counts = result["total_counts"]
+        job.warnings = result["warnings"] or None
+        job.completed_at = datetime.now(timezone.utc)
+        db.commit()
+    except Exception as e:
+        logger.error("Stock take completion job %s failed: %s", job_id, e, exc_info=True)
+        db.rollback()
+        job = db.query(StockTakeCompletionJob).filter(StockTakeCompletionJob.id == job_id).first()
+        if job:
+            job.status = "failed"
+            job.error_message = str(e)[:1000]
+            job.completed_at = datetime.now(timezone.utc)
+            db.commit()
+    finally:
+        progress_db.close()
+        db.close()
+
+
+def start_completion_job(job: StockTakeCompletionJob, database_url: Optional[str]) -> threading.Thread:
+    thread = threading.Thread(
+        target=run_completion_job,
+        args=(job.id, database_url),
+        daemon=True,
+        name=f"StockTakeCompletion-{job.id}",
+    )
+    thread.start()
+    return thread
@@ -73,9 +73,17 @@ class StockValidationConfig:
 
 def get_stock_validation_config(db: "Session", company_id) -> StockValidationConfig:
     """
-    Load stock validation config for a company (one query). Use once per request.
-    No DB lookup per line item.
+    Load stock validation config for a company (cached per company_config_cache; one query on a miss).
+    Use once per request. No DB lookup per line item.
     """
+    from app.services import company_config_cache
+
+    return company_config_cache.get(
+        db, company_id, "stock_validation", lambda: _load_stock_validation_config(db, company_id)
+    )
+
+
+def _load_stock_validation_config(db: "Session", company_id) -> StockValidationConfig:
     from app.models.settings import CompanySetting
 
     mode = STOCK_VALIDATION_MODE_STRICT
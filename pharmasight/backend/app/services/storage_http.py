@@ -0,0 +1,195 @@
+"""
+Shared HTTP clients for Supabase Storage REST calls (tenant_storage_service).
+
+- One keep-alive httpx client per storage base URL (per event loop for the async client), so
+  consecutive storage operations reuse connections instead of paying a TLS handshake each.
+  HTTP/2 when STORAGE_HTTP2 is on and the optional `h2` package is installed.
+- Bounded retries with exponential backoff for transport errors and 429/502/503/504
+  (STORAGE_HTTP_RETRIES, STORAGE_HTTP_BACKOFF_SECONDS). Other responses are returned as-is.
+- Per-operation latency metrics (get_metrics), keyed by the caller's operation label.
+"""
+import asyncio
+import importlib.util
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Tuple
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_RETRY_STATUSES = {429, 502, 503, 504}
+_RETRY_EXCEPTIONS = (httpx.TransportError,)
+_LATENCY_SAMPLES = 200
+
+_lock = threading.Lock()
+_clients: Dict[str, httpx.Client] = {}
+_async_clients: Dict[Tuple[str, int], httpx.AsyncClient] = {}
+_metrics: Dict[str, Dict[str, Any]] = {}
+
+
+def _http2_enabled() -> bool:
+    return bool(getattr(settings, "STORAGE_HTTP2", True)) and importlib.util.find_spec("h2") is not None
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=max(1, int(settings.STORAGE_HTTP_MAX_CONNECTIONS)),
+        max_keepalive_connections=max(0, int(settings.STORAGE_HTTP_MAX_KEEPALIVE)),
+        keepalive_expiry=30.0,
+    )
+
+
+def _pool_key(url: str) -> str:
+    """scheme://host[:port] of url (clients are shared per storage origin)."""
+    parsed = httpx.URL(url)
+    port = f":{parsed.port}" if parsed.port else ""
+    return f"{parsed.scheme}://{parsed.host}{port}"
+
+
+def get_client(url: str) -> httpx.Client:
+    key = _pool_key(url)
+    with _lock:
+        client = _clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.Client(http2=_http2_enabled(), limits=_limits(), timeout=20.0)
+            _clients[key] = client
+        return client
+
+
+def get_async_client(url: str) -> httpx.AsyncClient:
+    """Async client for url's origin, bound to the running event loop."""
+    key = (_pool_key(url), id(asyncio.get_running_loop()))
+    with _lock:
+        client = _async_clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(http2=_http2_enabled(), limits=_limits(), timeout=20.0)
+            _async_clients[key] = client
+        return client
+
+
+def _record(operation: str, elapsed: float, retries: int, failed: bool) -> None:
+    with _lock:
+        m = _metrics.get(operation)
+        if m is None:
+            m = _metrics[operation] = {
+                "requests": 0, "errors": 0, "retries": 0, "total_ms": 0.0, "max_ms": 0.0,
+                "samples": deque(maxlen=_LATENCY_SAMPLES),
+            }
+        ms = elapsed * 1000.0
+        m["requests"] += 1
+        m["errors"] += 1 if failed else 0
+        m["retries"] += retries
+        m["total_ms"] += ms
+        m["max_ms"] = max(m["max_ms"], ms)
+        m["samples"].append(ms)
+
+
+def _backoff(attempt: int) -> float:
+    return float(settings.STORAGE_HTTP_BACKOFF_SECONDS) * (2 ** attempt)
+
+
+def request(operation: str, method: str, url: str, **kwargs: Any) -> httpx.Response:
+    """
+    Send a request on the shared client for url's origin, retrying transient failures.
+    Raises the last transport error when every attempt failed.
+    """
+    retries = max(0, int(settings.STORAGE_HTTP_RETRIES))
+    client = get_client(url)
+    start = time.perf_counter()
+    attempt = 0
+    while True:
+        try:
+            resp = client.request(method, url, **kwargs)
+            if resp.status_code in _RETRY_STATUSES and attempt < retries:
+                logger.info("storage %s %s: status %s, retrying", operation, method, resp.status_code)
+            else:
+                _record(operation, time.perf_counter() - start, attempt, resp.status_code >= 400)
+                return resp
+        except _RETRY_EXCEPTIONS as e:
+            if attempt >= retries:
+                _record(operation, time.perf_counter() - start, attempt, True)
+                raise
+            logger.info("storage %s %s: %s, retrying", operation, method, e)
+        time.sleep(_backoff(attempt))
+        attempt += 1
+
+
+async def arequest(operation: str, method: str, url: str, **kwargs: Any) -> httpx.Response:
+    """Async variant of request (for async routes)."""
+    retries = max(0, int(settings.STORAGE_HTTP_RETRIES))
+    client = get_async_client(url)
+    start = time.perf_counter()
+    attempt = 0
+    while True:
+        try:
+            resp = await client.request(method, url, **kwargs)
+            if resp.status_code in _RETRY_STATUSES and attempt < retries:
+                logger.info("storage %s %s: status %s, retrying", operation, method, resp.status_code)
+            else:
+                _record(operation, time.perf_counter() - start, attempt, resp.status_code >= 400)
+                return resp
+        except _RETRY_EXCEPTIONS as e:
+            if attempt >= retries:
+                _record(operation, time.perf_counter() - start, attempt, True)
+                raise
+            logger.info("storage %s %s: %s, retrying", operation, method, e)
+        await asyncio.sleep(_backoff(attempt))
+        attempt += 1
+
+
+def _percentile(samples: Deque[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(pct * len(ordered)))], 2)
+
+
+def get_metrics() -> Dict[str, Any]:
+    with _lock:
+        operations = {
+            op: {
+                "requests": m["requests"],
+                "errors": m["errors"],
+                "retries": m["retries"],
+                "avg_ms": round(m["total_ms"] / m["requests"], 2) if m["requests"] else 0.0,
+                "p50_ms": _percentile(m["samples"], 0.5),
+                "p95_ms": _percentile(m["samples"], 0.95),
+                "max_ms": round(m["max_ms"], 2),
+            }
+            for op, m in sorted(_metrics.items())
+        }
+        return {
+            "http2": _http2_enabled(),
+            "clients": sorted(_clients),
+            "async_clients": len(_async_clients),
+            "operations": operations,
+        }
+
+
+def close_all() -> None:
+    """Close sync clients and forget async ones and metrics (tests; aclose_all at shutdown)."""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+        _async_clients.clear()
+        _metrics.clear()
+    for client in clients:
+        client.close()
+
+
+async def aclose_all() -> None:
+    """Close every client (app shutdown); async clients are closed on the running loop."""
+    with _lock:
+        async_clients = list(_async_clients.values())
+        _async_clients.clear()
+    for client in async_clients:
+        try:
+            await client.aclose()
+        except RuntimeError:
+            pass  # bound to another (closed) loop
+    close_all()
@@ -0,0 +1,251 @@
+"""
+Tenant engine manager - one SQLAlchemy engine per tenant database URL, under a global budget.
+
+- Each tenant engine gets TENANT_DB_POOL_SIZE + TENANT_DB_MAX_OVERFLOW connections at most; the
+  sum over all engines of this process stays within TENANT_DB_GLOBAL_MAX_CONNECTIONS.
+- A new engine that does not fit first disposes least-recently-used engines with no checked-out
+  connection; if still short it is created with whatever budget remains (minimum one connection).
+- Engines unused for TENANT_ENGINE_IDLE_SECONDS (and with nothing checked out) are disposed.
+- Disposed engines stay reachable through session factories / sessions handed out earlier (background
+  jobs, a request between lookup and use) and would open connections in a fresh pool. They are kept
+  as retired (weak references) and their open connections count against the budget until no one
+  holds them; idle connections of retired engines are closed on every sweep.
+- Per-engine pool metrics (checkouts, waits for a free connection, timeouts, overflow use,
+  connects, peak checked out) for the admin metrics endpoint (get_metrics).
+"""
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from sqlalchemy import create_engine, exc, pool
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Idle sweeps run at most this often (piggybacked on session_factory calls)
+_SWEEP_INTERVAL_SECONDS = 30.0
+
+
+class _PoolStats:
+    __slots__ = ("checkouts", "waits", "wait_ms", "timeouts", "overflow_checkouts", "connects", "peak_checked_out")
+
+    def __init__(self):
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_ms = 0.0
+        self.timeouts = 0
+        self.overflow_checkouts = 0
+        self.connects = 0
+        self.peak_checked_out = 0
+
+
+class _MeteredQueuePool(pool.QueuePool):
+    """QueuePool that records checkouts, waits (pool exhausted at checkout) and overflow use."""
+
+    _stats: Optional[_PoolStats] = None
+
+    def _do_get(self):
+        stats = self._stats
+        if stats is None:
+            return super()._do_get()
+        exhausted = self.checkedout() >= self.size() + self._max_overflow
+        t0 = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            stats.waits += 1
+            stats.timeouts += 1
+            stats.wait_ms += (time.perf_counter() - t0) * 1000
+            raise
+        if exhausted:
+            stats.waits += 1
+            stats.wait_ms += (time.perf_counter() - t0) * 1000
+        stats.checkouts += 1
+        if self.overflow() > 0:
+            stats.overflow_checkouts += 1
+        checked_out = self.checkedout()
+        if checked_out > stats.peak_checked_out:
+            stats.peak_checked_out = checked_out
+        return conn
+
+    def _create_connection(self):
+        if self._stats is not None:
+            self._stats.connects += 1
+        return super()._create_connection()
+
+    def recreate(self):
+        # engine.dispose() swaps in a recreated pool; keep counting into the same stats
+        new_pool = super().recreate()
+        new_pool._stats = self._stats
+        return new_pool
+
+
+class _TenantEngine:
+    __slots__ = ("engine", "factory", "capacity", "pool_size", "max_overflow", "created_at", "last_used", "stats")
+
+    def __init__(self, engine, factory, pool_size: int, max_overflow: int, stats: _PoolStats):
+        self.engine = engine
+        self.factory = factory
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.capacity = pool_size + max_overflow
+        self.created_at = time.time()
+        self.last_used = time.monotonic()
+        self.stats = stats
+
+    def checked_out(self) -> int:
+        return self.engine.pool.checkedout()
+
+
+_lock = threading.Lock()
+# effective tenant URL -> engine entry, least recently used first
+_engines: "OrderedDict[str, _TenantEngine]" = OrderedDict()
+_counters: Dict[str, int] = {"created": 0, "evicted_lru": 0, "evicted_idle": 0, "over_budget": 0}
+_last_sweep = 0.0
+# Disposed engines still referenced by earlier factories / sessions
+_retired: List["weakref.ref"] = []
+
+
+def _retired_engines() -> list:
+    """Live retired engines (drops the ones nobody references any more)."""
+    live = [e for e in (ref() for ref in _retired) if e is not None]
+    _retired[:] = [weakref.ref(e) for e in live]
+    return live
+
+
+def _retired_connections() -> int:
+    return sum(e.pool.checkedout() + e.pool.checkedin() for e in _retired_engines())
+
+
+def _reserved() -> int:
+    return sum(e.capacity for e in _engines.values()) + _retired_connections()
+
+
+def _dispose(url: str, reason: str) -> None:
+    entry = _engines.pop(url)
+    entry.engine.dispose()
+    _retired.append(weakref.ref(entry.engine))
+    _counters["evicted_" + reason] += 1
+    logger.info("Disposed tenant engine (%s): capacity=%s engines_left=%s", reason, entry.capacity, len(_engines))
+
+
+def _evict_idle(now: float) -> None:
+    idle_after = settings.TENANT_ENGINE_IDLE_SECONDS
+    for url in [u for u, e in _engines.items() if now - e.last_used > idle_after and e.checked_out() == 0]:
+        _dispose(url, "idle")
+    # Drain retired engines: close connections returned since they were disposed
+    for engine in _retired_engines():
+        if engine.pool.checkedin() > 0 and engine.pool.checkedout() == 0:
+            engine.dispose()
+
+
+def _make_room(needed: int) -> None:
+    """Dispose LRU engines with nothing checked out until needed connections fit the budget."""
+    budget = settings.TENANT_DB_GLOBAL_MAX_CONNECTIONS
+    for url in list(_engines):
+        if _reserved() + needed <= budget:
+            return
+        if _engines[url].checked_out() == 0:
+            _dispose(url, "lru")
+
+
+def session_factory(effective_url: str, connect_args: dict) -> sessionmaker:
+    """Session factory for a (resolved) tenant URL; creates the engine within the budget. Thread-safe."""
+    global _last_sweep
+    now = time.monotonic()
+    with _lock:
+        if now - _last_sweep > _SWEEP_INTERVAL_SECONDS:
+            _last_sweep = now
+            _evict_idle(now)
+        entry = _engines.get(effective_url)
+        if entry is not None:
+            entry.last_used = now
+            _engines.move_to_end(effective_url)
+            return entry.factory
+
+        pool_size = max(1, settings.TENANT_DB_POOL_SIZE)
+        max_overflow = max(0, settings.TENANT_DB_MAX_OVERFLOW)
+        _make_room(pool_size + max_overflow)
+        available = settings.TENANT_DB_GLOBAL_MAX_CONNECTIONS - _reserved()
+        if available < pool_size + max_overflow:
+            # Every other engine is busy: run this tenant on what is left rather than refuse it
+            _counters["over_budget"] += 1
+            pool_size = max(1, min(pool_size, available))
+            max_overflow = max(0, min(max_overflow, available - pool_size))
+            logger.warning(
+                "Tenant connection budget exhausted (%s reserved of %s); new engine limited to %s+%s",
+                _reserved(), settings.TENANT_DB_GLOBAL_MAX_CONNECTIONS, pool_size, max_overflow,
+            )
+        engine = create_engine(
+            effective_url,
+            poolclass=_MeteredQueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=settings.TENANT_DB_POOL_TIMEOUT_SECONDS,
+            pool_pre_ping=True,
+            pool_recycle=3600,
+            connect_args=connect_args,
+            echo=settings.DEBUG,
+        )
+        stats = _PoolStats()
+        engine.pool._stats = stats
+        factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        _engines[effective_url] = _TenantEngine(engine, factory, pool_size, max_overflow, stats)
+        _counters["created"] += 1
+        return factory
+
+
+def has_connected(engine) -> bool:
+    """True once the engine's pool has opened a connection (later checkouts rely on pre_ping)."""
+    stats = getattr(engine.pool, "_stats", None)
+    return stats is None or stats.connects > 0
+
+
+def dispose_all() -> None:
+    """Dispose every tenant engine (shutdown, tests)."""
+    with _lock:
+        for entry in _engines.values():
+            entry.engine.dispose()
+        _engines.clear()
+        for engine in _retired_engines():
+            engine.dispose()
+        _retired.clear()
+
+
+def get_metrics() -> Dict:
+    """Budget, counters and per-engine pool metrics. Host part only; credentials are not exposed."""
+    now = time.monotonic()
+    with _lock:
+        engines = []
+        for entry in reversed(_engines.values()):  # most recently used first
+            s = entry.stats
+            p = entry.engine.pool
+            engines.append({
+                "host": entry.engine.url.host,
+                "database": entry.engine.url.database,
+                "pool_size": entry.pool_size,
+                "max_overflow": entry.max_overflow,
+                "checked_out": p.checkedout(),
+                "idle_in_pool": p.checkedin(),
+                "idle_seconds": round(now - entry.last_used, 1),
+                "checkouts": s.checkouts,
+                "waits": s.waits,
+                "wait_ms_total": round(s.wait_ms, 1),
+                "timeouts": s.timeouts,
+                "overflow_checkouts": s.overflow_checkouts,
+                "connects": s.connects,
+                "peak_checked_out": s.peak_checked_out,
+            })
+        return {
+            "global_max_connections": settings.TENANT_DB_GLOBAL_MAX_CONNECTIONS,
+            "reserved_connections": _reserved(),
+            "retired_engines": len(_retired_engines()),
+            "retired_connections": _retired_connections(),
+            "engines": engines,
+            **_counters,
+        }
@@ -0,0 +1,178 @@
+"""
+Tenant migration orchestrator - applies missing migrations to all tenant DBs in parallel.
+
+- Bounded thread pool (TENANT_MIGRATION_WORKERS); each tenant has its own time budget
+  (TENANT_MIGRATION_TIMEOUT_SECONDS, enforced via statement_timeout in run_migrations_for_url).
+- Per-tenant progress is kept in-process (get_progress) for the admin status endpoint.
+- Gate mode (TENANT_MIGRATION_MODE=background): startup returns at once and requests for a
+  tenant wait in wait_until_migrated until that tenant's DB has been migrated.
+- Tenants sharing a database_url are migrated once, never concurrently.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+TIMEOUT = "timeout"
+_FINISHED = (DONE, FAILED, TIMEOUT)
+
+_lock = threading.Lock()
+# tenant_id (str) -> progress dict; rebuilt by each run
+_progress: Dict[str, Dict] = {}
+# database_url -> Event set when that DB's migrations have finished (any outcome)
+_ready: Dict[str, threading.Event] = {}
+_run_info: Dict = {"mode": None, "started_at": None, "finished_at": None}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _url_key(database_url: Optional[str]) -> str:
+    return (database_url or "").strip()
+
+
+def _describe_error(database_url: str, e: Exception) -> str:
+    """Error text with operator hints (same hints as the sequential runner had)."""
+    err_str = str(e)
+    if "Network is unreachable" in err_str and "supabase.co" in (database_url or ""):
+        err_str += " (On Render, use Supabase connection pooler URL instead of db.xxx.supabase.co – see RENDER.md)"
+    if "Tenant or user not found" in err_str:
+        err_str += " (Supabase project was deleted; point tenant at single DB or run: python scripts/mark_tenant_cancelled.py <tenant_id_or_name>)"
+    return err_str
+
+
+def _group_by_url(tenants: List) -> Dict[str, List]:
+    """Tenants sharing one database_url are migrated once (never concurrently on the same DB)."""
+    groups: Dict[str, List] = {}
+    for t in tenants:
+        groups.setdefault(_url_key(t.database_url), []).append(t)
+    return groups
+
+
+def register_tenants(tenants: List, mode: str) -> None:
+    """Reset progress and mark every tenant pending (gates close before the pool starts)."""
+    with _lock:
+        for event in _ready.values():
+            event.set()  # release anyone waiting on a previous run
+        _progress.clear()
+        _ready.clear()
+        _run_info.update(mode=mode, started_at=_now(), finished_at=None)
+        for url, group in _group_by_url(tenants).items():
+            _ready[url] = threading.Event()
+            for t in group:
+                _progress[str(t.id)] = {
+                    "tenant_id": str(t.id),
+                    "subdomain": t.subdomain,
+                    "status": PENDING,
+                    "applied": [],
+                    "error": None,
+                    "started_at": None,
+                    "finished_at": None,
+                }
+
+
+def _migrate_url(database_url: str, tenants: List, timeout_seconds: Optional[float]) -> None:
+    from app.services.migration_service import run_migrations_for_url
+
+    tids = [str(t.id) for t in tenants]
+    with _lock:
+        for tid in tids:
+            _progress[tid].update(status=RUNNING, started_at=_now())
+    status, applied, error = DONE, [], None
+    try:
+        applied = run_migrations_for_url(database_url, timeout_seconds=timeout_seconds)
+    except Exception as e:
+        timed_out = isinstance(e, TimeoutError) or "statement timeout" in str(e).lower()
+        status, error = (TIMEOUT if timed_out else FAILED), _describe_error(database_url, e)
+        logger.exception("Migrations failed for tenant(s) %s: %s", ", ".join(t.name for t in tenants), e)
+    with _lock:
+        for i, tid in enumerate(tids):
+            # Versions are reported once per DB (on the first tenant sharing it)
+            _progress[tid].update(status=status, applied=applied if i == 0 else [], error=error, finished_at=_now())
+        _ready[database_url].set()
+
+
+def _run_registered(tenants: List, max_workers: int, timeout_seconds: Optional[float]) -> Dict:
+    groups = _group_by_url(tenants)
+    if groups:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="TenantMigrations") as pool:
+            for url, group in groups.items():
+                pool.submit(_migrate_url, url, group, timeout_seconds)
+    with _lock:
+        _run_info["finished_at"] = _now()
+        applied = {tid: p["applied"] for tid, p in _progress.items() if p["applied"]}
+        errors = {tid: p["error"] for tid, p in _progress.items() if p["error"]}
+    return {"applied": applied, "errors": errors}
+
+
+def run_all(tenants: List, max_workers: int = 4, timeout_seconds: Optional[float] = None) -> Dict:
+    """
+    Migrate all tenants on a pool of max_workers threads; blocks until every tenant finished.
+    Returns { "applied": { tenant_id: [versions] }, "errors": { tenant_id: str } }.
+    """
+    register_tenants(tenants, "blocking")
+    return _run_registered(tenants, max_workers, timeout_seconds)
+
+
+def start_background(tenants: List, max_workers: int = 4, timeout_seconds: Optional[float] = None) -> threading.Thread:
+    """Gate mode: register tenants (closing their gates) and migrate them on a daemon thread."""
+    register_tenants(tenants, "background")
+
+    def _run():
+        try:
+            out = _run_registered(tenants, max_workers, timeout_seconds)
+            if out["applied"]:
+                logger.info("Background migrations applied on tenant DBs: %s", out["applied"])
+            if out["errors"]:
+                logger.warning("Background migration errors on tenant DBs: %s", out["errors"])
+        except Exception as e:
+            logger.exception("Background tenant migrations failed: %s", e)
+            release_all()
+
+    thread = threading.Thread(target=_run, daemon=True, name="TenantMigrations")
+    thread.start()
+    return thread
+
+
+def release_all() -> None:
+    """Open every gate (e.g. the runner crashed); requests proceed as if migrations finished."""
+    with _lock:
+        for event in _ready.values():
+            event.set()
+
+
+def wait_until_migrated(database_url: Optional[str], timeout: float) -> bool:
+    """
+    Block up to timeout seconds until migrations on this tenant DB have finished.
+    True when finished or the DB is not part of a run (never gated); False if still running.
+    """
+    with _lock:
+        event = _ready.get(_url_key(database_url))
+    if event is None:
+        return True
+    return event.wait(timeout)
+
+
+def get_progress() -> Dict:
+    """Per-tenant migration progress of the current / last run."""
+    with _lock:
+        tenants = [dict(p) for p in _progress.values()]
+        info = dict(_run_info)
+    counts = {s: 0 for s in (PENDING, RUNNING, DONE, FAILED, TIMEOUT)}
+    for p in tenants:
+        counts[p["status"]] += 1
+    return {
+        **info,
+        "total": len(tenants),
+        "complete": all(p["status"] in _FINISHED for p in tenants),
+        "counts": counts,
+        "tenants": tenants,
+    }
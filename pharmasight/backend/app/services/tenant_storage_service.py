@@ -16,15 +16,19 @@ Two modes for tenant-assets:
   on the Tenant row (master DB).
 
 Never expose raw storage paths to frontend; use signed URLs (5–15 min expiry).
+Downloads go through branding_asset_cache (uploads invalidate it); ensure_bucket is memoized.
 """
+import asyncio
 import logging
-from typing import Optional, Tuple, Any
+import threading
+import time
+from typing import Callable, Optional, Tuple, Any
 from urllib.parse import urlparse, quote
 from uuid import UUID
-import httpx
 from supabase import Client
 
 from app.config import settings
+from app.services import branding_asset_cache, signed_url_cache, storage_http
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +42,10 @@ MAX_IMAGE_BYTES = 2 * 1024 * 1024  # 2MB
 # Signed URL expiry: 5–15 min (10 min default). Never expose raw paths to frontend.
 SIGNED_URL_EXPIRY_SECONDS = 600  # 10 minutes
 
+# (storage base URL, bucket) already confirmed to exist by ensure_bucket in this process
+_ensured_buckets: set = set()
+_ensured_buckets_lock = threading.Lock()
+
 
 def _tenant_storage_overrides_enabled() -> bool:
     """True only when explicitly running in tenant_project mode."""
@@ -139,8 +147,7 @@ def _create_signed_url_via_rest(
         "Content-Type": "application/json",
     }
     try:
-        with httpx.Client(timeout=15.0) as client:
-            resp = client.post(endpoint, headers=headers, json={"expiresIn": int(expires_in)})
+        resp = storage_http.request("sign", "POST", endpoint, headers=headers, json={"expiresIn": int(expires_in)}, timeout=15.0)
         if resp.status_code >= 400:
             snippet = (resp.text or "")[:300]
             msg = ""
@@ -153,8 +160,7 @@ def _create_signed_url_via_rest(
                     **_storage_rest_auth_headers(service_role_key, include_authorization=False),
                     "Content-Type": "application/json",
                 }
-                with httpx.Client(timeout=15.0) as client:
-                    resp2 = client.post(endpoint, headers=headers, json={"expiresIn": int(expires_in)})
+                resp2 = storage_http.request("sign", "POST", endpoint, headers=headers, json={"expiresIn": int(expires_in)}, timeout=15.0)
                 if resp2.status_code >= 400:
                     snippet2 = (resp2.text or "")[:300]
                     logger.warning(
@@ -257,8 +263,7 @@ def _list_buckets_via_rest(*, base_url: str, service_role_key: str) -> Optional[
     # Some environments reject service-role key in Authorization; retry without Authorization on specific failure.
     headers = _storage_rest_auth_headers(service_role_key, include_authorization=True)
     try:
-        with httpx.Client(timeout=15.0) as client:
-            resp = client.get(endpoint, headers=headers)
+        resp = storage_http.request("list_buckets", "GET", endpoint, headers=headers, timeout=15.0)
         if resp.status_code >= 400:
             msg = ""
             try:
@@ -267,8 +272,7 @@ def _list_buckets_via_rest(*, base_url: str, service_role_key: str) -> Optional[
                 msg = ""
             if "Invalid Compact JWS" in str(msg):
                 headers = _storage_rest_auth_headers(service_role_key, include_authorization=False)
-                with httpx.Client(timeout=15.0) as client:
-                    resp2 = client.get(endpoint, headers=headers)
+                resp2 = storage_http.request("list_buckets", "GET", endpoint, headers=headers, timeout=15.0)
                 if resp2.status_code >= 400:
                     logger.warning(
                         "storage REST list buckets failed status=%s body=%r",
@@ -290,8 +294,7 @@ def _create_bucket_via_rest(*, base_url: str, service_role_key: str, bucket_name
     headers = {**_storage_rest_auth_headers(service_role_key, include_authorization=True), "Content-Type": "application/json"}
     payload = {"name": bucket_name, "public": False}
     try:
-        with httpx.Client(timeout=15.0) as client:
-            resp = client.post(endpoint, headers=headers, json=payload)
+        resp = storage_http.request("create_bucket", "POST", endpoint, headers=headers, json=payload, timeout=15.0)
         if resp.status_code >= 400:
             msg = ""
             try:
@@ -300,8 +303,7 @@ def _create_bucket_via_rest(*, base_url: str, service_role_key: str, bucket_name
                 msg = ""
             if "Invalid Compact JWS" in str(msg):
                 headers = {**_storage_rest_auth_headers(service_role_key, include_authorization=False), "Content-Type": "application/json"}
-                with httpx.Client(timeout=15.0) as client:
-                    resp2 = client.post(endpoint, headers=headers, json=payload)
+                resp2 = storage_http.request("create_bucket", "POST", endpoint, headers=headers, json=payload, timeout=15.0)
                 if resp2.status_code >= 400:
                     logger.warning("storage REST create bucket failed status=%s body=%r", resp2.status_code, (resp2.text or "")[:300])
                     return False
@@ -333,8 +335,7 @@ def _upload_object_via_rest(
         "cache-control": "0",
     }
     try:
-        with httpx.Client(timeout=20.0) as client:
-            resp = client.post(endpoint, headers=headers, content=content)
+        resp = storage_http.request("upload", "POST", endpoint, headers=headers, content=content, timeout=20.0)
         if resp.status_code >= 400:
             msg = ""
             try:
@@ -348,8 +349,7 @@ def _upload_object_via_rest(
                     "x-upsert": "true",
                     "cache-control": "0",
                 }
-                with httpx.Client(timeout=20.0) as client:
-                    resp2 = client.post(endpoint, headers=headers, content=content)
+                resp2 = storage_http.request("upload", "POST", endpoint, headers=headers, content=content, timeout=20.0)
                 if resp2.status_code >= 400:
                     logger.warning(
                         "storage REST upload failed status=%s endpoint=%s body=%r",
@@ -367,6 +367,47 @@ def _upload_object_via_rest(
         return False
 
 
+async def _upload_object_via_rest_async(
+    *,
+    base_url: str,
+    service_role_key: str,
+    bucket_name: str,
+    object_path: str,
+    content: bytes,
+    content_type: str,
+) -> bool:
+    """Async variant of _upload_object_via_rest (shared async client; for async routes)."""
+    endpoint = (
+        f"{base_url.rstrip('/')}/storage/v1/object/{quote(bucket_name, safe='')}/{_encode_storage_object_path_for_url(object_path)}"
+    )
+
+    def headers(include_authorization: bool) -> dict:
+        return {
+            **_storage_rest_auth_headers(service_role_key, include_authorization=include_authorization),
+            "Content-Type": content_type or "application/octet-stream",
+            "x-upsert": "true",
+            "cache-control": "0",
+        }
+
+    try:
+        resp = await storage_http.arequest("upload", "POST", endpoint, headers=headers(True), content=content, timeout=20.0)
+        if resp.status_code >= 400:
+            msg = ""
+            try:
+                msg = resp.json().get("message", "")  # type: ignore[union-attr]
+            except Exception:
+                msg = ""
+            if "Invalid Compact JWS" in str(msg):
+                resp = await storage_http.arequest("upload", "POST", endpoint, headers=headers(False), content=content, timeout=20.0)
+        if resp.status_code >= 400:
+            logger.warning("storage REST upload failed status=%s endpoint=%s body=%r", resp.status_code, endpoint, (resp.text or "")[:300])
+            return False
+        return True
+    except Exception as e:
+        logger.warning("storage REST upload exception endpoint=%s err=%s", endpoint, e)
+        return False
+
+
 def _download_object_authenticated_via_rest(
     *,
     base_url: str,
@@ -379,8 +420,7 @@ def _download_object_authenticated_via_rest(
     )
     headers = _storage_rest_auth_headers(service_role_key, include_authorization=True)
     try:
-        with httpx.Client(timeout=20.0) as client:
-            resp = client.get(endpoint, headers=headers)
+        resp = storage_http.request("download", "GET", endpoint, headers=headers, timeout=20.0)
         if resp.status_code >= 400:
             msg = ""
             try:
@@ -389,8 +429,7 @@ def _download_object_authenticated_via_rest(
                 msg = ""
             if "Invalid Compact JWS" in str(msg):
                 headers = _storage_rest_auth_headers(service_role_key, include_authorization=False)
-                with httpx.Client(timeout=20.0) as client:
-                    resp2 = client.get(endpoint, headers=headers)
+                resp2 = storage_http.request("download", "GET", endpoint, headers=headers, timeout=20.0)
                 if resp2.status_code >= 400:
                     logger.warning(
                         "storage REST download failed status=%s endpoint=%s body=%r",
@@ -511,12 +550,16 @@ def ensure_bucket(tenant: Optional[Any], bucket_name: Optional[str] = None) -> N
     """
     Ensure the given bucket exists and is private. Idempotent.
     If bucket_name is None, uses BUCKET (tenant-assets).
+    Memoized per (storage project, bucket) once the bucket is seen or created.
     """
     name = bucket_name or BUCKET
     base_url, key = _build_effective_storage_config(tenant)
     if not base_url or not key:
         logger.warning("ensure_bucket: missing storage config; cannot ensure bucket %s", name)
         return
+    memo_key = (base_url.rstrip("/"), name)
+    if memo_key in _ensured_buckets:
+        return
 
     buckets = _list_buckets_via_rest(base_url=base_url, service_role_key=key)
     if buckets is None:
@@ -532,8 +575,30 @@ def ensure_bucket(tenant: Optional[Any], bucket_name: Optional[str] = None) -> N
 
     if name not in bucket_names:
         ok = _create_bucket_via_rest(base_url=base_url, service_role_key=key, bucket_name=name)
-        if ok:
-            logger.info("Created storage bucket %s (private)", name)
+        if not ok:
+            return
+        logger.info("Created storage bucket %s (private)", name)
+    with _ensured_buckets_lock:
+        _ensured_buckets.add(memo_key)
+
+
+def _cached_download(base_url: str, stored_path: str, fetch: Callable[[], Optional[bytes]]) -> Optional[bytes]:
+    """Asset bytes from branding_asset_cache, else fetch() (stored on success); stale bytes if fetch fails."""
+    scope = base_url.rstrip("/")
+    data = branding_asset_cache.get(scope, stored_path)
+    if data is not None:
+        return data
+    data = fetch()
+    if data is not None:
+        branding_asset_cache.put(scope, stored_path, data)
+        return data
+    return branding_asset_cache.get(scope, stored_path, allow_stale=True)
+
+
+def _invalidate_cached(relative: str) -> None:
+    """Drop cached bytes and signed URLs for tenant-assets/{relative} after it was (re)uploaded."""
+    branding_asset_cache.invalidate(f"{BUCKET}/{relative}")
+    signed_url_cache.invalidate(BUCKET, relative)
 
 
 def validate_image_upload(
@@ -587,9 +652,13 @@ def upload_file(
         content_type=content_type,
     )
     if ok:
+        _invalidate_cached(relative)
         return f"{BUCKET}/{relative}"
+    return _upload_via_sdk(tenant, key, relative, content, content_type)
+
 
-    # Fallback to SDK (kept as backup). Avoid raising: signed URL generation depends on this.
+def _upload_via_sdk(tenant: Optional[Any], key: str, relative: str, content: bytes, content_type: str) -> Optional[str]:
+    """Fallback to SDK (kept as backup). Avoid raising: signed URL generation depends on this."""
     try:
         # Only fallback when we still have a plausible JWT; otherwise SDK will also fail.
         if not (key and key.startswith("eyJ")):
@@ -605,12 +674,59 @@ def upload_file(
                     "x-upsert": "true",
                 },
             )
+            _invalidate_cached(relative)
             return f"{BUCKET}/{relative}"
     except Exception as e:
         logger.exception("upload_file SDK fallback %s: %s", relative, e)
     return None
 
 
+async def upload_file_async(
+    tenant_id: UUID,
+    file_path: str,
+    content: bytes,
+    content_type: str,
+    *,
+    validate_image: bool = False,
+    tenant: Optional[Any] = None,
+) -> Optional[str]:
+    """
+    Async variant of upload_file for async routes: the upload goes through the shared async client
+    instead of blocking the event loop. Bucket check (memoized) and SDK fallback run in a thread.
+    """
+    if validate_image:
+        ok, err = validate_image_upload(content, content_type)
+        if not ok:
+            return None
+    base_url, key = _build_effective_storage_config(tenant)
+    if not base_url or not key:
+        return None
+    if (base_url.rstrip("/"), BUCKET) not in _ensured_buckets:
+        await asyncio.to_thread(ensure_bucket, tenant)
+    relative = f"{tenant_id}/{file_path}" if not file_path.startswith(str(tenant_id)) else file_path
+    ok = await _upload_object_via_rest_async(
+        base_url=base_url,
+        service_role_key=key,
+        bucket_name=BUCKET,
+        object_path=relative,
+        content=content,
+        content_type=content_type,
+    )
+    if ok:
+        _invalidate_cached(relative)
+        return f"{BUCKET}/{relative}"
+    return await asyncio.to_thread(_upload_via_sdk, tenant, key, relative, content, content_type)
+
+
+def _image_content_type(content_type: str) -> str:
+    ct = content_type or "image/png"
+    return ct if ct in ALLOWED_IMAGE_CONTENT_TYPES else "image/png"
+
+
+def _company_asset_rel(company_id: Optional[UUID], filename: str) -> str:
+    return f"companies/{company_id}/{filename}" if company_id is not None else filename
+
+
 def upload_logo(
     tenant_id: UUID,
     content: bytes,
@@ -620,11 +736,22 @@ def upload_logo(
     company_id: Optional[UUID] = None,
 ) -> Optional[str]:
     """Upload logo. Pass company_id so multiple companies in one tenant use separate paths."""
-    ct = content_type or "image/png"
-    if ct not in ALLOWED_IMAGE_CONTENT_TYPES:
-        ct = "image/png"
-    rel = f"companies/{company_id}/logo.png" if company_id is not None else "logo.png"
-    return upload_file(tenant_id, rel, content, ct, validate_image=True, tenant=tenant)
+    ct = _image_content_type(content_type)
+    return upload_file(tenant_id, _company_asset_rel(company_id, "logo.png"), content, ct, validate_image=True, tenant=tenant)
+
+
+async def upload_logo_async(
+    tenant_id: UUID,
+    content: bytes,
+    content_type: str,
+    *,
+    tenant: Optional[Any] = None,
+    company_id: Optional[UUID] = None,
+) -> Optional[str]:
+    ct = _image_content_type(content_type)
+    return await upload_file_async(
+        tenant_id, _company_asset_rel(company_id, "logo.png"), content, ct, validate_image=True, tenant=tenant
+    )
 
 
 def upload_stamp(
@@ -636,11 +763,22 @@ def upload_stamp(
     company_id: Optional[UUID] = None,
 ) -> Optional[str]:
     """Upload stamp. Pass company_id so multiple companies in one tenant use separate paths."""
-    ct = content_type or "image/png"
-    if ct not in ALLOWED_IMAGE_CONTENT_TYPES:
-        ct = "image/png"
-    rel = f"companies/{company_id}/stamp.png" if company_id is not None else "stamp.png"
-    return upload_file(tenant_id, rel, content, ct, validate_image=True, tenant=tenant)
+    ct = _image_content_type(content_type)
+    return upload_file(tenant_id, _company_asset_rel(company_id, "stamp.png"), content, ct, validate_image=True, tenant=tenant)
+
+
+async def upload_stamp_async(
+    tenant_id: UUID,
+    content: bytes,
+    content_type: str,
+    *,
+    tenant: Optional[Any] = None,
+    company_id: Optional[UUID] = None,
+) -> Optional[str]:
+    ct = _image_content_type(content_type)
+    return await upload_file_async(
+        tenant_id, _company_asset_rel(company_id, "stamp.png"), content, ct, validate_image=True, tenant=tenant
+    )
 
 
 def upload_user_signature(
@@ -651,13 +789,24 @@ def upload_user_signature(
     *,
     tenant: Optional[Any] = None,
 ) -> Optional[str]:
-    ct = content_type or "image/png"
-    if ct not in ALLOWED_IMAGE_CONTENT_TYPES:
-        ct = "image/png"
+    ct = _image_content_type(content_type)
     path = f"users/{user_id}/signature.png"
     return upload_file(tenant_id, path, content, ct, validate_image=True, tenant=tenant)
 
 
+async def upload_user_signature_async(
+    tenant_id: UUID,
+    user_id: UUID,
+    content: bytes,
+    content_type: str,
+    *,
+    tenant: Optional[Any] = None,
+) -> Optional[str]:
+    ct = _image_content_type(content_type)
+    path = f"users/{user_id}/signature.png"
+    return await upload_file_async(tenant_id, path, content, ct, validate_image=True, tenant=tenant)
+
+
 def upload_po_pdf(
     tenant_id: UUID, po_id: UUID, content: bytes, *, tenant: Optional[Any] = None
 ) -> Optional[str]:
@@ -665,12 +814,48 @@ def upload_po_pdf(
     return upload_file(tenant_id, path, content, "application/pdf", tenant=tenant)
 
 
-def download_file(stored_path: str, tenant: Optional[Any] = None) -> Optional[bytes]:
+def path_rendered_pdf(tenant_id: UUID, doc_type: str, doc_id: UUID, version: str) -> str:
+    """Stored path of a cached rendered document PDF (app.services.rendered_pdf_cache)."""
+    return f"{BUCKET}/{tenant_id}/documents/rendered/{doc_type}/{doc_id}-{version}.pdf"
+
+
+def list_files(folder: str, tenant: Optional[Any] = None, *, search: Optional[str] = None) -> list:
+    """Object names directly under tenant-assets/{folder} (optionally only names containing search); [] on error."""
+    client = _client(tenant)
+    if not client:
+        return []
+    try:
+        options = {"limit": 1000, "search": search} if search else {"limit": 1000}
+        return [o["name"] for o in client.storage.from_(BUCKET).list(folder, options) or [] if o.get("name")]
+    except Exception as e:
+        logger.warning("list_files %s: %s", folder, e)
+        return []
+
+
+def remove_files(relatives: list, tenant: Optional[Any] = None) -> bool:
+    """Delete tenant-assets/{relative} objects (and their cached bytes / signed URLs). False on error."""
+    if not relatives:
+        return True
+    client = _client(tenant)
+    if not client:
+        return False
+    try:
+        client.storage.from_(BUCKET).remove(list(relatives))
+    except Exception as e:
+        logger.warning("remove_files %s: %s", relatives[:3], e)
+        return False
+    for relative in relatives:
+        _invalidate_cached(relative)
+    return True
+
+
+def download_file(stored_path: str, tenant: Optional[Any] = None, *, use_asset_cache: bool = True) -> Optional[bytes]:
     """
     Download file bytes by stored path from Supabase.
     Paths: company-assets/{company_id}/..., user-assets/{user_id}/..., or tenant-assets/{tenant_id}/...
     For company-assets and user-assets no tenant is required (uses global client).
     For tenant-assets with tenant=None uses global client (backward compatibility).
+    use_asset_cache=False bypasses branding_asset_cache (documents that have their own cache).
     """
     parsed = _bucket_and_key(stored_path)
     if not parsed:
@@ -692,16 +877,22 @@ def download_file(stored_path: str, tenant: Optional[Any] = None) -> Optional[by
     base_url, key = _build_effective_storage_config(effective_tenant)
     if not base_url or not key:
         return None
-    ensure_bucket(effective_tenant, bucket_name=bucket_name)
-    data = _download_object_authenticated_via_rest(
-        base_url=base_url,
-        service_role_key=key,
-        bucket_name=bucket_name,
-        object_path=object_path,
-    )
-    if isinstance(data, (bytes, bytearray)):
-        return bytes(data)
-    return None
+
+    def fetch() -> Optional[bytes]:
+        ensure_bucket(effective_tenant, bucket_name=bucket_name)
+        data = _download_object_authenticated_via_rest(
+            base_url=base_url,
+            service_role_key=key,
+            bucket_name=bucket_name,
+            object_path=object_path,
+        )
+        if isinstance(data, (bytes, bytearray)):
+            return bytes(data)
+        return None
+
+    if not use_asset_cache:
+        return fetch()
+    return _cached_download(base_url, stored_path.strip(), fetch)
 
 
 def download_file_with_path_tenant(
@@ -721,13 +912,17 @@ def download_file_with_path_tenant(
         return None
     try:
         object_path = stored_path[len(BUCKET) + 1:]
-        data = _download_object_authenticated_via_rest(
-            base_url=base_url,
-            service_role_key=key,
-            bucket_name=BUCKET,
-            object_path=object_path,
-        )
-        return data if isinstance(data, bytes) else None
+
+        def fetch() -> Optional[bytes]:
+            data = _download_object_authenticated_via_rest(
+                base_url=base_url,
+                service_role_key=key,
+                bucket_name=BUCKET,
+                object_path=object_path,
+            )
+            return data if isinstance(data, bytes) else None
+
+        return _cached_download(base_url, stored_path, fetch)
     except Exception as e:
         logger.warning("download_file_with_path_tenant %s: %s", stored_path, e)
         return None
@@ -762,6 +957,10 @@ def get_signed_url(
 
     # REST-first: avoids storage3 SDK JSON parsing issues when Supabase returns a non-JSON body (HTML error page, etc).
     base_url, key = _build_effective_storage_config(effective_tenant)
+    cached = signed_url_cache.get(base_url, bucket_name, object_path, expires_in)
+    if cached:
+        return cached
+    issued_at = time.monotonic()
     rest_url = _create_signed_url_via_rest(
         base_url=base_url,
         service_role_key=key,
@@ -770,6 +969,7 @@ def get_signed_url(
         expires_in=expires_in,
     )
     if rest_url:
+        signed_url_cache.put(base_url, bucket_name, object_path, expires_in, rest_url, issued_at)
         return rest_url
 
     client = _client(effective_tenant) or _client(None)
@@ -803,6 +1003,7 @@ def get_signed_url(
             base_url2, _ = _build_effective_storage_config(effective_tenant)
             if base_url2:
                 url = _to_absolute_storage_signed_url(base_url2, url)
+                signed_url_cache.put(base_url2, bucket_name, object_path, expires_in, url, issued_at)
         return url
     except Exception as e:
         logger.warning("get_signed_url %s: %s", stored_path, e, exc_info=True)
@@ -825,6 +1026,10 @@ def get_signed_url_with_path_tenant(
 
     # REST-first for legacy path-tenant signing.
     base_url, key = _build_effective_storage_config(path_tenant)
+    cached = signed_url_cache.get(base_url, BUCKET, object_path, expires_in)
+    if cached:
+        return cached
+    issued_at = time.monotonic()
     rest_url = _create_signed_url_via_rest(
         base_url=base_url,
         service_role_key=key,
@@ -833,6 +1038,7 @@ def get_signed_url_with_path_tenant(
         expires_in=expires_in,
     )
     if rest_url:
+        signed_url_cache.put(base_url, BUCKET, object_path, expires_in, rest_url, issued_at)
         return rest_url
 
     client = _client(path_tenant) or _client(None)
@@ -860,6 +1066,7 @@ def get_signed_url_with_path_tenant(
             base_url2, _ = _build_effective_storage_config(path_tenant)
             if base_url2:
                 url = _to_absolute_storage_signed_url(base_url2, url)
+                signed_url_cache.put(base_url2, BUCKET, object_path, expires_in, url, issued_at)
         return url
     except Exception as e:
         logger.warning("get_signed_url_with_path_tenant %s: %s", stored_path, e)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Backfill sales_daily_rollup (sales, credit notes and COGS per branch and day) from sales_invoices,
+credit_notes and inventory_ledger.
+
+Run once after migration 099, and again for a range after correcting invoices or ledger rows by hand.
+Each branch is rebuilt one month at a time, committing after each month; postings to the branch wait
+only while its month is being rebuilt. The gross-profit report (GET /api/sales/branch/{id}/gross-profit)
+reads these rows only.
+
+Usage:
+  cd pharmasight/backend && python -m scripts.backfill_sales_rollup
+  python -m scripts.backfill_sales_rollup --branch-id <uuid>
+  python -m scripts.backfill_sales_rollup --start 2025-01-01 --end 2025-12-31
+"""
+import argparse
+import logging
+import sys
+from datetime import date, timedelta
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def _months(start: date, end: date):
+    """(first, last) day pairs covering start..end, split at month boundaries."""
+    cur = start
+    while cur <= end:
+        next_month = (cur.replace(day=28) + timedelta(days=4)).replace(day=1)
+        yield cur, min(end, next_month - timedelta(days=1))
+        cur = next_month
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill sales_daily_rollup")
+    parser.add_argument("--branch-id", type=str, default=None, help="Only this branch (default: all branches)")
+    parser.add_argument("--start", type=str, default=None, help="First day, YYYY-MM-DD (default: first document)")
+    parser.add_argument("--end", type=str, default=None, help="Last day, YYYY-MM-DD (default: latest document)")
+    args = parser.parse_args()
+
+    try:
+        from sqlalchemy import text
+        from app.database import SessionLocal
+        from app.services.sales_rollup_service import SalesRollupService
+    except ImportError as e:
+        logger.error("Import failed. Run from backend with PYTHONPATH=. %s", e)
+        sys.exit(1)
+
+    db = SessionLocal()
+    try:
+        scope = "WHERE id = :branch_id" if args.branch_id else ""
+        branches = db.execute(
+            text(f"SELECT id, company_id FROM branches {scope} ORDER BY id"),
+            {"branch_id": args.branch_id} if args.branch_id else {},
+        ).fetchall()
+        if args.branch_id and not branches:
+            logger.error("Branch %s not found", args.branch_id)
+            sys.exit(1)
+        total = 0
+        for branch in branches:
+            bounds = db.execute(
+                text("""
+                    SELECT MIN(d), MAX(d) FROM (
+                        SELECT invoice_date AS d FROM sales_invoices WHERE branch_id = :b
+                        UNION ALL
+                        SELECT credit_note_date FROM credit_notes WHERE branch_id = :b
+                    ) docs
+                """),
+                {"b": str(branch.id)},
+            ).fetchone()
+            start = date.fromisoformat(args.start) if args.start else bounds[0]
+            end = date.fromisoformat(args.end) if args.end else bounds[1]
+            if start is None or end is None or start > end:
+                continue
+            written = 0
+            for first, last in _months(start, end):
+                try:
+                    written += SalesRollupService.rebuild(db, branch.company_id, branch.id, first, last)
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    logger.exception("Rollup backfill failed for branch %s, %s..%s", branch.id, first, last)
+            logger.info("Branch %s: %s day row(s) for %s..%s", branch.id, written, start, end)
+            total += written
+        logger.info("Backfilled %s day row(s) for %s branch(es)", total, len(branches))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark document numbering under concurrent tills: number taken early vs late in the transaction.
+
+N simulated tills (threads, one session each) create documents in one branch. Each document is one
+transaction: DocumentNumberService.get_next plus --work-ms of in-transaction work (pg_sleep, standing in
+for per-line pricing and stock checks), then commit.
+
+  early - number first, then the work (previous create_sales_invoice order: sequence row locked throughout)
+  late  - work first, number as the last statement before commit (current order)
+
+Prints throughput and latency per mode and checks the numbers are gapless and unique. Uses a dedicated
+document type (BENCH) whose sequence row is deleted afterwards; no invoices are written.
+
+Run from pharmasight/backend with PYTHONPATH=. so that 'app' resolves.
+
+Usage:
+  python -m scripts.benchmark_document_numbering
+  python -m scripts.benchmark_document_numbering --tills 12 --docs-per-till 30 --work-ms 60
+  python -m scripts.benchmark_document_numbering --branch-id <uuid> --modes late
+"""
+import argparse
+import sys
+import threading
+import time
+from uuid import UUID
+
+BENCH_DOC_TYPE = "BENCH"
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[k]
+
+
+def _delete_sequence(SessionLocal, company_id, branch_id):
+    from sqlalchemy import text
+
+    db = SessionLocal()
+    try:
+        db.execute(
+            text("DELETE FROM document_sequences WHERE company_id = :c AND branch_id = :b AND document_type = :t"),
+            {"c": str(company_id), "b": str(branch_id), "t": BENCH_DOC_TYPE},
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _run_mode(mode, args, SessionLocal, company_id, branch_id):
+    from sqlalchemy import text
+    from app.services.document_number_service import DocumentNumberService
+
+    numbers, latencies, errors = [], [], []
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(args.tills)
+
+    def till():
+        db = SessionLocal()
+        try:
+            start_barrier.wait()
+            for _ in range(args.docs_per_till):
+                t0 = time.perf_counter()
+                try:
+                    if mode == "early":
+                        number = DocumentNumberService.get_next(db, company_id, branch_id, BENCH_DOC_TYPE)
+                    db.execute(text("SELECT pg_sleep(:s)"), {"s": args.work_ms / 1000.0})
+                    if mode == "late":
+                        number = DocumentNumberService.get_next(db, company_id, branch_id, BENCH_DOC_TYPE)
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    with lock:
+                        errors.append(str(e))
+                    continue
+                with lock:
+                    numbers.append(int(number.rsplit("-", 1)[1]))
+                    latencies.append((time.perf_counter() - t0) * 1000)
+        finally:
+            db.close()
+
+    _delete_sequence(SessionLocal, company_id, branch_id)
+    threads = [threading.Thread(target=till) for _ in range(args.tills)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    _delete_sequence(SessionLocal, company_id, branch_id)
+
+    gapless = sorted(numbers) == list(range(1, len(numbers) + 1))
+    print(
+        f"{mode:5s}: {len(numbers):5d} docs in {elapsed:6.2f}s  {len(numbers) / elapsed:7.1f} docs/s  "
+        f"p50 {_percentile(latencies, 50):7.1f} ms  p95 {_percentile(latencies, 95):7.1f} ms  "
+        f"gapless={'yes' if gapless else 'NO'}  errors={len(errors)}"
+    )
+    for err in errors[:3]:
+        print(f"       error: {err[:200]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark early vs late document numbering with concurrent tills")
+    parser.add_argument("--branch-id", type=str, default=None, help="Branch UUID (default: first branch)")
+    parser.add_argument("--tills", type=int, default=8, help="Concurrent tills (threads / sessions)")
+    parser.add_argument("--docs-per-till", type=int, default=20)
+    parser.add_argument("--work-ms", type=float, default=40.0, help="In-transaction work per document")
+    parser.add_argument("--modes", type=str, default="early,late", help="Comma-separated: early, late")
+    args = parser.parse_args()
+
+    try:
+        from app.database import SessionLocal
+        from app.models import Branch
+    except ImportError as e:
+        print("Import failed. Run from backend with PYTHONPATH=.", e, file=sys.stderr)
+        sys.exit(1)
+
+    db = SessionLocal()
+    try:
+        q = db.query(Branch)
+        branch = q.filter(Branch.id == UUID(args.branch_id)).first() if args.branch_id else q.first()
+        if not branch:
+            print("No branch found.", file=sys.stderr)
+            sys.exit(1)
+        company_id, branch_id = branch.company_id, branch.id
+    finally:
+        db.close()
+
+    print(f"branch {branch_id}: {args.tills} tills x {args.docs_per_till} docs, {args.work_ms:.0f} ms work per document")
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        if mode not in ("early", "late"):
+            print(f"Unknown mode {mode!r}", file=sys.stderr)
+            sys.exit(2)
+        _run_mode(mode, args, SessionLocal, company_id, branch_id)
+
+
+if __name__ == "__main__":
+    main()
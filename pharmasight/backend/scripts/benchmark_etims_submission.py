@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark eTIMS submission throughput against a local OSCU stub (no KRA, no database).
+
+Starts an HTTP stub of the OAuth token and sendSalesTransaction endpoints with a configurable
+latency and 503 rate, then submits the same synthetic backlog two ways and prints invoices/second:
+
+  serial  - the previous loop: one invoice at a time, a new requests.post connection per call
+  engine  - etims_submission_processor.run_concurrently with pooled etims_http sessions, per-branch
+            concurrency / rate limits and retries (DB claim and invoice updates are not included)
+
+Run from pharmasight/backend with PYTHONPATH=. so that 'app' resolves.
+
+Usage:
+  python -m scripts.benchmark_etims_submission
+  python -m scripts.benchmark_etims_submission --invoices 400 --branches 8 --workers 16 --latency-ms 150
+  python -m scripts.benchmark_etims_submission --error-rate 0.1 --rate 0      # 10% 503s, no rate limit
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _StubOscu(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled sessions can reuse connections
+    latency = 0.1
+    error_rate = 0.0
+    counter_lock = threading.Lock()
+    counts = {"token": 0, "submit": 0, "503": 0}
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        with self.counter_lock:
+            self.counts["token"] += 1
+        self._reply(200, {"access_token": "stub-token", "expires_in": 3600})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        time.sleep(self.latency)
+        with self.counter_lock:
+            self.counts["submit"] += 1
+            busy = random.random() < self.error_rate
+            if busy:
+                self.counts["503"] += 1
+        if busy:
+            self._reply(503, {"resultCd": "999", "resultMsg": "busy"})
+        else:
+            self._reply(200, {"resultCd": "000", "data": {"rcptNo": str(self.counts["submit"])}})
+
+    def log_message(self, *args):
+        pass
+
+
+def _payload(invoice_id):
+    return {"invcNo": str(invoice_id), "itemList": [{"itemNm": "Paracetamol", "qty": 1, "prc": 10}]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark eTIMS submission throughput against a local stub")
+    parser.add_argument("--invoices", type=int, default=200)
+    parser.add_argument("--branches", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--branch-concurrency", type=int, default=None, help="Default ETIMS_SUBMIT_BRANCH_CONCURRENCY")
+    parser.add_argument("--rate", type=float, default=None, help="Requests/s per branch (default ETIMS_SUBMIT_BRANCH_RATE_PER_SECOND)")
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="Stub latency per submission")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of submissions answered 503")
+    parser.add_argument("--skip-serial", action="store_true")
+    args = parser.parse_args()
+
+    import requests
+
+    from app.config import settings
+    from app.services.etims import etims_http
+    from app.services.etims.etims_submission_processor import BranchLimiter, run_concurrently
+
+    _StubOscu.latency = args.latency_ms / 1000.0
+    _StubOscu.error_rate = args.error_rate
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubOscu)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    url = f"{base}/sendSalesTransaction"
+    headers = {"Content-Type": "application/json", "Authorization": "Bearer stub-token"}
+
+    branches = [uuid.uuid4() for _ in range(max(1, args.branches))]
+    tasks = [(uuid.uuid4(), branches[i % len(branches)]) for i in range(args.invoices)]
+    print(f"{args.invoices} invoices, {len(branches)} branches, stub latency {args.latency_ms:.0f} ms, 503 rate {args.error_rate:.0%}")
+
+    if not args.skip_serial:
+        ok = 0
+        t0 = time.perf_counter()
+        for invoice_id, _ in tasks:
+            r = requests.post(url, json=_payload(invoice_id), headers=headers, timeout=45)
+            ok += r.status_code == 200
+        elapsed = time.perf_counter() - t0
+        print(f"serial : {elapsed:7.2f}s  {args.invoices / elapsed:8.1f} inv/s  ok={ok}")
+
+    concurrency = settings.ETIMS_SUBMIT_BRANCH_CONCURRENCY if args.branch_concurrency is None else args.branch_concurrency
+    rate = settings.ETIMS_SUBMIT_BRANCH_RATE_PER_SECOND if args.rate is None else args.rate
+    limiter = BranchLimiter(concurrency, rate)
+
+    def submit_one(invoice_id, throttle):
+        r = etims_http.request(
+            "POST", url, retry_statuses=etims_http.RETRY_STATUSES_SUBMIT, throttle=throttle,
+            json=_payload(invoice_id), headers=headers, timeout=45,
+        )
+        return "ok" if r.status_code == 200 else "failed"
+
+    t0 = time.perf_counter()
+    outcomes = run_concurrently(tasks, submit_one, workers=args.workers, limiter=limiter)
+    elapsed = time.perf_counter() - t0
+    ok = sum(1 for _, o in outcomes if o == "ok")
+    metrics = etims_http.get_metrics()
+    print(
+        f"engine : {elapsed:7.2f}s  {args.invoices / elapsed:8.1f} inv/s  ok={ok}  "
+        f"(workers={args.workers}, per-branch concurrency={concurrency}, rate={rate or 'unlimited'}/s, "
+        f"retries={metrics['retries']})"
+    )
+    etims_http.close_all()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Benchmark POS item search (item_branch_snapshot) latency: ranked vs ilike mode.
+
+Runs the same sampled queries through both search modes of ItemSearchService and prints
+p50 / p95 / p99 latency per mode and query kind (prefix, substring, typo). Point it at a
+DB with a realistic catalog, or pad the target branch with synthetic rows (--synthesize)
+up to the wanted total, e.g. 1.5M snapshot rows. Synthetic rows are inserted in the same
+transaction as the benchmark and rolled back at the end.
+
+Run from pharmasight/backend with PYTHONPATH=. so that 'app' resolves.
+
+Usage:
+  python -m scripts.benchmark_item_search                               # busiest branch, 200 queries
+  python -m scripts.benchmark_item_search --branch-id <uuid> --queries 500
+  python -m scripts.benchmark_item_search --synthesize 1500000          # pad to 1.5M snapshot rows
+  python -m scripts.benchmark_item_search --modes ranked                # one mode only
+"""
+import argparse
+import random
+import sys
+import time
+from uuid import UUID
+
+# Name parts for synthetic items (realistic trigram distribution)
+_WORDS = (
+    "amoxicillin", "albendazole", "paracetamol", "ibuprofen", "metronidazole", "ciprofloxacin",
+    "omeprazole", "cetirizine", "diclofenac", "azithromycin", "doxycycline", "fluconazole",
+    "metformin", "amlodipine", "losartan", "salbutamol", "prednisolone", "ranitidine",
+    "artemether", "lumefantrine", "cotrimoxazole", "erythromycin", "clotrimazole", "loratadine",
+)
+_FORMS = ("tabs", "caps", "syrup", "susp", "cream", "inj", "drops")
+_STRENGTHS = ("5mg", "10mg", "20mg", "100mg", "250mg", "400mg", "500mg", "1g", "125mg/5ml")
+
+# One statement: synthetic items and their snapshot rows for the target branch
+_SYNTHESIZE_SQL = """
+WITH new_items AS (
+    INSERT INTO items (id, company_id, name, base_unit, retail_unit, wholesale_unit, pack_size,
+                       wholesale_units_per_supplier, can_break_bulk, setup_complete)
+    SELECT gen_random_uuid(), :company_id,
+           initcap((:words)[1 + (g % :n_words)]) || ' ' || (:strengths)[1 + (g / 7 % :n_strengths)]
+               || ' ' || (:forms)[1 + (g / 3 % :n_forms)] || ' ' || g,
+           'piece', 'piece', 'box', 10, 1, true, true
+    FROM generate_series(1, :n) g
+    RETURNING id, name
+)
+INSERT INTO item_branch_snapshot (company_id, branch_id, item_id, name, pack_size, current_stock,
+                                  search_text, wholesale_units_per_supplier)
+SELECT :company_id, :branch_id, id, name, 10, (random() * 40)::int - 5, lower(name), 1
+FROM new_items
+"""
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[k]
+
+
+def _typo(word, rng):
+    """One random edit (drop, swap, or replace a character)."""
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    kind = rng.choice(("drop", "swap", "replace"))
+    if kind == "drop":
+        return word[:i] + word[i + 1:]
+    if kind == "swap":
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word[:i] + rng.choice("aeioukst") + word[i + 1:]
+
+
+def _sample_queries(names, count, rng):
+    """(kind, term) pairs drawn from real names: prefix, substring and typo queries."""
+    words = [w for n in names for w in (n or "").lower().split() if len(w) >= 5 and w.isalpha()]
+    if not words:
+        return []
+    queries = []
+    for i in range(count):
+        word = rng.choice(words)
+        kind = ("prefix", "substring", "typo")[i % 3]
+        if kind == "prefix":
+            queries.append((kind, word[: rng.randint(3, 5)]))
+        elif kind == "substring":
+            start = rng.randint(1, max(1, len(word) - 4))
+            queries.append((kind, word[start:start + 4]))
+        else:
+            queries.append((kind, _typo(word, rng)))
+    return queries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark item search latency (ranked vs ilike).",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("--company-id", type=str, default=None, help="Company of --branch-id (default: from branch)")
+    parser.add_argument("--branch-id", type=str, default=None, help="Branch to search (default: branch with most snapshot rows)")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per mode (default 200)")
+    parser.add_argument("--limit", type=int, default=20, help="Result limit per query (default 20)")
+    parser.add_argument("--modes", type=str, default="ilike,ranked", help="Comma-separated modes (default ilike,ranked)")
+    parser.add_argument("--synthesize", type=int, default=0, metavar="ROWS",
+                        help="Pad the branch with synthetic items until item_branch_snapshot has ROWS rows (rolled back)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for query sampling")
+    args = parser.parse_args()
+
+    try:
+        from sqlalchemy import text
+        from app.database import SessionLocal
+        from app.services import item_search_service as search
+    except ImportError as e:
+        print("Import failed. Run from backend with PYTHONPATH=.", e)
+        sys.exit(1)
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    runners = {"ilike": search._ilike_snapshot_rows, "ranked": search._ranked_snapshot_rows}
+    unknown = [m for m in modes if m not in runners]
+    if unknown:
+        print(f"Unknown mode(s): {', '.join(unknown)} (use ilike, ranked)")
+        sys.exit(1)
+
+    db = SessionLocal()
+    try:
+        if args.branch_id:
+            branch_id = UUID(args.branch_id)
+            company_id = UUID(args.company_id) if args.company_id else db.execute(
+                text("SELECT company_id FROM branches WHERE id = :b"), {"b": str(branch_id)}
+            ).scalar()
+        else:
+            row = db.execute(text("""
+                SELECT company_id, branch_id FROM item_branch_snapshot
+                GROUP BY company_id, branch_id ORDER BY COUNT(*) DESC LIMIT 1
+            """)).fetchone()
+            if not row:
+                print("No item_branch_snapshot rows; pass --branch-id and --synthesize.")
+                sys.exit(1)
+            company_id, branch_id = row.company_id, row.branch_id
+
+        total = db.execute(text("SELECT COUNT(*) FROM item_branch_snapshot")).scalar() or 0
+        if args.synthesize > total:
+            n = args.synthesize - total
+            print(f"Synthesizing {n} items + snapshot rows for branch {branch_id} (rolled back at the end)...")
+            t0 = time.perf_counter()
+            db.execute(text(_SYNTHESIZE_SQL), {
+                "company_id": str(company_id), "branch_id": str(branch_id), "n": n,
+                "words": list(_WORDS), "n_words": len(_WORDS),
+                "forms": list(_FORMS), "n_forms": len(_FORMS),
+                "strengths": list(_STRENGTHS), "n_strengths": len(_STRENGTHS),
+            })
+            db.execute(text("ANALYZE item_branch_snapshot"))
+            total = db.execute(text("SELECT COUNT(*) FROM item_branch_snapshot")).scalar() or 0
+            print(f"  done in {time.perf_counter() - t0:.1f}s")
+
+        branch_rows = db.execute(
+            text("SELECT COUNT(*) FROM item_branch_snapshot WHERE branch_id = :b"), {"b": str(branch_id)}
+        ).scalar() or 0
+        names = [r[0] for r in db.execute(
+            text("SELECT name FROM item_branch_snapshot WHERE branch_id = :b ORDER BY random() LIMIT 2000"),
+            {"b": str(branch_id)},
+        )]
+        rng = random.Random(args.seed)
+        queries = _sample_queries(names, args.queries, rng)
+        if not queries:
+            print("No usable item names to sample queries from.")
+            sys.exit(1)
+
+        print(f"item_branch_snapshot rows: {total} (branch {branch_id}: {branch_rows})")
+        print(f"Queries per mode: {len(queries)}, limit {args.limit}")
+        print("-" * 72)
+        print(f"{'mode':<8} {'kind':<10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'avg hits':>9}")
+        for mode in modes:
+            run = runners[mode]
+            timings = {}
+            savepoint = db.begin_nested()  # a failing mode (e.g. pg_trgm missing) must not drop synthetic rows
+            try:
+                run(db, queries[0][1], company_id, branch_id, args.limit)  # warm-up
+                for kind, term in queries:
+                    t0 = time.perf_counter()
+                    hits = len(run(db, term, company_id, branch_id, args.limit))
+                    timings.setdefault(kind, []).append(((time.perf_counter() - t0) * 1000, hits))
+                savepoint.commit()
+            except Exception as e:
+                savepoint.rollback()
+                print(f"{mode:<8} FAILED: {str(e).splitlines()[0]}")
+                continue
+            timings["all"] = [t for kind in ("prefix", "substring", "typo") for t in timings.get(kind, [])]
+            for kind in ("prefix", "substring", "typo", "all"):
+                samples = timings.get(kind) or []
+                if not samples:
+                    continue
+                ms = [s[0] for s in samples]
+                avg_hits = sum(s[1] for s in samples) / len(samples)
+                print(
+                    f"{mode:<8} {kind:<10} {_percentile(ms, 50):>9.2f} {_percentile(ms, 95):>9.2f} "
+                    f"{_percentile(ms, 99):>9.2f} {max(ms):>9.2f} {avg_hits:>9.1f}"
+                )
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
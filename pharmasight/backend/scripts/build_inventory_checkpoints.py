@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Build inventory_daily_checkpoints (closing stock per item, branch and day) incrementally.
+
+Each branch continues from its built_through day up to yesterday (UTC) and commits. Run nightly
+(cron / process manager) after midnight UTC; the first run builds the full history of a branch.
+Point-in-time valuation (GET /api/inventory/valuation?as_of_date=...) reads these checkpoints
+plus only the ledger rows after them.
+
+Usage:
+  cd pharmasight/backend && python -m scripts.build_inventory_checkpoints
+  python -m scripts.build_inventory_checkpoints --branch-id <uuid>
+  python -m scripts.build_inventory_checkpoints --rebuild --branch-id <uuid>   # recompute from the ledger
+"""
+import argparse
+import logging
+import sys
+from datetime import date
+from uuid import UUID
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build inventory_daily_checkpoints")
+    parser.add_argument("--branch-id", type=str, default=None, help="Only this branch (default: all branches)")
+    parser.add_argument("--through", type=str, default=None, help="Last day to build, YYYY-MM-DD (default: yesterday UTC)")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute existing checkpoints from the ledger first")
+    args = parser.parse_args()
+
+    try:
+        from sqlalchemy import text
+        from app.database import SessionLocal
+        from app.services.inventory_checkpoint_service import InventoryCheckpointService
+    except ImportError as e:
+        logger.error("Import failed. Run from backend with PYTHONPATH=. %s", e)
+        sys.exit(1)
+
+    through = date.fromisoformat(args.through) if args.through else None
+    db = SessionLocal()
+    try:
+        if args.rebuild:
+            n = InventoryCheckpointService.rebuild_items(db, UUID(args.branch_id) if args.branch_id else None)
+            db.commit()
+            logger.info("Rebuilt %s checkpoint row(s)", n)
+        if args.branch_id:
+            company_id = db.execute(
+                text("SELECT company_id FROM branches WHERE id = :b"), {"b": args.branch_id}
+            ).scalar()
+            if company_id is None:
+                logger.error("Branch %s not found", args.branch_id)
+                sys.exit(1)
+            n = InventoryCheckpointService.build_branch(db, company_id, UUID(args.branch_id), through)
+            db.commit()
+            logger.info("Branch %s: %s checkpoint row(s) written", args.branch_id, n)
+        else:
+            written = InventoryCheckpointService.build_all(db, through)
+            logger.info(
+                "Built checkpoints for %s branch(es), %s row(s) written", len(written), sum(written.values())
+            )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
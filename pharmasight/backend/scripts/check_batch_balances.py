@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Validate inventory_batch_balances against inventory_ledger (and optionally rebuild it).
+
+Expected = SUM(quantity_delta) per (item_id, branch_id, batch_number, expiry_date, unit_cost)
+over the ledger. FEFO allocation, next-expiry lookup and batch listings read the snapshot, so
+drift means wrong batches are allocated or shown.
+
+Drift can appear after direct SQL edits to inventory_ledger. Always validate after running
+repair scripts; fix drift with --rebuild (whole DB, or one branch with --branch-id).
+
+Usage:
+  cd pharmasight/backend && python -m scripts.check_batch_balances
+  python -m scripts.check_batch_balances --strict                 # exit 1 if drift
+  python -m scripts.check_batch_balances --show-drift --limit=200 # list drifted batch keys
+  python -m scripts.check_batch_balances --rebuild [--branch-id=<uuid>]
+"""
+import argparse
+import sys
+from uuid import UUID
+
+# Full outer join of ledger batch totals and snapshot rows on the batch key; {scope} filters by branch.
+_DRIFT_SQL = """
+WITH expected AS (
+    SELECT item_id, branch_id, batch_number, expiry_date, unit_cost, SUM(quantity_delta) AS quantity
+    FROM inventory_ledger
+    WHERE true {scope}
+    GROUP BY item_id, branch_id, batch_number, expiry_date, unit_cost
+),
+actual AS (
+    SELECT item_id, branch_id, batch_number, expiry_date, unit_cost, quantity
+    FROM inventory_batch_balances
+    WHERE true {scope}
+)
+SELECT
+    COALESCE(e.item_id, a.item_id) AS item_id,
+    COALESCE(e.branch_id, a.branch_id) AS branch_id,
+    COALESCE(e.batch_number, a.batch_number) AS batch_number,
+    COALESCE(e.expiry_date, a.expiry_date) AS expiry_date,
+    COALESCE(e.unit_cost, a.unit_cost) AS unit_cost,
+    COALESCE(e.quantity, 0) AS ledger_quantity,
+    COALESCE(a.quantity, 0) AS snapshot_quantity
+FROM expected e
+FULL OUTER JOIN actual a
+  ON a.item_id = e.item_id
+ AND a.branch_id = e.branch_id
+ AND COALESCE(a.batch_number, '') = COALESCE(e.batch_number, '')
+ AND COALESCE(a.expiry_date, 'infinity'::date) = COALESCE(e.expiry_date, 'infinity'::date)
+ AND a.unit_cost = e.unit_cost
+WHERE ABS(COALESCE(e.quantity, 0) - COALESCE(a.quantity, 0)) > 0.0001
+   OR (e.item_id IS NULL) <> (a.item_id IS NULL)
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate or rebuild inventory_batch_balances")
+    parser.add_argument("--strict", action="store_true", help="Exit with code 1 if snapshot != ledger")
+    parser.add_argument("--show-drift", action="store_true", help="Print sample of drifted batch keys")
+    parser.add_argument("--limit", type=int, default=50, help="Max drifted keys to show (default 50)")
+    parser.add_argument("--branch-id", help="Only check / rebuild this branch")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute the snapshot from the ledger, then validate")
+    args = parser.parse_args()
+
+    try:
+        from app.database import SessionLocal
+        from app.services.snapshot_service import SnapshotService
+        from sqlalchemy import text
+    except ImportError as e:
+        print("Import failed. Run from backend with PYTHONPATH=.", e)
+        sys.exit(1)
+
+    branch_id = UUID(args.branch_id) if args.branch_id else None
+    scope = " AND branch_id = :branch_id" if branch_id else ""
+    params = {"branch_id": str(branch_id)} if branch_id else {}
+
+    db = SessionLocal()
+    try:
+        if args.rebuild:
+            written = SnapshotService.rebuild_batch_balances(db, branch_id=branch_id)
+            db.commit()
+            print(f"Rebuilt inventory_batch_balances: {written} rows" + (f" (branch {branch_id})" if branch_id else ""))
+
+        ledger_keys = db.execute(
+            text(f"""
+                SELECT COUNT(*) FROM (
+                    SELECT 1 FROM inventory_ledger WHERE true {scope}
+                    GROUP BY item_id, branch_id, batch_number, expiry_date, unit_cost
+                ) k
+            """),
+            params,
+        ).scalar() or 0
+        actual = db.execute(
+            text(f"SELECT COUNT(*) FROM inventory_batch_balances WHERE true {scope}"), params
+        ).scalar() or 0
+        drift = db.execute(text(_DRIFT_SQL.format(scope=scope)), params).fetchall()
+
+        print("inventory_batch_balances vs inventory_ledger" + (f" (branch {branch_id})" if branch_id else ""))
+        print("-" * 60)
+        print(f"Ledger batch keys: {ledger_keys}")
+        print(f"Snapshot rows:     {actual}")
+        print(f"Drifted keys:      {len(drift)}")
+        if drift:
+            print("Drift found — run with --rebuild to recompute from the ledger.")
+
+        if args.show_drift and drift:
+            limit = max(1, min(args.limit, 500))
+            print()
+            print(f"Sample of drifted batch keys (up to {min(limit, len(drift))}):")
+            for row in drift[:limit]:
+                print(
+                    f"  item_id={row.item_id} branch_id={row.branch_id} batch={row.batch_number!r} "
+                    f"expiry={row.expiry_date} unit_cost={row.unit_cost} "
+                    f"ledger={row.ledger_quantity} snapshot={row.snapshot_quantity}"
+                )
+
+        if args.strict and drift:
+            sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Check the branch dashboard read model (inventory_balances, inventory_batch_balances and
+item_branch_snapshot stock) against inventory_ledger.
+
+The dashboard tiles (GET /api/inventory/branch/{id}/dashboard and the single-tile endpoints)
+read only the snapshots; drift here means the dashboard shows wrong stock. Fix batch drift with
+scripts.check_batch_balances --rebuild; item_branch_snapshot drift with a snapshot refresh.
+
+Usage:
+  cd pharmasight/backend && python -m scripts.check_dashboard_read_model                 # all branches
+  python -m scripts.check_dashboard_read_model --branch-id <uuid> --limit 100
+  python -m scripts.check_dashboard_read_model --strict                                  # exit 1 on drift
+"""
+import argparse
+import sys
+from uuid import UUID
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check dashboard read model against the ledger")
+    parser.add_argument("--branch-id", help="Only check this branch")
+    parser.add_argument("--limit", type=int, default=20, help="Max mismatched items to print per branch (default 20)")
+    parser.add_argument("--strict", action="store_true", help="Exit with code 1 if any branch drifts")
+    args = parser.parse_args()
+
+    try:
+        from sqlalchemy import text
+        from app.database import SessionLocal
+        from app.services.dashboard_read_model import BranchDashboardReadModel
+    except ImportError as e:
+        print("Import failed. Run from backend with PYTHONPATH=.", e)
+        sys.exit(1)
+
+    db = SessionLocal()
+    drifted = 0
+    try:
+        if args.branch_id:
+            branches = db.execute(
+                text("SELECT id, company_id, name FROM branches WHERE id = :b"), {"b": str(UUID(args.branch_id))}
+            ).fetchall()
+        else:
+            branches = db.execute(text("SELECT id, company_id, name FROM branches ORDER BY name")).fetchall()
+        for branch in branches:
+            report = BranchDashboardReadModel.check_consistency(db, branch.company_id, branch.id, args.limit)
+            status = "OK" if report["consistent"] else "DRIFT"
+            print(
+                f"{status:<6} {branch.name or branch.id}: items={report['item_mismatch_count']} "
+                f"batches={report['batch_mismatch_count']}"
+            )
+            for m in report["item_mismatches"]:
+                print(
+                    f"         item_id={m['item_id']} ledger={m['ledger_quantity']} "
+                    f"balance={m['balance_quantity']} snapshot={m['snapshot_quantity']}"
+                )
+            drifted += 0 if report["consistent"] else 1
+            db.rollback()
+        print("-" * 60)
+        print(f"Branches checked: {len(branches)}, drifted: {drifted}")
+        if args.strict and drifted:
+            sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,13 @@ Process snapshot_refresh_queue in batches (background worker).
 
 Run periodically via cron or a process manager. Each run processes up to --batch-size
 pending jobs (branch-wide or single-item). Branch-wide jobs expand to all company items
-for that branch.
+for that branch, paged by items.id (keyset) and resumed from the last committed chunk
+after a restart.
 
 Usage:
   cd pharmasight/backend && python -m scripts.process_snapshot_refresh_queue [--batch-size=50] [--once]
-  Night batch (faster): --once --quiet --chunk-size=1000
+  Night batch (faster): --once --quiet --chunk-size=5000
+  Several branches at once: --once --quiet --workers=4
 """
 import argparse
 import logging
@@ -28,8 +30,9 @@ def _enable_quiet_mode() -> None:
 def main():
     parser = argparse.ArgumentParser(description="Process snapshot_refresh_queue")
     parser.add_argument("--batch-size", type=int, default=50, help="Max jobs per batch")
-    parser.add_argument("--chunk-size", type=int, default=None, metavar="N", help="Items per commit for branch-wide (default 200). Use 1000 for night runs.")
+    parser.add_argument("--chunk-size", type=int, default=None, metavar="N", help="Items per commit for branch-wide (default 1000). Use 5000 for night runs.")
     parser.add_argument("--quiet", action="store_true", help="Suppress SQL logging (faster).")
+    parser.add_argument("--workers", type=int, default=1, metavar="N", help="Worker processes (each with its own DB session) running jobs in parallel. Default 1.")
     parser.add_argument("--interval", type=float, default=60.0, help="Seconds between runs (when not --once)")
     parser.add_argument("--once", action="store_true", help="Process one batch and exit")
     args = parser.parse_args()
@@ -45,6 +48,21 @@ def main():
         raise SystemExit(1) from e
 
     while True:
+        if args.workers > 1:
+            try:
+                n = SnapshotRefreshService.process_queue_parallel(
+                    workers=args.workers,
+                    batch_size=args.batch_size,
+                    branch_wide_chunk_size=args.chunk_size,
+                )
+                if n:
+                    logger.info("Processed %s snapshot refresh job(s) with %s workers", n, args.workers)
+            except Exception as e:
+                logger.exception("Parallel queue batch failed: %s", e)
+            if args.once:
+                break
+            time.sleep(args.interval)
+            continue
         db = SessionLocal()
         try:
             n = SnapshotRefreshService.process_queue_batch(
@@ -6,7 +6,8 @@ For each BATCHED/PAID invoice line:
   unit_cost_used = SUM(inventory_ledger.total_cost) / qty_base
 where qty_base = quantity (sale unit) × multiplier_to_retail, matching batch logic.
 
-Does NOT insert or alter ledger rows.
+Does NOT insert or alter ledger rows. sales_daily_rollup is rebuilt for the branches and days
+of the updated lines.
 
 Usage:
   cd pharmasight/backend
@@ -34,6 +35,7 @@ from app.config import normalize_postgres_url, settings
 from app.models import InventoryLedger, SalesInvoice, SalesInvoiceItem
 from app.services.inventory_service import InventoryService
 from app.services.item_units_helper import get_unit_multiplier_from_item
+from app.services.sales_rollup_service import SalesRollupService
 
 SNAPSHOT_VS_LEDGER_WARN_THRESHOLD = Decimal("0.01")
 
@@ -71,6 +73,8 @@ def main() -> None:
     updated = 0
     warned = 0
     skipped = 0
+    # (company_id, branch_id) -> [first, last] invoice_date of updated lines, for the rollup rebuild
+    touched: dict[tuple, list] = {}
 
     with Session(engine) as db:
         q = (
@@ -129,9 +133,15 @@ def main() -> None:
 
                 if not args.dry_run:
                     line.unit_cost_used = new_uc
+                    span = touched.setdefault((inv.company_id, inv.branch_id), [inv.invoice_date, inv.invoice_date])
+                    span[0], span[1] = min(span[0], inv.invoice_date), max(span[1], inv.invoice_date)
                 updated += 1
 
         if not args.dry_run:
+            db.flush()
+            # Gross profit reads sales_daily_rollup: recompute the days whose line costs changed
+            for (company_id, branch_id), (first_day, last_day) in touched.items():
+                SalesRollupService.rebuild(db, company_id, branch_id, first_day, last_day)
             db.commit()
 
     print(f"\nDone. lines_updated={updated} flags={warned} skipped={skipped} dry_run={args.dry_run}\n")
@@ -45,7 +45,9 @@ from app.models import (
     SalesInvoiceItem,
 )
 from app.services.item_units_helper import get_unit_multiplier_from_item
+from app.services.sales_rollup_service import SalesRollupService
 from app.services.snapshot_refresh_service import SnapshotRefreshService
+from app.services.snapshot_service import SnapshotService
 
 
 def _d(v) -> Decimal:
@@ -422,6 +424,8 @@ def main() -> None:
                     continue
                 row.unit_cost = plan.unit_cost_new
                 row.total_cost = plan.total_cost_new
+            db.flush()
+            SnapshotService.rebuild_batch_balances(db, branch_id=branch_id, item_ids=[p_alaxin_item.id])
 
             # 2) Update SalesInvoiceItem.unit_cost_used for eligible lines
             for inv_id, meta in item_line_plan.items():
@@ -444,6 +448,16 @@ def main() -> None:
             SnapshotRefreshService.refresh_item_sync(db, company_id, branch_id, mara_item.id)
             SnapshotRefreshService.refresh_item_sync(db, company_id, branch_id, p_alaxin_item.id)
 
+            # 5) Gross profit reads sales_daily_rollup: recompute the days of the repaired invoices
+            if affected_invoice_ids:
+                first_day, last_day = (
+                    db.query(func.min(SalesInvoice.invoice_date), func.max(SalesInvoice.invoice_date))
+                    .filter(SalesInvoice.id.in_(list(affected_invoice_ids)))
+                    .one()
+                )
+                if first_day is not None:
+                    SalesRollupService.rebuild(db, company_id, branch_id, first_day, last_day)
+
             db.commit()
             print("\n=== Apply complete ===")
         else:
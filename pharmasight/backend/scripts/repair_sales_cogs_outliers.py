@@ -45,6 +45,8 @@ if str(_backend) not in sys.path:
 from app.config import normalize_postgres_url, settings
 from app.models import InventoryLedger, ItemBranchPurchaseSnapshot, SalesInvoice, SalesInvoiceItem
 from app.services.item_units_helper import get_unit_multiplier_from_item
+from app.services.sales_rollup_service import SalesRollupService
+from app.services.snapshot_service import SnapshotService
 
 
 def _d(v: Any) -> Decimal:
@@ -57,6 +59,7 @@ def _d(v: Any) -> Decimal:
 class Candidate:
     invoice_id: UUID
     invoice_no: str
+    invoice_date: date
     line_id: UUID
     item_id: UUID
     item_name: str
@@ -168,6 +171,7 @@ def _load_candidates(
                 Candidate(
                     invoice_id=inv.id,
                     invoice_no=inv.invoice_no or str(inv.id),
+                    invoice_date=inv.invoice_date,
                     line_id=line.id,
                     item_id=line.item_id,
                     item_name=line.item_name or "?",
@@ -283,6 +287,13 @@ def main() -> None:
                 line.unit_cost_used = c.new_unit_cost
                 led.unit_cost = c.new_unit_cost
                 led.total_cost = c.ledger_total_cost_new
+            db.flush()
+            SnapshotService.rebuild_batch_balances(
+                db, branch_id=branch_id, item_ids=list({c.item_id for c in candidates})
+            )
+            # Gross profit reads sales_daily_rollup: recompute the repaired days
+            invoice_dates = [c.invoice_date for c in candidates]
+            SalesRollupService.rebuild(db, company_id, branch_id, min(invoice_dates), max(invoice_dates))
             db.commit()
             print(f"\nApplied {len(candidates)} repair(s) successfully.")
         except Exception:
@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
 """
-Bulk snapshot refresh: one direct SQL statement per branch (~10k items in seconds).
+Bulk snapshot refresh: one set-based refresh per branch (~10k items in seconds).
 
 Use when you need to refresh 6 branches × 10k items in under 2 hours. This runs
-a single set-based SQL per (company_id, branch_id) instead of 10k Python round-trips.
+pos_snapshot_service.refresh_pos_snapshot_bulk per (company_id, branch_id) instead of
+10k Python round-trips; rows are identical to the per-item refresh.
 
 Run from pharmasight/backend with PYTHONPATH=. so that 'app' resolves.
 
@@ -28,7 +29,6 @@ import argparse
 import logging
 import sys
 import time
-from pathlib import Path
 from uuid import UUID
 
 logging.basicConfig(
@@ -41,7 +41,7 @@ logger = logging.getLogger(__name__)
 
 def main() -> None:
     parser = argparse.ArgumentParser(
-        description="Bulk refresh item_branch_snapshot via direct SQL (one query per branch).",
+        description="Bulk refresh item_branch_snapshot via set-based SQL (one pass per branch).",
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog=__doc__,
     )
@@ -64,16 +64,11 @@ def main() -> None:
     try:
         from sqlalchemy import text
         from app.database import SessionLocal
+        from app.services.pos_snapshot_service import refresh_pos_snapshot_bulk
     except ImportError as e:
         logger.error("Import failed. Run from backend with PYTHONPATH=. %s", e)
         sys.exit(1)
 
-    sql_path = Path(__file__).resolve().parent / "bulk_refresh_branch_snapshot.sql"
-    if not sql_path.exists():
-        logger.error("SQL file not found: %s", sql_path)
-        sys.exit(1)
-    bulk_sql = sql_path.read_text(encoding="utf-8")
-
     db = SessionLocal()
     try:
         if args.company_id and args.branch_id:
@@ -121,12 +116,12 @@ def main() -> None:
                 db.execute(text("SET statement_timeout = :t"), {"t": args.statement_timeout})
                 db.commit()
                 logger.info(
-                    "Executing bulk SQL for branch %s (statement_timeout=%s)...",
+                    "Executing bulk refresh for branch %s (statement_timeout=%s)...",
                     bid_str[:8],
                     args.statement_timeout,
                 )
                 t0 = time.perf_counter()
-                db.execute(text(bulk_sql), {"company_id": cid_str, "branch_id": bid_str})
+                rows = refresh_pos_snapshot_bulk(db, UUID(cid_str), UUID(bid_str))
                 db.commit()
                 elapsed = time.perf_counter() - t0
                 if qid is not None:
@@ -135,7 +130,7 @@ def main() -> None:
                         {"id": str(qid)},
                     )
                     db.commit()
-                logger.info("Bulk refresh done for branch %s in %.1f s", bid_str[:8], elapsed)
+                logger.info("Bulk refresh done for branch %s: %s rows in %.1f s", bid_str[:8], rows, elapsed)
             except Exception as e:
                 logger.exception("Bulk refresh failed for branch %s: %s", bid_str[:8], e)
                 db.rollback()
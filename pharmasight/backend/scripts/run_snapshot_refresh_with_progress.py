@@ -55,7 +55,11 @@ def _progress_callback(event: str, **kwargs) -> None:
             print(f"[{ts}] Starting single-item refresh (item={iid})")
     elif event == "branch_total":
         total = kwargs.get("total_items", 0)
-        print(f"[{ts}] Branch has {total} active items to refresh")
+        resumed = kwargs.get("resumed_from") or 0
+        if resumed:
+            print(f"[{ts}] Branch has {total} active items to refresh (resuming after {resumed})")
+        else:
+            print(f"[{ts}] Branch has {total} active items to refresh")
     elif event == "chunk_done":
         refreshed = kwargs.get("refreshed_so_far", 0)
         total = kwargs.get("total_items", 1)
@@ -89,7 +93,7 @@ def run_status(db) -> None:
     # In progress (claimed, not processed)
     in_progress = db.execute(
         text("""
-            SELECT id, company_id, branch_id, item_id, reason, claimed_at
+            SELECT id, company_id, branch_id, item_id, reason, claimed_at, items_refreshed
             FROM snapshot_refresh_queue
             WHERE processed_at IS NULL AND claimed_at IS NOT NULL
               AND claimed_at >= NOW() - INTERVAL '1 hour'
@@ -134,9 +138,9 @@ def run_status(db) -> None:
     if in_progress:
         print("\n--- In progress (claimed, not yet completed) ---")
         for row in in_progress:
-            qid, cid, bid, iid, reason, claimed = row[0], row[1], row[2], row[3], row[4], row[5]
-            scope = "branch-wide" if iid is None else f"item {iid}"
-            print(f"  {str(qid)[:8]}... {scope}  claimed at {claimed}")
+            qid, cid, bid, iid, reason, claimed, done = row[0], row[1], row[2], row[3], row[4], row[5], row[6]
+            scope = f"branch-wide ({done or 0} items done)" if iid is None else f"item {iid}"
+            print(f"  {str(qid)[:8]}... {scope}  last heartbeat {claimed}")
 
     if processed_recent:
         print("\n--- Recently completed (last 24h, sample) ---")
@@ -156,7 +160,7 @@ def main() -> None:
     parser.add_argument("--status", action="store_true", help="Show queue status only (no refresh)")
     parser.add_argument("--once", action="store_true", help="Process one batch and exit")
     parser.add_argument("--batch-size", type=int, default=50, help="Max queue jobs per batch (default 50)")
-    parser.add_argument("--chunk-size", type=int, default=None, metavar="N", help="Items per commit for branch-wide jobs (default 200). Use 500-2000 for night runs to reduce commit overhead.")
+    parser.add_argument("--chunk-size", type=int, default=None, metavar="N", help="Items per commit for branch-wide jobs (default 1000). Use 2000-5000 for night runs to reduce commit overhead.")
     parser.add_argument("--quiet", action="store_true", help="Suppress SQL logging (WARNING only). Use for night batch to speed up.")
     parser.add_argument("--interval", type=float, default=60.0, help="Seconds between runs when not --once")
     args = parser.parse_args()
@@ -2,10 +2,12 @@
 """
 Process sales invoices with submission_status=pending and submit to KRA OSCU.
 
-Run via cron or process manager (same pattern as process_snapshot_refresh_queue).
+Run via cron or process manager (same pattern as process_snapshot_refresh_queue). Invoices are
+submitted concurrently (--workers, per-branch limits from ETIMS_SUBMIT_BRANCH_*); several copies of
+this worker can run side by side, SKIP LOCKED claims keep them on different invoices.
 
 Usage:
-  cd pharmasight/backend && python -m scripts.submit_pending_etims_invoices [--limit N] [--once]
+  cd pharmasight/backend && python -m scripts.submit_pending_etims_invoices [--limit N] [--workers N] [--once]
 """
 from __future__ import annotations
 
@@ -20,7 +22,8 @@ logger = logging.getLogger(__name__)
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Submit pending eTIMS sales invoices")
-    parser.add_argument("--limit", type=int, default=25, help="Max invoices per run")
+    parser.add_argument("--limit", type=int, default=None, help="Max invoices per run (default ETIMS_SUBMIT_BATCH_LIMIT)")
+    parser.add_argument("--workers", type=int, default=None, help="Concurrent submissions (default ETIMS_SUBMIT_WORKERS)")
     parser.add_argument("--once", action="store_true", help="Single run then exit")
     parser.add_argument("--interval", type=float, default=120.0, help="Seconds between runs (if not --once)")
     args = parser.parse_args()
@@ -35,14 +38,16 @@ def main() -> None:
     while True:
         db = SessionLocal()
         try:
-            summary = process_pending_etims_submissions(db, limit=args.limit)
+            summary = process_pending_etims_submissions(db, limit=args.limit, workers=args.workers)
             logger.info(
-                "eTIMS batch: candidates=%s ok=%s failed=%s skipped=%s errors=%s",
+                "eTIMS batch: candidates=%s ok=%s failed=%s skipped=%s claimed_elsewhere=%s errors=%s in %ss",
                 summary.get("candidates"),
                 summary.get("submitted_ok"),
                 summary.get("failed"),
                 summary.get("skipped"),
+                summary.get("claimed_elsewhere"),
                 len(summary.get("errors") or []),
+                summary.get("elapsed_seconds"),
             )
             for err in summary.get("errors") or []:
                 logger.warning("eTIMS error: %s", err)
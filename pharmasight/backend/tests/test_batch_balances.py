@@ -0,0 +1,141 @@
+"""
+Tests for inventory_batch_balances maintenance (SnapshotService.upsert_batch_balances).
+
+Incremental updates written next to ledger inserts must equal a rebuild from the ledger.
+Integration only (requires DB with a branch and an item); everything runs inside one
+transaction that is rolled back.
+
+Run: pytest backend/tests/test_batch_balances.py -v
+"""
+import sys
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+from uuid import uuid4
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def branch_item():
+    """(db, company_id, branch_id, item_id) from DB; skip when no DB or data."""
+    from sqlalchemy.exc import OperationalError
+    from app.database import SessionLocal
+    from app.models import Branch, Item
+
+    db = SessionLocal()
+    try:
+        try:
+            branch = db.query(Branch).first()
+        except OperationalError:
+            pytest.skip("Integration: database not reachable")
+        if not branch:
+            pytest.skip("Integration: need a branch in DB")
+        item = db.query(Item).filter(Item.company_id == branch.company_id).first()
+        if not item:
+            pytest.skip("Integration: need an item in DB")
+        yield db, branch.company_id, branch.id, item.id
+    finally:
+        db.rollback()
+        db.close()
+
+
+def _batch_rows(db, branch_id, item_id):
+    from sqlalchemy import text
+
+    rows = db.execute(
+        text("""
+            SELECT batch_number, expiry_date, unit_cost, quantity, first_ledger_entry_id
+            FROM inventory_batch_balances
+            WHERE branch_id = :branch_id AND item_id = :item_id
+        """),
+        {"branch_id": str(branch_id), "item_id": str(item_id)},
+    ).fetchall()
+    return {(r.batch_number, r.expiry_date, r.unit_cost): (r.quantity, r.first_ledger_entry_id) for r in rows}
+
+
+def _ledger_entry(company_id, branch_id, item_id, qty, batch_number, expiry_date, unit_cost):
+    from app.models import InventoryLedger
+
+    qty = Decimal(str(qty))
+    unit_cost = Decimal(str(unit_cost))
+    return InventoryLedger(
+        company_id=company_id,
+        branch_id=branch_id,
+        item_id=item_id,
+        batch_number=batch_number,
+        expiry_date=expiry_date,
+        transaction_type="ADJUSTMENT" if qty > 0 else "SALE",
+        reference_type="test",
+        document_number="TEST-BATCH",
+        quantity_delta=qty,
+        unit_cost=unit_cost,
+        total_cost=qty * unit_cost,
+        created_by=uuid4(),
+    )
+
+
+@pytest.mark.integration
+def test_incremental_batch_balances_match_rebuild(branch_item):
+    """Receipts, sales and a NULL batch applied incrementally equal rebuild_batch_balances."""
+    from app.services.snapshot_service import SnapshotService
+
+    db, company_id, branch_id, item_id = branch_item
+    expiry = date.today() + timedelta(days=90)
+    try:
+        SnapshotService.rebuild_batch_balances(db, branch_id=branch_id, item_ids=[item_id])
+        documents = [
+            [
+                _ledger_entry(company_id, branch_id, item_id, 30, "TB-1", expiry, "2.5"),
+                _ledger_entry(company_id, branch_id, item_id, 10, "TB-1", expiry, "2.75"),
+                _ledger_entry(company_id, branch_id, item_id, 5, None, None, "1"),
+            ],
+            [
+                _ledger_entry(company_id, branch_id, item_id, -12, "TB-1", expiry, "2.5"),
+                _ledger_entry(company_id, branch_id, item_id, -3, "TB-1", expiry, "2.5"),
+            ],
+            [_ledger_entry(company_id, branch_id, item_id, -5, None, None, "1")],
+        ]
+        for entries in documents:
+            db.add_all(entries)
+            db.flush()
+            SnapshotService.upsert_batch_balances(db, entries)
+        incremental = _batch_rows(db, branch_id, item_id)
+
+        SnapshotService.rebuild_batch_balances(db, branch_id=branch_id, item_ids=[item_id])
+        rebuilt = _batch_rows(db, branch_id, item_id)
+
+        assert incremental == rebuilt
+        assert incremental[("TB-1", expiry, Decimal("2.5000"))][0] == Decimal("15")
+        assert incremental[("TB-1", expiry, Decimal("2.5000"))][1] == documents[0][0].id
+    finally:
+        db.rollback()
+
+
+@pytest.mark.integration
+def test_fefo_allocation_reads_batch_balances(branch_item):
+    """allocate_stock_fefo_with_lock sees a batch only while it has remaining quantity."""
+    from app.services.inventory_service import InventoryService
+    from app.services.snapshot_service import SnapshotService
+
+    db, company_id, branch_id, item_id = branch_item
+    expiry = date.today() + timedelta(days=1)
+    try:
+        receipt = _ledger_entry(company_id, branch_id, item_id, 4, "TB-EARLY", expiry, "3")
+        db.add(receipt)
+        db.flush()
+        SnapshotService.upsert_batch_balances(db, [receipt])
+        allocations = InventoryService.allocate_stock_fefo_with_lock(db, item_id, branch_id, 4)
+        assert allocations[0]["batch_number"] == "TB-EARLY"
+
+        sale = _ledger_entry(company_id, branch_id, item_id, -4, "TB-EARLY", expiry, "3")
+        db.add(sale)
+        db.flush()
+        SnapshotService.upsert_batch_balances(db, [sale])
+        batches = InventoryService.get_stock_by_batch(db, item_id, branch_id)
+        assert "TB-EARLY" not in {b["batch_number"] for b in batches}
+    finally:
+        db.rollback()
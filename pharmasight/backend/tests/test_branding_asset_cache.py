@@ -0,0 +1,103 @@
+"""
+Tests for the branding asset cache (app.services.branding_asset_cache) as used by
+tenant_storage_service.download_file. Storage REST calls are monkeypatched; no network.
+
+Run: pytest backend/tests/test_branding_asset_cache.py -v
+"""
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+
+LOGO = "company-assets/c1/logo.png"
+
+
+@pytest.fixture
+def storage(monkeypatch, tmp_path):
+    """tenant_storage_service with counted fake REST calls and an empty cache."""
+    from app.config import settings
+    from app.services import branding_asset_cache, tenant_storage_service as svc
+
+    monkeypatch.setattr(settings, "BRANDING_ASSET_CACHE_TTL_SECONDS", 3600)
+    monkeypatch.setattr(settings, "BRANDING_ASSET_CACHE_MAX_BYTES", 1024)
+    monkeypatch.setattr(settings, "BRANDING_ASSET_CACHE_DIR", "")
+    monkeypatch.setattr(svc, "_build_effective_storage_config", lambda tenant=None: ("https://store.test", "eyJkey"))
+    monkeypatch.setattr(svc, "_ensured_buckets", set())
+    calls = {"list": 0, "download": 0}
+    objects = {("company-assets", "c1/logo.png"): b"logo-v1"}
+
+    def list_buckets(**kwargs):
+        calls["list"] += 1
+        return [{"name": "company-assets"}, {"name": "tenant-assets"}]
+
+    def download(*, bucket_name, object_path, **kwargs):
+        calls["download"] += 1
+        return objects.get((bucket_name, object_path))
+
+    def upload(*, bucket_name, object_path, content, **kwargs):
+        objects[(bucket_name, object_path)] = content
+        return True
+
+    monkeypatch.setattr(svc, "_list_buckets_via_rest", list_buckets)
+    monkeypatch.setattr(svc, "_download_object_authenticated_via_rest", download)
+    monkeypatch.setattr(svc, "_upload_object_via_rest", upload)
+    branding_asset_cache.clear()
+    yield svc, calls, objects
+    branding_asset_cache.clear()
+
+
+def test_warm_download_needs_no_storage_calls(storage):
+    svc, calls, _ = storage
+    assert svc.download_file(LOGO) == b"logo-v1"
+    assert calls == {"list": 1, "download": 1}
+    for _ in range(3):
+        assert svc.download_file(LOGO) == b"logo-v1"
+    assert calls == {"list": 1, "download": 1}
+
+
+def test_upload_invalidates_and_bucket_check_is_memoized(storage):
+    from uuid import uuid4
+
+    svc, calls, objects = storage
+    tenant_id = uuid4()
+    path = f"tenant-assets/{tenant_id}/stamp.png"
+    objects[("tenant-assets", f"{tenant_id}/stamp.png")] = b"stamp-v1"
+    assert svc.download_file(path) == b"stamp-v1"
+    assert svc.upload_stamp(tenant_id, b"stamp-v2", "image/png") == path
+    assert svc.download_file(path) == b"stamp-v2"
+    assert calls == {"list": 1, "download": 2}
+
+
+def test_expired_entry_is_refetched_and_stale_served_on_failure(storage, monkeypatch):
+    from app.config import settings
+
+    svc, calls, objects = storage
+    assert svc.download_file(LOGO) == b"logo-v1"
+    monkeypatch.setattr(settings, "BRANDING_ASSET_CACHE_TTL_SECONDS", -1)
+    objects[("company-assets", "c1/logo.png")] = b"logo-v2"
+    assert svc.download_file(LOGO) == b"logo-v2"
+    del objects[("company-assets", "c1/logo.png")]
+    assert svc.download_file(LOGO) == b"logo-v2"  # storage error: last good bytes
+    assert calls["download"] == 3
+
+
+def test_byte_budget_and_disk_tier(storage, monkeypatch, tmp_path):
+    from app.config import settings
+    from app.services import branding_asset_cache
+
+    svc, calls, objects = storage
+    monkeypatch.setattr(settings, "BRANDING_ASSET_CACHE_DIR", str(tmp_path))
+    for n in range(3):
+        objects[("company-assets", f"c{n}/stamp.png")] = bytes([n]) * 400
+        svc.download_file(f"company-assets/c{n}/stamp.png")
+    metrics = branding_asset_cache.get_metrics()
+    assert metrics["bytes"] <= 1024 and metrics["blobs"] == 2
+
+    branding_asset_cache.clear()  # as after a restart: disk tier answers
+    downloads = calls["download"]
+    assert svc.download_file("company-assets/c2/stamp.png") == bytes([2]) * 400
+    assert calls["download"] == downloads
+    assert branding_asset_cache.get_metrics()["disk_hits"] == 1
@@ -0,0 +1,153 @@
+"""
+Tests for the company configuration cache (app.services.company_config_cache) behind
+get_global_pricing_config, get_stock_validation_config and is_module_enabled_for_company.
+
+Integration (requires DB with a branch and migration 102): a warm request reads no settings,
+bump_config_version (settings endpoints) and a version bumped by another worker both force a
+reload, and outside a request only the version is read. Rolled back.
+
+Run: pytest backend/tests/test_company_config_cache.py -v
+"""
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+
+
+@pytest.fixture
+def company_db():
+    """(db, company) from DB; skip when no DB, branch or config_version column."""
+    from sqlalchemy.exc import OperationalError, ProgrammingError
+    from app.database import SessionLocal
+    from app.models import Branch, Company
+    from app.module_metadata import get_core_modules
+    from app.services import company_config_cache
+
+    db = SessionLocal()
+    try:
+        try:
+            branch = db.query(Branch).first()
+            company = db.query(Company).filter(Company.id == branch.company_id).first() if branch else None
+        except (OperationalError, ProgrammingError):
+            pytest.skip("Integration: database or companies.config_version (migration 102) not available")
+        if not company:
+            pytest.skip("Integration: need a branch in DB")
+        # Core modules are cached process-wide; load them outside the test transaction
+        probe = SessionLocal()
+        try:
+            get_core_modules(probe)
+        finally:
+            probe.close()
+        company_config_cache.clear()
+        yield db, company
+    finally:
+        db.rollback()
+        db.close()
+        company_config_cache.clear()
+
+
+@contextmanager
+def _request(db, company):
+    """What CompanyConfigScopeMiddleware + get_current_user set up for one request."""
+    from app.services import company_config_cache
+
+    token = company_config_cache._request_memo.set({})
+    try:
+        db.refresh(company)
+        company_config_cache.note_company(company)
+        yield
+    finally:
+        company_config_cache._request_memo.reset(token)
+
+
+@contextmanager
+def _count_queries(db):
+    from sqlalchemy import event
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+
+def _read_all(db, company_id):
+    from app.module_enforcement import is_module_enabled_for_company
+    from app.services.pricing_config_service import get_global_pricing_config
+    from app.services.stock_validation_service import get_stock_validation_config
+
+    return (
+        get_stock_validation_config(db, company_id).mode,
+        get_global_pricing_config(db, company_id)["below_margin_behavior"],
+        is_module_enabled_for_company(db, company_id, "pharmacy"),
+    )
+
+
+def _set_stock_validation_mode(db, company_id, mode):
+    from app.models import CompanySetting
+    from app.services.stock_validation_service import STOCK_VALIDATION_SETTING_KEY
+
+    row = db.query(CompanySetting).filter(
+        CompanySetting.company_id == company_id,
+        CompanySetting.setting_key == STOCK_VALIDATION_SETTING_KEY,
+    ).first()
+    if row is None:
+        row = CompanySetting(company_id=company_id, setting_key=STOCK_VALIDATION_SETTING_KEY, setting_type="string")
+        db.add(row)
+    row.setting_value = mode
+    db.flush()
+
+
+@pytest.mark.integration
+def test_warm_request_reads_no_settings_and_bump_reloads(company_db):
+    from app.services.company_config_cache import bump_config_version
+
+    db, company = company_db
+    _set_stock_validation_mode(db, company.id, "WARN")
+
+    with _request(db, company):
+        first = _read_all(db, company.id)
+    assert first[0] == "WARN"
+
+    with _request(db, company), _count_queries(db) as statements:
+        assert _read_all(db, company.id) == first
+    assert statements == []
+
+    _set_stock_validation_mode(db, company.id, "OFF")
+    with _request(db, company):
+        assert _read_all(db, company.id)[0] == "WARN"  # not invalidated yet
+        bump_config_version(db, company.id)
+        assert _read_all(db, company.id)[0] == "OFF"
+
+    with _request(db, company), _count_queries(db) as statements:
+        assert _read_all(db, company.id)[0] == "OFF"
+    assert statements == []
+
+
+@pytest.mark.integration
+def test_version_bumped_elsewhere_is_detected(company_db):
+    """Another worker bumping config_version invalidates this process's entry; outside a request only the version is read."""
+    from sqlalchemy import text
+
+    db, company = company_db
+    _set_stock_validation_mode(db, company.id, "STRICT")
+    assert _read_all(db, company.id)[0] == "STRICT"
+
+    with _count_queries(db) as statements:
+        assert _read_all(db, company.id)[0] == "STRICT"
+    assert len(statements) == 3 and all("config_version" in s for s in statements)
+
+    _set_stock_validation_mode(db, company.id, "WARN")
+    db.execute(
+        text("UPDATE companies SET config_version = config_version + 1 WHERE id = :cid"),
+        {"cid": str(company.id)},
+    )
+    with _request(db, company):
+        assert _read_all(db, company.id)[0] == "WARN"
@@ -0,0 +1,120 @@
+"""
+Tests for the branch dashboard read model (BranchDashboardReadModel).
+
+Integration only (requires DB with a branch): the snapshot-based tiles must equal the ledger
+aggregates the dashboard endpoints used before. Synthetic rows are rolled back.
+
+Run: pytest backend/tests/test_dashboard_read_model.py -v
+"""
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+from uuid import uuid4
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def branch_db():
+    """(db, company_id, branch_id) from DB; skip when no DB or branch."""
+    from sqlalchemy.exc import OperationalError
+    from app.database import SessionLocal
+    from app.models import Branch
+
+    db = SessionLocal()
+    try:
+        try:
+            branch = db.query(Branch).first()
+        except OperationalError:
+            pytest.skip("Integration: database not reachable")
+        if not branch:
+            pytest.skip("Integration: need a branch in DB")
+        yield db, branch.company_id, branch.id
+    finally:
+        db.rollback()
+        db.close()
+
+
+def _ledger_tiles(db, company_id, branch_id, days):
+    from sqlalchemy import text
+
+    params = {"c": str(company_id), "b": str(branch_id), "today": date.today(), "cutoff": date.today() + timedelta(days=days)}
+    in_stock = db.execute(text("""
+        SELECT COUNT(*) FROM (
+            SELECT item_id FROM inventory_ledger WHERE company_id = :c AND branch_id = :b
+            GROUP BY item_id HAVING SUM(quantity_delta) > 0
+        ) s
+    """), params).scalar()
+    expiring = db.execute(text("""
+        SELECT COUNT(*) FROM (
+            SELECT 1 FROM inventory_ledger
+            WHERE company_id = :c AND branch_id = :b AND expiry_date IS NOT NULL
+              AND expiry_date >= :today AND expiry_date <= :cutoff
+            GROUP BY item_id, batch_number, expiry_date HAVING SUM(quantity_delta) > 0
+        ) s
+    """), params).scalar()
+    return in_stock, expiring
+
+
+@pytest.mark.integration
+def test_tiles_match_ledger_aggregates(branch_db):
+    """items_in_stock and expiring_count equal the ledger GROUP BY results, before and after new movements."""
+    from app.models import InventoryLedger, Item
+    from app.services.dashboard_read_model import BranchDashboardReadModel
+    from app.services.snapshot_service import SnapshotService
+
+    db, company_id, branch_id = branch_db
+    try:
+        tiles = BranchDashboardReadModel.tiles(db, company_id, branch_id, 365)
+        assert (tiles["items_in_stock"], tiles["expiring_count"]) == _ledger_tiles(db, company_id, branch_id, 365)
+
+        item = Item(id=uuid4(), company_id=company_id, name="Dashboard test item", base_unit="piece")
+        db.add(item)
+        db.flush()
+        entries = []
+        for qty, batch, expiry in [(10, "B1", date.today() + timedelta(days=30)), (5, "B2", date.today() + timedelta(days=400)), (-10, "B1", date.today() + timedelta(days=30))]:
+            entry = InventoryLedger(
+                id=uuid4(), company_id=company_id, branch_id=branch_id, item_id=item.id,
+                transaction_type="ADJUSTMENT", quantity_delta=qty, unit_cost=4, total_cost=4 * qty,
+                batch_number=batch, expiry_date=expiry, created_by=uuid4(),
+            )
+            db.add(entry)
+            entries.append(entry)
+        db.flush()
+        SnapshotService.upsert_inventory_balance(db, company_id, branch_id, item.id, 5, document_number="TEST-DASH")
+        SnapshotService.upsert_batch_balances(db, entries)
+
+        for days in (60, 365, 500):
+            tiles = BranchDashboardReadModel.tiles(db, company_id, branch_id, days)
+            assert (tiles["items_in_stock"], tiles["expiring_count"]) == _ledger_tiles(db, company_id, branch_id, days)
+        assert BranchDashboardReadModel.stock_map(db, company_id, branch_id)[item.id] == 5
+        assert BranchDashboardReadModel.check_consistency(db, company_id, branch_id)["consistent"]
+    finally:
+        db.rollback()
+
+
+@pytest.mark.integration
+def test_consistency_check_reports_drift(branch_db):
+    """A balance that disagrees with the ledger is reported."""
+    from sqlalchemy import text
+    from app.services.dashboard_read_model import BranchDashboardReadModel
+
+    db, company_id, branch_id = branch_db
+    try:
+        changed = db.execute(
+            text("""
+                UPDATE inventory_balances SET current_stock = current_stock + 3
+                WHERE item_id = (SELECT item_id FROM inventory_balances WHERE branch_id = :b LIMIT 1) AND branch_id = :b
+            """),
+            {"b": str(branch_id)},
+        ).rowcount
+        if not changed:
+            pytest.skip("Integration: need inventory_balances rows")
+        report = BranchDashboardReadModel.check_consistency(db, company_id, branch_id)
+        assert not report["consistent"]
+        assert report["item_mismatch_count"] >= 1
+    finally:
+        db.rollback()
@@ -0,0 +1,117 @@
+"""
+Tests for bulk document export rendering (app.services.document_export_service): the render
+process pool, merged PDFs and expiry of export files. Integration (requires DB with a branch and
+migration 100): a job cancelled before its worker starts is not rendered. Rolled back.
+
+Run: pytest backend/tests/test_document_export.py -v
+"""
+import sys
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+
+
+def _grn_docs(n):
+    from app.services.document_pdf_generator import DOC_TYPE_GRN, grn_payload
+
+    return [
+        (DOC_TYPE_GRN, grn_payload(
+            company_name="Test Pharmacy", company_address=None, company_phone=None, company_pin=None,
+            branch_name="Main", branch_address=None, grn_no=f"GRN-{i}", date_received=date(2026, 3, 1),
+            supplier_name="Supplier", items=[{"item_name": "Paracetamol", "quantity": 2.0, "unit_name": "box",
+                                              "unit_cost": 5.0, "total_cost": 10.0}],
+            total_cost=Decimal("10"), notes=None,
+        ))
+        for i in range(n)
+    ]
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_render_many_in_order(monkeypatch, workers):
+    from app.config import settings
+    from app.services import document_export_service as svc
+    from app.services.document_pdf_generator import build_document_pdf
+
+    monkeypatch.setattr(settings, "DOCUMENT_EXPORT_WORKERS", workers)
+    docs = _grn_docs(3)
+    try:
+        pdfs = svc._render_many(docs)
+    finally:
+        svc.shutdown_pool()
+    assert len(pdfs) == 3 and all(p.startswith(b"%PDF") for p in pdfs)
+    assert len(pdfs[1]) == len(build_document_pdf(*docs[1]))
+
+
+def test_merged_pdf_has_a_page_per_document():
+    import io
+    from pypdf import PdfReader, PdfWriter
+    from app.services import document_export_service as svc
+    from app.services.document_pdf_generator import build_document_pdf
+
+    writer = PdfWriter()
+    svc._append_pdfs(writer, [build_document_pdf(*d) for d in _grn_docs(2)])
+    svc._append_pdfs(writer, [build_document_pdf(*d) for d in _grn_docs(2)])
+    out = io.BytesIO()
+    writer.write(out)
+    assert len(PdfReader(io.BytesIO(out.getvalue())).pages) == 4
+
+
+def test_cleanup_removes_only_expired_exports(monkeypatch, tmp_path):
+    import os
+    import time
+    from app.config import settings
+    from app.services import document_export_service as svc
+
+    monkeypatch.setattr(settings, "DOCUMENT_EXPORT_DIR", str(tmp_path))
+    old, new = tmp_path / "old.zip", tmp_path / "new.pdf"
+    old.write_bytes(b"x")
+    new.write_bytes(b"x")
+    stale = time.time() - 3 * 3600
+    os.utime(old, (stale, stale))
+
+    assert svc.cleanup_old_exports(max_age_hours=2) == 1
+    assert not old.exists() and new.exists()
+
+
+@pytest.mark.integration
+def test_job_cancelled_before_start_is_not_rendered(monkeypatch):
+    from uuid import uuid4
+    from sqlalchemy.exc import OperationalError, ProgrammingError
+    from app.database import SessionLocal
+    from app.models import Branch, DocumentExportJob, User
+    from app.services import document_export_service as svc
+
+    db = SessionLocal()
+    try:
+        try:
+            branch = db.query(Branch).first()
+            db.query(DocumentExportJob).first()
+        except (OperationalError, ProgrammingError):
+            pytest.skip("Integration: database or document_export_jobs (migration 100) not available")
+        if not branch:
+            pytest.skip("Integration: need a branch in DB")
+        suffix = uuid4().hex[:8]
+        user = User(id=uuid4(), email=f"dx-{suffix}@test.local", username=f"dx{suffix}")
+        db.add(user)
+        db.flush()
+        job = DocumentExportJob(
+            company_id=branch.company_id, branch_id=branch.id, user_id=user.id, doc_type="grn",
+            output_format="zip", filters={}, status="cancelled",
+        )
+        db.add(job)
+        db.flush()
+        monkeypatch.setattr(db, "commit", db.flush)  # keep everything in the rolled-back transaction
+        monkeypatch.setattr(svc, "_iter_document_chunks", lambda *a, **kw: pytest.fail("cancelled job was rendered"))
+
+        svc.run_export(db, job)
+
+        db.refresh(job)
+        assert job.status == "cancelled" and job.started_at is None
+    finally:
+        db.rollback()
+        db.close()
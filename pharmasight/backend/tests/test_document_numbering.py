@@ -0,0 +1,52 @@
+"""
+Tests for DocumentNumberService.get_next (single UPDATE ... RETURNING on document_sequences).
+
+Integration (requires DB with a branch): the sequence row is created on first use, numbers increase
+by one, and a rolled-back document does not consume its number (gapless). Rolled back.
+
+Run: pytest backend/tests/test_document_numbering.py -v
+"""
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+
+
+@pytest.fixture
+def branch_db():
+    """(db, branch) from DB; skip when no DB or branch."""
+    from sqlalchemy.exc import OperationalError, ProgrammingError
+    from app.database import SessionLocal
+    from app.models import Branch
+
+    db = SessionLocal()
+    try:
+        try:
+            branch = db.query(Branch).first()
+        except (OperationalError, ProgrammingError):
+            pytest.skip("Integration: database not available")
+        if not branch:
+            pytest.skip("Integration: need a branch in DB")
+        yield db, branch
+    finally:
+        db.rollback()
+        db.close()
+
+
+@pytest.mark.integration
+def test_numbers_are_sequential_and_gapless(branch_db):
+    from app.services.document_number_service import DocumentNumberService, _branch_code_two_digit
+
+    db, branch = branch_db
+    code = _branch_code_two_digit(branch)
+    next_number = lambda: DocumentNumberService.get_next(db, branch.company_id, branch.id, "TEST")  # noqa: E731
+
+    assert next_number() == f"TEST-{code}-000001"
+    assert next_number() == f"TEST-{code}-000002"
+    savepoint = db.begin_nested()
+    assert next_number() == f"TEST-{code}-000003"
+    savepoint.rollback()  # document failed: its number is released
+    assert next_number() == f"TEST-{code}-000003"
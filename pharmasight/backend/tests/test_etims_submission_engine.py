@@ -0,0 +1,148 @@
+"""
+Tests for the concurrent eTIMS submission engine (etims_submission_processor.run_concurrently,
+BranchLimiter) and pooled OSCU HTTP retries (etims_http) against a local stub. No database.
+
+Run: pytest backend/tests/test_etims_submission_engine.py -v
+"""
+import sys
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from uuid import uuid4
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+
+
+def test_per_branch_concurrency_is_capped():
+    from app.services.etims.etims_submission_processor import BranchLimiter, run_concurrently
+
+    branches = [uuid4(), uuid4()]
+    tasks = [(uuid4(), branches[i % 2]) for i in range(12)]
+    lock = threading.Lock()
+    in_flight = defaultdict(int)
+    peak = defaultdict(int)
+
+    def submit_one(invoice_id, throttle):
+        branch_id = dict(tasks)[invoice_id]
+        throttle()
+        with lock:
+            in_flight[branch_id] += 1
+            peak[branch_id] = max(peak[branch_id], in_flight[branch_id])
+        time.sleep(0.02)
+        with lock:
+            in_flight[branch_id] -= 1
+        return "ok"
+
+    outcomes = run_concurrently(tasks, submit_one, workers=8, limiter=BranchLimiter(2, 0))
+    assert sorted(i for i, _ in outcomes) == sorted(i for i, _ in tasks)
+    assert {o for _, o in outcomes} == {"ok"}
+    assert max(peak.values()) == 2
+
+
+def test_rate_limit_spaces_requests_per_branch():
+    from app.services.etims.etims_submission_processor import BranchLimiter
+
+    limiter = BranchLimiter(1, 50)  # 20 ms apart
+    t0 = time.monotonic()
+    for _ in range(4):
+        limiter.throttle("b1")
+    limiter.throttle("b2")  # other branch: not delayed by b1
+    assert time.monotonic() - t0 >= 0.055
+
+
+@pytest.fixture
+def oscu_stub(monkeypatch):
+    """Stub sendSalesTransaction answering with the queued status codes (then 200; 0 drops the connection)."""
+    from app.config import settings
+    from app.services.etims import etims_http
+
+    monkeypatch.setattr(settings, "ETIMS_HTTP_RETRIES", 3)
+    monkeypatch.setattr(settings, "ETIMS_HTTP_BACKOFF_SECONDS", 0)
+    statuses = []
+    ports = set()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            ports.add(self.client_address[1])
+            status = statuses.pop(0) if statuses else 200
+            if status == 0:  # body received, connection dropped without a response
+                self.close_connection = True
+                return
+            body = b'{"resultCd": "000"}' if status == 200 else b'{"resultCd": "999"}'
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    etims_http.close_all()
+    yield f"http://127.0.0.1:{server.server_address[1]}/sendSalesTransaction", statuses, ports
+    etims_http.close_all()
+    server.shutdown()
+
+
+def test_submit_retries_busy_responses_on_one_connection(oscu_stub):
+    from app.services.etims import etims_http
+
+    url, statuses, ports = oscu_stub
+    statuses.extend([503, 429])
+    calls = []
+    r = etims_http.request("POST", url, retry_statuses=etims_http.RETRY_STATUSES_SUBMIT,
+                           throttle=lambda: calls.append(1), json={"invcNo": "1"}, timeout=5)
+    assert r.status_code == 200 and len(calls) == 3
+    assert etims_http.get_metrics()["retries"] == 2
+    assert len(ports) == 1  # keep-alive connection reused across attempts
+
+
+def test_submit_does_not_retry_gateway_errors(oscu_stub):
+    from app.services.etims import etims_http
+
+    url, statuses, _ = oscu_stub
+    statuses.append(502)
+    r = etims_http.request("POST", url, retry_statuses=etims_http.RETRY_STATUSES_SUBMIT, json={}, timeout=5)
+    assert r.status_code == 502 and etims_http.get_metrics()["retries"] == 0
+
+
+def test_submit_does_not_retry_after_body_was_sent(oscu_stub):
+    """A connection aborted after the POST went out may have reached OSCU: the invoice fails instead."""
+    import requests
+    from app.services.etims import etims_http
+
+    url, statuses, _ = oscu_stub
+    statuses.append(0)
+    with pytest.raises(requests.ConnectionError):
+        etims_http.request("POST", url, retry_statuses=etims_http.RETRY_STATUSES_SUBMIT, json={}, timeout=5)
+    assert etims_http.get_metrics()["retries"] == 0 and statuses == []
+
+
+def test_submit_retries_refused_connections(monkeypatch):
+    import socket
+    import requests
+    from app.config import settings
+    from app.services.etims import etims_http
+
+    monkeypatch.setattr(settings, "ETIMS_HTTP_RETRIES", 2)
+    monkeypatch.setattr(settings, "ETIMS_HTTP_BACKOFF_SECONDS", 0)
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]  # closed once released: nothing listens
+    etims_http.close_all()
+    try:
+        with pytest.raises(requests.ConnectionError):
+            etims_http.request("POST", f"http://127.0.0.1:{port}/sendSalesTransaction",
+                               retry_statuses=etims_http.RETRY_STATUSES_SUBMIT, json={}, timeout=5)
+        assert etims_http.get_metrics()["retries"] == 2
+    finally:
+        etims_http.close_all()
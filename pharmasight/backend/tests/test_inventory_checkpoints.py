@@ -0,0 +1,134 @@
+"""
+Tests for daily stock checkpoints (InventoryCheckpointService).
+
+Integration only (requires DB with a branch); synthetic ledger rows on past days are inserted
+inside one transaction that is rolled back. Checkpoint reads must equal summing the ledger.
+
+Run: pytest backend/tests/test_inventory_checkpoints.py -v
+"""
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from uuid import uuid4
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def branch_db():
+    """(db, company_id, branch_id) from DB; skip when no DB or branch."""
+    from sqlalchemy.exc import OperationalError, ProgrammingError
+    from app.database import SessionLocal
+    from app.models import Branch, InventoryCheckpointProgress
+
+    db = SessionLocal()
+    try:
+        try:
+            branch = db.query(Branch).first()
+            db.query(InventoryCheckpointProgress).first()
+        except (OperationalError, ProgrammingError):
+            pytest.skip("Integration: database or checkpoint tables (migration 098) not available")
+        if not branch:
+            pytest.skip("Integration: need a branch in DB")
+        yield db, branch.company_id, branch.id
+    finally:
+        db.rollback()
+        db.close()
+
+
+def _ledger_sums(db, company_id, branch_id, as_of):
+    from sqlalchemy import text
+
+    end = datetime(as_of.year, as_of.month, as_of.day, tzinfo=timezone.utc) + timedelta(days=1)
+    rows = db.execute(
+        text("""
+            SELECT item_id, SUM(quantity_delta) q, SUM(quantity_delta * unit_cost) v FROM inventory_ledger
+            WHERE company_id = :c AND branch_id = :b AND created_at < :end GROUP BY item_id
+        """),
+        {"c": str(company_id), "b": str(branch_id), "end": end},
+    ).fetchall()
+    return {r.item_id: (round(float(r.q), 4), round(float(r.v), 4)) for r in rows}
+
+
+def _rounded(stock):
+    return {k: (round(q, 4), round(v, 4)) for k, (q, v) in stock.items()}
+
+
+def _add_ledger(db, company_id, branch_id, item_id, days_ago, qty, unit_cost=10):
+    from app.models import InventoryLedger
+    from app.services.snapshot_service import SnapshotService
+
+    # total_cost is stored unsigned, as the write paths do (sales, adjustments)
+    entry = InventoryLedger(
+        id=uuid4(), company_id=company_id, branch_id=branch_id, item_id=item_id,
+        transaction_type="ADJUSTMENT", quantity_delta=qty, unit_cost=unit_cost, total_cost=abs(qty) * unit_cost,
+        created_by=uuid4(),
+        created_at=datetime.now(timezone.utc) - timedelta(days=days_ago),
+    )
+    db.add(entry)
+    db.flush()
+    SnapshotService.upsert_batch_balances(db, [entry])
+
+
+@pytest.mark.integration
+def test_checkpoint_reads_match_ledger(branch_db):
+    """stock_as_of equals the full ledger sum for dates before, inside and after the checkpoints."""
+    from app.models import Item
+    from app.services.inventory_checkpoint_service import InventoryCheckpointService as svc
+
+    db, company_id, branch_id = branch_db
+    try:
+        item = Item(id=uuid4(), company_id=company_id, name="Checkpoint test item", base_unit="piece")
+        db.add(item)
+        db.flush()
+        for days_ago, qty in [(40, 100), (30, -20), (30, -5), (10, 50), (3, -30), (0, -1)]:
+            _add_ledger(db, company_id, branch_id, item.id, days_ago, qty)
+
+        today = datetime.now(timezone.utc).date()
+        svc.build_branch(db, company_id, branch_id, through=today - timedelta(days=5))
+        assert svc.get_built_through(db, branch_id) == today - timedelta(days=5)
+        for days_ago in (45, 40, 35, 30, 10, 6, 5, 4, 3, 0):
+            as_of = today - timedelta(days=days_ago)
+            assert _rounded(svc.stock_as_of(db, company_id, branch_id, as_of)) == _ledger_sums(db, company_id, branch_id, as_of)
+        assert _rounded(svc.stock_as_of(db, company_id, branch_id, today))[item.id] == (94, 940)
+    finally:
+        db.rollback()
+
+
+@pytest.mark.integration
+def test_backdated_and_rewritten_ledger_rows_stay_consistent(branch_db):
+    """A backdated row moves built_through back; a rewritten row is rebuilt for its item."""
+    from sqlalchemy import text
+    from app.models import Item
+    from app.services.inventory_checkpoint_service import InventoryCheckpointService as svc
+    from app.services.snapshot_service import SnapshotService
+
+    db, company_id, branch_id = branch_db
+    try:
+        item = Item(id=uuid4(), company_id=company_id, name="Checkpoint test item 2", base_unit="piece")
+        db.add(item)
+        db.flush()
+        _add_ledger(db, company_id, branch_id, item.id, 20, 10)
+        _add_ledger(db, company_id, branch_id, item.id, 8, 5)
+        today = datetime.now(timezone.utc).date()
+        svc.build_branch(db, company_id, branch_id)
+        assert svc.get_built_through(db, branch_id) == today - timedelta(days=1)
+
+        _add_ledger(db, company_id, branch_id, item.id, 15, 7)
+        assert svc.get_built_through(db, branch_id) < today - timedelta(days=15)
+        as_of = today - timedelta(days=2)
+        assert _rounded(svc.stock_as_of(db, company_id, branch_id, as_of)) == _ledger_sums(db, company_id, branch_id, as_of)
+
+        svc.build_branch(db, company_id, branch_id)
+        db.execute(
+            text("UPDATE inventory_ledger SET quantity_delta = 12, total_cost = 120 WHERE item_id = :i AND quantity_delta = 10"),
+            {"i": str(item.id)},
+        )
+        SnapshotService.rebuild_batch_balances(db, branch_id=branch_id, item_ids=[item.id])
+        assert _rounded(svc.stock_as_of(db, company_id, branch_id, as_of)) == _ledger_sums(db, company_id, branch_id, as_of)
+        assert round(svc.stock_as_of(db, company_id, branch_id, as_of)[item.id][0], 4) == 24
+    finally:
+        db.rollback()
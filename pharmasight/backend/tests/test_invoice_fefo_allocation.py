@@ -0,0 +1,125 @@
+"""
+Tests for InventoryService.allocate_invoice_fefo (whole-invoice FEFO allocation).
+
+Integration only (requires DB with a branch and items that have stock); everything runs
+inside one transaction that is rolled back.
+
+Run: pytest backend/tests/test_invoice_fefo_allocation.py -v
+"""
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def stocked_items():
+    """(db, branch_id, items) for up to 20 items with positive stock; skip when no DB or data."""
+    from sqlalchemy import func
+    from sqlalchemy.exc import OperationalError
+    from app.database import SessionLocal
+    from app.models import Branch, InventoryLedger, Item
+
+    db = SessionLocal()
+    try:
+        try:
+            branch = db.query(Branch).first()
+        except OperationalError:
+            pytest.skip("Integration: database not reachable")
+        if not branch:
+            pytest.skip("Integration: need a branch in DB")
+        stocked = (
+            db.query(InventoryLedger.item_id)
+            .filter(InventoryLedger.branch_id == branch.id)
+            .group_by(InventoryLedger.item_id)
+            .having(func.sum(InventoryLedger.quantity_delta) > 0)
+            .limit(20)
+            .subquery()
+        )
+        items = db.query(Item).filter(Item.id.in_(db.query(stocked.c.item_id))).all()
+        if not items:
+            pytest.skip("Integration: need items with stock in DB")
+        yield db, branch.id, items
+    finally:
+        db.rollback()
+        db.close()
+
+
+def _per_batch(allocations):
+    """Quantity per (batch_number, expiry_date); cost layers inside a batch have no FEFO order."""
+    totals = {}
+    for a in allocations:
+        key = (a["batch_number"], a["expiry_date"])
+        totals[key] = totals.get(key, 0.0) + a["quantity"]
+    return totals
+
+
+def _retail_line(item, quantity):
+    return {
+        "item_id": item.id,
+        "item": item,
+        "quantity": quantity,
+        "unit_name": item.retail_unit or item.base_unit,
+    }
+
+
+@pytest.mark.integration
+def test_invoice_allocation_matches_per_item_fefo(stocked_items):
+    """Each line gets the same batches as allocate_stock_fefo_with_lock (expired included)."""
+    from app.services.inventory_service import InventoryService
+
+    db, branch_id, items = stocked_items
+    try:
+        lines = []
+        for item in items:
+            available = InventoryService.get_current_stock(db, item.id, branch_id)
+            lines.append(_retail_line(item, max(1, int(available) // 2)))
+
+        results = InventoryService.allocate_invoice_fefo(db, branch_id, lines)
+
+        assert len(results) == len(lines)
+        for line, result in zip(lines, results):
+            expected = InventoryService.allocate_stock_fefo_with_lock(
+                db, line["item_id"], branch_id, result["quantity_base"], exclude_expired=False
+            )
+            assert _per_batch(result["allocations"]) == pytest.approx(_per_batch(expected))
+            assert all(a["ledger_entry_id"] is not None for a in result["allocations"])
+    finally:
+        db.rollback()
+
+
+@pytest.mark.integration
+def test_repeated_item_lines_share_one_pool(stocked_items):
+    """Two lines for the same item together cannot take more than the item's stock."""
+    from app.services.inventory_service import InventoryService, InsufficientStockError
+
+    db, branch_id, items = stocked_items
+    try:
+        item = items[0]
+        available = InventoryService.get_current_stock(db, item.id, branch_id)
+        half = available / 2
+        first, second = InventoryService.allocate_invoice_fefo(
+            db, branch_id, [_retail_line(item, half), _retail_line(item, half)]
+        )
+        assert sum(a["quantity"] for a in first["allocations"] + second["allocations"]) == pytest.approx(available)
+
+        with pytest.raises(InsufficientStockError) as exc:
+            InventoryService.allocate_invoice_fefo(
+                db, branch_id, [_retail_line(item, half), _retail_line(item, half + 1)]
+            )
+        assert exc.value.line_index == 1
+        assert exc.value.required == pytest.approx(half + 1)
+    finally:
+        db.rollback()
+
+
+@pytest.mark.integration
+def test_empty_invoice_is_noop(stocked_items):
+    """No lines means no queries and no allocations."""
+    from app.services.inventory_service import InventoryService
+
+    db, branch_id, _ = stocked_items
+    assert InventoryService.allocate_invoice_fefo(db, branch_id, []) == []
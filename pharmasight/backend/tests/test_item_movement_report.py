@@ -0,0 +1,93 @@
+"""
+Tests for the item movement report (item_movement_report_service).
+
+Integration only (requires DB with a branch): keyset chunks must produce the same rows as one
+chunk, and references resolve with one query per type. Synthetic rows are rolled back.
+
+Run: pytest backend/tests/test_item_movement_report.py -v
+"""
+import sys
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from uuid import uuid4
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def branch_db():
+    """(db, company_id, branch_id) from DB; skip when no DB or branch."""
+    from sqlalchemy.exc import OperationalError
+    from app.database import SessionLocal
+    from app.models import Branch
+
+    db = SessionLocal()
+    try:
+        try:
+            branch = db.query(Branch).first()
+        except OperationalError:
+            pytest.skip("Integration: database not reachable")
+        if not branch:
+            pytest.skip("Integration: need a branch in DB")
+        yield db, branch.company_id, branch.id
+    finally:
+        db.rollback()
+        db.close()
+
+
+@pytest.mark.integration
+def test_keyset_chunks_match_single_pass_and_batch_references(branch_db):
+    from sqlalchemy import event
+    from app.models import InventoryLedger, Item
+    from app.services.item_movement_report_service import open_item_movement_report
+
+    db, company_id, branch_id = branch_db
+    try:
+        item = Item(id=uuid4(), company_id=company_id, name="Movement test item", base_unit="piece")
+        db.add(item)
+        db.flush()
+        base = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(days=3)
+        invoice_ids = [uuid4() for _ in range(3)]
+        # Two rows share each timestamp so chunk boundaries fall inside ties
+        for n in range(7):
+            db.add(InventoryLedger(
+                id=uuid4(), company_id=company_id, branch_id=branch_id, item_id=item.id,
+                transaction_type="SALE" if n else "ADJUSTMENT",
+                reference_type="sales_invoice" if n else "MANUAL_ADJUSTMENT",
+                reference_id=invoice_ids[n % 3] if n else None,
+                quantity_delta=100 if n == 0 else -n, unit_cost=1, total_cost=1,
+                created_by=uuid4(), created_at=base + timedelta(hours=n // 2),
+            ))
+        db.flush()
+        today = date.today()
+
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        results = []
+        for chunk_size in (1000, 2):
+            header, rows = open_item_movement_report(
+                db, company_id, branch_id, item.id, today - timedelta(days=10), today, chunk_size=chunk_size
+            )
+            engine = db.get_bind()
+            event.listen(engine, "before_cursor_execute", count)
+            try:
+                statements.clear()
+                results.append([r.model_dump() for r in rows])
+            finally:
+                event.remove(engine, "before_cursor_execute", count)
+            if chunk_size == 1000:
+                # ledger chunk + sales_invoices IN + invoice line prices
+                assert sum("FROM sales_invoices" in s for s in statements) == 1
+                assert len(statements) == 3
+
+        assert results[0] == results[1]
+        assert len(results[0]) == 7
+        assert results[0][-1]["running_balance"] == 100 - sum(range(1, 7))
+    finally:
+        db.rollback()
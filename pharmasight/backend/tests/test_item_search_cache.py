@@ -0,0 +1,171 @@
+"""
+Tests for the in-process item search cache (app.services.item_search_cache).
+
+The session is a fake that serves item_branch_snapshot rows and the branch version from memory,
+so no database is needed.
+
+Run: pytest backend/tests/test_item_search_cache.py -v
+"""
+import sys
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from uuid import uuid4
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+
+COMPANY_ID = uuid4()
+BRANCH_ID = uuid4()
+
+
+class _FakeResult:
+    def __init__(self, rows=None, scalar=None):
+        self._rows = rows or []
+        self._scalar = scalar
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def scalar(self):
+        return self._scalar
+
+
+class _FakeSession:
+    """Answers the cache's two statements: version read and (delta) row select."""
+
+    def __init__(self):
+        from app.services.item_search_cache import _ROW_FIELDS
+
+        self.Row = namedtuple("Row", _ROW_FIELDS + ("search_text", "updated_at"))
+        self.rows = {}
+        self.version = 1
+        self.info = {}
+        self.selects = 0
+
+    def get_bind(self):
+        return SimpleNamespace(url="postgresql://fake/db")
+
+    def put(self, name, stock, updated_at=None):
+        item_id = next((k for k, r in self.rows.items() if r.name == name), uuid4())
+        values = dict.fromkeys(self.Row._fields)
+        values.update(
+            item_id=item_id, name=name, current_stock=stock, search_text=name.lower(),
+            updated_at=updated_at or datetime.now(timezone.utc),
+        )
+        self.rows[item_id] = self.Row(**values)
+
+    def execute(self, statement, params):
+        sql = str(statement)
+        if "item_branch_snapshot_versions" in sql:
+            return _FakeResult(scalar=self.version)
+        self.selects += 1
+        rows = list(self.rows.values())
+        if "since" in params:
+            rows = [r for r in rows if r.updated_at >= params["since"]]
+        return _FakeResult(rows=rows)
+
+    def rollback(self):
+        pass
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    from app.config import settings
+    from app.services import item_search_cache
+
+    monkeypatch.setattr(settings, "ITEM_SEARCH_CACHE_TTL_SECONDS", 300)
+    monkeypatch.setattr(settings, "ITEM_SEARCH_CACHE_VERSION_CHECK_SECONDS", 0)
+    monkeypatch.setattr(settings, "ITEM_SEARCH_FUZZY_MIN_RESULTS", 5)
+    item_search_cache.invalidate()
+    yield item_search_cache
+    item_search_cache.invalidate()
+
+
+def _names(rows):
+    return [r.name for r in rows]
+
+
+def test_ranked_order_prefix_word_start_substring(cache, monkeypatch):
+    """Name prefix beats word start beats mid-word match; in-stock first within a tier."""
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "ITEM_SEARCH_MODE", "ranked")
+    db = _FakeSession()
+    for name, stock in [
+        ("Prozqxalinate Cream", 10),
+        ("Syrup Zqxalin 100ml", 0),
+        ("Zqxalin 500mg Caps", 0),
+        ("Gel Zqxalin Forte", 10),
+        ("Zqxalin Tabs", 10),
+    ]:
+        db.put(name, stock)
+    names = _names(cache.lookup(db, "zqxalin", COMPANY_ID, BRANCH_ID, 10))
+    assert names == [
+        "Zqxalin Tabs", "Zqxalin 500mg Caps", "Gel Zqxalin Forte", "Syrup Zqxalin 100ml", "Prozqxalinate Cream",
+    ]
+
+
+def test_ilike_order_and_fuzzy_delegation(cache, monkeypatch):
+    """ilike mode: in-stock then name. Ranked mode with few matches defers to the DB (None)."""
+    from app.config import settings
+
+    db = _FakeSession()
+    for name, stock in [("Beta Amox", 0), ("Alpha Amox", 5), ("Gamma Amox", 5)]:
+        db.put(name, stock)
+    monkeypatch.setattr(settings, "ITEM_SEARCH_MODE", "ilike")
+    assert _names(cache.lookup(db, "AMOX", COMPANY_ID, BRANCH_ID, 10)) == ["Alpha Amox", "Gamma Amox", "Beta Amox"]
+    assert _names(cache.lookup(db, "amox", COMPANY_ID, BRANCH_ID, 2)) == ["Alpha Amox", "Gamma Amox"]
+    monkeypatch.setattr(settings, "ITEM_SEARCH_MODE", "ranked")
+    assert cache.lookup(db, "amoxcilin", COMPANY_ID, BRANCH_ID, 10) is None
+
+
+def test_version_bump_patches_changed_rows(cache, monkeypatch):
+    """Same version: served from memory. New version: changed and added rows are patched in."""
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "ITEM_SEARCH_MODE", "ilike")
+    db = _FakeSession()
+    old = datetime.now(timezone.utc) - timedelta(hours=1)
+    db.put("Paracetamol 500mg", 0, updated_at=old)
+    db.put("Ibuprofen 200mg", 3, updated_at=old)
+    assert _names(cache.lookup(db, "500mg", COMPANY_ID, BRANCH_ID, 10)) == ["Paracetamol 500mg"]
+    assert db.selects == 1
+
+    db.put("Amoxicillin 500mg", 2)
+    assert _names(cache.lookup(db, "500mg", COMPANY_ID, BRANCH_ID, 10)) == ["Paracetamol 500mg"]
+    assert db.selects == 1
+
+    db.version += 1
+    db.put("Paracetamol 500mg", 7)
+    rows = cache.lookup(db, "500mg", COMPANY_ID, BRANCH_ID, 10)
+    assert _names(rows) == ["Amoxicillin 500mg", "Paracetamol 500mg"]
+    assert float(rows[1].current_stock) == 7
+    assert db.selects == 2
+
+
+def test_commit_hooks_bump_and_invalidate(cache, monkeypatch):
+    """Marked branches are bumped before commit and dropped from the local cache after it."""
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "ITEM_SEARCH_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "ITEM_SEARCH_MODE", "ilike")
+    db = _FakeSession()
+    db.put("Cetirizine 10mg", 4)
+    cache.lookup(db, "cetir", COMPANY_ID, BRANCH_ID, 10)
+    assert len(cache._entries) == 1
+
+    executed = []
+    db.execute = lambda statement, params: executed.append((str(statement), params))
+    cache.mark_branch_changed(db, COMPANY_ID, BRANCH_ID)
+    cache.mark_branch_changed(db, COMPANY_ID, BRANCH_ID)
+    assert cache.bump_branch_versions(db) == 1
+    assert "ON CONFLICT (branch_id)" in executed[0][0]
+    assert executed[0][1] == {"b0": str(BRANCH_ID), "c0": str(COMPANY_ID)}
+    assert cache.bump_branch_versions(db) == 0
+
+    cache._after_commit_invalidate(db)
+    assert len(cache._entries) == 0
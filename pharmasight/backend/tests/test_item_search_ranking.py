@@ -0,0 +1,93 @@
+"""
+Tests for ranked POS item search (ItemSearchService, ITEM_SEARCH_MODE=ranked).
+
+Integration only (requires DB with a branch and the pg_trgm extension); synthetic items and
+snapshot rows are inserted inside one transaction that is rolled back.
+
+Run: pytest backend/tests/test_item_search_ranking.py -v
+"""
+import sys
+from pathlib import Path
+from uuid import uuid4
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def branch_db():
+    """(db, company_id, branch_id) from DB; skip when no DB, branch or pg_trgm."""
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+    from app.database import SessionLocal
+    from app.models import Branch
+
+    db = SessionLocal()
+    try:
+        try:
+            branch = db.query(Branch).first()
+        except OperationalError:
+            pytest.skip("Integration: database not reachable")
+        if not branch:
+            pytest.skip("Integration: need a branch in DB")
+        if not db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).scalar():
+            pytest.skip("Integration: need pg_trgm extension")
+        yield db, branch.company_id, branch.id
+    finally:
+        db.rollback()
+        db.close()
+
+
+def _add_snapshot_items(db, company_id, branch_id, names_and_stock):
+    from app.models import Item, ItemBranchSnapshot
+
+    for name, stock in names_and_stock:
+        item = Item(id=uuid4(), company_id=company_id, name=name, base_unit="piece")
+        db.add(item)
+        db.flush()
+        db.add(ItemBranchSnapshot(
+            company_id=company_id,
+            branch_id=branch_id,
+            item_id=item.id,
+            name=name,
+            current_stock=stock,
+            search_text=f"{name.lower()} zqtest",
+        ))
+    db.flush()
+
+
+@pytest.mark.integration
+def test_prefix_then_word_start_then_substring(branch_db):
+    """Name prefix beats word-start beats mid-word match, even when the prefix match is out of stock."""
+    from app.services.item_search_service import _ranked_snapshot_rows
+
+    db, company_id, branch_id = branch_db
+    try:
+        _add_snapshot_items(db, company_id, branch_id, [
+            ("Prozqxalinate Cream", 10),        # substring
+            ("Syrup Zqxalin 100ml", 10),        # word start
+            ("Zqxalin 500mg Caps", 0),          # name prefix, out of stock
+            ("Gel Zqxalin Forte", 10),          # word start
+        ])
+        names = [r.name for r in _ranked_snapshot_rows(db, "zqxalin", company_id, branch_id, 10)]
+        assert names[0] == "Zqxalin 500mg Caps"
+        assert set(names[1:3]) == {"Syrup Zqxalin 100ml", "Gel Zqxalin Forte"}
+        assert names[3] == "Prozqxalinate Cream"
+    finally:
+        db.rollback()
+
+
+@pytest.mark.integration
+def test_typo_falls_back_to_fuzzy_matches(branch_db):
+    """A misspelt term with no substring match still finds the item."""
+    from app.services.item_search_service import _ranked_snapshot_rows
+
+    db, company_id, branch_id = branch_db
+    try:
+        _add_snapshot_items(db, company_id, branch_id, [("Zqamoxicillin 250mg Caps", 5)])
+        rows = _ranked_snapshot_rows(db, "zqamoxcillin", company_id, branch_id, 10)
+        assert "Zqamoxicillin 250mg Caps" in [r.name for r in rows]
+    finally:
+        db.rollback()
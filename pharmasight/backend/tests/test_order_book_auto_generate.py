@@ -0,0 +1,127 @@
+"""
+Tests for set-based order book auto-generation (OrderBookService.auto_generate_entries).
+
+Rule tests need no database. The integration test compares the bulk run against a
+per-item evaluation (ledger stock, per-line unit conversion) inside a rolled-back transaction.
+
+Run: pytest backend/tests/test_order_book_auto_generate.py -v
+"""
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    "stock, monthly, pack, expected",
+    [
+        (0, 0, 10, 1),        # stock fell to zero, no recent sales: one pack
+        (5, 0, 10, 1),        # at or below one wholesale pack
+        (50, 0, 10, 0),       # plenty of stock, no sales
+        (50, 200, 10, 5),     # below half monthly: 100 - 50 = 50 retail = 5 packs
+        (12, 40, 10, 1),      # 8 retail short: under 1.5 packs is one pack
+        (0, 40, 10, 1),       # empty shelf with recent sales: one pack
+        (20, 400, 10, 18),    # 200 - 20 = 180 retail = 18 packs
+        (60, 100, 10, 0),     # not below half monthly, above one pack
+    ],
+)
+def test_auto_reorder_packs_rules(stock, monthly, pack, expected):
+    from app.services.order_book_service import _auto_reorder_packs
+
+    assert _auto_reorder_packs(stock, monthly, pack) == expected
+
+
+@pytest.fixture(scope="module")
+def branch_db():
+    """(db, branch, user_id) from DB; skip when no DB or data."""
+    from sqlalchemy.exc import OperationalError
+    from app.database import SessionLocal
+    from app.models import Branch, User
+
+    db = SessionLocal()
+    try:
+        try:
+            branch = db.query(Branch).first()
+        except OperationalError:
+            pytest.skip("Integration: database not reachable")
+        if not branch:
+            pytest.skip("Integration: need a branch in DB")
+        user = db.query(User).first()
+        if not user:
+            pytest.skip("Integration: need a user in DB")
+        yield db, branch, user.id
+    finally:
+        db.rollback()
+        db.close()
+
+
+@pytest.mark.integration
+def test_bulk_generation_matches_per_item_rules(branch_db, monkeypatch):
+    """Entries created equal the per-item evaluation of the same rules."""
+    from sqlalchemy import func
+    from app.models import DailyOrderBook, InventoryLedger, Item, SalesInvoice, SalesInvoiceItem
+    from app.services.inventory_service import InventoryService
+    from app.services.order_book_service import OrderBookService, _auto_reorder_packs
+
+    db, branch, user_id = branch_db
+    entry_date = date.today() + timedelta(days=3650)  # no existing entries on this date
+    monkeypatch.setattr(db, "commit", db.flush)
+    try:
+        sold = (
+            db.query(SalesInvoiceItem.item_id)
+            .join(SalesInvoice, SalesInvoiceItem.sales_invoice_id == SalesInvoice.id)
+            .filter(
+                SalesInvoice.branch_id == branch.id,
+                SalesInvoice.company_id == branch.company_id,
+                SalesInvoice.status.in_(["BATCHED", "PAID"]),
+            )
+            .distinct()
+            .all()
+        )
+        if not sold:
+            pytest.skip("Integration: need sales at the branch")
+        since = datetime.utcnow() - timedelta(days=30)
+        expected = {}
+        for (item_id,) in sold:
+            item = db.query(Item).filter(Item.id == item_id).first()
+            stock = db.query(func.sum(InventoryLedger.quantity_delta)).filter(
+                InventoryLedger.item_id == item_id, InventoryLedger.branch_id == branch.id
+            ).scalar()
+            monthly = 0.0
+            for qty, unit_name in (
+                db.query(SalesInvoiceItem.quantity, SalesInvoiceItem.unit_name)
+                .join(SalesInvoice, SalesInvoiceItem.sales_invoice_id == SalesInvoice.id)
+                .filter(
+                    SalesInvoiceItem.item_id == item_id,
+                    SalesInvoice.branch_id == branch.id,
+                    SalesInvoice.status.in_(["BATCHED", "PAID"]),
+                    SalesInvoice.created_at >= since,
+                )
+            ):
+                try:
+                    monthly += InventoryService.convert_to_base_units(db, item_id, float(qty), unit_name or "")
+                except ValueError:
+                    monthly += float(qty)
+            packs = _auto_reorder_packs(float(stock or 0), monthly, max(1, int(item.pack_size or 1)))
+            if packs > 0:
+                expected[item_id] = packs
+
+        created = OrderBookService.auto_generate_entries(
+            db, branch.company_id, branch.id, user_id, entry_date=entry_date
+        )
+        rows = db.query(DailyOrderBook).filter(
+            DailyOrderBook.branch_id == branch.id, DailyOrderBook.entry_date == entry_date
+        ).all()
+
+        assert created == len(expected)
+        assert {r.item_id: int(r.quantity_needed) for r in rows} == expected
+        # Second run on the same date adds nothing
+        assert OrderBookService.auto_generate_entries(
+            db, branch.company_id, branch.id, user_id, entry_date=entry_date
+        ) == 0
+    finally:
+        db.rollback()
@@ -0,0 +1,113 @@
+"""
+Tests for the effective-permission resolver (app.services.permission_resolver) behind
+_user_has_permission / ensure_user_has_branch_access.
+
+Integration (requires DB with a branch and migration 101): within a request the set is loaded once,
+a later request reuses it without queries, and bump_permissions_version makes the next request reload.
+Rolled back.
+
+Run: pytest backend/tests/test_permission_resolver.py -v
+"""
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from uuid import uuid4
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+
+
+@pytest.fixture
+def branch_db():
+    """(db, company, branch) from DB; skip when no DB, branch or permissions_version column."""
+    from sqlalchemy.exc import OperationalError, ProgrammingError
+    from app.database import SessionLocal
+    from app.models import Branch, Company
+    from app.services import permission_resolver
+
+    db = SessionLocal()
+    try:
+        try:
+            branch = db.query(Branch).first()
+            company = db.query(Company).filter(Company.id == branch.company_id).first() if branch else None
+        except (OperationalError, ProgrammingError):
+            pytest.skip("Integration: database or companies.permissions_version (migration 101) not available")
+        if not branch:
+            pytest.skip("Integration: need a branch in DB")
+        permission_resolver.clear()
+        yield db, company, branch
+    finally:
+        db.rollback()
+        db.close()
+        permission_resolver.clear()
+
+
+@contextmanager
+def _request(db, company):
+    """What PermissionScopeMiddleware + get_current_user set up for one request."""
+    from app.services import permission_resolver
+
+    token = permission_resolver._request_memo.set({})
+    try:
+        db.refresh(company)
+        permission_resolver.note_company(company)
+        yield
+    finally:
+        permission_resolver._request_memo.reset(token)
+
+
+@contextmanager
+def _count_queries(db):
+    from sqlalchemy import event
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+
+@pytest.mark.integration
+def test_permission_checks_are_loaded_once_and_invalidated_by_version(branch_db):
+    from fastapi import HTTPException
+    from app.dependencies import _user_has_permission, ensure_user_has_branch_access
+    from app.models import Permission, RolePermission, User, UserBranchRole, UserRole
+    from app.services.permission_resolver import bump_permissions_version
+
+    db, company, branch = branch_db
+    suffix = uuid4().hex[:8]
+    user = User(id=uuid4(), email=f"perm-{suffix}@test.local", username=f"perm{suffix}")
+    role = UserRole(id=uuid4(), role_name=f"test-{suffix}")
+    perm = Permission(id=uuid4(), name=f"test.view_{suffix}", module="test", action="view")
+    db.add_all([user, role, perm])
+    db.flush()
+    db.add_all([
+        UserBranchRole(user_id=user.id, branch_id=branch.id, role_id=role.id),
+        RolePermission(role_id=role.id, permission_id=perm.id),
+    ])
+    db.flush()
+
+    with _request(db, company), _count_queries(db) as statements:
+        assert _user_has_permission(db, user.id, perm.name)
+        assert not _user_has_permission(db, user.id, "test.missing")
+        ensure_user_has_branch_access(db, user.id, branch.id)
+        ensure_user_has_branch_access(db, user.id, str(branch.id))
+        with pytest.raises(HTTPException):
+            ensure_user_has_branch_access(db, user.id, uuid4())
+    assert len(statements) == 1
+
+    with _request(db, company):
+        with _count_queries(db) as statements:
+            assert _user_has_permission(db, user.id, perm.name)
+        assert statements == []  # warm request: no queries
+        db.query(RolePermission).filter(RolePermission.role_id == role.id).delete()
+        bump_permissions_version(db, company.id)
+
+    with _request(db, company):
+        assert not _user_has_permission(db, user.id, perm.name)
+        ensure_user_has_branch_access(db, user.id, branch.id)  # still assigned, role has no permissions
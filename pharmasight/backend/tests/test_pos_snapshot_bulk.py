@@ -0,0 +1,152 @@
+"""
+Parity tests: set-based refresh_pos_snapshot_bulk vs per-item refresh_pos_snapshot_for_item.
+
+Both paths must write identical item_branch_snapshot rows. Integration only (requires DB with
+company, branch and items); everything runs inside one transaction that is rolled back.
+
+Run: pytest backend/tests/test_pos_snapshot_bulk.py -v
+"""
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+
+# Columns compared between the two paths (id/updated_at differ by design).
+_COMPARED_COLUMNS = (
+    "name", "pack_size", "base_unit", "sku", "vat_rate", "vat_category",
+    "current_stock", "average_cost", "last_purchase_price", "selling_price", "margin_percent",
+    "next_expiry_date", "search_text", "last_purchase_date", "last_supplier_id",
+    "last_order_date", "last_sale_date", "last_order_book_date", "last_quotation_date",
+    "default_item_margin", "branch_margin", "company_margin", "floor_price", "minimum_margin",
+    "promotion_price", "promotion_start", "promotion_end", "promotion_active",
+    "effective_selling_price", "price_source",
+    "retail_unit", "supplier_unit", "wholesale_unit", "wholesale_units_per_supplier",
+)
+
+
+def _snapshot_rows(db, branch_id, item_ids):
+    from sqlalchemy import text
+
+    rows = db.execute(
+        text(f"""
+            SELECT item_id, {", ".join(_COMPARED_COLUMNS)}
+            FROM item_branch_snapshot
+            WHERE branch_id = :branch_id AND item_id = ANY(CAST(:item_ids AS uuid[]))
+        """),
+        {"branch_id": str(branch_id), "item_ids": [str(i) for i in item_ids]},
+    ).mappings().all()
+    return {str(r["item_id"]): dict(r) for r in rows}
+
+
+def _converge(db, company_id, branch_id, item_ids):
+    """
+    Both paths write ledger-derived cost back to item_branch_purchase_snapshot after reading it,
+    so the first refresh can see a stale purchase snapshot. Run one pass so both start converged.
+    """
+    from app.services.pos_snapshot_service import refresh_pos_snapshot_bulk
+
+    refresh_pos_snapshot_bulk(db, company_id, branch_id, item_ids)
+
+
+def _assert_rows_equal(per_item, bulk):
+    assert set(per_item) == set(bulk)
+    for item_id, expected in per_item.items():
+        actual = bulk[item_id]
+        for col in _COMPARED_COLUMNS:
+            a, b = expected[col], actual[col]
+            if isinstance(a, Decimal) and isinstance(b, Decimal):
+                # Per-item path computes in float before the numeric(…,4) cast
+                assert abs(a - b) <= Decimal("0.0001"), f"{item_id} {col}: {a} != {b}"
+            else:
+                assert a == b, f"{item_id} {col}: {a!r} != {b!r}"
+
+
+@pytest.fixture(scope="module")
+def snapshot_scope():
+    """(db, company_id, branch_id, item_ids) from DB; skip when no DB or data."""
+    from sqlalchemy.exc import OperationalError
+    from app.database import SessionLocal
+    from app.models import Branch, Item
+
+    db = SessionLocal()
+    try:
+        try:
+            branch = db.query(Branch).first()
+        except OperationalError:
+            pytest.skip("Integration: database not reachable")
+        if not branch:
+            pytest.skip("Integration: need a branch in DB")
+        item_ids = [
+            row.id
+            for row in db.query(Item.id)
+            .filter(Item.company_id == branch.company_id, Item.is_active == True)
+            .order_by(Item.id)
+            .limit(200)
+            .all()
+        ]
+        if not item_ids:
+            pytest.skip("Integration: need active items in DB")
+        yield db, branch.company_id, branch.id, item_ids
+    finally:
+        db.rollback()
+        db.close()
+
+
+@pytest.mark.integration
+def test_bulk_refresh_matches_per_item_for_item_list(snapshot_scope):
+    """refresh_pos_snapshot_bulk(item_ids) writes the same rows as refresh_pos_snapshot_for_item."""
+    from app.services.pos_snapshot_service import (
+        refresh_pos_snapshot_bulk,
+        refresh_pos_snapshot_for_item,
+    )
+
+    db, company_id, branch_id, item_ids = snapshot_scope
+    try:
+        _converge(db, company_id, branch_id, item_ids)
+        for item_id in item_ids:
+            refresh_pos_snapshot_for_item(db, company_id, branch_id, item_id)
+        per_item = _snapshot_rows(db, branch_id, item_ids)
+
+        written = refresh_pos_snapshot_bulk(db, company_id, branch_id, item_ids)
+        bulk = _snapshot_rows(db, branch_id, item_ids)
+
+        assert written == len(item_ids)
+        _assert_rows_equal(per_item, bulk)
+    finally:
+        db.rollback()
+
+
+@pytest.mark.integration
+def test_bulk_refresh_whole_branch_matches_per_item(snapshot_scope):
+    """Branch-wide bulk refresh (item_ids=None) matches per-item rows for the sampled items."""
+    from app.services.pos_snapshot_service import (
+        refresh_pos_snapshot_bulk,
+        refresh_pos_snapshot_for_item,
+    )
+
+    db, company_id, branch_id, item_ids = snapshot_scope
+    try:
+        _converge(db, company_id, branch_id, item_ids)
+        refresh_pos_snapshot_bulk(db, company_id, branch_id)
+        bulk = _snapshot_rows(db, branch_id, item_ids)
+
+        for item_id in item_ids:
+            refresh_pos_snapshot_for_item(db, company_id, branch_id, item_id)
+        per_item = _snapshot_rows(db, branch_id, item_ids)
+
+        _assert_rows_equal(per_item, bulk)
+    finally:
+        db.rollback()
+
+
+@pytest.mark.integration
+def test_bulk_refresh_empty_item_list_is_noop(snapshot_scope):
+    """Empty item_ids does not touch the DB."""
+    from app.services.pos_snapshot_service import refresh_pos_snapshot_bulk
+
+    db, company_id, branch_id, _ = snapshot_scope
+    assert refresh_pos_snapshot_bulk(db, company_id, branch_id, []) == 0
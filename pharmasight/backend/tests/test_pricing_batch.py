@@ -0,0 +1,132 @@
+"""
+Tests for PricingService.price_lines_batch (document line pricing in a constant number of queries).
+
+Integration only (requires DB with a branch and items); pins the batch path to the single-line
+path: calculate_recommended_price, get_item_cost, is_line_price_at_promo and validate_line_price.
+
+Run: pytest backend/tests/test_pricing_batch.py -v
+"""
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def priced_items():
+    """(db, company_id, branch_id, items) for up to 25 items of the branch's company; skip when no DB or data."""
+    from sqlalchemy.exc import OperationalError, ProgrammingError
+    from app.database import SessionLocal
+    from app.models import Branch, Item
+
+    db = SessionLocal()
+    try:
+        try:
+            branch = db.query(Branch).first()
+        except (OperationalError, ProgrammingError):
+            pytest.skip("Integration: database not reachable")
+        if not branch:
+            pytest.skip("Integration: need a branch in DB")
+        items = db.query(Item).filter(Item.company_id == branch.company_id).limit(25).all()
+        if not items:
+            pytest.skip("Integration: need items in DB")
+        yield db, branch.company_id, branch.id, items
+    finally:
+        db.rollback()
+        db.close()
+
+
+def _unit(item):
+    return item.retail_unit or item.base_unit or ""
+
+
+@pytest.mark.integration
+def test_recommended_price_matches_single_line(priced_items):
+    """Recommendation, cost and errors equal calculate_recommended_price / get_item_cost per line."""
+    from app.services.pricing_service import PricingService
+
+    db, company_id, branch_id, items = priced_items
+    lines = [{"item_id": i.id, "unit_name": _unit(i)} for i in items]
+    lines.append({"item_id": items[0].id, "unit_name": "no-such-unit"})
+
+    results = PricingService.price_lines_batch(db, company_id, branch_id, lines)
+
+    assert len(results) == len(lines)
+    for line, result in zip(lines, results):
+        try:
+            expected = PricingService.calculate_recommended_price(
+                db, line["item_id"], branch_id, company_id, line["unit_name"]
+            )
+        except ValueError as e:
+            assert result["error"] == str(e)
+            continue
+        assert result["error"] is None
+        assert result["recommended"] == expected
+        assert result["unit_cost_used"] == PricingService.get_item_cost(db, line["item_id"], branch_id)
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("user_has_override", [False, True])
+def test_validation_matches_single_line(priced_items, user_has_override):
+    """Promo flag and validation equal is_line_price_at_promo / validate_line_price for prices around cost."""
+    from app.services.item_units_helper import get_unit_multiplier_from_item
+    from app.services.pricing_config_service import is_line_price_at_promo, validate_line_price
+    from app.services.pricing_service import PricingService
+
+    db, company_id, branch_id, items = priced_items
+    lines, expected = [], []
+    for item in items:
+        cost = PricingService.get_item_cost(db, item.id, branch_id)
+        mult = get_unit_multiplier_from_item(item, _unit(item))
+        if not cost or cost <= 0 or not mult or mult <= 0:
+            continue
+        for factor in ("0.5", "1.05", "2"):
+            price = (cost * mult * Decimal(factor)).quantize(Decimal("0.01"))
+            is_promo = is_line_price_at_promo(db, item.id, _unit(item), price)
+            lines.append({"item_id": item.id, "unit_name": _unit(item), "unit_price_exclusive": price})
+            expected.append((is_promo, validate_line_price(
+                db, company_id, item.id, price, cost * mult, user_has_override,
+                branch_id=branch_id, is_promo_price=is_promo,
+            )))
+    if not lines:
+        pytest.skip("Integration: need items with a cost in the branch")
+
+    results = PricingService.price_lines_batch(
+        db, company_id, branch_id, lines, user_has_sell_below_margin=user_has_override
+    )
+
+    for result, (is_promo, validation) in zip(results, expected):
+        assert result["is_promo_price"] == is_promo
+        assert result["validation"] == validation
+
+
+@pytest.mark.integration
+def test_query_count_does_not_grow_with_lines(priced_items):
+    """One line or every item: the number of statements stays within a small constant."""
+    from sqlalchemy import event
+    from app.services.pricing_service import PricingService
+
+    db, company_id, branch_id, items = priced_items
+    statements = []
+
+    def count(*args, **kwargs):
+        statements.append(1)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        counts = []
+        for subset in (items[:1], items):
+            statements.clear()
+            PricingService.price_lines_batch(
+                db, company_id, branch_id,
+                [{"item_id": i.id, "unit_name": _unit(i), "unit_price_exclusive": Decimal("100")} for i in subset],
+            )
+            counts.append(len(statements))
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    assert max(counts) <= 12
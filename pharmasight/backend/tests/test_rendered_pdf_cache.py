@@ -0,0 +1,91 @@
+"""
+Tests for the rendered PDF cache (app.services.rendered_pdf_cache). Tenant storage is monkeypatched.
+
+Run: pytest backend/tests/test_rendered_pdf_cache.py -v
+"""
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from uuid import uuid4
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+
+
+@pytest.fixture
+def pdf_cache(monkeypatch):
+    from app.config import settings
+    from app.services import rendered_pdf_cache
+
+    monkeypatch.setattr(settings, "RENDERED_PDF_CACHE_MAX_BYTES", 1024)
+    monkeypatch.setattr(settings, "RENDERED_PDF_CACHE_PERSIST", False)
+    rendered_pdf_cache.clear()
+    yield rendered_pdf_cache
+    rendered_pdf_cache.clear()
+
+
+def test_version_changes_with_status_timestamps_and_branding_bytes():
+    from app.services.rendered_pdf_cache import document_version
+
+    ts = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+    base = document_version("BATCHED", ts, None, b"logo-v1")
+    assert base == document_version("BATCHED", ts, None, b"logo-v1")
+    assert base != document_version("PAID", ts, None, b"logo-v1")
+    assert base != document_version("BATCHED", ts.replace(minute=1), None, b"logo-v1")
+    assert base != document_version("BATCHED", ts, None, b"logo-v2")
+
+
+def test_lru_eviction_by_bytes(pdf_cache):
+    ids = [uuid4() for _ in range(3)]
+    for doc_id in ids:
+        pdf_cache.put("grn", doc_id, "v1", b"%PDF" + b"x" * 400)
+    assert pdf_cache.get("grn", ids[0], "v1") is None
+    assert pdf_cache.get("grn", ids[2], "v1") is not None
+    assert pdf_cache.get("grn", ids[2], "v2") is None
+    metrics = pdf_cache.get_metrics()
+    assert (metrics["entries"], metrics["evictions"], metrics["hits"]) == (2, 1, 1)
+
+
+def test_persisted_tier_serves_memory_misses(pdf_cache, monkeypatch):
+    from app.config import settings
+    from app.services import tenant_storage_service as svc
+
+    monkeypatch.setattr(settings, "RENDERED_PDF_CACHE_PERSIST", True)
+    stored = {}
+    monkeypatch.setattr(svc, "upload_file", lambda tenant_id, rel, content, ct, **kw: stored.setdefault(f"{svc.BUCKET}/{rel}", content))
+    monkeypatch.setattr(svc, "download_file", lambda path, tenant=None, use_asset_cache=True: stored.get(path))
+    monkeypatch.setattr(svc, "list_files", lambda folder, tenant=None, search=None: [
+        p.rsplit("/", 1)[1] for p in stored if p.startswith(f"{svc.BUCKET}/{folder}/")
+    ])
+    monkeypatch.setattr(svc, "remove_files", lambda rels, tenant=None: [stored.pop(f"{svc.BUCKET}/{r}") for r in rels])
+    tenant = SimpleNamespace(id=uuid4())
+    doc_id = uuid4()
+
+    pdf_cache.put("sales_invoice", doc_id, "v1", b"%PDF-invoice", tenant)
+    pdf_cache._persist_pool.shutdown(wait=True)
+    pdf_cache._persist_pool = None
+    assert list(stored) == [svc.path_rendered_pdf(tenant.id, "sales_invoice", doc_id, "v1")]
+
+    pdf_cache.clear()  # as after a restart
+    assert pdf_cache.get("sales_invoice", doc_id, "v1", tenant) == b"%PDF-invoice"
+    assert pdf_cache.get("sales_invoice", doc_id, "v1", tenant) == b"%PDF-invoice"
+    assert (pdf_cache.get_metrics()["persisted_hits"], pdf_cache.get_metrics()["hits"]) == (1, 1)
+
+    pdf_cache.put("sales_invoice", doc_id, "v2", b"%PDF-invoice-v2", tenant)
+    pdf_cache._persist_pool.shutdown(wait=True)
+    pdf_cache._persist_pool = None
+    assert list(stored) == [svc.path_rendered_pdf(tenant.id, "sales_invoice", doc_id, "v2")]
+    assert pdf_cache.get_metrics()["persisted_removed"] == 1
+
+
+def test_lines_updated_at_is_latest_item_change():
+    from app.services.rendered_pdf_cache import document_version, lines_updated_at
+
+    ts = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+    lines = [SimpleNamespace(item=SimpleNamespace(updated_at=ts)), SimpleNamespace(item=None)]
+    assert lines_updated_at(lines) == ts and lines_updated_at([]) is None
+    renamed = lines + [SimpleNamespace(item=SimpleNamespace(updated_at=ts.replace(hour=13)))]
+    assert document_version("BATCHED", lines_updated_at(lines)) != document_version("BATCHED", lines_updated_at(renamed))
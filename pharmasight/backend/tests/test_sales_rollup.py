@@ -0,0 +1,146 @@
+"""
+Tests for the daily sales / COGS rollup (SalesRollupService).
+
+choose_cogs is unit-tested. Integration (requires DB with a branch and migration 099): rows added by
+record_invoice / record_credit_note equal a rebuild from the source documents, and a rebuild only
+holds up postings of its own branch. Rolled back.
+
+Run: pytest backend/tests/test_sales_rollup.py -v
+"""
+import sys
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from uuid import uuid4
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+
+
+def test_choose_cogs_prefers_invoice_lines_when_present():
+    from app.services.sales_rollup_service import choose_cogs
+
+    assert choose_cogs(Decimal("90"), Decimal("100")) == (Decimal("100"), "invoice_lines")
+    assert choose_cogs(Decimal("90"), Decimal("0")) == (Decimal("90"), "ledger")
+    assert choose_cogs(Decimal("0"), Decimal("0")) == (Decimal("0"), "invoice_lines")
+
+
+@pytest.fixture(scope="module")
+def branch_db():
+    """(db, company_id, branch_id) from DB; skip when no DB, branch or rollup table."""
+    from sqlalchemy.exc import OperationalError, ProgrammingError
+    from app.database import SessionLocal
+    from app.models import Branch, SalesDailyRollup
+
+    db = SessionLocal()
+    try:
+        try:
+            branch = db.query(Branch).first()
+            db.query(SalesDailyRollup).first()
+        except (OperationalError, ProgrammingError):
+            pytest.skip("Integration: database or sales_daily_rollup (migration 099) not available")
+        if not branch:
+            pytest.skip("Integration: need a branch in DB")
+        yield db, branch.company_id, branch.id
+    finally:
+        db.rollback()
+        db.close()
+
+
+def _rollup_row(db, branch_id, day):
+    from app.services.sales_rollup_service import SalesRollupService
+
+    rows = SalesRollupService.get_days(db, branch_id, day, day)
+    assert len(rows) == 1
+    return {k: Decimal(str(v)) for k, v in rows[0]._mapping.items() if k != "rollup_date"}
+
+
+@pytest.mark.integration
+def test_recorded_rows_equal_rebuild(branch_db):
+    """Two invoices (one in packs) and a credit note recorded at posting time match a rebuild of the day."""
+    from app.models import CreditNote, InventoryLedger, Item, SalesInvoice, SalesInvoiceItem
+    from app.services.sales_rollup_service import SalesRollupService
+
+    db, company_id, branch_id = branch_db
+    day = date(2001, 1, 1)
+    user_id = uuid4()
+    try:
+        item = Item(
+            id=uuid4(), company_id=company_id, name="Rollup test item", base_unit="tablet",
+            retail_unit="tablet", wholesale_unit="packet", pack_size=10,
+        )
+        db.add(item)
+        db.flush()
+        invoices = []
+        for no, (qty, unit, unit_cost, price) in enumerate([(3, "packet", 2, 50), (4, "tablet", 2.5, 6)]):
+            invoice = SalesInvoice(
+                id=uuid4(), company_id=company_id, branch_id=branch_id, invoice_no=f"TEST-ROLLUP-{no}",
+                invoice_date=day, payment_mode="cash", status="BATCHED", created_by=user_id,
+                total_exclusive=qty * price, total_inclusive=qty * price * Decimal("1.16"),
+            )
+            line = SalesInvoiceItem(
+                id=uuid4(), sales_invoice_id=invoice.id, item_id=item.id, unit_name=unit, quantity=qty,
+                unit_price_exclusive=price, line_total_exclusive=qty * price,
+                line_total_inclusive=qty * price * Decimal("1.16"), unit_cost_used=unit_cost,
+            )
+            line.item = item
+            invoice.items = [line]
+            qty_base = qty * (10 if unit == "packet" else 1)
+            entry = InventoryLedger(
+                id=uuid4(), company_id=company_id, branch_id=branch_id, item_id=item.id,
+                transaction_type="SALE", reference_type="sales_invoice", reference_id=invoice.id,
+                quantity_delta=-qty_base, unit_cost=unit_cost, total_cost=unit_cost * qty_base, created_by=user_id,
+            )
+            db.add_all([invoice, entry])
+            db.flush()
+            SalesRollupService.record_invoice(db, invoice, [entry])
+            invoices.append(invoice)
+
+        credit_note = CreditNote(
+            id=uuid4(), company_id=company_id, branch_id=branch_id, credit_note_no="TEST-ROLLUP-CN",
+            original_invoice_id=invoices[0].id, credit_note_date=day, created_by=user_id,
+            total_exclusive=50, total_inclusive=58,
+        )
+        ret = InventoryLedger(
+            id=uuid4(), company_id=company_id, branch_id=branch_id, item_id=item.id,
+            transaction_type="SALE_RETURN", reference_type="credit_note", reference_id=credit_note.id,
+            quantity_delta=10, unit_cost=2, total_cost=20, created_by=user_id,
+        )
+        db.add_all([credit_note, ret])
+        db.flush()
+        SalesRollupService.record_credit_note(db, credit_note, [ret])
+
+        recorded = _rollup_row(db, branch_id, day)
+        assert recorded["invoice_count"] == 2
+        assert recorded["sales_exclusive"] == Decimal("174")
+        assert recorded["invoice_line_cogs"] == Decimal("70")  # 3 x 10 x 2 + 4 x 1 x 2.5
+        assert recorded["ledger_cogs"] == Decimal("70")
+        assert (recorded["credit_note_count"], recorded["return_cogs"]) == (1, Decimal("20"))
+
+        SalesRollupService.rebuild(db, company_id, branch_id, day, day)
+        assert _rollup_row(db, branch_id, day) == recorded
+    finally:
+        db.rollback()
+
+
+@pytest.mark.integration
+def test_rebuild_blocks_postings_of_its_branch_only(branch_db):
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+    from app.database import SessionLocal
+    from app.services.sales_rollup_service import SalesRollupService
+
+    db, company_id, branch_id = branch_db
+    SalesRollupService.rebuild(db, company_id, branch_id, date(2000, 1, 1), date(2000, 1, 1))
+    other = SessionLocal()
+    try:
+        other.execute(text("SET LOCAL lock_timeout = '200ms'"))
+        SalesRollupService._lock_branch(other, company_id, uuid4())
+        with pytest.raises(OperationalError):
+            SalesRollupService._lock_branch(other, company_id, branch_id)
+    finally:
+        other.rollback()
+        other.close()
+        db.rollback()
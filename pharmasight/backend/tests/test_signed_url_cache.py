@@ -0,0 +1,67 @@
+"""
+Tests for the signed URL cache (app.services.signed_url_cache) as used by
+tenant_storage_service.get_signed_url. The storage sign call is monkeypatched; no network.
+
+Run: pytest backend/tests/test_signed_url_cache.py -v
+"""
+import sys
+from pathlib import Path
+from uuid import uuid4
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+
+
+@pytest.fixture
+def signing(monkeypatch):
+    """tenant_storage_service with a counting fake sign call and an empty URL cache."""
+    from app.config import settings
+    from app.services import signed_url_cache, tenant_storage_service as svc
+
+    monkeypatch.setattr(settings, "SIGNED_URL_CACHE_MIN_REMAINING_FRACTION", 0.5)
+    monkeypatch.setattr(settings, "SIGNED_URL_CACHE_MAX_ENTRIES", 2)
+    monkeypatch.setattr(svc, "_build_effective_storage_config", lambda tenant=None: ("https://store.test", "eyJkey"))
+    monkeypatch.setattr(svc, "_ensured_buckets", {("https://store.test", svc.BUCKET)})
+    signed = []
+
+    def sign(*, bucket_name, object_path, expires_in, **kwargs):
+        signed.append((bucket_name, object_path))
+        return f"https://store.test/storage/v1/object/sign/{bucket_name}/{object_path}?token={len(signed)}"
+
+    monkeypatch.setattr(svc, "_create_signed_url_via_rest", sign)
+    monkeypatch.setattr(svc, "_upload_object_via_rest", lambda **kwargs: True)
+    signed_url_cache.clear()
+    yield svc, signed
+    signed_url_cache.clear()
+
+
+def test_fresh_url_is_reused_until_fraction_of_lifetime_left(signing, monkeypatch):
+    from app.config import settings
+
+    svc, signed = signing
+    first = svc.get_signed_url("company-assets/c1/logo.png")
+    assert svc.get_signed_url("company-assets/c1/logo.png") == first
+    assert svc.get_signed_url("company-assets/c1/logo.png", expires_in=60) != first  # other lifetime, own entry
+    assert len(signed) == 2
+
+    monkeypatch.setattr(settings, "SIGNED_URL_CACHE_MIN_REMAINING_FRACTION", 1.0)  # any age is too old
+    assert svc.get_signed_url("company-assets/c1/logo.png") != first
+    assert len(signed) == 3
+
+
+def test_upload_invalidates_and_size_is_bounded(signing):
+    from app.services import signed_url_cache
+
+    svc, signed = signing
+    tenant_id = uuid4()
+    path = f"tenant-assets/{tenant_id}/stamp.png"
+    before = svc.get_signed_url(path)
+    assert svc.upload_stamp(tenant_id, b"\x89PNG", "image/png") == path
+    assert svc.get_signed_url(path) != before
+
+    for n in range(3):
+        svc.get_signed_url(f"user-assets/u{n}/signature.png")
+    metrics = signed_url_cache.get_metrics()
+    assert metrics["entries"] == 2 and metrics["evictions"] >= 1
@@ -0,0 +1,95 @@
+"""
+Tests for the transaction-scoped snapshot refresh collector (SnapshotRefreshService.defer_item_refresh).
+
+Repeated schedule_snapshot_refresh calls for the same (company, branch, item) inside one
+transaction must collapse into one set-based refresh per branch, run before commit.
+refresh_pos_snapshot_bulk is replaced with a recorder, so no database is needed.
+
+Run: pytest backend/tests/test_snapshot_refresh_collector.py -v
+"""
+import sys
+from pathlib import Path
+from uuid import uuid4
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+from sqlalchemy.orm import Session
+
+
+@pytest.fixture
+def bulk_calls(monkeypatch):
+    """Record refresh_pos_snapshot_bulk calls as (company_id, branch_id, item_ids)."""
+    import app.services.snapshot_refresh_service as srs
+
+    calls = []
+
+    def _record(db, company_id, branch_id, item_ids=None):
+        calls.append((company_id, branch_id, list(item_ids)))
+        return len(item_ids)
+
+    monkeypatch.setattr(srs, "refresh_pos_snapshot_bulk", _record)
+    return calls
+
+
+def test_duplicate_keys_refresh_once_per_branch_at_commit(bulk_calls):
+    """FEFO-split lines (same item, several ledger rows) refresh each item once, at commit."""
+    from app.services.snapshot_refresh_service import SnapshotRefreshService
+
+    company_id, branch_a, branch_b = uuid4(), uuid4(), uuid4()
+    item_1, item_2 = uuid4(), uuid4()
+    db = Session()
+    for item_id in (item_1, item_1, item_1, item_2):
+        SnapshotRefreshService.schedule_snapshot_refresh(db, company_id, branch_a, item_id=item_id)
+    SnapshotRefreshService.schedule_snapshot_refresh(db, company_id, branch_b, item_ids=[item_1])
+
+    assert bulk_calls == []
+    db.commit()
+
+    assert len(bulk_calls) == 2
+    by_branch = {branch: sorted(items) for _, branch, items in bulk_calls}
+    assert by_branch[branch_a] == sorted([str(item_1), str(item_2)])
+    assert by_branch[branch_b] == [str(item_1)]
+    db.close()
+
+
+def test_rollback_discards_collected_keys(bulk_calls):
+    """Nothing collected in a rolled-back transaction is refreshed by the next commit."""
+    from app.services.snapshot_refresh_service import SnapshotRefreshService
+
+    db = Session()
+    SnapshotRefreshService.schedule_snapshot_refresh(db, uuid4(), uuid4(), item_id=uuid4())
+    db.rollback()
+    db.commit()
+
+    assert bulk_calls == []
+    db.close()
+
+
+def test_explicit_flush_runs_collected_refreshes_once(bulk_calls):
+    """flush_deferred_refreshes runs the pending set now; commit then has nothing left to do."""
+    from app.services.snapshot_refresh_service import SnapshotRefreshService
+
+    db = Session()
+    SnapshotRefreshService.defer_item_refresh(db, uuid4(), uuid4(), uuid4())
+    assert SnapshotRefreshService.flush_deferred_refreshes(db) == 1
+    db.commit()
+
+    assert len(bulk_calls) == 1
+    db.close()
+
+
+def test_pending_orm_rows_are_flushed_before_refresh(bulk_calls):
+    """The refresh reads with raw SQL: the session is flushed first so pending ledger rows are seen."""
+    from app.services.snapshot_refresh_service import SnapshotRefreshService
+
+    events = []
+    db = Session()
+    db.flush = lambda *args, **kwargs: events.append(("flush", len(bulk_calls)))
+    SnapshotRefreshService.defer_item_refresh(db, uuid4(), uuid4(), uuid4())
+    SnapshotRefreshService.flush_deferred_refreshes(db)
+
+    assert events == [("flush", 0)]
+    assert len(bulk_calls) == 1
+    db.close()
@@ -0,0 +1,148 @@
+"""
+Tests for the snapshot refresh queue worker (app.services.snapshot_refresh_service).
+
+Integration (requires DB with a branch whose company has active items and migration 094): claims
+are exclusive across sessions, branch-wide jobs page items by keyset and a job resumes after its
+stored cursor. The worker commits, so the test queue row is deleted afterwards; the snapshot
+refresh itself is recorded instead of run.
+
+Run: pytest backend/tests/test_snapshot_refresh_queue.py -v
+"""
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+
+
+@pytest.fixture
+def branch_job():
+    """(db, queue_id, branch, active item ids in id order) for a pending branch-wide job; skip when no DB."""
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError, ProgrammingError
+    from app.database import SessionLocal
+    from app.models import Branch
+
+    db = SessionLocal()
+    queue_id = None
+    try:
+        try:
+            branch = db.query(Branch).first()
+            db.execute(text("SELECT last_item_id, items_refreshed FROM snapshot_refresh_queue LIMIT 1"))
+        except (OperationalError, ProgrammingError):
+            pytest.skip("Integration: database or snapshot_refresh_queue progress columns (migration 094) not available")
+        if not branch:
+            pytest.skip("Integration: need a branch in DB")
+        item_ids = [
+            iid for (iid,) in db.execute(
+                text("SELECT id FROM items WHERE company_id = :c AND is_active = true ORDER BY id"),
+                {"c": str(branch.company_id)},
+            )
+        ]
+        if len(item_ids) < 5:
+            pytest.skip("Integration: need at least 5 active items in the branch's company")
+        # Oldest job in the queue, so claim_next_job picks it first
+        queue_id = db.execute(
+            text("""
+                INSERT INTO snapshot_refresh_queue (company_id, branch_id, item_id, created_at, reason)
+                VALUES (:c, :b, NULL, TIMESTAMPTZ '2000-01-01', 'test_snapshot_refresh_queue')
+                RETURNING id
+            """),
+            {"c": str(branch.company_id), "b": str(branch.id)},
+        ).scalar()
+        db.commit()
+        yield db, queue_id, branch, item_ids
+    finally:
+        db.rollback()
+        if queue_id is not None:
+            db.execute(text("DELETE FROM snapshot_refresh_queue WHERE id = :id"), {"id": str(queue_id)})
+            db.commit()
+        db.close()
+
+
+@pytest.fixture
+def refreshed_chunks(monkeypatch):
+    """Record the item id chunks passed to refresh_items_bulk instead of refreshing snapshots."""
+    from app.services.snapshot_refresh_service import SnapshotRefreshService
+
+    chunks = []
+    monkeypatch.setattr(
+        SnapshotRefreshService, "refresh_items_bulk",
+        staticmethod(lambda db, company_id, branch_id, item_ids: chunks.append(list(item_ids))),
+    )
+    return chunks
+
+
+def _queue_row(db, queue_id):
+    from sqlalchemy import text
+
+    db.rollback()
+    return db.execute(
+        text("SELECT claimed_at, processed_at, last_item_id, items_refreshed FROM snapshot_refresh_queue WHERE id = :id"),
+        {"id": str(queue_id)},
+    ).first()
+
+
+@pytest.mark.integration
+def test_claim_is_exclusive_across_sessions(branch_job):
+    from app.database import SessionLocal
+    from app.services.snapshot_refresh_service import SnapshotRefreshService
+
+    db, queue_id, _, _ = branch_job
+    row = SnapshotRefreshService.claim_next_job(db, branch_wide_only=True)
+    assert row is not None and row[0] == queue_id
+    assert _queue_row(db, queue_id).claimed_at is not None
+
+    other = SessionLocal()
+    try:
+        again = SnapshotRefreshService.claim_next_job(other, branch_wide_only=True)
+        assert again is None or again[0] != queue_id
+    finally:
+        other.rollback()
+        other.close()
+
+
+@pytest.mark.integration
+def test_branch_job_pages_by_keyset_and_stores_cursor(branch_job, refreshed_chunks):
+    from app.services.snapshot_refresh_service import SnapshotRefreshService
+
+    db, queue_id, branch, item_ids = branch_job
+    row = SnapshotRefreshService.claim_next_job(db, branch_wide_only=True)
+    assert SnapshotRefreshService.process_claimed_job(db, row, branch_wide_chunk_size=2)
+
+    assert [iid for chunk in refreshed_chunks for iid in chunk] == item_ids
+    assert all(len(chunk) <= 2 for chunk in refreshed_chunks)
+    stored = _queue_row(db, queue_id)
+    assert stored.processed_at is not None
+    assert (stored.last_item_id, stored.items_refreshed) == (item_ids[-1], len(item_ids))
+
+
+@pytest.mark.integration
+def test_abandoned_branch_job_resumes_after_last_committed_chunk(branch_job, refreshed_chunks):
+    """A job taken over from a dead worker continues after its cursor instead of starting over."""
+    from sqlalchemy import text
+    from app.services.snapshot_refresh_service import SnapshotRefreshService
+
+    db, queue_id, branch, item_ids = branch_job
+    db.execute(
+        text("""
+            UPDATE snapshot_refresh_queue
+            SET claimed_at = NOW() - INTERVAL '2 hours', last_item_id = :cursor, items_refreshed = 3
+            WHERE id = :id
+        """),
+        {"cursor": str(item_ids[2]), "id": str(queue_id)},
+    )
+    db.commit()
+    events = []
+
+    row = SnapshotRefreshService.claim_next_job(db, branch_wide_only=True)
+    assert row is not None and row[0] == queue_id
+    assert SnapshotRefreshService.process_claimed_job(
+        db, row, branch_wide_chunk_size=2, progress_callback=lambda event, **kw: events.append((event, kw)),
+    )
+
+    assert [iid for chunk in refreshed_chunks for iid in chunk] == item_ids[3:]
+    assert ("branch_total", {"total_items": len(item_ids), "resumed_from": 3}) in events
+    assert _queue_row(db, queue_id).items_refreshed == len(item_ids)
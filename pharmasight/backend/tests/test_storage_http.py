@@ -0,0 +1,118 @@
+"""
+Tests for pooled storage REST clients (app.services.storage_http) as used by tenant_storage_service.
+A local HTTP/1.1 keep-alive stub stands in for Supabase Storage; it records client connections.
+
+Run: pytest backend/tests/test_storage_http.py -v
+"""
+import asyncio
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from uuid import uuid4
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+
+
+class _StubStorage(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body, content_type="application/octet-stream"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        state = self.server.state
+        state["connections"].add(self.client_address)
+        if self.path == "/storage/v1/bucket":
+            self._reply(200, json.dumps([{"name": "company-assets"}, {"name": "tenant-assets"}]).encode(), "application/json")
+        elif state["fail_next"] > 0:
+            state["fail_next"] -= 1
+            self._reply(503, b"unavailable")
+        else:
+            self._reply(200, f"bytes:{self.path.rsplit('/', 1)[-1]}".encode())
+
+    def do_POST(self):
+        self.server.state["connections"].add(self.client_address)
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self._reply(200, b'{"Key": "ok"}', "application/json")
+
+
+@pytest.fixture
+def stub_storage(monkeypatch):
+    """tenant_storage_service pointed at a local stub server; fresh clients, metrics and caches."""
+    from app.config import settings
+    from app.services import branding_asset_cache, storage_http, tenant_storage_service as svc
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubStorage)
+    server.state = {"connections": set(), "fail_next": 0}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setattr(settings, "STORAGE_HTTP_BACKOFF_SECONDS", 0.0)
+    monkeypatch.setattr(settings, "STORAGE_HTTP_RETRIES", 2)
+    monkeypatch.setattr(svc, "_build_effective_storage_config", lambda tenant=None: (base_url, "eyJkey"))
+    monkeypatch.setattr(svc, "_ensured_buckets", set())
+    storage_http.close_all()
+    branding_asset_cache.clear()
+    yield svc, server.state
+    storage_http.close_all()
+    branding_asset_cache.clear()
+    server.shutdown()
+    server.server_close()
+
+
+def test_consecutive_calls_reuse_one_connection(stub_storage):
+    from app.services import storage_http
+
+    svc, state = stub_storage
+    for n in range(5):
+        assert svc.download_file(f"company-assets/c{n}/logo.png") == b"bytes:logo.png"
+    assert len(state["connections"]) == 1  # bucket list + 5 downloads on one keep-alive connection
+    metrics = storage_http.get_metrics()
+    assert metrics["operations"]["download"]["requests"] == 5
+    assert metrics["operations"]["list_buckets"]["requests"] == 1
+    assert len(metrics["clients"]) == 1
+
+
+def test_transient_status_is_retried(stub_storage):
+    from app.services import storage_http
+
+    svc, state = stub_storage
+    state["fail_next"] = 2
+    assert svc.download_file("company-assets/c1/stamp.png") == b"bytes:stamp.png"
+    download = storage_http.get_metrics()["operations"]["download"]
+    assert (download["requests"], download["retries"], download["errors"]) == (1, 2, 0)
+
+    state["fail_next"] = 3  # more failures than retries: the 503 is returned to the caller
+    assert svc.download_file("company-assets/c2/stamp.png") is None
+    assert storage_http.get_metrics()["operations"]["download"]["errors"] == 1
+
+
+def test_async_upload_uses_shared_async_client(stub_storage):
+    from app.services import storage_http
+
+    svc, state = stub_storage
+    tenant_id = uuid4()
+
+    async def upload_twice():
+        first = await svc.upload_stamp_async(tenant_id, b"\x89PNG", "image/png")
+        second = await svc.upload_logo_async(tenant_id, b"\x89PNG", "image/png")
+        metrics = storage_http.get_metrics()
+        await storage_http.aclose_all()
+        return first, second, metrics
+
+    first, second, metrics = asyncio.run(upload_twice())
+    assert (first, second) == (f"tenant-assets/{tenant_id}/stamp.png", f"tenant-assets/{tenant_id}/logo.png")
+    assert metrics["async_clients"] == 1 and metrics["operations"]["upload"]["requests"] == 2
+    # sync bucket check + two async uploads: one connection per client
+    assert len(state["connections"]) == 2
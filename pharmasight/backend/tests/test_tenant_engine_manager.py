@@ -0,0 +1,134 @@
+"""
+Tests for the tenant engine manager (app.services.tenant_engine_manager).
+
+Engines point at SQLite files in tmp_path, so no tenant database is needed.
+
+Run: pytest backend/tests/test_tenant_engine_manager.py -v
+"""
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+from sqlalchemy import text
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    from app.config import settings
+    from app.services import tenant_engine_manager
+
+    monkeypatch.setattr(settings, "TENANT_DB_POOL_SIZE", 2)
+    monkeypatch.setattr(settings, "TENANT_DB_MAX_OVERFLOW", 1)
+    monkeypatch.setattr(settings, "TENANT_DB_POOL_TIMEOUT_SECONDS", 0.2)
+    monkeypatch.setattr(settings, "TENANT_DB_GLOBAL_MAX_CONNECTIONS", 6)
+    monkeypatch.setattr(settings, "TENANT_ENGINE_IDLE_SECONDS", 600)
+    tenant_engine_manager.dispose_all()
+    yield tenant_engine_manager
+    tenant_engine_manager.dispose_all()
+
+
+def _url(tmp_path, name):
+    return f"sqlite:///{tmp_path / name}.db"
+
+
+def test_same_url_reuses_engine_and_counts_checkouts(manager, tmp_path):
+    factory = manager.session_factory(_url(tmp_path, "a"), {})
+    assert manager.session_factory(_url(tmp_path, "a"), {}) is factory
+    db = factory()
+    assert not manager.has_connected(db.get_bind())
+    db.execute(text("SELECT 1"))
+    db.close()
+    assert manager.has_connected(factory.kw["bind"])
+    engine = manager.get_metrics()["engines"][0]
+    assert engine["checkouts"] == 1
+    assert engine["connects"] == 1
+    assert engine["checked_out"] == 0
+
+
+def test_budget_evicts_least_recently_used_idle_engine(manager, tmp_path):
+    a = manager.session_factory(_url(tmp_path, "a"), {})
+    manager.session_factory(_url(tmp_path, "b"), {})
+    manager.session_factory(_url(tmp_path, "a"), {})  # a is now most recently used
+    held = a()
+    held.execute(text("SELECT 1"))  # a has a connection checked out
+
+    manager.session_factory(_url(tmp_path, "c"), {})
+    metrics = manager.get_metrics()
+    assert [e["database"].rsplit("/", 1)[-1] for e in metrics["engines"]] == ["c.db", "a.db"]
+    assert metrics["evicted_lru"] == 1
+    assert metrics["reserved_connections"] <= 6
+    held.close()
+
+
+def test_busy_engines_shrink_new_engine_to_remaining_budget(manager, tmp_path, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "TENANT_DB_GLOBAL_MAX_CONNECTIONS", 4)
+    held = manager.session_factory(_url(tmp_path, "a"), {})()
+    held.execute(text("SELECT 1"))
+    manager.session_factory(_url(tmp_path, "b"), {})
+    metrics = manager.get_metrics()
+    assert metrics["over_budget"] == 1
+    assert metrics["reserved_connections"] == 4
+    assert (metrics["engines"][0]["pool_size"], metrics["engines"][0]["max_overflow"]) == (1, 0)
+    held.close()
+
+
+def test_wait_and_timeout_are_recorded(manager, tmp_path):
+    from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+    factory = manager.session_factory(_url(tmp_path, "a"), {})
+    sessions = [factory() for _ in range(3)]
+    for s in sessions:
+        s.execute(text("SELECT 1"))  # pool_size 2 + overflow 1: pool now exhausted
+    blocked = factory()
+    with pytest.raises(PoolTimeout):
+        blocked.execute(text("SELECT 1"))
+    blocked.close()
+    for s in sessions:
+        s.close()
+    engine = manager.get_metrics()["engines"][0]
+    assert engine["overflow_checkouts"] == 1
+    assert engine["peak_checked_out"] == 3
+    assert (engine["waits"], engine["timeouts"]) == (1, 1)
+
+
+def test_idle_engines_are_disposed(manager, tmp_path, monkeypatch):
+    from app.config import settings
+
+    manager.session_factory(_url(tmp_path, "a"), {})
+    monkeypatch.setattr(settings, "TENANT_ENGINE_IDLE_SECONDS", -1)
+    monkeypatch.setattr(manager, "_last_sweep", 0.0)
+    monkeypatch.setattr(manager, "_SWEEP_INTERVAL_SECONDS", -1)
+    manager.session_factory(_url(tmp_path, "b"), {})
+    metrics = manager.get_metrics()
+    assert metrics["evicted_idle"] == 1
+    assert len(metrics["engines"]) == 1
+
+
+def test_evicted_engine_still_in_use_counts_against_budget(manager, tmp_path):
+    """A factory handed out before eviction keeps working; its connections stay in the budget until drained."""
+    import gc
+
+    evicted = manager.get_metrics()["evicted_lru"]
+    a = manager.session_factory(_url(tmp_path, "a"), {})
+    manager.session_factory(_url(tmp_path, "b"), {})
+    manager.session_factory(_url(tmp_path, "c"), {})  # budget 6 = two engines: a is evicted
+    assert manager.get_metrics()["evicted_lru"] == evicted + 1
+
+    late = a()  # e.g. a background job that resolved its factory before the eviction
+    late.execute(text("SELECT 1"))
+    metrics = manager.get_metrics()
+    assert (metrics["retired_engines"], metrics["retired_connections"]) == (1, 1)
+    assert metrics["reserved_connections"] == 7
+    late.close()
+
+    with manager._lock:
+        manager._evict_idle(0.0)  # sweep closes the returned connection
+    assert manager.get_metrics()["retired_connections"] == 0
+    del a, late
+    gc.collect()
+    assert manager.get_metrics()["retired_engines"] == 0
@@ -0,0 +1,96 @@
+"""
+Tests for the parallel tenant migration orchestrator (app.services.tenant_migration_orchestrator).
+
+run_migrations_for_url is replaced with a recorder, so no database is needed.
+
+Run: pytest backend/tests/test_tenant_migration_orchestrator.py -v
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from uuid import uuid4
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+
+
+def _tenant(url):
+    return SimpleNamespace(id=uuid4(), name=url, subdomain=url, database_url=url)
+
+
+@pytest.fixture
+def fake_migrate(monkeypatch):
+    """Replace run_migrations_for_url; records peak concurrency and per-URL call counts."""
+    import app.services.migration_service as ms
+
+    state = {"active": 0, "peak": 0, "calls": {}, "lock": threading.Lock(), "block": {}}
+
+    def _run(url, timeout_seconds=None):
+        with state["lock"]:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            state["calls"][url] = state["calls"].get(url, 0) + 1
+        try:
+            gate = state["block"].get(url)
+            if gate is not None:
+                gate.wait(5)
+            time.sleep(0.02)
+            if url.startswith("slow"):
+                raise TimeoutError(f"Migrations exceeded {timeout_seconds:g}s before 095_x")
+            if url.startswith("bad"):
+                raise RuntimeError("Migration 095_x failed: boom")
+            return ["095_x"]
+        finally:
+            with state["lock"]:
+                state["active"] -= 1
+
+    monkeypatch.setattr(ms, "run_migrations_for_url", _run)
+    return state
+
+
+def test_run_all_is_bounded_and_reports_outcomes(fake_migrate):
+    """At most max_workers DBs migrate at once; failures and timeouts are reported per tenant."""
+    from app.services import tenant_migration_orchestrator as orch
+
+    tenants = [_tenant(f"ok{i}") for i in range(8)] + [_tenant("slow"), _tenant("bad")]
+    out = orch.run_all(tenants, max_workers=3, timeout_seconds=1)
+
+    assert fake_migrate["peak"] <= 3
+    assert len(out["applied"]) == 8
+    assert set(out["errors"]) == {str(tenants[8].id), str(tenants[9].id)}
+    progress = orch.get_progress()
+    assert progress["complete"] is True
+    assert progress["counts"] == {"pending": 0, "running": 0, "done": 8, "failed": 1, "timeout": 1}
+
+
+def test_tenants_sharing_a_database_migrate_it_once(fake_migrate):
+    """Two tenants on one database_url: one migration run, both tenants marked done."""
+    from app.services import tenant_migration_orchestrator as orch
+
+    shared_a, shared_b = _tenant("shared"), _tenant("shared")
+    out = orch.run_all([shared_a, shared_b], max_workers=4)
+
+    assert fake_migrate["calls"] == {"shared": 1}
+    assert list(out["applied"].values()) == [["095_x"]]
+    assert orch.get_progress()["counts"]["done"] == 2
+
+
+def test_background_mode_gates_until_tenant_db_is_migrated(fake_migrate):
+    """wait_until_migrated holds a tenant until its DB is done; other and unknown DBs pass."""
+    from app.services import tenant_migration_orchestrator as orch
+
+    release = threading.Event()
+    fake_migrate["block"]["held"] = release
+    thread = orch.start_background([_tenant("held"), _tenant("free")], max_workers=2)
+
+    assert orch.wait_until_migrated("free", timeout=2) is True
+    assert orch.wait_until_migrated("held", timeout=0.05) is False
+    assert orch.wait_until_migrated("not-in-run", timeout=0) is True
+    release.set()
+    assert orch.wait_until_migrated("held", timeout=2) is True
+    thread.join(2)
+    assert orch.get_progress()["mode"] == "background"
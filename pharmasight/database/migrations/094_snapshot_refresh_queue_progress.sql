@@ -0,0 +1,18 @@
+-- =====================================================
+-- 094: snapshot_refresh_queue — resumable progress for branch-wide jobs
+-- last_item_id: keyset cursor (items.id) of the last committed chunk; a restarted worker
+--   resumes after it instead of starting the branch again.
+-- items_refreshed: items refreshed so far (progress reporting across restarts).
+-- Rollback: ALTER TABLE snapshot_refresh_queue DROP COLUMN IF EXISTS last_item_id, DROP COLUMN IF EXISTS items_refreshed;
+-- =====================================================
+
+ALTER TABLE snapshot_refresh_queue
+    ADD COLUMN IF NOT EXISTS last_item_id UUID,
+    ADD COLUMN IF NOT EXISTS items_refreshed INTEGER NOT NULL DEFAULT 0;
+
+-- Keyset paging over a company's active items (ORDER BY id, WHERE id > cursor)
+CREATE INDEX IF NOT EXISTS idx_items_company_active_id
+    ON items(company_id, id) WHERE is_active = true;
+
+COMMENT ON COLUMN snapshot_refresh_queue.last_item_id IS 'Keyset cursor: last items.id committed by a branch-wide job; restart resumes after it.';
+COMMENT ON COLUMN snapshot_refresh_queue.items_refreshed IS 'Items refreshed so far for a branch-wide job (progress across restarts).';
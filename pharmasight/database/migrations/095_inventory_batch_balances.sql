@@ -0,0 +1,60 @@
+-- =====================================================
+-- 095: inventory_batch_balances — precomputed stock per batch
+-- Running SUM(quantity_delta) per (item_id, branch_id, batch_number, expiry_date, unit_cost),
+-- the grouping FEFO allocation uses. Updated by SnapshotService in the same transaction as
+-- every ledger write, so allocation, next-expiry lookup and batch listings no longer
+-- aggregate the full ledger history.
+-- first_ledger_entry_id: first receipt (positive) ledger row of the batch (sales line batch_id).
+-- Verify / rebuild: python -m scripts.check_batch_balances [--rebuild]
+-- Rollback: DROP TABLE IF EXISTS inventory_batch_balances;
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS inventory_batch_balances (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    company_id UUID NOT NULL REFERENCES companies(id) ON DELETE CASCADE,
+    branch_id UUID NOT NULL REFERENCES branches(id) ON DELETE CASCADE,
+    item_id UUID NOT NULL REFERENCES items(id) ON DELETE CASCADE,
+    batch_number VARCHAR(200),
+    expiry_date DATE,
+    unit_cost NUMERIC(20, 4) NOT NULL,
+    quantity NUMERIC(20, 4) NOT NULL DEFAULT 0,
+    first_ledger_entry_id UUID,
+    first_received_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Batch key; NULL batch_number / expiry_date are one batch each (same as ledger GROUP BY)
+CREATE UNIQUE INDEX IF NOT EXISTS ux_inventory_batch_balances_key ON inventory_batch_balances (
+    item_id, branch_id, (COALESCE(batch_number, '')), (COALESCE(expiry_date, 'infinity'::date)), unit_cost
+);
+
+-- FEFO reads: open batches for (item, branch) in expiry order
+CREATE INDEX IF NOT EXISTS idx_inventory_batch_balances_open
+    ON inventory_batch_balances(item_id, branch_id, expiry_date)
+    WHERE quantity > 0;
+CREATE INDEX IF NOT EXISTS idx_inventory_batch_balances_branch ON inventory_batch_balances(branch_id);
+
+COMMENT ON TABLE inventory_batch_balances IS 'Precomputed stock per (item_id, branch_id, batch_number, expiry_date, unit_cost). Updated in same transaction as ledger writes.';
+COMMENT ON COLUMN inventory_batch_balances.quantity IS 'SUM(inventory_ledger.quantity_delta) for the batch key, base units. May be negative when a batch was oversold.';
+COMMENT ON COLUMN inventory_batch_balances.first_ledger_entry_id IS 'First positive ledger row of the batch (used as sales line batch_id).';
+
+-- Backfill from ledger
+INSERT INTO inventory_batch_balances (
+    company_id, branch_id, item_id, batch_number, expiry_date, unit_cost,
+    quantity, first_ledger_entry_id, first_received_at, updated_at
+)
+SELECT
+    (ARRAY_AGG(company_id))[1],
+    branch_id,
+    item_id,
+    batch_number,
+    expiry_date,
+    unit_cost,
+    SUM(quantity_delta),
+    (ARRAY_AGG(id ORDER BY created_at, id) FILTER (WHERE quantity_delta > 0))[1],
+    MIN(created_at),
+    NOW()
+FROM inventory_ledger
+GROUP BY item_id, branch_id, batch_number, expiry_date, unit_cost
+ON CONFLICT (item_id, branch_id, (COALESCE(batch_number, '')), (COALESCE(expiry_date, 'infinity'::date)), unit_cost)
+DO NOTHING;
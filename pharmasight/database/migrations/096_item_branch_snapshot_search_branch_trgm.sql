@@ -0,0 +1,17 @@
+-- =====================================================
+-- 096: Branch-scoped trigram index for ranked POS item search
+-- idx_item_branch_snapshot_search_text_gin (046/049) indexes search_text for all branches, so a
+-- common term returns matches from every branch before the branch filter applies. This index
+-- keys trigrams by branch_id (btree_gin), serving ILIKE '%q%' and the fuzzy word-similarity
+-- operator (search_text %> q) for one branch only. Used by ItemSearchService (ITEM_SEARCH_MODE=ranked).
+-- Rollback: DROP INDEX IF EXISTS idx_item_branch_snapshot_branch_search_trgm;
+-- =====================================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS btree_gin;
+
+CREATE INDEX IF NOT EXISTS idx_item_branch_snapshot_branch_search_trgm
+    ON item_branch_snapshot USING gin (branch_id, search_text gin_trgm_ops);
+
+COMMENT ON INDEX idx_item_branch_snapshot_branch_search_trgm IS
+    'Item search: substring and fuzzy (pg_trgm) match on search_text within one branch';
@@ -0,0 +1,21 @@
+-- =====================================================
+-- 097: item_branch_snapshot_versions — per-branch change counter for the search cache
+-- version is bumped (at commit, once per transaction and branch) whenever item_branch_snapshot
+-- rows of the branch are written through pos_snapshot_service. The in-process item search cache
+-- (ITEM_SEARCH_CACHE_ENABLED) compares it to decide whether its copy is current and patches
+-- changed rows by updated_at.
+-- Rollback: DROP TABLE IF EXISTS item_branch_snapshot_versions; DROP INDEX IF EXISTS idx_item_branch_snapshot_branch_updated;
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS item_branch_snapshot_versions (
+    branch_id UUID PRIMARY KEY REFERENCES branches(id) ON DELETE CASCADE,
+    company_id UUID NOT NULL REFERENCES companies(id) ON DELETE CASCADE,
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+COMMENT ON TABLE item_branch_snapshot_versions IS 'Change counter per branch for item_branch_snapshot; read by the in-process item search cache.';
+
+-- Search cache delta reads: rows of a branch changed since a point in time
+CREATE INDEX IF NOT EXISTS idx_item_branch_snapshot_branch_updated
+    ON item_branch_snapshot(branch_id, updated_at);
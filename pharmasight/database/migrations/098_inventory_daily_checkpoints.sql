@@ -0,0 +1,36 @@
+-- =====================================================
+-- 098: inventory_daily_checkpoints — closing stock per (item, branch, day) for point-in-time valuation
+-- One row per day (UTC) on which the item moved in the branch: cumulative SUM(quantity_delta) and
+-- SUM(total_cost) of inventory_ledger up to the end of that day. inventory_checkpoint_progress.built_through
+-- is the last day whose checkpoints are complete for the branch; valuation "as of D" reads each item's
+-- latest checkpoint on or before LEAST(D, built_through) plus only the ledger rows after it.
+-- Built incrementally by: python -m scripts.build_inventory_checkpoints (nightly). Backdated ledger
+-- rows move built_through back; rewritten ledger rows rebuild the affected items (SnapshotService).
+-- Rollback: DROP TABLE IF EXISTS inventory_daily_checkpoints; DROP TABLE IF EXISTS inventory_checkpoint_progress;
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS inventory_daily_checkpoints (
+    item_id UUID NOT NULL REFERENCES items(id) ON DELETE CASCADE,
+    branch_id UUID NOT NULL REFERENCES branches(id) ON DELETE CASCADE,
+    checkpoint_date DATE NOT NULL,
+    company_id UUID NOT NULL REFERENCES companies(id) ON DELETE CASCADE,
+    quantity NUMERIC(20, 4) NOT NULL,
+    layer_value NUMERIC(20, 4) NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (item_id, branch_id, checkpoint_date)
+);
+
+CREATE INDEX IF NOT EXISTS idx_inventory_daily_checkpoints_branch_date
+    ON inventory_daily_checkpoints(branch_id, checkpoint_date);
+
+COMMENT ON TABLE inventory_daily_checkpoints IS 'Closing stock per (item, branch, day with movements): cumulative ledger quantity and value at end of day (UTC).';
+COMMENT ON COLUMN inventory_daily_checkpoints.layer_value IS 'Cumulative SUM(inventory_ledger.total_cost) up to the end of checkpoint_date.';
+
+CREATE TABLE IF NOT EXISTS inventory_checkpoint_progress (
+    branch_id UUID PRIMARY KEY REFERENCES branches(id) ON DELETE CASCADE,
+    company_id UUID NOT NULL REFERENCES companies(id) ON DELETE CASCADE,
+    built_through DATE NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+COMMENT ON TABLE inventory_checkpoint_progress IS 'Last day (UTC) whose inventory_daily_checkpoints are complete, per branch.';
@@ -0,0 +1,32 @@
+-- =====================================================
+-- 099: sales_daily_rollup — sales, credit notes and COGS per (branch, business day) for gross profit
+-- Invoices (BATCHED/PAID) count on invoice_date, credit notes on credit_note_date. Rows are added to in
+-- the transaction that posts the document (batch invoice, quotation conversion, credit note), so the
+-- gross-profit report reads these rows only. ledger_cogs = SALE ledger total_cost of the day's invoices;
+-- invoice_line_cogs = quantity x unit multiplier x unit_cost_used; return_cogs = SALE_RETURN ledger
+-- total_cost of the day's credit notes.
+-- After applying, fill history once: python -m scripts.backfill_sales_rollup
+-- Rollback: DROP TABLE IF EXISTS sales_daily_rollup;
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS sales_daily_rollup (
+    branch_id UUID NOT NULL REFERENCES branches(id) ON DELETE CASCADE,
+    rollup_date DATE NOT NULL,
+    company_id UUID NOT NULL REFERENCES companies(id) ON DELETE CASCADE,
+    sales_exclusive NUMERIC(20, 4) NOT NULL DEFAULT 0,
+    sales_inclusive NUMERIC(20, 4) NOT NULL DEFAULT 0,
+    invoice_count INTEGER NOT NULL DEFAULT 0,
+    ledger_cogs NUMERIC(20, 4) NOT NULL DEFAULT 0,
+    invoice_line_cogs NUMERIC(20, 4) NOT NULL DEFAULT 0,
+    credit_notes_exclusive NUMERIC(20, 4) NOT NULL DEFAULT 0,
+    credit_notes_inclusive NUMERIC(20, 4) NOT NULL DEFAULT 0,
+    credit_note_count INTEGER NOT NULL DEFAULT 0,
+    return_cogs NUMERIC(20, 4) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (branch_id, rollup_date)
+);
+
+COMMENT ON TABLE sales_daily_rollup IS 'Sales, credit notes and COGS per branch and business day; maintained on batch / credit note, rebuilt by scripts/backfill_sales_rollup.py.';
+COMMENT ON COLUMN sales_daily_rollup.ledger_cogs IS 'SUM(inventory_ledger.total_cost) of SALE rows of invoices dated rollup_date.';
+COMMENT ON COLUMN sales_daily_rollup.invoice_line_cogs IS 'SUM(quantity x multiplier to retail x unit_cost_used) of lines of invoices dated rollup_date.';
+COMMENT ON COLUMN sales_daily_rollup.return_cogs IS 'SUM(inventory_ledger.total_cost) of SALE_RETURN rows of credit notes dated rollup_date.';
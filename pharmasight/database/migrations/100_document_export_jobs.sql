@@ -0,0 +1,32 @@
+-- =====================================================
+-- 100: document_export_jobs — bulk PDF export of finalized documents (sales invoices, GRNs,
+-- supplier invoices) as one ZIP or merged PDF. Rendered in the background by
+-- app.services.document_export_service; progress is polled like import_jobs.
+-- Rollback: DROP TABLE IF EXISTS document_export_jobs;
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS document_export_jobs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    company_id UUID NOT NULL REFERENCES companies(id) ON DELETE CASCADE,
+    branch_id UUID NOT NULL REFERENCES branches(id) ON DELETE CASCADE,
+    user_id UUID NOT NULL REFERENCES users(id),
+    doc_type VARCHAR(30) NOT NULL,
+    output_format VARCHAR(10) NOT NULL DEFAULT 'zip',
+    filters JSONB,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    total_docs INTEGER NOT NULL DEFAULT 0,
+    processed_docs INTEGER NOT NULL DEFAULT 0,
+    output_path TEXT,
+    output_bytes BIGINT,
+    error_message VARCHAR(1000),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    completed_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_document_export_jobs_company_created
+    ON document_export_jobs (company_id, created_at DESC);
+
+COMMENT ON TABLE document_export_jobs IS 'Bulk document PDF exports (ZIP or merged PDF); status pending/processing/completed/failed/cancelled.';
+COMMENT ON COLUMN document_export_jobs.output_path IS 'File on the app host (DOCUMENT_EXPORT_DIR) holding the finished export.';
@@ -0,0 +1,13 @@
+-- =====================================================
+-- 101: companies.permissions_version — change counter for the effective-permission cache
+-- Bumped by the role / permission / user-role edit endpoints (api/users.py). The in-process
+-- permission resolver (app.services.permission_resolver) compares it with the version its
+-- cached (branch, permission) sets were loaded under; get_current_user already reads the
+-- company row, so checking it costs no extra query.
+-- Rollback: ALTER TABLE companies DROP COLUMN IF EXISTS permissions_version;
+-- =====================================================
+
+ALTER TABLE companies
+    ADD COLUMN IF NOT EXISTS permissions_version BIGINT NOT NULL DEFAULT 0;
+
+COMMENT ON COLUMN companies.permissions_version IS 'Bumped on role/permission/assignment changes; invalidates cached user permission sets.';
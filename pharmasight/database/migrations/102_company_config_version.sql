@@ -0,0 +1,14 @@
+-- =====================================================
+-- 102: companies.config_version — change counter for the company configuration cache
+-- Bumped by the company / branch settings endpoints (api/company.py) and module licensing.
+-- The in-process cache (app.services.company_config_cache) keeps pricing, stock validation,
+-- report display and module settings per company and reuses an entry only while it was loaded
+-- under the current version; get_current_user already reads the company row, so checking it
+-- costs no extra query.
+-- Rollback: ALTER TABLE companies DROP COLUMN IF EXISTS config_version;
+-- =====================================================
+
+ALTER TABLE companies
+    ADD COLUMN IF NOT EXISTS config_version BIGINT NOT NULL DEFAULT 0;
+
+COMMENT ON COLUMN companies.config_version IS 'Bumped on company/branch settings changes; invalidates cached company configuration.';
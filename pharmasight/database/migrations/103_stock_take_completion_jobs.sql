@@ -0,0 +1,36 @@
+-- =====================================================
+-- 103: stock_take_completion_jobs — branch stock take completion as a tracked background job.
+-- POST /api/stock-take/branch/{branch_id}/complete creates a job; the completion engine
+-- (app.services.stock_take_completion_service) posts all variance / zero-out adjustments in
+-- one transaction and reports progress here. At most one pending/processing job per session.
+-- Rollback: DROP TABLE IF EXISTS stock_take_completion_jobs;
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS stock_take_completion_jobs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    company_id UUID NOT NULL REFERENCES companies(id) ON DELETE CASCADE,
+    branch_id UUID NOT NULL REFERENCES branches(id) ON DELETE CASCADE,
+    session_id UUID NOT NULL REFERENCES stock_take_sessions(id) ON DELETE CASCADE,
+    user_id UUID NOT NULL REFERENCES users(id),
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    total_items INTEGER NOT NULL DEFAULT 0,
+    processed_items INTEGER NOT NULL DEFAULT 0,
+    items_updated INTEGER NOT NULL DEFAULT 0,
+    items_zeroed INTEGER NOT NULL DEFAULT 0,
+    total_counts INTEGER NOT NULL DEFAULT 0,
+    warnings JSONB,
+    error_message VARCHAR(1000),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    completed_at TIMESTAMPTZ
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_stock_take_completion_jobs_active_session
+    ON stock_take_completion_jobs (session_id)
+    WHERE status IN ('pending', 'processing');
+
+CREATE INDEX IF NOT EXISTS idx_stock_take_completion_jobs_branch_created
+    ON stock_take_completion_jobs (branch_id, created_at DESC);
+
+COMMENT ON TABLE stock_take_completion_jobs IS 'Background stock take completions; status pending/processing/completed/failed. processed_items / total_items = adjustment lines posted.';
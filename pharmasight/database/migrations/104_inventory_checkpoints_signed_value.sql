@@ -0,0 +1,12 @@
+-- =====================================================
+-- 104: inventory_daily_checkpoints.layer_value is signed: SUM(quantity_delta * unit_cost).
+-- Checkpoints built before this summed inventory_ledger.total_cost, which write paths store unsigned
+-- (outflows added value instead of removing it). Drop them; valuation reads the ledger until the
+-- next python -m scripts.build_inventory_checkpoints run rebuilds every branch from its first row.
+-- Rollback: none needed (the nightly build repopulates both tables).
+-- =====================================================
+
+DELETE FROM inventory_daily_checkpoints;
+DELETE FROM inventory_checkpoint_progress;
+
+COMMENT ON COLUMN inventory_daily_checkpoints.layer_value IS 'Cumulative SUM(inventory_ledger.quantity_delta * unit_cost) up to the end of checkpoint_date.';
@@ -673,6 +673,8 @@ const API = {
             api.get(`${CONFIG.API_ENDPOINTS.inventory}/branch/${branchId}/expiring?days=${days}`),
         getTotalStockValue: (branchId) =>
             api.get(`${CONFIG.API_ENDPOINTS.inventory}/branch/${branchId}/total-value`),
+        getBranchDashboard: (branchId, expiringDays = 365) =>
+            api.get(`${CONFIG.API_ENDPOINTS.inventory}/branch/${branchId}/dashboard?expiring_days=${expiringDays}`),
         allocateFEFO: (itemId, branchId, quantity, unitName) => 
             api.post(`${CONFIG.API_ENDPOINTS.inventory}/allocate-fefo`, {
                 item_id: itemId,
@@ -1296,6 +1298,7 @@ const API = {
             const queryParams = userId ? `?user_id=${userId}` : '';
             return api.post(`/api/stock-take/branch/${branchId}/complete${queryParams}`, null);
         },
+        getCompletionJob: (branchId, jobId) => api.get(`/api/stock-take/branch/${branchId}/completion-jobs/${jobId}`),
         getVarianceReport: (branchId, sessionId) => api.get(`/api/stock-take/branch/${branchId}/variance-report`, { session_id: sessionId }),
         cancelForBranch: (branchId, userId) => {
             const queryParams = userId ? `?user_id=${userId}` : '';
@@ -252,14 +252,13 @@ async function applyDashboardFilters() {
             if (API.items && typeof API.items.count === 'function') {
                 promises.push(API.items.count(CONFIG.COMPANY_ID).then(function (d) { kpis.itemsCount = (d.count != null ? d.count : 0); }).catch(function () { kpis.itemsCount = 0; }));
             }
-            if (API.inventory && typeof API.inventory.getItemsInStockCount === 'function') {
-                promises.push(API.inventory.getItemsInStockCount(branchId).then(function (d) { kpis.stockCount = (d.count != null ? d.count : 0); }).catch(function () { kpis.stockCount = 0; }));
-            }
-            if (API.inventory && typeof API.inventory.getTotalStockValue === 'function') {
-                promises.push(API.inventory.getTotalStockValue(branchId).then(function (d) { kpis.stockValue = d.total_value; }).catch(function () { kpis.stockValue = null; }));
-            }
-            if (API.inventory && typeof API.inventory.getExpiringCount === 'function') {
-                promises.push(API.inventory.getExpiringCount(branchId, 365).then(function (d) { kpis.expiringCount = (d.count != null ? d.count : 0); }).catch(function () { kpis.expiringCount = 0; }));
+            if (API.inventory && typeof API.inventory.getBranchDashboard === 'function') {
+                // One call for all stock tiles (items in stock, stock value, expiring batches)
+                promises.push(API.inventory.getBranchDashboard(branchId, 365).then(function (d) {
+                    kpis.stockCount = (d.items_in_stock_count != null ? d.items_in_stock_count : 0);
+                    kpis.stockValue = d.total_value;
+                    kpis.expiringCount = (d.expiring_count != null ? d.expiring_count : 0);
+                }).catch(function () { kpis.stockCount = 0; kpis.stockValue = null; kpis.expiringCount = 0; }));
             }
             if (API.orderBook && typeof API.orderBook.getTodaySummary === 'function') {
                 promises.push(API.orderBook.getTodaySummary(branchId, CONFIG.COMPANY_ID, 50).then(function (s) {
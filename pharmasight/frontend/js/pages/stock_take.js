@@ -1617,7 +1617,20 @@ async function completeStockTake() {
             throw new Error('Unable to identify current user. Please refresh and try again.');
         }
         
-        const result = await API.stockTake.completeForBranch(CONFIG.BRANCH_ID, userId);
+        let result = await API.stockTake.completeForBranch(CONFIG.BRANCH_ID, userId);
+        
+        // Completion runs as a background job: poll until it finishes
+        while (result && result.job_id && (result.status === 'pending' || result.status === 'processing')) {
+            if (completeBtn) {
+                completeBtn.innerHTML = `<i class="fas fa-spinner fa-spin"></i> Completing... ${Math.round(result.progress_percent || 0)}%`;
+            }
+            await new Promise(resolve => setTimeout(resolve, 2000));
+            const job = await API.stockTake.getCompletionJob(CONFIG.BRANCH_ID, result.job_id);
+            result = { ...job, job_id: result.job_id };
+        }
+        if (result && result.status === 'failed') {
+            throw new Error(result.error_message || 'Failed to complete stock take');
+        }
         
         if (result && result.success !== false) {
             const itemsUpdated = result.items_updated || 0;